@@ -0,0 +1,7 @@
+"""
+Benchmarks do Cloud Insights, executados offline contra o backend AWS sintético.
+
+- benchmarks.tools: executa cada ferramenta de src/ia/tools numa conta sintética
+  grande e compara tempo, chamadas à AWS, memória e tamanho da saída com o
+  baseline versionado (python -m benchmarks.tools).
+"""
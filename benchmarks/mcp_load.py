@@ -0,0 +1,581 @@
+"""
+Teste de carga do servidor MCP contra uma conta AWS sintética.
+
+O servidor (src/mcp/server.py) é iniciado num processo filho, com transporte
+streamable-http numa porta livre e as chamadas à AWS respondidas pelo
+FakeAWSBackend (modo 'fake' do aws_fixtures) com a latência escolhida. Clientes
+fastmcp concorrentes (um por --concurrency) chamam as ferramentas de um mix
+ponderado, em ciclo fechado, durante --duration segundos ou até --requests chamadas.
+
+Relatório:
+- vazão (chamadas/s) e latência p50/p95/p99 das chamadas bem-sucedidas, por ferramenta;
+- taxa de erros e de chamadas recusadas pelo executor por estar "ocupado"
+  (backpressure de src/mcp/executor.py), além dos throttles da AWS informados em
+  '_meta.aws_calls';
+- memória residente do servidor (VmRSS, Linux) e vazão ao longo do tempo.
+
+--aws-rate-limit limita a vazão da AWS simulada por serviço ou operação: acima
+dela o backend responde ThrottlingException, e as retentativas do botocore e os
+throttles aparecem no relatório.
+
+--max-error-rate, --max-throttle-rate e --max-p99-ms transformam o teste num
+portão: acima dos limites, o código de saída é 1.
+
+Uso:
+    python -m benchmarks.mcp_load                                   # mix 'interactive', 16 clientes, 30 s
+    python -m benchmarks.mcp_load --mix heavy --concurrency 8 --latency 80 --duration 60
+    python -m benchmarks.mcp_load --mix "get_top_services=3,audit_governance_tags=1"
+    python -m benchmarks.mcp_load --aws-rate-limit "ce=5,cloudwatch=20"    # throttling da AWS
+    python -m benchmarks.mcp_load --url http://127.0.0.1:8002/mcp   # servidor já em execução
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.clouds.aws.fake_backend import parse_rate_limits
+from src.clouds.aws.synthetic import PROFILES, SCALES, SyntheticAccount
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Marca das respostas de backpressure do executor ("Ferramenta X ocupada: ...")
+BUSY_MARKER = 'ocupada'
+
+OUTCOMES = ('ok', 'error', 'throttled')
+
+
+class LoadCall:
+    """
+    Uma chamada do mix: ferramenta MCP, variante e argumentos derivados da conta.
+    """
+    
+    def __init__(self, tool: str, arguments: Callable[[SyntheticAccount], Dict[str, Any]] = None,
+                 variant: Optional[str] = None):
+        """
+        Inicializa a chamada.
+        
+        Args:
+            tool: Nome da ferramenta no servidor MCP
+            arguments: Função que recebe a conta e devolve os argumentos da chamada
+            variant: Sufixo que distingue chamadas da mesma ferramenta
+        """
+        self.tool = tool
+        self.arguments = arguments or (lambda account: {})
+        name = tool[len('mcp_'):] if tool.startswith('mcp_') else tool
+        self.id = f"{name}[{variant}]" if variant else name
+
+
+def _running_instance(account: SyntheticAccount) -> Dict[str, Any]:
+    return next(i for i in account.instances if i['State']['Name'] == 'running')
+
+
+def _instance_name(account: SyntheticAccount) -> str:
+    return next(t['Value'] for t in _running_instance(account)['Tags'] if t['Key'] == 'Name')
+
+
+CALLS: Dict[str, LoadCall] = {call.id: call for call in [
+    LoadCall('mcp_get_top_services', lambda a: {'limit': 10}),
+    LoadCall('mcp_get_service_details', lambda a: {'service_name': 'EC2'}),
+    LoadCall('mcp_get_aws_tags'),
+    LoadCall('mcp_get_dimension_values', lambda a: {'dimension_name': 'SERVICE'}),
+    LoadCall('mcp_validate_service', lambda a: {'service_name': 'Amazon Simple Storage Service'}),
+    LoadCall('mcp_aws_ec2_call', lambda a: {'method': 'describe_instances', 'limit': 10}, 'instances'),
+    LoadCall('mcp_get_instance_cost_by_name', lambda a: {'instance_name': _instance_name(a)}),
+    LoadCall('mcp_find_instances_by_tag', lambda a: {'tag_key': 'Environment', 'tag_value': 'production',
+                                                     'limit': 10}),
+    LoadCall('mcp_analyze_tags_costs', lambda a: {'tag_keys': 'Environment,Project'}),
+    LoadCall('mcp_analyze_tag_values', lambda a: {
+        'tag_key': 'Project', 'tag_values': ','.join(a.tags['Project']['values'][:3])}),
+    LoadCall('mcp_get_instance_metrics', lambda a: {'instance_id': _running_instance(a)['InstanceId']}),
+    LoadCall('mcp_resolve_service_name', lambda a: {'service_name': 'ec2'}),
+    LoadCall('mcp_suggest_services', lambda a: {'partial_name': 'Elastic'}),
+    LoadCall('mcp_format_currency', lambda a: {'amount': 1234.56}),
+    LoadCall('mcp_get_current_date'),
+    LoadCall('mcp_get_safe_date_range', lambda a: {'months_back': 3}),
+    LoadCall('mcp_discover_account_resources', lambda a: {'limit': 10}),
+    LoadCall('mcp_get_account_context_data'),
+    LoadCall('mcp_forecast_service_costs'),
+    LoadCall('mcp_audit_governance_tags'),
+    LoadCall('mcp_identify_orphaned_resources', lambda a: {'limit': 10}),
+    LoadCall('mcp_analyze_fleet_perf', lambda a: {'max_instances': 200}),
+    LoadCall('mcp_get_network_analysis', lambda a: {'days': 7, 'top_n': 20})
+]}
+
+# Mixes predefinidos: id da chamada → peso
+MIXES: Dict[str, Dict[str, int]] = {
+    # Perguntas pontuais de um assistente: custos, serviços e utilidades
+    'interactive': {
+        'get_top_services': 6, 'get_service_details': 4, 'resolve_service_name': 3, 'suggest_services': 2,
+        'get_dimension_values': 2, 'find_instances_by_tag': 2, 'get_instance_cost_by_name': 2,
+        'analyze_tags_costs': 2, 'get_instance_metrics': 1, 'aws_ec2_call[instances]': 1,
+        'format_currency': 2, 'get_current_date': 2, 'get_safe_date_range': 1
+    },
+    # Varreduras da conta (pool "heavy" do executor): expõe backpressure
+    'heavy': {
+        'audit_governance_tags': 2, 'identify_orphaned_resources': 2, 'analyze_fleet_perf': 2,
+        'get_network_analysis': 1, 'discover_account_resources': 1, 'get_account_context_data': 1,
+        'forecast_service_costs': 1
+    },
+    # Todas as chamadas com o mesmo peso
+    'all': {call_id: 1 for call_id in CALLS}
+}
+
+
+def parse_mix(spec: str) -> List[Tuple[LoadCall, int]]:
+    """
+    Interpreta o mix: nome de MIXES ou "id=peso,id=peso" (peso padrão 1).
+    
+    Args:
+        spec: Especificação do mix
+    
+    Returns:
+        Lista de (chamada, peso)
+    """
+    weights = MIXES.get(spec)
+    if weights is None:
+        weights = {}
+        for part in (part.strip() for part in spec.split(',')):
+            if not part:
+                continue
+            call_id, _, weight = part.partition('=')
+            call_id = call_id.strip()
+            call_id = call_id[len('mcp_'):] if call_id.startswith('mcp_') else call_id
+            weights[call_id] = int(weight) if weight.strip() else 1
+    unknown = sorted(set(weights) - set(CALLS))
+    if unknown:
+        raise ValueError(f"Chamadas desconhecidas no mix: {', '.join(unknown)} "
+                         f"(use {', '.join(MIXES)} ou ids de {', '.join(CALLS)})")
+    mix = [(CALLS[call_id], weight) for call_id, weight in weights.items() if weight > 0]
+    if not mix:
+        raise ValueError("Mix vazio")
+    return mix
+
+
+# ----- servidor -----
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int) -> None:
+    """Processo filho: executa o servidor MCP na porta indicada (modo fake vem do ambiente)."""
+    from src.ia.warmup import start_background_warm_up
+    from src.mcp.server import mcp
+    
+    start_background_warm_up()
+    mcp.run(transport="streamable-http", host="127.0.0.1", port=port, path="/mcp", log_level="warning")
+
+
+def start_server(workdir: str, scale: str, seed: int, profile: str, latency_ms: float,
+                 rate_limit: Optional[str] = None, timeout: float = 120.0) -> Tuple[subprocess.Popen, str]:
+    """
+    Inicia o servidor MCP num processo filho, com a AWS respondida pelo backend sintético.
+    
+    Args:
+        workdir: Diretório de trabalho do servidor (log de dados brutos e caches)
+        scale: Tamanho da conta sintética
+        seed: Semente da conta
+        profile: Perfil da conta
+        latency_ms: Latência simulada por chamada à AWS
+        rate_limit: Limites de taxa da AWS simulada (ex: 'ce=5'; padrão: sem limite)
+        timeout: Segundos aguardando o servidor responder
+    
+    Returns:
+        Tupla (processo, URL do endpoint MCP)
+    """
+    port = _free_port()
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get('PYTHONPATH')])),
+               CLOUD_INSIGHTS_AWS_MODE='fake',
+               CLOUD_INSIGHTS_REPLAY_LATENCY=str(latency_ms),
+               CLOUD_INSIGHTS_FAKE_SCALE=scale,
+               CLOUD_INSIGHTS_FAKE_SEED=str(seed),
+               CLOUD_INSIGHTS_FAKE_PROFILE=profile,
+               CLOUD_INSIGHTS_FAKE_RATE_LIMIT=rate_limit or '',
+               CLOUD_INSIGHTS_CACHE_DIR=os.path.join(workdir, 'cache'))
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.mcp_load', '--serve', '--port', str(port)],
+                               cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(os.path.join(workdir, 'server.log'), encoding='utf-8', errors='replace') as server_log:
+                raise RuntimeError(f"Servidor MCP terminou ao iniciar:\n{server_log.read()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                return process, f"http://127.0.0.1:{port}/mcp"
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Servidor MCP não respondeu em {timeout:.0f}s")
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """Memória residente do processo em MB (Linux; None se indisponível)."""
+    try:
+        with open(f"/proc/{pid}/status", encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+# ----- carga -----
+
+class LoadRun:
+    """
+    Resultados de uma execução: latência e desfecho de cada chamada e amostras de memória.
+    """
+    
+    def __init__(self):
+        self.calls: Dict[str, Dict[str, Any]] = {}
+        self.timeline: List[Dict[str, Any]] = []
+        self.aws_throttles = 0
+        self.errors: Dict[str, str] = {}
+        self.completed = 0
+    
+    def record(self, call_id: str, seconds: float, outcome: str, detail: Optional[str] = None) -> None:
+        entry = self.calls.setdefault(call_id, {'latencies': [], **{name: 0 for name in OUTCOMES}})
+        entry[outcome] += 1
+        self.completed += 1
+        if outcome == 'ok':
+            entry['latencies'].append(seconds)
+        elif outcome == 'error' and detail:
+            # Primeira mensagem de erro de cada chamada, para diagnóstico
+            self.errors.setdefault(call_id, detail[:300])
+
+
+def _classify(result: Any) -> Tuple[str, Optional[str], int]:
+    """Desfecho de uma chamada: (ok|error|throttled, mensagem de erro, throttles da AWS)."""
+    text = ''.join(getattr(block, 'text', '') for block in result.content or [])
+    if result.is_error:
+        return ('throttled' if BUSY_MARKER in text else 'error'), text, 0
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return 'ok', None, 0
+    if not isinstance(data, dict):
+        return 'ok', None, 0
+    throttles = ((data.get('_meta') or {}).get('aws_calls') or {}).get('throttles', 0)
+    if 'error' in data:
+        return 'error', str(data['error']), throttles
+    return 'ok', None, throttles
+
+
+async def _worker(url: str, mix: List[Tuple[LoadCall, int]], arguments: Dict[str, Dict[str, Any]],
+                  run: LoadRun, rng: random.Random, deadline: float, budget: List[int],
+                  call_timeout: float) -> None:
+    from fastmcp import Client
+    from fastmcp.client.transports import StreamableHttpTransport
+    
+    calls = [call for call, _ in mix]
+    weights = [weight for _, weight in mix]
+    async with Client(transport=StreamableHttpTransport(url)) as client:
+        while time.perf_counter() < deadline and budget[0] != 0:
+            budget[0] -= 1
+            call = rng.choices(calls, weights)[0]
+            started = time.perf_counter()
+            try:
+                result = await client.call_tool(call.tool, arguments[call.id], raise_on_error=False,
+                                                timeout=call_timeout)
+            except Exception as e:
+                run.record(call.id, time.perf_counter() - started, 'error', f"{type(e).__name__}: {e}")
+                continue
+            outcome, detail, throttles = _classify(result)
+            run.aws_throttles += throttles
+            run.record(call.id, time.perf_counter() - started, outcome, detail)
+
+
+async def _sample(run: LoadRun, pid: Optional[int], started: float, interval: float, stop: asyncio.Event) -> None:
+    """Amostra a memória do servidor e a vazão a cada intervalo."""
+    previous = 0
+    while True:
+        completed = run.completed
+        rss = _rss_mb(pid) if pid else None
+        run.timeline.append({
+            'seconds': round(time.perf_counter() - started, 1),
+            'rss_mb': None if rss is None else round(rss, 1),
+            'calls_per_second': round((completed - previous) / interval, 1) if run.timeline else 0.0
+        })
+        previous = completed
+        if stop.is_set():
+            return
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_load(url: str, mix: List[Tuple[LoadCall, int]], arguments: Dict[str, Dict[str, Any]],
+                   concurrency: int = 16, duration: float = 30.0, requests: Optional[int] = None,
+                   server_pid: Optional[int] = None, sample_interval: float = 1.0,
+                   call_timeout: float = 120.0, seed: int = 42) -> Tuple[LoadRun, float]:
+    """
+    Executa a carga: `concurrency` clientes em ciclo fechado.
+    
+    Args:
+        url: Endpoint MCP (streamable-http)
+        mix: Chamadas e pesos (ver parse_mix())
+        arguments: Argumentos de cada chamada, por id
+        concurrency: Clientes simultâneos
+        duration: Segundos de carga
+        requests: Total de chamadas (encerra antes do prazo se atingido)
+        server_pid: Processo do servidor, para amostrar a memória
+        sample_interval: Segundos entre amostras de memória e vazão
+        call_timeout: Prazo de cada chamada em segundos
+        seed: Semente do sorteio das chamadas
+    
+    Returns:
+        Tupla (resultados, segundos decorridos)
+    """
+    run = LoadRun()
+    budget = [requests if requests else -1]
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    sampler = asyncio.create_task(_sample(run, server_pid, started, sample_interval, stop))
+    try:
+        await asyncio.gather(*(
+            _worker(url, mix, arguments, run, random.Random(seed + index), started + duration, budget, call_timeout)
+            for index in range(concurrency)
+        ))
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+    return run, elapsed
+
+
+async def warm_up(url: str, mix: List[Tuple[LoadCall, int]], arguments: Dict[str, Dict[str, Any]],
+                  call_timeout: float) -> None:
+    """Chama cada ferramenta do mix uma vez (conta sintética, caches e imports prontos antes da medição)."""
+    from fastmcp import Client
+    from fastmcp.client.transports import StreamableHttpTransport
+    
+    async with Client(transport=StreamableHttpTransport(url)) as client:
+        for call, _ in mix:
+            await client.call_tool(call.tool, arguments[call.id], raise_on_error=False, timeout=call_timeout)
+
+
+# ----- relatório -----
+
+def summarize(run: LoadRun, elapsed: float) -> Dict[str, Any]:
+    """
+    Consolida os resultados: vazão, latência por chamada, taxas de erro e memória.
+    
+    Returns:
+        {'totals': {...}, 'calls': {id: métricas}, 'memory': {...}, 'timeline': [...], 'errors': {...}}
+    """
+    calls = {}
+    for call_id, entry in sorted(run.calls.items()):
+        total = sum(entry[name] for name in OUTCOMES)
+        latencies = np.asarray(entry['latencies']) * 1000
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [None] * 3
+        calls[call_id] = {
+            'calls': total,
+            **{name: entry[name] for name in OUTCOMES},
+            'error_rate': round(entry['error'] / total, 4),
+            'throttle_rate': round(entry['throttled'] / total, 4),
+            'p50_ms': None if percentiles[0] is None else round(float(percentiles[0]), 1),
+            'p95_ms': None if percentiles[1] is None else round(float(percentiles[1]), 1),
+            'p99_ms': None if percentiles[2] is None else round(float(percentiles[2]), 1),
+            'max_ms': round(float(latencies.max()), 1) if len(latencies) else None
+        }
+    
+    total = sum(call['calls'] for call in calls.values())
+    ok = sum(call['ok'] for call in calls.values())
+    latencies = np.concatenate([np.asarray(entry['latencies']) for entry in run.calls.values()] or [[]]) * 1000
+    overall = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [None] * 3
+    memory = [sample['rss_mb'] for sample in run.timeline if sample['rss_mb'] is not None]
+    return {
+        'totals': {
+            'calls': total,
+            'seconds': round(elapsed, 2),
+            'calls_per_second': round(total / elapsed, 2) if elapsed else 0.0,
+            'ok_per_second': round(ok / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(sum(call['error'] for call in calls.values()) / total, 4) if total else 0.0,
+            'throttle_rate': round(sum(call['throttled'] for call in calls.values()) / total, 4) if total else 0.0,
+            'aws_throttles': run.aws_throttles,
+            'p50_ms': None if overall[0] is None else round(float(overall[0]), 1),
+            'p95_ms': None if overall[1] is None else round(float(overall[1]), 1),
+            'p99_ms': None if overall[2] is None else round(float(overall[2]), 1)
+        },
+        'calls': calls,
+        'memory': {
+            'start_mb': memory[0] if memory else None,
+            'peak_mb': max(memory) if memory else None,
+            'end_mb': memory[-1] if memory else None
+        },
+        'timeline': run.timeline,
+        'errors': run.errors
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.0f}"
+
+
+def _sparkline(values: List[float]) -> str:
+    if not values:
+        return ''
+    bars = '▁▂▃▄▅▆▇█'
+    low, high = min(values), max(values)
+    if high == low:
+        return bars[0] * len(values)
+    return ''.join(bars[int((value - low) / (high - low) * (len(bars) - 1))] for value in values)
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    """Relatório em texto: tabela por chamada, totais, memória e vazão ao longo do tempo."""
+    lines = [f"{'chamada':<34} {'n':>6} {'erro%':>6} {'ocup%':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}"]
+    for call_id, call in summary['calls'].items():
+        lines.append(f"{call_id:<34} {call['calls']:>6} {call['error_rate'] * 100:>6.1f} "
+                     f"{call['throttle_rate'] * 100:>6.1f} {_ms(call['p50_ms']):>7} {_ms(call['p95_ms']):>7} "
+                     f"{_ms(call['p99_ms']):>7} {_ms(call['max_ms']):>7}")
+    totals = summary['totals']
+    lines.append("")
+    lines.append(f"🚀 {totals['calls']} chamadas em {totals['seconds']:.1f}s: {totals['calls_per_second']:.1f}/s "
+                 f"({totals['ok_per_second']:.1f}/s com sucesso); latência p50 {_ms(totals['p50_ms'])} ms, "
+                 f"p95 {_ms(totals['p95_ms'])} ms, p99 {_ms(totals['p99_ms'])} ms")
+    lines.append(f"⚠️  Erros {totals['error_rate'] * 100:.1f}% · recusadas por ocupação "
+                 f"{totals['throttle_rate'] * 100:.1f}% · throttles da AWS {totals['aws_throttles']}")
+    
+    memory = summary['memory']
+    timeline = summary['timeline']
+    if memory['peak_mb'] is not None:
+        lines.append(f"💾 Memória do servidor: {memory['start_mb']:.0f} → {memory['end_mb']:.0f} MB "
+                     f"(pico {memory['peak_mb']:.0f} MB)  "
+                     f"{_sparkline([s['rss_mb'] for s in timeline if s['rss_mb'] is not None])}")
+    if len(timeline) > 1:
+        rates = [sample['calls_per_second'] for sample in timeline[1:]]
+        lines.append(f"📈 Vazão por intervalo: {min(rates):.0f}–{max(rates):.0f}/s  {_sparkline(rates)}")
+    for call_id, message in summary['errors'].items():
+        lines.append(f"❌ {call_id}: {message}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Ponto de entrada: inicia o servidor, aplica a carga e imprime o relatório.
+    
+    Returns:
+        0 dentro dos limites, 1 se algum limite (--max-*) for ultrapassado
+    """
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor MCP contra uma conta AWS sintética")
+    parser.add_argument('--mix', default='interactive',
+                        help=f"Mix de chamadas: {', '.join(MIXES)} ou \"id=peso,id=peso\"")
+    parser.add_argument('--concurrency', type=int, default=16, help="Clientes simultâneos")
+    parser.add_argument('--duration', type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument('--requests', type=int, help="Total de chamadas (encerra antes do prazo se atingido)")
+    parser.add_argument('--latency', type=float, default=50.0, help="Latência simulada por chamada à AWS (ms)")
+    parser.add_argument('--scale', default='medium', choices=sorted(SCALES), help="Tamanho da conta sintética")
+    parser.add_argument('--seed', type=int, default=42, help="Semente da conta e do sorteio das chamadas")
+    parser.add_argument('--profile', default='default', choices=list(PROFILES), help="Perfil da conta sintética")
+    parser.add_argument('--aws-rate-limit',
+                        help="Chamadas/s da AWS simulada por serviço ou operação, ex: 'ce=5,ec2.DescribeInstances=20' "
+                             "(acima disso, ThrottlingException)")
+    parser.add_argument('--url', help="Endpoint de um servidor já em execução, em modo fake com a mesma conta "
+                             "(sem iniciar um; memória não medida)")
+    parser.add_argument('--sample-interval', type=float, default=1.0, help="Segundos entre amostras de memória")
+    parser.add_argument('--call-timeout', type=float, default=120.0, help="Prazo de cada chamada (s)")
+    parser.add_argument('--no-warmup', action='store_true', help="Não aquece o servidor antes de medir")
+    parser.add_argument('--max-error-rate', type=float, help="Falha se a taxa de erros passar disso (0-1)")
+    parser.add_argument('--max-throttle-rate', type=float, help="Falha se a taxa de recusas passar disso (0-1)")
+    parser.add_argument('--max-p99-ms', type=float, help="Falha se o p99 geral passar disso (ms)")
+    parser.add_argument('--json', help="Grava o resultado completo neste arquivo")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    
+    if args.serve:
+        serve(args.port)
+        return 0
+    
+    try:
+        mix = parse_mix(args.mix)
+        parse_rate_limits(args.aws_rate_limit)
+    except ValueError as e:
+        parser.error(str(e))
+    json_path = os.path.abspath(args.json) if args.json else None
+    account = SyntheticAccount.generate(args.scale, seed=args.seed, profile=args.profile,
+                                        region=os.environ.get('AWS_REGION', 'us-east-1'))
+    arguments = {call.id: call.arguments(account) for call, _ in mix}
+    
+    workdir = tempfile.mkdtemp(prefix='cloud-insights-load-')
+    process = None
+    try:
+        url = args.url
+        if not url:
+            started = time.perf_counter()
+            process, url = start_server(workdir, args.scale, args.seed, args.profile, args.latency,
+                                        args.aws_rate_limit)
+            print(f"🧪 Servidor MCP em {url} (pid {process.pid}, conta '{args.scale}', perfil {args.profile}, "
+                  f"latência AWS {args.latency:.0f} ms"
+                  f"{f', limites {args.aws_rate_limit}' if args.aws_rate_limit else ''}) "
+                  f"pronto em {time.perf_counter() - started:.1f}s")
+        if not args.no_warmup:
+            started = time.perf_counter()
+            asyncio.run(warm_up(url, mix, arguments, args.call_timeout))
+            print(f"🔥 Aquecimento: {len(mix)} chamadas em {time.perf_counter() - started:.1f}s")
+        
+        print(f"⏱️  {args.concurrency} clientes, mix '{args.mix}', "
+              f"{f'{args.requests} chamadas' if args.requests else f'{args.duration:.0f}s'}...", flush=True)
+        run, elapsed = asyncio.run(run_load(url, mix, arguments, args.concurrency, args.duration, args.requests,
+                                            process.pid if process else None, args.sample_interval,
+                                            args.call_timeout, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    summary = summarize(run, elapsed)
+    summary['meta'] = {'mix': args.mix, 'concurrency': args.concurrency, 'latency_ms': args.latency,
+                       'aws_rate_limit': args.aws_rate_limit,
+                       'scale': args.scale, 'seed': args.seed, 'profile': args.profile,
+                       'created_at': datetime.now().isoformat(timespec='seconds')}
+    print(format_report(summary))
+    
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(summary, json_file, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado gravado em {json_path}")
+    
+    totals = summary['totals']
+    exceeded = [
+        f"{name} {value} > {limit}" for name, value, limit in (
+            ('taxa de erros', totals['error_rate'], args.max_error_rate),
+            ('taxa de recusas', totals['throttle_rate'], args.max_throttle_rate),
+            ('p99 (ms)', totals['p99_ms'], args.max_p99_ms)
+        ) if limit is not None and value is not None and value > limit
+    ]
+    for message in exceeded:
+        print(f"❌ Limite ultrapassado: {message}")
+    return 1 if exceeded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,489 @@
+"""
+Benchmark de todas as ferramentas do agente contra uma conta AWS sintética.
+
+Cada função de ALL_TOOLS (src/ia/tools/__init__.py) é executada com argumentos
+representativos contra o FakeAWSBackend (modo 'fake' do aws_fixtures), sem
+rede nem credenciais. Por ferramenta são medidos:
+- tempo de parede (mediana de --repeat execuções, caches frios);
+- chamadas à AWS (total e por operação, contadas no backend);
+- pico de memória (tracemalloc, numa execução separada; inclui as respostas
+  montadas pelo backend, como seriam as do boto3, mas não o custo fixo de criar a
+  sessão e os clientes boto3, medido à parte e descontado);
+- tamanho da saída em bytes (com o '_meta.aws_calls' que o agente e o servidor MCP
+  recebem: cada execução roda num aws_call_scope()).
+
+O resultado é comparado com o baseline (benchmarks/baseline.json) e regressões
+acima das tolerâncias são sinalizadas (código de saída 1). O baseline só é
+comparável com a mesma conta (tamanho e semente) e, para tempo e memória, na
+mesma máquina: gere-o de novo com --update-baseline ao trocar de ambiente.
+
+Uso:
+    python -m benchmarks.tools                      # conta 'large', compara com o baseline
+    python -m benchmarks.tools --only find_instances_by_tag,audit_governance_tags
+    python -m benchmarks.tools --scale small --repeat 1 --no-baseline
+    python -m benchmarks.tools --update-baseline    # regrava o baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.clouds.aws.fake_backend import FakeAWSBackend
+from src.clouds.aws.synthetic import PROFILES, SCALES, SyntheticAccount
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Métrica → (tolerância relativa padrão, folga absoluta): só é regressão se passar das duas
+METRICS = {
+    'wall_seconds': (0.30, 0.05),
+    'aws_calls': (0.0, 0),
+    'peak_memory_mb': (0.20, 1.0),
+    'output_bytes': (0.10, 512)
+}
+
+
+class BenchmarkCase:
+    """
+    Uma execução de ferramenta: nome, variante e argumentos derivados da conta.
+    """
+    
+    def __init__(self, tool: str, arguments: Callable[[SyntheticAccount], Dict[str, Any]] = None,
+                 variant: Optional[str] = None):
+        """
+        Inicializa o caso.
+        
+        Args:
+            tool: Nome da função em ALL_TOOLS
+            arguments: Função que recebe a conta e devolve os argumentos da chamada
+            variant: Sufixo que distingue casos da mesma ferramenta
+        """
+        self.tool = tool
+        self.arguments = arguments or (lambda account: {})
+        self.id = f"{tool}[{variant}]" if variant else tool
+
+
+def _running_instance(account: SyntheticAccount) -> Dict[str, Any]:
+    return next(i for i in account.instances if i['State']['Name'] == 'running')
+
+
+def _instance_name(account: SyntheticAccount) -> str:
+    return next(t['Value'] for t in _running_instance(account)['Tags'] if t['Key'] == 'Name')
+
+
+CASES: List[BenchmarkCase] = [
+    BenchmarkCase('get_top_services', lambda a: {'limit': 10}),
+    BenchmarkCase('get_service_details', lambda a: {'service_name': 'EC2'}),
+    BenchmarkCase('get_aws_tags'),
+    BenchmarkCase('get_dimension_values', lambda a: {'dimension_name': 'USAGE_TYPE'}),
+    BenchmarkCase('discover_account_resources', lambda a: {'limit': 10}),
+    BenchmarkCase('validate_and_analyze_service', lambda a: {'service_name': 'Amazon Simple Storage Service'}),
+    BenchmarkCase('analyze_account_coverage'),
+    BenchmarkCase('get_account_context_data'),
+    BenchmarkCase('forecast_service_costs', lambda a: {'compare_with_api': True}),
+    BenchmarkCase('check_account_data_availability'),
+    BenchmarkCase('aws_ec2_call', lambda a: {'method': 'describe_instances', 'limit': 10}, 'instances'),
+    BenchmarkCase('aws_ec2_call', lambda a: {'method': 'describe_snapshots', 'limit': 10}, 'snapshots'),
+    BenchmarkCase('get_instance_cost_by_name', lambda a: {'instance_name': _instance_name(a)}),
+    BenchmarkCase('find_instances_by_tag', lambda a: {'tag_key': 'Environment', 'tag_value': 'production',
+                                                      'limit': 10}, 'value'),
+    BenchmarkCase('find_instances_by_tag', lambda a: {'tag_key': 'Project', 'limit': 10}, 'key'),
+    BenchmarkCase('audit_governance_tags'),
+    BenchmarkCase('identify_orphaned_resources', lambda a: {'limit': 10}),
+    BenchmarkCase('analyze_multiple_tags_costs', lambda a: {'tag_keys': 'Environment,Project,Team'}),
+    BenchmarkCase('analyze_tag_specific_values', lambda a: {
+        'tag_key': 'Project', 'tag_values': ','.join(a.tags['Project']['values'][:3])}),
+    BenchmarkCase('format_currency', lambda a: {'amount': 1234.56}),
+    BenchmarkCase('get_current_date'),
+    BenchmarkCase('get_date_from_period', lambda a: {'period_description': 'últimos 3 meses'}),
+    BenchmarkCase('all_dimensions'),
+    BenchmarkCase('get_safe_date_range', lambda a: {'months_back': 6}),
+    BenchmarkCase('get_instance_performance_metrics', lambda a: {'instance_id': _running_instance(a)['InstanceId']}),
+    BenchmarkCase('analyze_ec2_fleet_performance', lambda a: {'max_instances': len(a.instances)}),
+    BenchmarkCase('get_network_traffic_analysis', lambda a: {'days': 7, 'top_n': 50}, 'fleet'),
+    BenchmarkCase('get_network_traffic_analysis', lambda a: {'instance_id': _running_instance(a)['InstanceId']},
+                  'instance'),
+    BenchmarkCase('resolve_service_name', lambda a: {'service_name': 'ec2'}),
+    BenchmarkCase('suggest_services', lambda a: {'partial_name': 'Elastic'}),
+    BenchmarkCase('list_all_services'),
+    BenchmarkCase('refresh_services_cache')
+]
+
+
+@contextmanager
+def _quiet() -> Iterator[None]:
+    """Descarta os prints das ferramentas durante a medição."""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        yield
+
+
+def _reset_caches() -> None:
+    """Caches em memória entre execuções: cada medição começa fria."""
+    from src.clouds.aws.cost_trends import CostTrendEngine
+    from src.clouds.aws.metric_cache import metric_cache
+    from src.ia.tools.pagination import result_snapshots
+    
+    CostTrendEngine.clear_cache()
+    metric_cache.clear()
+    result_snapshots.clear()
+
+
+def _output_text(result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, default=str, ensure_ascii=False)
+
+
+def _call_diff(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {name: count - before.get(name, 0) for name, count in after.items() if count - before.get(name, 0)}
+
+
+def _client_overhead_mb(services: List[str]) -> float:
+    """
+    Pico de memória de criar uma sessão do projeto com um cliente por serviço.
+    
+    As ferramentas criam sessões novas a cada execução, e cada sessão carrega de
+    novo os modelos de serviço do botocore: esse custo fixo não é da ferramenta.
+    
+    Args:
+        services: Serviços AWS usados pela ferramenta (ex: ['ce', 'ec2'])
+    
+    Returns:
+        Pico em MB
+    """
+    from src.clouds.aws.client import AWSClient
+    
+    gc.collect()
+    tracemalloc.start()
+    try:
+        aws_client = AWSClient()
+        for service in services:
+            aws_client.get_client(service)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(case: BenchmarkCase, function: Callable[..., Any], account: SyntheticAccount,
+             backend: FakeAWSBackend, repeat: int = 3, measure_memory: bool = True) -> Dict[str, Any]:
+    """
+    Executa um caso e mede tempo, chamadas à AWS, memória e saída.
+    
+    Args:
+        case: Caso do benchmark
+        function: Ferramenta a executar
+        account: Conta sintética (para os argumentos)
+        backend: Backend que conta as chamadas
+        repeat: Execuções cronometradas (a mediana é reportada)
+        measure_memory: Se True, faz uma execução extra com tracemalloc (descontado
+            o pico de criar os clientes boto3 dos serviços chamados)
+    
+    Returns:
+        Dicionário com as métricas do caso
+    """
+    from src.adapters.haystack_tools import is_error_result
+    from src.telemetry.aws_calls import aws_call_scope
+    
+    arguments = case.arguments(account)
+    timings: List[float] = []
+    calls: Dict[str, int] = {}
+    accounting: Dict[str, Any] = {}
+    text, error = '', None
+    
+    for attempt in range(max(repeat, 1)):
+        _reset_caches()
+        before = backend.snapshot()
+        started = time.perf_counter()
+        # Como no agente e no servidor MCP: a execução contabiliza as próprias chamadas à AWS
+        with aws_call_scope(case.tool) as ledger:
+            try:
+                with _quiet():
+                    result = function(**arguments)
+            except Exception as e:
+                result = f"Erro: {type(e).__name__}: {e}"
+        timings.append(time.perf_counter() - started)
+        if attempt == 0:
+            calls = _call_diff(backend.snapshot(), before)
+            accounting = ledger.summary()
+            text = _output_text(result)
+            if is_error_result(text):
+                error = text[:300]
+    
+    peak_mb = None
+    if measure_memory:
+        overhead_mb = _client_overhead_mb(sorted({name.split('.')[0] for name in calls}))
+        _reset_caches()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with aws_call_scope(case.tool), _quiet():
+                function(**arguments)
+        except Exception:
+            pass
+        finally:
+            peak_mb = max(tracemalloc.get_traced_memory()[1] / (1024 * 1024) - overhead_mb, 0.0)
+            tracemalloc.stop()
+    
+    return {
+        'tool': case.tool,
+        'arguments': arguments,
+        'wall_seconds': round(statistics.median(timings), 4),
+        'wall_seconds_min': round(min(timings), 4),
+        'aws_calls': sum(calls.values()),
+        'aws_operations': calls,
+        'aws_bytes_received': accounting.get('bytes_received', 0),
+        'aws_estimated_cost_usd': accounting.get('estimated_cost_usd', 0.0),
+        'peak_memory_mb': round(peak_mb, 2) if peak_mb is not None else None,
+        'output_bytes': len(text.encode('utf-8')),
+        'error': error
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerances: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Compara os resultados com o baseline.
+    
+    Args:
+        results: Métricas por caso desta execução
+        baseline: Métricas por caso do baseline
+        tolerances: Tolerância relativa por métrica (padrão: METRICS)
+    
+    Returns:
+        Lista de achados {'case', 'metric', 'kind' ('regression'|'improvement'|'new'),
+        'baseline', 'current', 'change_percent'}
+    """
+    tolerances = tolerances or {}
+    findings: List[Dict[str, Any]] = []
+    for case_id, current in results.items():
+        reference = baseline.get(case_id)
+        if reference is None:
+            findings.append({'case': case_id, 'metric': None, 'kind': 'new'})
+            continue
+        if current.get('error') and not reference.get('error'):
+            findings.append({'case': case_id, 'metric': 'error', 'kind': 'regression',
+                             'baseline': None, 'current': current['error'], 'change_percent': None})
+        for metric, (default_tolerance, slack) in METRICS.items():
+            base, value = reference.get(metric), current.get(metric)
+            if base is None or value is None:
+                continue
+            tolerance = tolerances.get(metric, default_tolerance)
+            change = round((value - base) / base * 100, 1) if base else None
+            if value > base * (1 + tolerance) and value - base > slack:
+                kind = 'regression'
+            elif value < base * (1 - tolerance) and base - value > slack:
+                kind = 'improvement'
+            else:
+                continue
+            findings.append({'case': case_id, 'metric': metric, 'kind': kind,
+                             'baseline': base, 'current': value, 'change_percent': change})
+    return findings
+
+
+def format_report(results: Dict[str, Dict[str, Any]], findings: List[Dict[str, Any]]) -> str:
+    """
+    Monta a tabela por ferramenta e a lista de regressões/melhorias.
+    
+    Args:
+        results: Métricas por caso
+        findings: Resultado de compare()
+    
+    Returns:
+        Texto do relatório
+    """
+    flagged = {f['case'] for f in findings if f['kind'] == 'regression'}
+    width = max([len(case_id) for case_id in results] + [10])
+    lines = [
+        "",
+        "📊 " + "=" * 60,
+        "   BENCHMARK DAS FERRAMENTAS",
+        "=" * 64,
+        f"{'ferramenta':<{width}}  {'tempo (s)':>9}  {'AWS':>5}  {'memória (MB)':>12}  {'saída (KB)':>10}  status"
+    ]
+    for case_id, result in results.items():
+        memory = result['peak_memory_mb']
+        status = '❌ erro' if result['error'] else ('⚠️  regressão' if case_id in flagged else '✅')
+        lines.append(
+            f"{case_id:<{width}}  {result['wall_seconds']:>9.3f}  {result['aws_calls']:>5}  "
+            f"{memory if memory is not None else '-':>12}  {result['output_bytes'] / 1024:>10.1f}  {status}"
+        )
+    
+    lines.append("")
+    regressions = [f for f in findings if f['kind'] == 'regression']
+    improvements = [f for f in findings if f['kind'] == 'improvement']
+    new_cases = [f['case'] for f in findings if f['kind'] == 'new']
+    for title, items in (("⚠️  Regressões:", regressions), ("🚀 Melhorias:", improvements)):
+        if not items:
+            continue
+        lines.append(title)
+        for f in items:
+            change = f" ({f['change_percent']:+.1f}%)" if f.get('change_percent') is not None else ""
+            lines.append(f"  {f['case']} {f['metric']}: {f['baseline']} → {f['current']}{change}")
+    if new_cases:
+        lines.append(f"🆕 Sem baseline: {', '.join(new_cases)}")
+    total = sum(r['wall_seconds'] for r in results.values())
+    lines.append(f"Total: {len(results)} casos, {total:.1f}s, "
+                 f"{sum(r['aws_calls'] for r in results.values())} chamadas à AWS "
+                 f"(custo estimado US$ {sum(r.get('aws_estimated_cost_usd', 0) for r in results.values()):.2f}), "
+                 f"{len(regressions)} regressão(ões)")
+    return "\n".join(lines) + "\n"
+
+
+def _account_meta(account: SyntheticAccount, scale: str) -> Dict[str, Any]:
+    return {'scale': scale, 'seed': account.seed, 'profile': account.profile, 'sizes': account.sizes}
+
+
+def run_suite(scale: str = 'large', seed: int = 42, repeat: int = 3, only: Optional[List[str]] = None,
+              measure_memory: bool = True, latency_ms: float = 0.0, profile: str = 'default') -> Dict[str, Any]:
+    """
+    Gera a conta sintética, liga o modo fake e executa os casos.
+    
+    As ferramentas rodam num diretório temporário (log de dados brutos e cache de
+    serviços isolados do usuário), removido ao final.
+    
+    Args:
+        scale: Tamanho da conta sintética
+        seed: Semente da conta
+        repeat: Execuções cronometradas por caso
+        only: Ferramentas ou casos a executar (padrão: todos)
+        measure_memory: Se True, mede o pico de memória de cada caso
+        latency_ms: Latência simulada por chamada à AWS
+        profile: Perfil da conta sintética
+    
+    Returns:
+        {'meta': {...}, 'cases': {id: métricas}}
+    """
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='cloud-insights-bench-')
+    os.environ['CLOUD_INSIGHTS_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    os.chdir(workdir)
+    try:
+        started = time.perf_counter()
+        account = SyntheticAccount.generate(scale, seed=seed, profile=profile,
+                                            region=os.environ.get('AWS_REGION', 'us-east-1'))
+        print(f"🧪 Conta sintética '{scale}' (perfil {profile}) gerada em {time.perf_counter() - started:.1f}s: "
+              f"{json.dumps(account.summary(), ensure_ascii=False)}")
+        
+        from src.clouds.aws.replay import aws_fixtures
+        backend = FakeAWSBackend(account)
+        aws_fixtures.configure('fake', latency=str(latency_ms), backend=backend)
+        
+        # Importadas depois do chdir: o log de dados brutos fica no diretório temporário
+        from src.ia.tools import ALL_TOOLS
+        from src.ia.tools.service_resolver import get_service_resolver
+        
+        tools = {function.__name__: function for function in ALL_TOOLS}
+        missing = sorted(set(tools) - {case.tool for case in CASES})
+        if missing:
+            raise RuntimeError(f"Ferramentas sem caso de benchmark: {', '.join(missing)}")
+        
+        # Lista de serviços do resolver vinda da conta sintética (cache compartilhado novo)
+        with _quiet():
+            get_service_resolver().refresh_services()
+        
+        selected = [case for case in CASES if not only or case.tool in only or case.id in only]
+        cases: Dict[str, Dict[str, Any]] = {}
+        for case in selected:
+            print(f"⏱️  {case.id}...", flush=True)
+            cases[case.id] = run_case(case, tools[case.tool], account, backend, repeat, measure_memory)
+        
+        return {
+            'meta': dict(_account_meta(account, scale),
+                         python=platform.python_version(),
+                         machine=f"{platform.system()} {platform.machine()}",
+                         repeat=repeat,
+                         latency_ms=latency_ms,
+                         created_at=datetime.now().isoformat(timespec='seconds')),
+            'cases': cases
+        }
+    finally:
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Ponto de entrada: executa o benchmark, imprime o relatório e compara com o baseline.
+    
+    Returns:
+        0 sem regressões, 1 com regressões, 2 se o baseline for de outra conta
+    """
+    parser = argparse.ArgumentParser(description="Benchmark das ferramentas contra uma conta AWS sintética")
+    parser.add_argument('--scale', default='large', choices=sorted(SCALES), help="Tamanho da conta sintética")
+    parser.add_argument('--seed', type=int, default=42, help="Semente da conta sintética")
+    parser.add_argument('--profile', default='default', choices=list(PROFILES), help="Perfil da conta sintética")
+    parser.add_argument('--repeat', type=int, default=3, help="Execuções cronometradas por caso")
+    parser.add_argument('--only', help="Ferramentas ou casos a executar, separados por vírgula")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latência simulada por chamada à AWS (ms)")
+    parser.add_argument('--no-memory', action='store_true', help="Não mede o pico de memória")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Arquivo do baseline")
+    parser.add_argument('--no-baseline', action='store_true', help="Não compara com o baseline")
+    parser.add_argument('--update-baseline', action='store_true', help="Grava esta execução como baseline")
+    parser.add_argument('--json', help="Grava o resultado completo neste arquivo")
+    for metric, (tolerance, _) in METRICS.items():
+        parser.add_argument(f"--{metric.replace('_', '-')}-tolerance", type=float, default=tolerance,
+                            help=f"Tolerância relativa de {metric} (padrão {tolerance})")
+    args = parser.parse_args(argv)
+    
+    only = [name.strip() for name in args.only.split(',')] if args.only else None
+    baseline_path = os.path.abspath(args.baseline)
+    json_path = os.path.abspath(args.json) if args.json else None
+    
+    report = run_suite(args.scale, args.seed, args.repeat, only, not args.no_memory, args.latency, args.profile)
+    
+    findings: List[Dict[str, Any]] = []
+    exit_code = 0
+    if not args.no_baseline and not args.update_baseline:
+        if not os.path.exists(baseline_path):
+            print(f"⚠️  Baseline não encontrado em {baseline_path}; use --update-baseline para criá-lo")
+        else:
+            with open(baseline_path, encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            expected = {key: baseline['meta'].get(key) for key in ('scale', 'seed', 'profile', 'sizes')}
+            current = {key: report['meta'][key] for key in ('scale', 'seed', 'profile', 'sizes')}
+            if expected != current:
+                print(f"⚠️  Baseline gerado para outra conta ({expected}); comparação ignorada")
+                exit_code = 2
+            else:
+                tolerances = {metric: getattr(args, f"{metric}_tolerance") for metric in METRICS}
+                findings = compare(report['cases'], baseline['cases'], tolerances)
+                if any(f['kind'] == 'regression' for f in findings):
+                    exit_code = 1
+    
+    print(format_report(report['cases'], findings))
+    report['findings'] = findings
+    
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(report, json_file, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 Resultado gravado em {json_path}")
+    
+    if args.update_baseline:
+        if only and os.path.exists(baseline_path):
+            # Execução parcial: atualiza só os casos executados
+            with open(baseline_path, encoding='utf-8') as baseline_file:
+                previous = json.load(baseline_file)
+            report['cases'] = dict(previous.get('cases', {}), **report['cases'])
+        baseline = {'meta': report['meta'], 'cases': report['cases']}
+        with open(baseline_path, 'w', encoding='utf-8') as baseline_file:
+            json.dump(baseline, baseline_file, ensure_ascii=False, indent=2, default=str)
+            baseline_file.write("\n")
+        print(f"💾 Baseline gravado em {baseline_path}")
+    
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,19 +6,23 @@ Jera Cloud Analyzer CLI - Análise inteligente de custos AWS com IA
 import os
 import sys
 import argparse
-import boto3
-from dotenv import load_dotenv
+import contextlib
 from pathlib import Path
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ProfileNotFound
+from typing import Optional
 
 # Adicionar o diretório do projeto ao path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+# boto3, dotenv e o agente (haystack, OpenAI) são importados só pelos caminhos que
+# os usam: --version e --examples não pagam o custo dessas dependências
+
 def test_aws_connection():
     """
     Testa a conexão AWS com diferentes métodos para garantir que funciona.
     """
+    import boto3
+    
     try:
         # Tentar várias formas de conectar
         session = boto3.Session()
@@ -63,6 +67,9 @@ def check_aws_credentials():
     Returns:
         tuple: (bool: tem_credenciais, str: método_detectado, str: detalhes)
     """
+    import boto3
+    from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ProfileNotFound
+    
     try:
         # Tentar criar uma sessão boto3 - ela vai procurar credenciais automaticamente
         session = boto3.Session()
@@ -123,6 +130,8 @@ def check_aws_credentials():
 
 def setup_environment():
     """Configura as variáveis de ambiente necessárias com estratégia híbrida."""
+    import boto3
+    from dotenv import load_dotenv
     
     # 1. Verificar OpenAI API Key primeiro
     openai_key = None
@@ -146,6 +155,17 @@ def setup_environment():
         os.environ['OPENAI_MODEL'] = 'gpt-4'
         print("🤖 Usando modelo OpenAI padrão: gpt-4")
     
+    # Replay/fake: as chamadas à AWS são respondidas por fixtures gravadas ou por
+    # uma conta sintética, sem credenciais
+    from src.clouds.aws.replay import aws_fixtures, offline_enabled
+    if offline_enabled():
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        if aws_fixtures.mode == 'replay':
+            print(f"🎞️  Modo replay: respostas da AWS lidas de {aws_fixtures.directory}")
+        else:
+            print("🧪 Modo fake: respostas da AWS geradas por uma conta sintética")
+        return True
+    
     # 2. Verificar credenciais AWS (estratégia híbrida)
     print("\n🔍 Verificando credenciais AWS...")
     
@@ -221,8 +241,10 @@ def setup_environment():
             print("   cloud-analyzer -q \"sua pergunta\"")
             return False
 
-def run_query(question: str):
-    """Executa uma consulta no agente Jera Cloud Analyzer."""
+def run_query(question: str, stream: bool = True, aws_calls: bool = False, trace: Optional[str] = None):
+    """Executa uma consulta no agente Jera Cloud Analyzer (stream: mostra o progresso em tempo real;
+    aws_calls: ao final, resume as chamadas à AWS por ferramenta e operação; trace: grava o trace
+    da execução em JSON lines no formato OTLP nesse arquivo e mostra um resumo em árvore)."""
     try:
         print(f"🤖 Processando: \"{question}\"\n")
         
@@ -230,7 +252,31 @@ def run_query(question: str):
         from src.ia.agent import run_agent_query
         
         # Executar consulta
-        run_agent_query(question)
+        if not aws_calls and not trace:
+            run_agent_query(question, stream=stream)
+            return
+        
+        with contextlib.ExitStack() as stack:
+            ledger = run_trace = None
+            if aws_calls:
+                from src.telemetry.aws_calls import aws_call_scope
+                ledger = stack.enter_context(aws_call_scope('consulta', kind='run'))
+            if trace:
+                from src.adapters.haystack_tracing import enable_haystack_tracing
+                from src.telemetry.tracing import trace_scope
+                enable_haystack_tracing()
+                run_trace = stack.enter_context(trace_scope('cloud-analyzer consulta',
+                                                            {'cloud_insights.query_chars': len(question)}))
+            run_agent_query(question, stream=stream)
+        
+        if ledger is not None:
+            from src.telemetry.aws_calls import format_call_summary
+            print(format_call_summary(ledger))
+        if run_trace is not None:
+            from src.telemetry.tracing import format_flame
+            run_trace.write_jsonl(trace)
+            print(format_flame(run_trace))
+            print(f"📝 Trace gravado em {trace}")
         
     except KeyboardInterrupt:
         print("\n⏹️  Operação cancelada pelo usuário")
@@ -319,9 +365,41 @@ Autenticação AWS (2 opções):
         help='Mostrar versão e capacidades'
     )
     
+    parser.add_argument(
+        '--no-stream',
+        action='store_true',
+        help='Não transmitir a resposta: mostrar só o resultado completo no final'
+    )
+    
+    parser.add_argument(
+        '--aws-calls',
+        action='store_true',
+        help='Ao final, resumir as chamadas à AWS (latência, bytes, throttles e custo) por ferramenta'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        nargs='?',
+        const='traces.jsonl',
+        metavar='ARQUIVO',
+        help='Gravar o trace da execução (modelo, ferramentas e chamadas à AWS) em JSON lines no '
+             'formato OTLP (padrão: traces.jsonl) e mostrar um resumo em árvore com os tempos'
+    )
+    
+    parser.add_argument(
+        '--startup-profile',
+        action='store_true',
+        help='Executar o comando medindo o tempo de import de cada módulo'
+    )
+    
     # Parse dos argumentos
     args = parser.parse_args()
     
+    # Perfil de inicialização: o comando roda de novo num processo filho, medido
+    if args.startup_profile:
+        from src.telemetry.startup import profile_startup
+        sys.exit(profile_startup())
+    
     # Mostrar versão
     if args.version:
         show_version()
@@ -338,7 +416,8 @@ Autenticação AWS (2 opções):
     
     # Executar consulta
     if args.query:
-        run_query(args.query)
+        run_query(args.query, stream=not args.no_stream, aws_calls=args.aws_calls,
+                  trace=args.trace)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -1,10 +1,27 @@
 """
 Adaptadores Haystack para as ferramentas de análise AWS.
 Estes wrappers decoram as funções core com @tool do Haystack.
+
+As ferramentas de HAYSTACK_TOOLS são memoizadas por sessão do agente: dentro de
+tool_memo_scope(), chamadas repetidas da mesma ferramenta com os mesmos
+argumentos (normalizados) retornam o resultado guardado, marcado como cache,
+sem nova consulta à AWS.
+
+Cada execução real de uma ferramenta tem o próprio aws_call_scope(): as chamadas
+à AWS que ela causar aparecem em '_meta.aws_calls' e nos escopos externos (ex: o
+resumo por consulta do CLI).
 """
 
-from typing import Optional
-from haystack.tools import tool
+import dataclasses
+import functools
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+from haystack.tools import Tool, tool
 
 # Importar todas as funções core centralizadas
 from src.ia.tools import (
@@ -16,6 +33,7 @@ from src.ia.tools import (
     validate_and_analyze_service,
     analyze_account_coverage,
     get_account_context_data,
+    forecast_service_costs,
     check_account_data_availability,
     aws_ec2_call,
     get_instance_cost_by_name,
@@ -37,13 +55,15 @@ from src.ia.tools import (
     list_all_services,
     refresh_services_cache
 )
+from src.ia.tools.response import to_json
+from src.telemetry.aws_calls import accounted
 
 # ===============================
 # HAYSTACK TOOLS - AWS DATA
 # ===============================
 
 @tool
-def haystack_get_top_services(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 5) -> str:
+def haystack_get_top_services(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 5, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém os top serviços mais caros da AWS.
     
@@ -51,11 +71,13 @@ def haystack_get_top_services(start_date: Optional[str] = None, end_date: Option
         start_date: Data de início (YYYY-MM-DD) - opcional, padrão últimos 30 dias
         end_date: Data de fim (YYYY-MM-DD) - opcional, padrão hoje
         limit: Número de serviços a retornar (padrão 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return get_top_services(start_date, end_date, limit)
+    return get_top_services(start_date, end_date, limit, fields=fields, max_bytes=max_bytes)
 
 @tool
-def haystack_get_service_details(service_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+def haystack_get_service_details(service_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém detalhes de custos de um serviço específico com resolução automática do nome.
     
@@ -63,8 +85,10 @@ def haystack_get_service_details(service_name: str, start_date: Optional[str] =
         service_name: Nome do serviço AWS (aceita apelidos como 'rds', 'ec2', etc.)
         start_date: Data de início (YYYY-MM-DD) - opcional
         end_date: Data de fim (YYYY-MM-DD) - opcional
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return get_service_details(service_name, start_date, end_date)
+    return get_service_details(service_name, start_date, end_date, fields=fields, max_bytes=max_bytes)
 
 @tool
 def haystack_get_aws_tags() -> str:
@@ -84,14 +108,16 @@ def haystack_get_dimension_values(dimension_name: str) -> str:
     return get_dimension_values(dimension_name)
 
 @tool
-def haystack_discover_account_resources(limit: int = 5) -> str:
+def haystack_discover_account_resources(limit: int = 5, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Descobre recursos disponíveis na conta AWS.
     
     Args:
         limit: Número máximo de recursos por categoria (padrão 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return discover_account_resources(limit)
+    return discover_account_resources(limit, fields=fields, max_bytes=max_bytes)
 
 @tool
 def haystack_validate_service(service_name: str) -> str:
@@ -111,11 +137,30 @@ def haystack_analyze_account_coverage() -> str:
     return analyze_account_coverage()
 
 @tool
-def haystack_get_account_context_data() -> str:
+def haystack_get_account_context_data(fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém dados de contexto completos da conta AWS.
+    
+    Args:
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return get_account_context_data()
+    return get_account_context_data(fields=fields, max_bytes=max_bytes)
+
+@tool
+def haystack_forecast_service_costs(history_days: int = 90, horizon_days: int = 30, top_n: int = 10,
+                                    method: str = "auto", compare_with_api: bool = False) -> str:
+    """
+    Prevê os custos de cada serviço AWS para os próximos dias, com intervalos de confiança.
+    
+    Args:
+        history_days: Dias de histórico usados no ajuste (padrão 90)
+        horizon_days: Dias a prever a partir de hoje (padrão 30)
+        top_n: Número de serviços detalhados (padrão 10)
+        method: 'auto', 'holt_winters' ou 'linear' (padrão 'auto')
+        compare_with_api: Confronta o total com a previsão paga do Cost Explorer (padrão False)
+    """
+    return forecast_service_costs(history_days, horizon_days, top_n, method, compare_with_api)
 
 @tool
 def haystack_check_data_availability() -> str:
@@ -133,7 +178,10 @@ def haystack_aws_ec2_call(
     subnet_ids: Optional[str] = None, 
     group_ids: Optional[str] = None, 
     region_name: Optional[str] = None, 
-    limit: int = 5
+    limit: int = 5,
+    fields: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    cursor: Optional[str] = None
 ) -> str:
     """
     Executa chamadas específicas da API EC2.
@@ -147,8 +195,11 @@ def haystack_aws_ec2_call(
         group_ids: IDs de security groups (opcional)
         region_name: Nome da região (opcional)
         limit: Limite de resultados (padrão 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
+        cursor: Cursor 'next_cursor' de '_pagination' para buscar a próxima página (opcional)
     """
-    return aws_ec2_call(method, instance_ids, volume_ids, vpc_ids, subnet_ids, group_ids, region_name, limit)
+    return aws_ec2_call(method, instance_ids, volume_ids, vpc_ids, subnet_ids, group_ids, region_name, limit, fields=fields, max_bytes=max_bytes, cursor=cursor)
 
 @tool
 def haystack_get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
@@ -163,7 +214,7 @@ def haystack_get_instance_cost_by_name(instance_name: str, start_date: Optional[
     return get_instance_cost_by_name(instance_name, start_date, end_date)
 
 @tool
-def haystack_find_instances_by_tag(tag_key: str, tag_value: Optional[str] = None, limit: int = 5) -> str:
+def haystack_find_instances_by_tag(tag_key: str, tag_value: Optional[str] = None, limit: int = 5, cursor: Optional[str] = None) -> str:
     """
     Encontra instâncias EC2 por tag específica.
     
@@ -171,25 +222,33 @@ def haystack_find_instances_by_tag(tag_key: str, tag_value: Optional[str] = None
         tag_key: Chave da tag
         tag_value: Valor da tag (opcional)
         limit: Número máximo de instâncias (padrão 5)
+        cursor: Cursor 'next_cursor' de '_pagination' para buscar a próxima página (opcional)
     """
-    return find_instances_by_tag(tag_key, tag_value, limit)
+    return find_instances_by_tag(tag_key, tag_value, limit, cursor=cursor)
 
 @tool
-def haystack_audit_governance_tags() -> str:
+def haystack_audit_governance_tags(fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Audita tags de governança nas instâncias EC2.
+    
+    Args:
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return audit_governance_tags()
+    return audit_governance_tags(fields=fields, max_bytes=max_bytes)
 
 @tool
-def haystack_identify_orphaned_resources(limit: int = 5) -> str:
+def haystack_identify_orphaned_resources(limit: int = 5, fields: Optional[str] = None, max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
     """
     Identifica recursos órfãos (não utilizados) na conta AWS.
     
     Args:
         limit: Número máximo de recursos por categoria (padrão 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
+        cursor: Cursor 'next_cursor' de '_pagination' para buscar a próxima página (opcional)
     """
-    return identify_orphaned_resources(limit)
+    return identify_orphaned_resources(limit, fields=fields, max_bytes=max_bytes, cursor=cursor)
 
 @tool
 def haystack_analyze_tags_costs(tag_keys: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
@@ -204,7 +263,7 @@ def haystack_analyze_tags_costs(tag_keys: str, start_date: Optional[str] = None,
     return analyze_multiple_tags_costs(tag_keys, start_date, end_date)
 
 @tool
-def haystack_analyze_tag_values(tag_key: str, tag_values: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+def haystack_analyze_tag_values(tag_key: str, tag_values: str, start_date: Optional[str] = None, end_date: Optional[str] = None, cursor: Optional[str] = None) -> str:
     """
     Analisa custos de valores específicos de uma tag.
     
@@ -213,8 +272,9 @@ def haystack_analyze_tag_values(tag_key: str, tag_values: str, start_date: Optio
         tag_values: Valores da tag separados por vírgula
         start_date: Data de início (YYYY-MM-DD) - opcional
         end_date: Data de fim (YYYY-MM-DD) - opcional
+        cursor: Cursor 'next_cursor' de '_pagination' para buscar a próxima página (opcional)
     """
-    return analyze_tag_specific_values(tag_key, tag_values, start_date, end_date)
+    return analyze_tag_specific_values(tag_key, tag_values, start_date, end_date, cursor=cursor)
 
 # ===============================
 # HAYSTACK TOOLS - UTILITIES
@@ -248,8 +308,7 @@ def haystack_get_date_from_period(period_description: str) -> str:
         period_description: Descrição como "último mês", "últimos 3 meses", etc.
     """
     result = get_date_from_period(period_description)
-    import json
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    return to_json(result)
 
 @tool
 def haystack_all_dimensions() -> str:
@@ -257,8 +316,7 @@ def haystack_all_dimensions() -> str:
     Lista todas as dimensões disponíveis para análise de custos AWS.
     """
     dimensions = all_dimensions()
-    import json
-    return json.dumps(dimensions, ensure_ascii=False, indent=2)
+    return to_json(dimensions)
 
 @tool
 def haystack_get_safe_date_range(months_back: int = 1) -> str:
@@ -269,15 +327,14 @@ def haystack_get_safe_date_range(months_back: int = 1) -> str:
         months_back: Número de meses para trás (padrão 1)
     """
     result = get_safe_date_range(months_back)
-    import json
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    return to_json(result)
 
 # ===============================
 # HAYSTACK TOOLS - CLOUDWATCH
 # ===============================
 
 @tool
-def haystack_get_instance_metrics(instance_id: str, hours: int = 24, metrics: Optional[str] = None) -> str:
+def haystack_get_instance_metrics(instance_id: str, hours: int = 24, metrics: Optional[str] = None, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém métricas de performance de uma instância EC2 específica via CloudWatch.
     
@@ -285,11 +342,13 @@ def haystack_get_instance_metrics(instance_id: str, hours: int = 24, metrics: Op
         instance_id: ID da instância EC2 (ex: 'i-1234567890abcdef0')
         hours: Número de horas para análise (padrão: 24)
         metrics: Métricas específicas separadas por vírgula (opcional)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return get_instance_performance_metrics(instance_id, hours, metrics)
+    return get_instance_performance_metrics(instance_id, hours, metrics, fields=fields, max_bytes=max_bytes)
 
 @tool
-def haystack_analyze_fleet_perf(tag_key: Optional[str] = None, tag_value: Optional[str] = None, hours: int = 24, max_instances: int = 10) -> str:
+def haystack_analyze_fleet_perf(tag_key: Optional[str] = None, tag_value: Optional[str] = None, hours: int = 24, max_instances: int = 100, group_by: str = "instance_type", fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Analisa performance de uma frota de instâncias EC2.
     
@@ -297,20 +356,28 @@ def haystack_analyze_fleet_perf(tag_key: Optional[str] = None, tag_value: Option
         tag_key: Chave da tag para filtrar instâncias (opcional)
         tag_value: Valor da tag para filtrar instâncias (opcional)
         hours: Número de horas para análise (padrão: 24)
-        max_instances: Número máximo de instâncias (padrão: 10)
+        max_instances: Número máximo de instâncias (padrão: 100, limite: 50000)
+        group_by: Agrupamento dos percentis: 'instance_type', 'availability_zone' ou 'tag:<chave>'
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return analyze_ec2_fleet_performance(tag_key, tag_value, hours, max_instances)
+    return analyze_ec2_fleet_performance(tag_key, tag_value, hours, max_instances, group_by, fields=fields, max_bytes=max_bytes)
 
 @tool
-def haystack_get_network_analysis(instance_id: str, days: int = 7) -> str:
+def haystack_get_network_analysis(instance_id: Optional[str] = None, days: int = 7, top_n: int = 20, order_by: str = "NetworkOut", fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
-    Analisa tráfego de rede de uma instância EC2.
+    Analisa tráfego de rede de uma instância EC2 ou, sem instance_id, ranqueia as instâncias
+    de maior tráfego da frota (top talkers) em uma única consulta.
     
     Args:
-        instance_id: ID da instância EC2
-        days: Número de dias para análise (padrão: 7)
+        instance_id: ID da instância EC2 (opcional; sem ele, analisa a frota)
+        days: Número de dias para análise (padrão: 7; no modo frota, máximo 14)
+        top_n: Número de instâncias no ranking do modo frota (padrão: 20)
+        order_by: Métrica do ranking: 'NetworkOut', 'NetworkIn', 'NetworkPacketsOut' ou 'NetworkPacketsIn'
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     """
-    return get_network_traffic_analysis(instance_id, days)
+    return get_network_traffic_analysis(instance_id, days, top_n, order_by, fields=fields, max_bytes=max_bytes)
 
 # ===============================
 # HAYSTACK TOOLS - SERVICES
@@ -355,11 +422,186 @@ def haystack_refresh_services_cache() -> str:
     """
     return refresh_services_cache()
 
+# ===============================
+# MEMOIZAÇÃO POR SESSÃO
+# ===============================
+
+# Ferramentas com efeito colateral ou que dependem do relógio nunca são memoizadas
+NON_MEMOIZED_TOOLS = {"haystack_refresh_services_cache", "haystack_get_current_date"}
+
+
+def is_error_result(text: str) -> bool:
+    """Indica se o resultado de uma ferramenta é uma mensagem de erro (não deve ser reaproveitado)."""
+    if text.startswith("Erro"):
+        return True
+    if not text.startswith("{"):
+        return False
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and "error" in data
+
+
+class ToolCallMemo:
+    """
+    Resultados de chamadas de ferramentas de uma sessão, com TTL.
+    
+    Chamadas simultâneas com a mesma chave (o modelo repetindo a chamada no mesmo
+    passo) aguardam a primeira em vez de consultar a AWS de novo.
+    """
+    
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 256):
+        """
+        Inicializa a memoização.
+        
+        Args:
+            ttl_seconds: Validade de cada resultado
+            max_entries: Número máximo de resultados guardados
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def call(self, key: Tuple[str, str], compute: Callable[[], str]) -> str:
+        """
+        Retorna o resultado guardado para a chave ou executa compute() e guarda o resultado.
+        
+        Args:
+            key: (nome da ferramenta, argumentos normalizados)
+            compute: Execução real da ferramenta
+        
+        Returns:
+            Resultado da ferramenta; quando vem do cache, com a anotação '_cache'
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and time.monotonic() - entry[0] <= self.ttl_seconds:
+                    self.hits += 1
+                    return self._annotate(entry[1], time.monotonic() - entry[0])
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Outra thread está executando a mesma chamada
+            event.wait()
+        
+        try:
+            result = compute()
+            if isinstance(result, str) and not is_error_result(result):
+                with self._lock:
+                    self._entries[key] = (time.monotonic(), result)
+                    if len(self._entries) > self.max_entries:
+                        del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+    
+    @staticmethod
+    def _annotate(result: str, age: float) -> str:
+        """Marca o resultado como vindo do cache (no JSON quando possível, senão como prefixo)."""
+        note = {"cached": True, "age_seconds": round(age, 1),
+                "note": "Resultado reaproveitado de chamada idêntica nesta sessão"}
+        if result.startswith("{") and result[1:].lstrip() != "}":
+            return '{"_cache":' + json.dumps(note, ensure_ascii=False, separators=(',', ':')) + "," + result[1:]
+        return f"[cache: {note['note']}, há {note['age_seconds']}s]\n{result}"
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso da memoização."""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+    
+    def clear(self) -> None:
+        """Remove todos os resultados guardados."""
+        with self._lock:
+            self._entries.clear()
+
+
+_active_memo: ContextVar[Optional[ToolCallMemo]] = ContextVar("haystack_tool_memo", default=None)
+
+
+@contextmanager
+def tool_memo_scope(memo: ToolCallMemo) -> Iterator[ToolCallMemo]:
+    """
+    Ativa a memoização das ferramentas dentro do bloco (ex: durante um Agent.run).
+    
+    O Agent executa as ferramentas em threads com uma cópia do contexto, então a
+    memoização ativa aqui vale também para elas.
+    
+    Args:
+        memo: Memoização da sessão
+    """
+    token = _active_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _active_memo.reset(token)
+
+
+def _normalize_arguments(signature: inspect.Signature, kwargs: Dict[str, Any]) -> str:
+    """Argumentos com os padrões aplicados e textos sem espaços nas pontas, em JSON canônico."""
+    bound = signature.bind_partial(**kwargs)
+    bound.apply_defaults()
+    arguments = {name: value.strip() if isinstance(value, str) else value
+                 for name, value in bound.arguments.items()}
+    return json.dumps(arguments, sort_keys=True, default=str)
+
+
+def memoize_tool(haystack_tool: Tool) -> Tool:
+    """
+    Retorna uma cópia da ferramenta que usa a memoização da sessão ativa.
+    
+    Sem tool_memo_scope() ativo, a ferramenta é executada normalmente.
+    
+    Args:
+        haystack_tool: Ferramenta criada com @tool
+    
+    Returns:
+        Ferramenta memoizada (ou a própria, se estiver em NON_MEMOIZED_TOOLS)
+    """
+    if haystack_tool.name in NON_MEMOIZED_TOOLS:
+        return haystack_tool
+    
+    function = haystack_tool.function
+    signature = inspect.signature(function)
+    
+    @functools.wraps(function)
+    def memoized(**kwargs):
+        memo = _active_memo.get()
+        if memo is None:
+            return function(**kwargs)
+        key = (haystack_tool.name, _normalize_arguments(signature, kwargs))
+        return memo.call(key, lambda: function(**kwargs))
+    
+    return dataclasses.replace(haystack_tool, function=memoized)
+
+
+def account_tool(haystack_tool: Tool) -> Tool:
+    """
+    Retorna uma cópia da ferramenta em que cada execução contabiliza as próprias chamadas à AWS.
+    
+    Args:
+        haystack_tool: Ferramenta criada com @tool
+    
+    Returns:
+        Ferramenta contabilizada
+    """
+    return dataclasses.replace(haystack_tool, function=accounted(haystack_tool.name, haystack_tool.function))
+
+
 # ===============================
 # LISTA DE TODAS AS FERRAMENTAS HAYSTACK
 # ===============================
 
-HAYSTACK_TOOLS = [
+# Resultados vindos da memoização não refazem chamadas, então não são contabilizados de novo
+HAYSTACK_TOOLS: List[Tool] = [memoize_tool(account_tool(haystack_tool)) for haystack_tool in [
     # AWS Data Tools
     haystack_get_top_services,
     haystack_get_service_details,
@@ -369,6 +611,7 @@ HAYSTACK_TOOLS = [
     haystack_validate_service,
     haystack_analyze_account_coverage,
     haystack_get_account_context_data,
+    haystack_forecast_service_costs,
     haystack_check_data_availability,
     haystack_aws_ec2_call,
     haystack_get_instance_cost_by_name,
@@ -395,4 +638,4 @@ HAYSTACK_TOOLS = [
     haystack_suggest_services,
     haystack_list_all_services,
     haystack_refresh_services_cache
-] 
\ No newline at end of file
+]] 
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Adaptador do tracing do Haystack para os spans de src/telemetry/tracing.py.
+
+O Agent do Haystack já abre spans para a execução ('haystack.agent.run'), cada
+passo ('haystack.agent.step'), a chamada ao modelo ('haystack.agent.step.llm') e
+cada ferramenta ('haystack.agent.step.tool', na thread da ferramenta e com o
+contexto copiado). O HaystackTracer os converte em spans do trace ativo, com
+nomes curtos e atributos no padrão GenAI do OpenTelemetry:
+- modelo: mensagens e caracteres de entrada, tokens de entrada/saída (do 'usage'
+  da OpenAI ou, sem ele — em streaming a API não o envia —, estimados);
+- ferramenta: nome, tamanho da saída e erro.
+
+O conteúdo das mensagens e dos resultados nunca é gravado: os content tags só
+servem para extrair essas medidas. Fora de um trace_scope() nada é registrado.
+"""
+
+import contextlib
+from typing import Dict, Any, Iterator, Optional
+
+from haystack import tracing as haystack_tracing
+from haystack.tracing.tracer import NullSpan
+
+from src.adapters.tool_budget import estimate_tokens
+from src.telemetry import tracing
+
+# Nome do span do Haystack → (nome do span, categoria do tempo)
+SPAN_NAMES = {
+    'haystack.agent.run': ('agent.run', None),
+    'haystack.agent.step': ('agent.step', None),
+    'haystack.agent.step.llm': ('llm', 'llm'),
+    'haystack.agent.step.tool': ('tool', 'tool'),
+    'haystack.chat_generator.run': ('llm', 'llm')
+}
+
+
+def _message_chars(message: Any) -> int:
+    chars = len(getattr(message, 'text', None) or '')
+    for result in getattr(message, 'tool_call_results', None) or []:
+        chars += len(str(getattr(result, 'result', '') or ''))
+    for call in getattr(message, 'tool_calls', None) or []:
+        chars += len(str(getattr(call, 'arguments', '') or ''))
+    return chars
+
+
+class HaystackSpan(haystack_tracing.Span):
+    """
+    Span do Haystack apoiado num span do trace ativo.
+    """
+    
+    def __init__(self, span: tracing.Span):
+        self._span = span
+    
+    def set_tag(self, key: str, value: Any) -> None:
+        if key == 'haystack.agent.step':
+            self._span.name = f"agent.step {value}"
+        elif key == 'haystack.tool.name':
+            self._span.name = f"tool {value}"
+            self._span.set_attribute('gen_ai.tool.name', value)
+        elif key == 'haystack.tool.error' and value:
+            self._span.set_error("Falha na ferramenta")
+        elif key == 'haystack.agent.tools':
+            self._span.set_attribute('cloud_insights.tools_available', len(value or []))
+        elif isinstance(value, (str, int, float, bool)) and not key.endswith('description'):
+            self._span.set_attribute(key, value)
+    
+    def set_content_tag(self, key: str, value: Any) -> None:
+        # Só medidas: o conteúdo não é guardado
+        if key.endswith('step.llm.input') or (key == 'haystack.component.input' and self._span.name == 'llm'):
+            messages = (value or {}).get('messages') or []
+            chars = sum(_message_chars(message) for message in messages)
+            self._span.set_attribute('cloud_insights.input_messages', len(messages))
+            self._span.set_attribute('cloud_insights.input_chars', chars)
+        elif key.endswith('step.llm.output') or (key == 'haystack.component.output' and self._span.name == 'llm'):
+            self._record_llm_output(value or {})
+        elif key.endswith('step.tool.output'):
+            text = value if isinstance(value, str) else str(value)
+            self._span.set_attribute('cloud_insights.output_bytes', len(text.encode('utf-8')))
+    
+    def _record_llm_output(self, output: Dict[str, Any]) -> None:
+        replies = output.get('replies') or []
+        meta = (getattr(replies[-1], 'meta', None) or {}) if replies else {}
+        usage = meta.get('usage') or {}
+        if meta.get('model'):
+            self._span.set_attribute('gen_ai.response.model', meta['model'])
+        if meta.get('finish_reason'):
+            self._span.set_attribute('gen_ai.response.finish_reasons', [meta['finish_reason']])
+        self._span.set_attribute('cloud_insights.tool_calls', sum(len(getattr(reply, 'tool_calls', None) or [])
+                                                                  for reply in replies))
+        if usage.get('prompt_tokens') is not None:
+            self._span.set_attribute('gen_ai.usage.input_tokens', usage['prompt_tokens'])
+            self._span.set_attribute('gen_ai.usage.output_tokens', usage.get('completion_tokens', 0))
+            return
+        # Streaming: sem 'usage' na resposta, estimativa pelo tamanho do texto
+        output_chars = sum(_message_chars(reply) for reply in replies)
+        input_chars = self._span.attributes.get('cloud_insights.input_chars', 0)
+        self._span.set_attribute('gen_ai.usage.input_tokens', estimate_tokens('x' * input_chars))
+        self._span.set_attribute('gen_ai.usage.output_tokens', estimate_tokens('x' * output_chars))
+        self._span.set_attribute('cloud_insights.tokens_estimated', True)
+    
+    def raw_span(self) -> Any:
+        return self._span
+
+
+class HaystackTracer(haystack_tracing.Tracer):
+    """
+    Tracer do Haystack que registra os spans no trace ativo (trace_scope()).
+    """
+    
+    @contextlib.contextmanager
+    def trace(self, operation_name: str, tags: Optional[Dict[str, Any]] = None,
+              parent_span: Optional[haystack_tracing.Span] = None) -> Iterator[haystack_tracing.Span]:
+        parent = parent_span.raw_span() if isinstance(parent_span, HaystackSpan) else None
+        name, category = SPAN_NAMES.get(operation_name, (operation_name, None))
+        attributes = {'cloud_insights.category': category} if category else {}
+        with tracing.span(name, attributes=attributes, parent=parent) as opened:
+            if opened is None:
+                yield _NULL_SPAN
+                return
+            wrapped = HaystackSpan(opened)
+            for key, value in (tags or {}).items():
+                wrapped.set_tag(key, value)
+            yield wrapped
+    
+    def current_span(self) -> Optional[haystack_tracing.Span]:
+        active = tracing.current_span()
+        return HaystackSpan(active) if active is not None else None
+
+
+_NULL_SPAN = NullSpan()
+
+
+def enable_haystack_tracing() -> None:
+    """Liga o HaystackTracer como tracer global do Haystack (idempotente)."""
+    if not isinstance(haystack_tracing.tracer.actual_tracer, HaystackTracer):
+        haystack_tracing.enable_tracing(HaystackTracer())
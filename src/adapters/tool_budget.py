@@ -0,0 +1,354 @@
+"""
+Orçamento de tokens dos resultados de ferramentas entregues ao agente.
+
+Cada resultado de ferramenta volta ao modelo em todos os passos seguintes da
+consulta, então respostas grandes (detalhes de custo por tipo de uso, dumps de
+instâncias, listas de dimensões) pesam no custo e na latência de toda a execução.
+budget_tools() envolve as ferramentas do agente: resultados que cabem no orçamento
+passam intactos; os demais são reduzidos de forma determinística, das reduções
+sem perda para as com perda, parando assim que o resultado cabe:
+
+1. campos vazios (None, "", [], {}) removidos dos itens de listas;
+2. linhas com custo zero removidas (só a contagem é informada);
+3. listas longas reduzidas aos k itens de maior custo, com uma linha '_others'
+   trazendo a contagem e os totais dos itens omitidos — os totais da lista
+   completa continuam corretos;
+4. em último caso, truncamento pelo fit_to_budget() da camada de resposta.
+
+O resultado reduzido recebe a chave '_budget' com o que foi feito.
+"""
+
+import dataclasses
+import functools
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from haystack.tools import Tool
+
+from src.ia.tools.response import DROPPED_KEYS, KEPT_KEYS, encode, fit_to_budget
+
+# Aproximação para JSON compacto nos tokenizadores da OpenAI (sem dependência de tokenizador)
+CHARS_PER_TOKEN = 3.5
+
+# Orçamento padrão por resultado de ferramenta, em tokens
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Listas nunca são reduzidas a menos itens que isso
+MIN_ROWS = 3
+
+# Caracteres reservados para a anotação '_budget' ao reduzir os dados
+_ANNOTATION_RESERVE = 600
+
+# Chaves numéricas tratadas como valores monetários/de uso (somadas e usadas no ranking);
+# contagens e identificadores numéricos ficam de fora
+_COST_KEY = re.compile(r'amount|cost|spend|saving|total', re.IGNORECASE)
+_NOT_COST_KEY = re.compile(r'count|_id$|Id$', re.IGNORECASE)
+_NUMERIC_TEXT = re.compile(r'^-?\d+(\.\d+)?([eE][-+]?\d+)?$')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa do número de tokens de um texto."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _env_budget() -> int:
+    value = os.environ.get('CLOUD_INSIGHTS_TOOL_TOKEN_BUDGET', '').strip()
+    return int(value) if value.isdigit() else DEFAULT_TOKEN_BUDGET
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == '' or value == [] or value == {}
+
+
+def _cost_leaves(item: Any, prefix: str = '') -> Dict[str, float]:
+    """Valores de custo de um item, por caminho ('Metrics.UnblendedCost.Amount')."""
+    leaves: Dict[str, float] = {}
+    if not isinstance(item, dict):
+        return leaves
+    for key, value in item.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            leaves.update(_cost_leaves(value, f"{path}."))
+            continue
+        if not _COST_KEY.search(str(key)) or _NOT_COST_KEY.search(str(key)) or isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            leaves[path] = float(value)
+        elif isinstance(value, str) and _NUMERIC_TEXT.match(value):
+            leaves[path] = float(value)
+    return leaves
+
+
+def _sum_costs(items: List[Any]) -> Dict[str, float]:
+    sums: Dict[str, float] = {}
+    for item in items:
+        for path, value in _cost_leaves(item).items():
+            sums[path] = sums.get(path, 0.0) + value
+    return {path: round(value, 6) for path, value in sums.items()}
+
+
+def _is_others_row(item: Any) -> bool:
+    return isinstance(item, dict) and set(item) == {'_others'}
+
+
+def _walk_lists(data: Any, path: str = '') -> List[Tuple[str, List[Any]]]:
+    """Todas as listas dos dados com seus caminhos (exceto as chaves de KEPT_KEYS)."""
+    found: List[Tuple[str, List[Any]]] = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if not path and key in KEPT_KEYS + ('_cache',):
+                continue
+            found.extend(_walk_lists(value, f"{path}.{key}" if path else str(key)))
+    elif isinstance(data, list):
+        found.append((path or '$', data))
+        for index, item in enumerate(data):
+            found.extend(_walk_lists(item, f"{path}[{index}]"))
+    return found
+
+
+class ToolOutputBudget:
+    """
+    Reduz resultados de ferramentas até caberem num orçamento de tokens.
+    """
+    
+    def __init__(self, max_tokens: Optional[int] = None):
+        """
+        Inicializa o orçamento.
+        
+        Args:
+            max_tokens: Tokens por resultado (padrão: CLOUD_INSIGHTS_TOOL_TOKEN_BUDGET ou 6000; 0 desativa)
+        """
+        self.max_tokens = max_tokens if max_tokens is not None else _env_budget()
+        self._lock = threading.Lock()
+        self.results = 0
+        self.reduced = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+    
+    def _limit(self) -> int:
+        """Tamanho máximo (caracteres) dos dados reduzidos, descontada a anotação."""
+        return max(int(self.max_tokens * CHARS_PER_TOKEN) - _ANNOTATION_RESERVE, _ANNOTATION_RESERVE)
+    
+    def _fits(self, data: Any) -> bool:
+        return len(encode(data)) <= self._limit()
+    
+    def apply(self, tool_name: str, text: str) -> str:
+        """
+        Retorna o resultado dentro do orçamento.
+        
+        Args:
+            tool_name: Nome da ferramenta (usado nos logs)
+            text: Resultado da ferramenta
+        
+        Returns:
+            O próprio resultado, se couber, ou a versão reduzida com a anotação '_budget'
+        """
+        tokens = estimate_tokens(text)
+        if not self.max_tokens or tokens <= self.max_tokens:
+            self._count(tokens, tokens, reduced=False)
+            return text
+        
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, (dict, list)):
+            reduced = self.reduce(data, tokens)
+        else:
+            # Texto livre: não há estrutura para agregar
+            limit = int(self.max_tokens * CHARS_PER_TOKEN)
+            reduced = text[:limit] + f"\n… [truncado: {limit} de {len(text)} caracteres]"
+        
+        self._count(tokens, estimate_tokens(reduced), reduced=True)
+        print(f"✂️  {tool_name}: resultado reduzido de ~{tokens} para ~{estimate_tokens(reduced)} tokens")
+        return reduced
+    
+    def reduce(self, data: Any, original_tokens: int) -> str:
+        """
+        Aplica as reduções em ordem até os dados caberem no orçamento.
+        
+        Args:
+            data: Resultado da ferramenta já decodificado
+            original_tokens: Tokens estimados do resultado original
+        
+        Returns:
+            JSON reduzido, com a anotação '_budget'
+        """
+        steps: List[str] = []
+        lists: Dict[str, Dict[str, Any]] = {}
+        zero_rows = 0
+        
+        data = self._drop_empty_fields(data)
+        steps.append('empty_fields')
+        
+        if not self._fits(data):
+            zero_rows = self._drop_zero_rows(data)
+            if zero_rows:
+                steps.append('zero_rows')
+        
+        if not self._fits(data):
+            self._top_k(data, lists)
+            if lists:
+                steps.append('top_k')
+        
+        budget: Dict[str, Any] = {
+            'max_tokens': self.max_tokens,
+            'original_tokens': original_tokens,
+            'steps': steps
+        }
+        if zero_rows:
+            budget['zero_rows_dropped'] = zero_rows
+        if lists:
+            budget['lists'] = [dict(path=path, **summary) for path, summary in lists.items()]
+        budget['hint'] = ("Totais em 'lists[].sums' consideram a lista completa; para ver itens omitidos "
+                          "use 'fields', filtros mais específicos ou 'cursor', quando disponível")
+        
+        if not self._fits(data):
+            data, budget['truncated'] = fit_to_budget(data, self._limit())
+            steps.append('truncated')
+        if not self._fits(data):
+            # Não há mais o que encurtar (ex: um único texto enorme): prévia truncada
+            # (metade do espaço: aspas e barras do texto são escapadas ao serializar)
+            data = {'preview': encode(data)[:self._limit() // 2]}
+        
+        if not isinstance(data, dict):
+            data = {'items': data}
+        data['_budget'] = budget
+        return encode(data)
+    
+    @classmethod
+    def _drop_empty_fields(cls, data: Any, in_list: bool = False) -> Any:
+        """Remove metadados e, dentro de listas, campos vazios (sem perda de informação)."""
+        if isinstance(data, dict):
+            return {key: cls._drop_empty_fields(value, in_list) for key, value in data.items()
+                    if key not in DROPPED_KEYS and not (in_list and _is_empty(value))}
+        if isinstance(data, list):
+            return [cls._drop_empty_fields(item, True) for item in data]
+        return data
+    
+    @staticmethod
+    def _drop_zero_rows(data: Any) -> int:
+        """Remove, das listas de objetos, os itens cujos valores de custo são todos zero."""
+        dropped = 0
+        for _, items in _walk_lists(data):
+            kept = []
+            for item in items:
+                leaves = _cost_leaves(item)
+                if leaves and not any(leaves.values()):
+                    dropped += 1
+                else:
+                    kept.append(item)
+            if len(kept) < len(items):
+                items[:] = kept
+        return dropped
+    
+    def _top_k(self, data: Any, lists: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Reduz as maiores listas aos itens de maior custo até caber no orçamento.
+        
+        A cada passo, a maior lista (em bytes) que ainda pode ser reduzida perde os
+        itens necessários para cobrir o excesso; os omitidos são agregados numa
+        linha final '_others'. Sem valores de custo, a ordem original decide.
+        """
+        limit = self._limit()
+        originals: Dict[str, List[Any]] = {}
+        
+        for _ in range(100):
+            excess = len(encode(data)) - limit
+            if excess <= 0:
+                return
+            candidates = []
+            for path, items in _walk_lists(data):
+                rows = [item for item in items if not _is_others_row(item)]
+                if len(rows) > MIN_ROWS:
+                    candidates.append((len(encode(items)), path, items, rows))
+            if not candidates:
+                return
+            size, path, items, rows = max(candidates, key=lambda candidate: candidate[0])
+            
+            full = originals.setdefault(path, list(rows))
+            average = size / max(len(items), 1)
+            keep = max(MIN_ROWS, min(len(rows) - 1, len(rows) - math.ceil(excess / average)))
+            
+            # Maiores custos primeiro (ordenação estável: empates mantêm a ordem original)
+            weights = [sum(abs(value) for value in _cost_leaves(item).values()) for item in full]
+            order = sorted(range(len(full)), key=lambda index: -weights[index])
+            kept = [full[index] for index in order[:keep]]
+            omitted = [full[index] for index in order[keep:]]
+            
+            if all(isinstance(item, dict) for item in full):
+                others: Any = {'_others': {'count': len(omitted), 'sums': _sum_costs(omitted)}}
+                if not others['_others']['sums']:
+                    del others['_others']['sums']
+            else:
+                others = f"… (+{len(omitted)} outros)"
+            items[:] = kept + [others]
+            
+            summary = {'kept': len(kept), 'total': len(full)}
+            sums = _sum_costs(full)
+            if sums:
+                summary['sums'] = sums
+            lists[path] = summary
+    
+    def _count(self, tokens_in: int, tokens_out: int, reduced: bool) -> None:
+        with self._lock:
+            self.results += 1
+            self.reduced += int(reduced)
+            self.tokens_in += tokens_in
+            self.tokens_out += tokens_out
+    
+    def wrap(self, haystack_tool: Tool) -> Tool:
+        """
+        Retorna uma cópia da ferramenta cujo resultado passa pelo orçamento.
+        
+        Args:
+            haystack_tool: Ferramenta Haystack
+        
+        Returns:
+            Ferramenta com o resultado limitado ao orçamento
+        """
+        function = haystack_tool.function
+        
+        @functools.wraps(function)
+        def budgeted(**kwargs):
+            result = function(**kwargs)
+            if not isinstance(result, str):
+                return result
+            return self.apply(haystack_tool.name, result)
+        
+        return dataclasses.replace(haystack_tool, function=budgeted)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do orçamento (tokens estimados)."""
+        with self._lock:
+            return {
+                'max_tokens': self.max_tokens,
+                'results': self.results,
+                'reduced': self.reduced,
+                'tokens_in': self.tokens_in,
+                'tokens_out': self.tokens_out,
+                'tokens_saved': self.tokens_in - self.tokens_out
+            }
+
+
+# Orçamento compartilhado pelas ferramentas do agente
+tool_output_budget = ToolOutputBudget()
+
+
+def budget_tools(tools: List[Tool], budget: Optional[ToolOutputBudget] = None) -> List[Tool]:
+    """
+    Aplica o orçamento de tokens aos resultados das ferramentas.
+    
+    Args:
+        tools: Ferramentas Haystack (ex: HAYSTACK_TOOLS)
+        budget: Orçamento a usar (padrão: tool_output_budget)
+    
+    Returns:
+        Cópias das ferramentas com o resultado limitado ao orçamento
+    """
+    budget = budget or tool_output_budget
+    return [budget.wrap(haystack_tool) for haystack_tool in tools]
@@ -5,6 +5,10 @@ import os
 import boto3
 from typing import Dict, List, Any, Optional
 
+from src.clouds.aws.replay import aws_fixtures
+from src.telemetry.aws_calls import instrument_call_accounting
+from src.telemetry.metrics import instrument_session
+
 
 class AWSClient:
     """
@@ -40,7 +44,11 @@ class AWSClient:
         if profile_name:
             session_kwargs["profile_name"] = profile_name
             
-        return boto3.Session(**session_kwargs)
+        # Hooks de métricas: chamadas, latência e throttling por serviço/operação;
+        # contabilidade das chamadas por execução de ferramenta (_meta.aws_calls);
+        # hooks de gravação/replay (CLOUD_INSIGHTS_AWS_MODE) para execução offline
+        session = instrument_call_accounting(instrument_session(boto3.Session(**session_kwargs)))
+        return aws_fixtures.attach(session)
     
     def get_client(self, service_name: str) -> Any:
         """
@@ -6,17 +6,11 @@ import json
 from decimal import Decimal
 from datetime import datetime, timedelta
 
-from src.clouds.aws.cost_explorer import CostExplorer
-
+import numpy as np
 
-class CostDecimalEncoder(json.JSONEncoder):
-    """
-    Encoder JSON personalizado para lidar com objetos Decimal.
-    """
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
+from src.clouds.aws.cost_explorer import CostExplorer
+from src.clouds.aws.cost_trends import CostTrendEngine, period_change_percent
+from src.clouds.aws.utils import JsonEncoder
 
 
 class CostAnalyzer:
@@ -32,6 +26,7 @@ class CostAnalyzer:
             cost_explorer: Cliente Cost Explorer opcional. Se não fornecido, um novo será criado.
         """
         self.cost_explorer = cost_explorer or CostExplorer()
+        self.trend_engine = CostTrendEngine(self.cost_explorer)
         
     def get_top_services(self, limit: int = 5, start_date: Optional[str] = None, 
                          end_date: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -74,88 +69,86 @@ class CostAnalyzer:
         # Ordenar e limitar a quantidade de serviços
         services = sorted(service_costs.values(), key=lambda x: x['cost'], reverse=True)[:limit]
         
-        return json.loads(json.dumps(services, cls=CostDecimalEncoder))
+        return json.loads(json.dumps(services, cls=JsonEncoder))
     
-    def get_cost_trends(self, months: int = 6) -> Dict[str, Any]:
+    def get_cost_trends(self, months: int = 6, granularity: str = 'MONTHLY',
+                        top_n: int = 10, include_usage_types: bool = True) -> Dict[str, Any]:
         """
         Analisa tendências de custo nos últimos meses.
         
+        O total da conta e as tendências por serviço e por tipo de uso são calculados
+        de uma vez a partir de uma única matriz de custos (ver CostTrendEngine).
+        
         Args:
             months: Número de meses a analisar
+            granularity: Granularidade da matriz ('MONTHLY'|'DAILY')
+            top_n: Número de serviços/tipos de uso detalhados
+            include_usage_types: Se deve incluir tendências por tipo de uso
             
         Returns:
             Dados de tendência de custos, incluindo comparações mês a mês
+            e tendências por serviço e tipo de uso
         """
-        # Definir datas para o período
+        # Definir datas para o período, alinhando o início ao primeiro dia do mês
+        # para que o primeiro período mensal não seja parcial
         today = datetime.now()
         end_date = today.strftime('%Y-%m-%d')
-        start_date = (today - timedelta(days=30 * months)).strftime('%Y-%m-%d')
+        start_dt = (today - timedelta(days=30 * months)).replace(day=1)
+        if granularity == 'DAILY':
+            start_dt = today - timedelta(days=30 * months)
+        start_date = start_dt.strftime('%Y-%m-%d')
         
         # Garantir que temos pelo menos 1 dia entre start_date e end_date
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
         end_dt = datetime.strptime(end_date, '%Y-%m-%d')
         if (end_dt - start_dt).days < 1:
             start_date = (end_dt - timedelta(days=1)).strftime('%Y-%m-%d')
         
-        result = self.cost_explorer.get_cost_by_service(
-            start_date=start_date, 
+        analysis = self.trend_engine.get_trends(
+            start_date=start_date,
             end_date=end_date,
-            granularity='MONTHLY'
+            granularity=granularity,
+            top_n=top_n,
+            include_usage_types=include_usage_types
         )
         
-        if 'ResultsByTime' not in result or not result['ResultsByTime']:
+        totals = np.asarray(analysis['period_totals'], dtype=np.float64)
+        periods = analysis['periods']
+        
+        if totals.size == 0:
             return {'trends': [], 'total_change': 0, 'average_change': 0}
-            
-        # Calcular custos totais por mês
-        monthly_costs = []
-        for period in result['ResultsByTime']:
-            total_cost = Decimal('0')
-            for group in period.get('Groups', []):
-                cost = Decimal(group.get('Metrics', {}).get('UnblendedCost', {}).get('Amount', '0'))
-                total_cost += cost
-                
-            monthly_costs.append({
-                'period': period.get('TimePeriod', {}).get('Start', ''),
-                'cost': total_cost
-            })
         
-        # Calcular mudanças percentuais
-        trends = []
-        for i in range(1, len(monthly_costs)):
-            previous_cost = monthly_costs[i-1]['cost']
-            current_cost = monthly_costs[i]['cost']
-            
-            if previous_cost > 0:
-                percent_change = ((current_cost - previous_cost) / previous_cost) * 100
-            else:
-                percent_change = 0 if current_cost == 0 else 100
-                
-            trends.append({
-                'period': monthly_costs[i]['period'],
-                'cost': current_cost,
-                'previous_cost': previous_cost,
-                'percent_change': percent_change
-            })
+        # Mudanças percentuais do total, calculadas de forma vetorizada
+        changes = period_change_percent(totals)
+        trends = [
+            {
+                'period': periods[i],
+                'cost': float(totals[i]),
+                'previous_cost': float(totals[i - 1]),
+                'percent_change': float(changes[i - 1])
+            }
+            for i in range(1, len(periods))
+        ]
         
         # Calcular tendência geral
         total_change = 0
         if trends:
-            first_month = monthly_costs[0]['cost']
-            last_month = monthly_costs[-1]['cost']
-            
-            if first_month > 0:
-                total_change = ((last_month - first_month) / first_month) * 100
-            else:
-                total_change = 0 if last_month == 0 else 100
+            total_change = float(period_change_percent(totals[[0, -1]])[0])
         
         # Calcular média de mudança
-        average_change = sum(t['percent_change'] for t in trends) / len(trends) if trends else 0
+        average_change = float(changes.mean()) if trends else 0
         
-        return json.loads(json.dumps({
+        result = {
             'trends': trends,
             'total_change': total_change,
-            'average_change': average_change
-        }, cls=CostDecimalEncoder))
+            'average_change': average_change,
+            'granularity': granularity,
+            'partial_periods': analysis['partial_periods'],
+            'services': analysis['services']
+        }
+        if include_usage_types:
+            result['usage_types'] = analysis['usage_types']
+        
+        return result
     
     def get_cost_by_tag_analysis(self, tag_key: str, start_date: Optional[str] = None, 
                                 end_date: Optional[str] = None) -> Dict[str, Any]:
@@ -210,7 +203,7 @@ class CostAnalyzer:
             'untagged_cost': float(untagged_cost),
             'untagged_percentage': float(untagged_cost / total_cost * 100) if total_cost > 0 else 0,
             'total_cost': float(total_cost)
-        }, cls=CostDecimalEncoder))
+        }, cls=JsonEncoder))
     
     def generate_optimization_recommendations(self) -> List[Dict[str, Any]]:
         """
@@ -297,8 +290,8 @@ class CostAnalyzer:
         Returns:
             Lista de anomalias detectadas
         """
-        # Obter tendências dos últimos meses
-        trends_data = self.get_cost_trends(months=3)
+        # Obter tendências dos últimos meses (só os totais por período: sem a matriz de usage types)
+        trends_data = self.get_cost_trends(months=3, include_usage_types=False)
         
         anomalies = []
         for trend in trends_data.get('trends', []):
@@ -330,7 +323,7 @@ class CostAnalyzer:
                 services = self.get_top_services(limit=3, start_date=period_start, end_date=period_end)
                 anomaly['top_contributors'] = services
                 
-        return json.loads(json.dumps(anomalies, cls=CostDecimalEncoder))
+        return json.loads(json.dumps(anomalies, cls=JsonEncoder))
     
     def analyze_all_tags_with_services(self, start_date: Optional[str] = None, 
                                      end_date: Optional[str] = None) -> Dict[str, Any]:
@@ -447,4 +440,4 @@ class CostAnalyzer:
         # Ordenar por custo
         services = sorted(service_costs.values(), key=lambda x: x['cost'], reverse=True)
         
-        return json.loads(json.dumps(services, cls=CostDecimalEncoder)) 
\ No newline at end of file
+        return json.loads(json.dumps(services, cls=JsonEncoder)) 
\ No newline at end of file
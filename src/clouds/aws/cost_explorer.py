@@ -179,6 +179,74 @@ class CostExplorer:
         
         return raw_response
     
+    def get_cost_and_usage_grouped(self, group_by: List[str], start_date: Optional[str] = None,
+                                   end_date: Optional[str] = None,
+                                   granularity: str = 'MONTHLY') -> Dict[str, Any]:
+        """
+        Obtém custos agrupados por até duas dimensões, percorrendo todas as páginas.
+        
+        Args:
+            group_by: Dimensões de agrupamento (ex: ['SERVICE', 'USAGE_TYPE'])
+            start_date: Data inicial no formato YYYY-MM-DD (padrão: 30 dias atrás)
+            end_date: Data final no formato YYYY-MM-DD (padrão: hoje)
+            granularity: Granularidade dos resultados ('DAILY'|'MONTHLY'|'HOURLY')
+        
+        Returns:
+            Resposta no formato do get_cost_and_usage, com os grupos de todas as
+            páginas consolidados em um único ResultsByTime
+        """
+        start, end = self._normalize_dates(start_date, end_date)
+        
+        parameters = {
+            'TimePeriod': {
+                'Start': start,
+                'End': end
+            },
+            'Granularity': granularity,
+            'Metrics': ['UnblendedCost'],
+            'GroupBy': [
+                {
+                    'Type': 'DIMENSION',
+                    'Key': key
+                }
+                for key in group_by
+            ]
+        }
+        
+        # Com muitos grupos o Cost Explorer pagina os resultados; cada página traz
+        # um subconjunto dos grupos de cada período
+        results_by_period: Dict[str, Dict[str, Any]] = {}
+        page_token = None
+        
+        while True:
+            request = dict(parameters)
+            if page_token:
+                request['NextPageToken'] = page_token
+            
+            raw_response = self.client.get_cost_and_usage(**request)
+            
+            # Log dos dados brutos para auditoria
+            self._log_raw_aws_data('get_cost_and_usage_grouped', request, raw_response)
+            
+            for period in raw_response.get('ResultsByTime', []):
+                period_start = period.get('TimePeriod', {}).get('Start', '')
+                merged = results_by_period.setdefault(period_start, {
+                    'TimePeriod': period.get('TimePeriod', {}),
+                    'Total': period.get('Total', {}),
+                    'Groups': [],
+                    'Estimated': period.get('Estimated', False)
+                })
+                merged['Groups'].extend(period.get('Groups', []))
+            
+            page_token = raw_response.get('NextPageToken')
+            if not page_token:
+                break
+        
+        return {
+            'GroupDefinitions': parameters['GroupBy'],
+            'ResultsByTime': [results_by_period[key] for key in sorted(results_by_period)]
+        }
+    
     def get_cost_forecast(self, start_date: Optional[str] = None, 
                          end_date: Optional[str] = None,
                          granularity: str = 'MONTHLY',
@@ -0,0 +1,380 @@
+"""
+Motor vetorizado de tendências de custo por serviço e tipo de uso.
+
+Uma única consulta ao Cost Explorer (agrupada por SERVICE e USAGE_TYPE) gera uma
+matriz linhas × períodos em NumPy. Todas as métricas de tendência (variação entre
+períodos, médias móveis, taxa de crescimento e participação no total) são
+calculadas de uma vez para todas as linhas, sem consultas adicionais por serviço.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from src.clouds.aws.cost_explorer import CostExplorer
+
+
+class CostMatrix:
+    """
+    Matriz de custos (chaves × períodos) montada a partir do Cost Explorer.
+    """
+    
+    def __init__(self, keys: List[Tuple[str, ...]], periods: List[str], period_ends: List[str],
+                 values: np.ndarray, dimensions: List[str], granularity: str,
+                 estimated: Optional[List[bool]] = None, unit: str = 'USD'):
+        """
+        Inicializa a matriz de custos.
+        
+        Args:
+            keys: Chave de cada linha (uma tupla com um valor por dimensão)
+            periods: Data de início de cada período (coluna)
+            period_ends: Data de fim de cada período
+            values: Matriz float64 de formato (len(keys), len(periods))
+            dimensions: Dimensões que compõem as chaves (ex: ['SERVICE', 'USAGE_TYPE'])
+            granularity: Granularidade dos períodos ('DAILY'|'MONTHLY')
+            estimated: Indica, por período, se o valor ainda é estimado (período em aberto)
+            unit: Moeda dos valores
+        """
+        self.keys = keys
+        self.periods = periods
+        self.period_ends = period_ends
+        self.values = values
+        self.dimensions = dimensions
+        self.granularity = granularity
+        self.estimated = estimated or [False] * len(periods)
+        self.unit = unit
+    
+    @classmethod
+    def from_cost_and_usage(cls, response: Dict[str, Any], dimensions: List[str],
+                            granularity: str) -> 'CostMatrix':
+        """
+        Constrói a matriz a partir da resposta (consolidada) do get_cost_and_usage.
+        
+        Args:
+            response: Resposta com ResultsByTime agrupado pelas dimensões informadas
+            dimensions: Dimensões usadas no GroupBy da consulta
+            granularity: Granularidade usada na consulta
+        
+        Returns:
+            Matriz de custos
+        """
+        results = response.get('ResultsByTime', [])
+        periods = [period.get('TimePeriod', {}).get('Start', '') for period in results]
+        period_ends = [period.get('TimePeriod', {}).get('End', '') for period in results]
+        estimated = [bool(period.get('Estimated', False)) for period in results]
+        
+        key_index: Dict[Tuple[str, ...], int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        amounts: List[float] = []
+        unit = 'USD'
+        
+        for col, period in enumerate(results):
+            for group in period.get('Groups', []):
+                key = tuple(group.get('Keys', []))
+                row = key_index.setdefault(key, len(key_index))
+                metric = group.get('Metrics', {}).get('UnblendedCost', {})
+                unit = metric.get('Unit', unit)
+                rows.append(row)
+                cols.append(col)
+                amounts.append(float(metric.get('Amount', '0')))
+        
+        values = np.zeros((len(key_index), len(periods)), dtype=np.float64)
+        if amounts:
+            np.add.at(values, (np.asarray(rows), np.asarray(cols)), np.asarray(amounts))
+        
+        return cls(list(key_index), periods, period_ends, values, list(dimensions),
+                   granularity, estimated, unit)
+    
+    def aggregate(self, dimension: str) -> 'CostMatrix':
+        """
+        Agrega a matriz para uma única dimensão (ex: de SERVICE+USAGE_TYPE para SERVICE).
+        
+        Args:
+            dimension: Dimensão a manter
+        
+        Returns:
+            Nova matriz agregada pela dimensão
+        """
+        if self.dimensions == [dimension]:
+            return self
+        
+        position = self.dimensions.index(dimension)
+        labels = [key[position] if len(key) > position else '' for key in self.keys]
+        unique_labels, inverse = np.unique(np.asarray(labels, dtype=object), return_inverse=True)
+        
+        values = np.zeros((len(unique_labels), len(self.periods)), dtype=np.float64)
+        np.add.at(values, inverse, self.values)
+        
+        return CostMatrix([(label,) for label in unique_labels], self.periods, self.period_ends,
+                          values, [dimension], self.granularity, self.estimated, self.unit)
+    
+    def totals(self) -> np.ndarray:
+        """Retorna o custo total de cada período (soma das colunas)."""
+        return self.values.sum(axis=0)
+
+
+def period_change_percent(values: np.ndarray) -> np.ndarray:
+    """
+    Calcula a variação percentual entre períodos consecutivos para todas as linhas.
+    
+    Segue a convenção já usada em CostAnalyzer.get_cost_trends: se o período
+    anterior é zero, a variação é 100% quando há custo novo e 0% caso contrário.
+    
+    Args:
+        values: Matriz (linhas × períodos) ou vetor de custos
+    
+    Returns:
+        Matriz (linhas × períodos-1) com as variações percentuais
+    """
+    previous = values[..., :-1]
+    current = values[..., 1:]
+    
+    change = np.where(current > 0, 100.0, 0.0)
+    np.divide((current - previous) * 100.0, previous, out=change, where=previous > 0)
+    return change
+
+
+def rolling_average(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Calcula a média móvel simples de todas as linhas via soma acumulada.
+    
+    Args:
+        values: Matriz (linhas × períodos)
+        window: Tamanho da janela (limitado ao número de períodos)
+    
+    Returns:
+        Matriz (linhas × períodos-window+1) com as médias móveis
+    """
+    window = max(1, min(window, values.shape[-1]))
+    cumulative = np.cumsum(values, axis=-1)
+    padded = np.concatenate([np.zeros(values.shape[:-1] + (1,)), cumulative], axis=-1)
+    return (padded[..., window:] - padded[..., :-window]) / window
+
+
+def growth_rates(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcula a taxa de crescimento composta por período e a inclinação linear de cada linha.
+    
+    Args:
+        values: Matriz (linhas × períodos)
+    
+    Returns:
+        Tupla (crescimento composto em % por período, inclinação em custo por período).
+        O crescimento composto é NaN quando o primeiro ou o último período é zero.
+    """
+    periods = values.shape[-1]
+    if periods < 2:
+        nan = np.full(values.shape[:-1], np.nan)
+        return nan, np.zeros(values.shape[:-1])
+    
+    first = values[..., 0]
+    last = values[..., -1]
+    compound = np.full(first.shape, np.nan)
+    valid = (first > 0) & (last > 0)
+    compound[valid] = (np.power(last[valid] / first[valid], 1.0 / (periods - 1)) - 1.0) * 100.0
+    
+    # Regressão linear por mínimos quadrados para todas as linhas de uma vez
+    t = np.arange(periods, dtype=np.float64)
+    t_centered = t - t.mean()
+    centered = values - values.mean(axis=-1, keepdims=True)
+    slope = centered @ t_centered / (t_centered @ t_centered)
+    
+    return compound, slope
+
+
+class CostTrendEngine:
+    """
+    Calcula tendências de custo de todos os serviços e tipos de uso a partir de uma matriz em cache.
+    """
+    
+    # A matriz é reaproveitada entre chamadas do mesmo processo (ferramentas e agente)
+    CACHE_TTL_SECONDS = 900
+    _matrix_cache: Dict[Tuple[Any, ...], Tuple[float, CostMatrix]] = {}
+    _cache_lock = threading.Lock()
+    cache_hits = 0
+    cache_misses = 0
+    
+    def __init__(self, cost_explorer: Optional[CostExplorer] = None):
+        """
+        Inicializa o motor de tendências.
+        
+        Args:
+            cost_explorer: Cliente Cost Explorer opcional. Se não fornecido, um novo será criado.
+        """
+        self.cost_explorer = cost_explorer or CostExplorer()
+    
+    def get_matrix(self, start_date: str, end_date: str, granularity: str = 'MONTHLY',
+                   include_usage_types: bool = True) -> CostMatrix:
+        """
+        Obtém a matriz de custos do período, usando o cache quando possível.
+        
+        Args:
+            start_date: Data inicial no formato YYYY-MM-DD
+            end_date: Data final no formato YYYY-MM-DD
+            granularity: Granularidade ('DAILY'|'MONTHLY')
+            include_usage_types: Se deve detalhar as linhas por USAGE_TYPE
+        
+        Returns:
+            Matriz de custos (SERVICE ou SERVICE+USAGE_TYPE × períodos)
+        """
+        dimensions = ['SERVICE', 'USAGE_TYPE'] if include_usage_types else ['SERVICE']
+        cache_key = (granularity, tuple(dimensions), start_date, end_date)
+        
+        with self._cache_lock:
+            cached = self._matrix_cache.get(cache_key)
+            if cached and time.time() - cached[0] < self.CACHE_TTL_SECONDS:
+                CostTrendEngine.cache_hits += 1
+                return cached[1]
+            CostTrendEngine.cache_misses += 1
+        
+        response = self.cost_explorer.get_cost_and_usage_grouped(
+            dimensions, start_date, end_date, granularity
+        )
+        matrix = CostMatrix.from_cost_and_usage(response, dimensions, granularity)
+        
+        with self._cache_lock:
+            # Descartar entradas expiradas para o cache não crescer indefinidamente
+            now = time.time()
+            for key in [k for k, (ts, _) in self._matrix_cache.items() if now - ts >= self.CACHE_TTL_SECONDS]:
+                del self._matrix_cache[key]
+            self._matrix_cache[cache_key] = (now, matrix)
+        
+        return matrix
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Remove todas as matrizes em cache."""
+        with cls._cache_lock:
+            cls._matrix_cache.clear()
+    
+    @classmethod
+    def cache_stats(cls) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache de matrizes."""
+        with cls._cache_lock:
+            lookups = cls.cache_hits + cls.cache_misses
+            return {
+                'entries': len(cls._matrix_cache),
+                'hits': cls.cache_hits,
+                'misses': cls.cache_misses,
+                'hit_ratio': round(cls.cache_hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def analyze(self, matrix: CostMatrix, top_n: int = 10,
+                window: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Calcula as métricas de tendência para todas as linhas da matriz.
+        
+        Args:
+            matrix: Matriz de custos
+            top_n: Número de linhas (por custo total) detalhadas no resultado
+            window: Janela da média móvel (padrão: 3 para MONTHLY, 7 para DAILY)
+        
+        Returns:
+            Dicionário com as linhas mais relevantes e os destaques de crescimento
+        """
+        values = matrix.values
+        if window is None:
+            window = 7 if matrix.granularity == 'DAILY' else 3
+        
+        result = {
+            'dimensions': matrix.dimensions,
+            'granularity': matrix.granularity,
+            'periods': matrix.periods,
+            'rows_total': len(matrix.keys),
+            'items': [],
+            'fastest_growing': [],
+            'fastest_declining': []
+        }
+        
+        if values.size == 0:
+            return result
+        
+        column_totals = values.sum(axis=0)
+        row_totals = values.sum(axis=1)
+        grand_total = row_totals.sum()
+        
+        changes = period_change_percent(values)
+        rolling = rolling_average(values, window)
+        compound, slope = growth_rates(values)
+        
+        share = np.divide(row_totals * 100.0, grand_total,
+                          out=np.zeros_like(row_totals), where=grand_total > 0)
+        last_share = np.divide(values[:, -1] * 100.0, column_totals[-1],
+                               out=np.zeros(len(row_totals)), where=column_totals[-1] > 0)
+        mean_cost = values.mean(axis=1)
+        relative_slope = np.divide(slope * 100.0, mean_cost,
+                                   out=np.zeros_like(slope), where=mean_cost > 0)
+        
+        order = np.argsort(-row_totals, kind='stable')
+        
+        def build_item(row: int) -> Dict[str, Any]:
+            item = {dimension.lower(): matrix.keys[row][i] if i < len(matrix.keys[row]) else ''
+                    for i, dimension in enumerate(matrix.dimensions)}
+            item.update({
+                'total_cost': round(float(row_totals[row]), 4),
+                'last_cost': round(float(values[row, -1]), 4),
+                'share_percent': round(float(share[row]), 2),
+                'last_share_percent': round(float(last_share[row]), 2),
+                'last_change_percent': round(float(changes[row, -1]), 2) if changes.shape[1] else None,
+                'average_change_percent': round(float(changes[row].mean()), 2) if changes.shape[1] else None,
+                'rolling_average': round(float(rolling[row, -1]), 4),
+                'growth_rate_percent': None if np.isnan(compound[row]) else round(float(compound[row]), 2),
+                'slope_per_period': round(float(slope[row]), 4),
+                'series': [round(float(v), 4) for v in values[row]]
+            })
+            return item
+        
+        result['items'] = [build_item(row) for row in order[:top_n]]
+        
+        # Destaques de crescimento apenas entre linhas com participação relevante (>= 1%)
+        relevant = np.flatnonzero(share >= 1.0)
+        if relevant.size:
+            by_growth = relevant[np.argsort(-relative_slope[relevant], kind='stable')]
+            result['fastest_growing'] = [
+                {**{d.lower(): matrix.keys[row][i] for i, d in enumerate(matrix.dimensions)},
+                 'slope_percent_per_period': round(float(relative_slope[row]), 2)}
+                for row in by_growth[:5] if relative_slope[row] > 0
+            ]
+            result['fastest_declining'] = [
+                {**{d.lower(): matrix.keys[row][i] for i, d in enumerate(matrix.dimensions)},
+                 'slope_percent_per_period': round(float(relative_slope[row]), 2)}
+                for row in by_growth[::-1][:5] if relative_slope[row] < 0
+            ]
+        
+        return result
+    
+    def get_trends(self, start_date: str, end_date: str, granularity: str = 'MONTHLY',
+                   top_n: int = 10, include_usage_types: bool = True) -> Dict[str, Any]:
+        """
+        Calcula tendências por serviço e, opcionalmente, por tipo de uso.
+        
+        Args:
+            start_date: Data inicial no formato YYYY-MM-DD
+            end_date: Data final no formato YYYY-MM-DD
+            granularity: Granularidade ('DAILY'|'MONTHLY')
+            top_n: Número de serviços/tipos de uso detalhados
+            include_usage_types: Se deve incluir a análise por USAGE_TYPE
+        
+        Returns:
+            Dicionário com totais por período, tendências por serviço e por tipo de uso
+        """
+        matrix = self.get_matrix(start_date, end_date, granularity, include_usage_types)
+        services = matrix.aggregate('SERVICE')
+        
+        result = {
+            'granularity': granularity,
+            'periods': matrix.periods,
+            'partial_periods': [p for p, estimated in zip(matrix.periods, matrix.estimated) if estimated],
+            'currency': matrix.unit,
+            'period_totals': [round(float(v), 4) for v in matrix.totals()],
+            'services': self.analyze(services, top_n=top_n),
+            'generated_at': datetime.now().isoformat()
+        }
+        
+        if include_usage_types:
+            result['usage_types'] = self.analyze(matrix, top_n=top_n)
+        
+        return result
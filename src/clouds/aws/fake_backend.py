@@ -0,0 +1,888 @@
+"""
+Backend AWS em processo, respondido a partir de uma conta sintética.
+
+Com CLOUD_INSIGHTS_AWS_MODE=fake (ou aws_fixtures.configure('fake', backend=...)),
+as chamadas das sessões do AWSClient não saem do processo: o hook before-call
+do botocore entrega a operação ao FakeAWSBackend, que monta a resposta no
+formato do boto3 a partir de uma SyntheticAccount. Erros viram ClientError
+normalmente (FakeAWSError → resposta HTTP 4xx).
+
+Operações simuladas:
+- ce: GetCostAndUsage (DAILY/MONTHLY, GroupBy por dimensão ou tag, filtros
+  Dimensions/Tags/And/Or/Not e NextPageToken), GetDimensionValues, GetTags,
+  GetCostForecast;
+- ec2: DescribeInstances, DescribeVolumes, DescribeSnapshots, DescribeAddresses,
+  DescribeVpcs, DescribeSubnets, DescribeSecurityGroups, DescribeRegions,
+  DescribeAvailabilityZones (com Filters, MaxResults e NextToken);
+- elbv2: DescribeLoadBalancers, DescribeTargetGroups, DescribeTargetHealth,
+  DescribeListeners;
+- cloudwatch: GetMetricData (MetricStat e Metrics Insights "top N");
+- sts: GetCallerIdentity.
+
+Como no serviço real, listas do EC2 sem MaxResults vêm inteiras, o Cost
+Explorer pagina grupos e valores, e o GetMetricData limita os pontos por resposta.
+Limites de taxa opcionais por serviço ou operação (balde de fichas; ex: 'ce=5')
+respondem ThrottlingException acima da vazão, exercitando as retentativas do
+botocore e a contagem de throttles.
+
+Fora do aws_fixtures, FakeAWSBackend.client() cria um cliente boto3 avulso
+respondido pelo backend (ex: CostExplorer com um AWSClient de teste) e
+FakeAWSBackend.stub() prepara um Stubber do botocore com as respostas de uma
+sequência de chamadas, validadas contra o modelo do serviço.
+"""
+
+import copy
+import fnmatch
+import math
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+import numpy as np
+from botocore import xform_name
+from botocore.awsrequest import AWSResponse
+from botocore.stub import Stubber
+
+from src.clouds.aws.synthetic import REGION_CODES, SyntheticAccount
+
+# Grupos (período × chaves) por página do GetCostAndUsage
+CE_PAGE_SIZE = 5000
+# Valores por página do GetDimensionValues/GetTags
+CE_VALUES_PAGE_SIZE = 1000
+# Pontos por resposta do GetMetricData (limite da AWS)
+MAX_DATAPOINTS_PER_RESPONSE = 100800
+
+COST_METRICS = {'UnblendedCost', 'BlendedCost', 'AmortizedCost', 'NetUnblendedCost', 'NetAmortizedCost'}
+CE_DIMENSIONS = {
+    'AZ', 'INSTANCE_TYPE', 'LINKED_ACCOUNT', 'LINKED_ACCOUNT_NAME', 'OPERATION', 'PURCHASE_TYPE',
+    'REGION', 'SERVICE', 'SERVICE_CODE', 'USAGE_TYPE', 'USAGE_TYPE_GROUP', 'RECORD_TYPE',
+    'OPERATING_SYSTEM', 'TENANCY', 'SCOPE', 'PLATFORM', 'SUBSCRIPTION_ID', 'LEGAL_ENTITY_NAME',
+    'DEPLOYMENT_OPTION', 'DATABASE_ENGINE', 'CACHE_ENGINE', 'INSTANCE_TYPE_FAMILY',
+    'BILLING_ENTITY', 'RESERVATION_ID', 'RESOURCE_ID', 'RIGHTSIZING_TYPE', 'SAVINGS_PLANS_TYPE',
+    'SAVINGS_PLAN_ARN', 'PAYMENT_OPTION', 'AGREEMENT_END_DATE_TIME_AFTER',
+    'AGREEMENT_END_DATE_TIME_BEFORE', 'INVOICING_ENTITY', 'ANOMALY_TOTAL_IMPACT_ABSOLUTE',
+    'ANOMALY_TOTAL_IMPACT_PERCENTAGE'
+}
+
+# Métricas do EC2: nível por instância ('cpu' ou 'network'), escala e se são contadores
+EC2_METRICS = {
+    'CPUUtilization': ('cpu', 1.0, False),
+    'NetworkIn': ('network', 0.6, True),
+    'NetworkOut': ('network', 1.0, True),
+    'NetworkPacketsIn': ('network', 0.6 / 900, True),
+    'NetworkPacketsOut': ('network', 1.0 / 900, True),
+    'EBSReadBytes': ('network', 0.2, True),
+    'EBSWriteBytes': ('network', 0.3, True),
+    'EBSReadOps': ('network', 0.2 / 16384, True),
+    'EBSWriteOps': ('network', 0.3 / 16384, True),
+    'DiskReadBytes': ('network', 0.0, True),
+    'DiskWriteBytes': ('network', 0.0, True),
+    'StatusCheckFailed': ('cpu', 0.0, False),
+    'StatusCheckFailed_Instance': ('cpu', 0.0, False),
+    'StatusCheckFailed_System': ('cpu', 0.0, False)
+}
+STAT_FACTORS = {'Average': 1.0, 'Maximum': 1.3, 'Minimum': 0.7, 'Sum': 1.0, 'SampleCount': 1.0}
+DAILY = 2 * np.pi / 86400
+_INSIGHTS = re.compile(
+    r'SELECT\s+(\w+)\((\w+)\)\s+FROM\s+SCHEMA\("([^"]+)",\s*(\w+)\)\s+GROUP BY\s+(\w+)'
+    r'(?:\s+ORDER BY\s+\w+\(\)\s+(ASC|DESC))?(?:\s+LIMIT\s+(\d+))?', re.IGNORECASE
+)
+
+
+class FakeAWSError(Exception):
+    """Erro devolvido pelo backend sintético como resposta de erro da AWS."""
+    
+    def __init__(self, code: str, message: str, status_code: int = 400):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+    
+    def response(self) -> Dict[str, Any]:
+        """Resposta interpretada no formato que o botocore transforma em ClientError."""
+        return {
+            'Error': {'Code': self.code, 'Message': self.message},
+            'ResponseMetadata': {'HTTPStatusCode': self.status_code}
+        }
+
+
+def _parse_date(value: Any, field: str) -> date:
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        raise FakeAWSError('ValidationException', f"{field} inválido: {value}")
+
+
+def _as_utc(value: Any) -> datetime:
+    """StartTime/EndTime do CloudWatch: datetime (ingênuo = UTC), ISO ou epoch."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _amount(value: float) -> str:
+    return f"{value:.10f}"
+
+
+def _page(items: List[Any], token: Optional[str], size: Optional[int],
+          token_field: str = 'NextToken') -> Tuple[List[Any], Dict[str, Any]]:
+    """Fatia uma lista por posição; o token é a posição da próxima página."""
+    try:
+        offset = int(token) if token else 0
+    except ValueError:
+        raise FakeAWSError('InvalidParameterValue' if token_field == 'NextToken' else 'ValidationException',
+                           f"{token_field} inválido: {token}")
+    if not size:
+        return items[offset:], {}
+    end = offset + size
+    extra = {token_field: str(end)} if end < len(items) else {}
+    return items[offset:end], extra
+
+
+def _tag_value(resource: Dict[str, Any], key: str) -> Optional[str]:
+    for tag in resource.get('Tags', []):
+        if tag['Key'] == key:
+            return tag['Value']
+    return None
+
+
+# Filtros do EC2: nome → valores do recurso comparados com os Values do filtro
+_COMMON_FILTERS: Dict[str, Callable[[Dict[str, Any]], Iterable[Any]]] = {
+    'tag-key': lambda r: [tag['Key'] for tag in r.get('Tags', [])],
+    'tag-value': lambda r: [tag['Value'] for tag in r.get('Tags', [])],
+    'owner-id': lambda r: [r.get('OwnerId')]
+}
+EC2_FILTERS: Dict[str, Dict[str, Callable[[Dict[str, Any]], Iterable[Any]]]] = {
+    'instances': {
+        'instance-state-name': lambda r: [r['State']['Name']],
+        'instance-state-code': lambda r: [str(r['State']['Code'])],
+        'instance-id': lambda r: [r['InstanceId']],
+        'instance-type': lambda r: [r['InstanceType']],
+        'availability-zone': lambda r: [r['Placement']['AvailabilityZone']],
+        'vpc-id': lambda r: [r.get('VpcId')],
+        'subnet-id': lambda r: [r.get('SubnetId')],
+        'image-id': lambda r: [r.get('ImageId')],
+        'architecture': lambda r: [r.get('Architecture')],
+        'private-ip-address': lambda r: [r.get('PrivateIpAddress')]
+    },
+    'volumes': {
+        'status': lambda r: [r['State']],
+        'volume-id': lambda r: [r['VolumeId']],
+        'volume-type': lambda r: [r['VolumeType']],
+        'size': lambda r: [str(r['Size'])],
+        'availability-zone': lambda r: [r['AvailabilityZone']],
+        'encrypted': lambda r: [str(r['Encrypted']).lower()],
+        'attachment.instance-id': lambda r: [a['InstanceId'] for a in r.get('Attachments', [])],
+        'attachment.status': lambda r: [a['State'] for a in r.get('Attachments', [])]
+    },
+    'snapshots': {
+        'status': lambda r: [r['State']],
+        'snapshot-id': lambda r: [r['SnapshotId']],
+        'volume-id': lambda r: [r['VolumeId']],
+        'volume-size': lambda r: [str(r['VolumeSize'])],
+        'encrypted': lambda r: [str(r['Encrypted']).lower()]
+    },
+    'addresses': {
+        'domain': lambda r: [r.get('Domain')],
+        'public-ip': lambda r: [r.get('PublicIp')],
+        'allocation-id': lambda r: [r.get('AllocationId')],
+        'association-id': lambda r: [r.get('AssociationId')],
+        'instance-id': lambda r: [r.get('InstanceId')]
+    },
+    'vpcs': {
+        'vpc-id': lambda r: [r['VpcId']],
+        'state': lambda r: [r['State']],
+        'is-default': lambda r: [str(r['IsDefault']).lower()],
+        'cidr': lambda r: [r['CidrBlock']]
+    },
+    'subnets': {
+        'subnet-id': lambda r: [r['SubnetId']],
+        'vpc-id': lambda r: [r['VpcId']],
+        'availability-zone': lambda r: [r['AvailabilityZone']],
+        'state': lambda r: [r['State']]
+    },
+    'security_groups': {
+        'group-id': lambda r: [r['GroupId']],
+        'group-name': lambda r: [r['GroupName']],
+        'vpc-id': lambda r: [r['VpcId']]
+    }
+}
+
+
+def _extractor(kind: str, name: str) -> Callable[[Dict[str, Any]], Iterable[Any]]:
+    if name.startswith('tag:'):
+        key = name[4:]
+        return lambda r: [_tag_value(r, key)]
+    extractor = EC2_FILTERS[kind].get(name) or _COMMON_FILTERS.get(name)
+    if extractor is None:
+        raise FakeAWSError('InvalidParameterValue', f"The filter '{name}' is invalid")
+    return extractor
+
+
+def _apply_filters(kind: str, items: List[Dict[str, Any]],
+                   filters: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Aplica os Filters do EC2 (E entre filtros, OU entre valores, curingas * e ?)."""
+    for entry in filters or []:
+        extractor = _extractor(kind, entry.get('Name', ''))
+        patterns = [str(value) for value in entry.get('Values', [])]
+        exact = {pattern for pattern in patterns if '*' not in pattern and '?' not in pattern}
+        wildcards = [pattern for pattern in patterns if pattern not in exact]
+        items = [
+            item for item in items
+            if any(value is not None and (value in exact or any(fnmatch.fnmatchcase(value, p) for p in wildcards))
+                   for value in extractor(item))
+        ]
+    return items
+
+
+def parse_rate_limits(spec: Optional[str]) -> Dict[str, float]:
+    """
+    Interpreta limites de taxa no formato 'ce=5,ec2.DescribeInstances=20'.
+    
+    Args:
+        spec: Pares serviço[.Operação]=chamadas por segundo, separados por vírgula
+    
+    Returns:
+        Chamadas por segundo por serviço ou serviço.Operação (vazio sem limites)
+    
+    Raises:
+        ValueError: Par mal formado ou taxa não positiva
+    """
+    limits: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, value = item.partition('=')
+        try:
+            rate = float(value)
+        except ValueError:
+            rate = 0.0
+        if not name.strip() or rate <= 0:
+            raise ValueError(f"Limite de taxa inválido: '{item}' (use serviço[.Operação]=chamadas/s)")
+        limits[name.strip()] = rate
+    return limits
+
+
+class FakeAWSBackend:
+    """
+    Responde às chamadas da AWS com os dados de uma SyntheticAccount.
+    """
+    
+    def __init__(self, account: SyntheticAccount, rate_limits: Optional[Dict[str, float]] = None):
+        """
+        Inicializa o backend.
+        
+        Args:
+            account: Conta sintética usada nas respostas
+            rate_limits: Chamadas por segundo por serviço ('ce') ou operação
+                ('ec2.DescribeInstances'; tem precedência); acima da taxa, com rajada
+                de até um segundo, a chamada recebe ThrottlingException
+        """
+        self.account = account
+        self.rate_limits = dict(rate_limits or {})
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[float]] = {}
+        self.calls: Dict[str, int] = {}
+        self.throttled = 0
+    
+    def handle(self, service: str, operation: str, params: Optional[Dict[str, Any]],
+               region: Optional[str]) -> Dict[str, Any]:
+        """
+        Executa uma operação.
+        
+        Args:
+            service: Nome do serviço no botocore (ex: 'ce', 'ec2', 'cloudwatch')
+            operation: Nome da operação (ex: 'GetCostAndUsage')
+            params: Parâmetros da chamada
+            region: Região do cliente
+        
+        Returns:
+            Resposta no formato do boto3
+        
+        Raises:
+            FakeAWSError: Operação não simulada, parâmetros inválidos ou limite de taxa
+        """
+        name = f"{service}.{operation}"
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if not self._take_token(name if name in self.rate_limits else service):
+                self.throttled += 1
+                raise FakeAWSError('ThrottlingException', 'Rate exceeded')
+        handler = getattr(self, f"_{service}_{xform_name(operation)}", None)
+        if handler is None:
+            raise FakeAWSError('UnsupportedOperation', f"{name} não é simulada pelo backend sintético")
+        response = handler(params or {}, region or self.account.region)
+        response['ResponseMetadata'] = {'RequestId': f"fake-{sum(self.calls.values()):08d}",
+                                        'HTTPStatusCode': 200, 'RetryAttempts': 0}
+        return response
+    
+    def _take_token(self, key: str) -> bool:
+        """Consome uma ficha do balde de `key` (chamar com o lock); sem limite, sempre há ficha."""
+        rate = self.rate_limits.get(key)
+        if rate is None:
+            return True
+        capacity = max(rate, 1.0)
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self._buckets[key] = [tokens, now]
+            return False
+        self._buckets[key] = [tokens - 1, now]
+        return True
+    
+    def call_count(self) -> int:
+        """Total de chamadas recebidas."""
+        with self._lock:
+            return sum(self.calls.values())
+    
+    def snapshot(self) -> Dict[str, int]:
+        """Cópia das contagens por serviço.operação."""
+        with self._lock:
+            return dict(self.calls)
+    
+    def reset(self) -> None:
+        """Zera as contagens e os baldes dos limites de taxa."""
+        with self._lock:
+            self.calls.clear()
+            self._buckets.clear()
+            self.throttled = 0
+    
+    def client(self, service: str, region: Optional[str] = None) -> Any:
+        """
+        Cria um cliente boto3 cujas chamadas são respondidas por este backend.
+        
+        O cliente passa pela validação de parâmetros e pelos eventos do botocore
+        como um cliente real, mas não usa credenciais nem rede.
+        
+        Args:
+            service: Nome do serviço no botocore (ex: 'ce', 'ec2')
+            region: Região do cliente (padrão: a da conta sintética)
+        
+        Returns:
+            Cliente boto3
+        """
+        import boto3
+        
+        session = boto3.session.Session(aws_access_key_id='synthetic', aws_secret_access_key='synthetic',
+                                        region_name=region or self.account.region)
+        client = session.client(service)
+        
+        def capture(params: Dict[str, Any], context: Dict[str, Any], **kwargs) -> None:
+            context['_fake_params'] = copy.deepcopy(params)
+        
+        def respond(model: Any, context: Dict[str, Any], **kwargs) -> Tuple[AWSResponse, Dict[str, Any]]:
+            try:
+                parsed = self.handle(service, model.name, context.get('_fake_params'), client.meta.region_name)
+            except FakeAWSError as e:
+                return AWSResponse(None, e.status_code, {}, None), e.response()
+            return AWSResponse(None, 200, {}, None), parsed
+        
+        client.meta.events.register('before-parameter-build', capture)
+        client.meta.events.register('before-call', respond)
+        return client
+    
+    def stub(self, client: Any, calls: Iterable[Tuple[str, Dict[str, Any]]]) -> Stubber:
+        """
+        Prepara um Stubber do botocore com as respostas deste backend.
+        
+        Cada resposta é validada contra o formato de saída da operação no modelo do
+        botocore, e o Stubber confere os parâmetros de cada chamada, na ordem.
+        
+        Args:
+            client: Cliente boto3 a simular (de qualquer sessão)
+            calls: Sequência de (método do cliente, parâmetros),
+                ex: [('get_cost_and_usage', {...})]
+        
+        Returns:
+            Stubber ainda não ativado (use `with backend.stub(client, calls):`)
+        """
+        service = client.meta.service_model.service_name
+        stubber = Stubber(client)
+        for method, params in calls:
+            operation = client.meta.method_to_api_mapping[method]
+            try:
+                response = self.handle(service, operation, params, client.meta.region_name)
+            except FakeAWSError as e:
+                stubber.add_client_error(method, service_error_code=e.code, service_message=e.message,
+                                         http_status_code=e.status_code, expected_params=params)
+                continue
+            stubber.add_response(method, response, expected_params=params)
+        return stubber
+    
+    # ----- Cost Explorer -----
+    
+    def _time_period(self, params: Dict[str, Any]) -> Tuple[date, date]:
+        period = params.get('TimePeriod') or {}
+        start = _parse_date(period.get('Start'), 'TimePeriod.Start')
+        end = _parse_date(period.get('End'), 'TimePeriod.End')
+        if start >= end:
+            raise FakeAWSError('ValidationException', 'Start date must be before end date')
+        return start, end
+    
+    def _periods(self, start: date, end: date, granularity: str) -> List[Tuple[date, date]]:
+        if granularity == 'DAILY':
+            return [(start + timedelta(days=d), start + timedelta(days=d + 1)) for d in range((end - start).days)]
+        if granularity != 'MONTHLY':
+            raise FakeAWSError('ValidationException', f"Granularity {granularity} is not enabled for this account")
+        periods = []
+        cursor = start
+        while cursor < end:
+            next_month = date(cursor.year + cursor.month // 12, cursor.month % 12 + 1, 1)
+            periods.append((cursor, min(next_month, end)))
+            cursor = next_month
+        return periods
+    
+    def _cost_filter(self, expression: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, float]:
+        """
+        Avalia um Filter: máscara das linhas de uso e fração do custo pelas tags.
+        
+        Tags são independentes das dimensões: o filtro por tag multiplica o custo
+        das linhas selecionadas pela participação dos valores escolhidos.
+        """
+        account = self.account
+        rows = np.ones(len(account.row_service), dtype=bool)
+        if not expression:
+            return rows, 1.0
+        if 'Dimensions' in expression:
+            key = expression['Dimensions'].get('Key')
+            values = expression['Dimensions'].get('Values', [])
+            if key not in CE_DIMENSIONS:
+                raise FakeAWSError('ValidationException', f"Dimension {key} is not allowed")
+            if key == 'LINKED_ACCOUNT':
+                return rows & (account.account_id in values), 1.0
+            column = account.row_dimensions.get(key)
+            if column is None:
+                return rows & False, 1.0
+            return np.isin(column, values), 1.0
+        if 'Tags' in expression:
+            return rows, account.tag_share(expression['Tags'].get('Key', ''), expression['Tags'].get('Values', []))
+        if 'CostCategories' in expression:
+            return rows & False, 1.0
+        if 'And' in expression:
+            factor = 1.0
+            for item in expression['And']:
+                mask, item_factor = self._cost_filter(item)
+                rows &= mask
+                factor *= item_factor
+            return rows, factor
+        if 'Or' in expression:
+            rows &= False
+            factor = 0.0
+            for item in expression['Or']:
+                mask, item_factor = self._cost_filter(item)
+                rows |= mask
+                factor = max(factor, item_factor)
+            return rows, min(factor, 1.0)
+        if 'Not' in expression:
+            mask, factor = self._cost_filter(expression['Not'])
+            if factor < 1.0:
+                return rows, 1.0 - factor
+            return ~mask, 1.0
+        raise FakeAWSError('ValidationException', 'Expression must contain a filter')
+    
+    def _group_axis(self, definition: Dict[str, Any], rows: np.ndarray) -> Dict[str, Any]:
+        """Um eixo de agrupamento: rótulos e códigos por linha (dimensão) ou participações (tag)."""
+        account = self.account
+        kind, key = definition.get('Type'), definition.get('Key')
+        if kind == 'TAG':
+            tag = account.tags.get(key)
+            if tag is None:
+                return {'labels': [f"{key}$"], 'shares': np.array([1.0])}
+            return {'labels': [f"{key}${value}" for value in tag['values']] + [f"{key}$"],
+                    'shares': np.append(tag['shares'], tag['untagged'])}
+        if kind != 'DIMENSION' or key not in CE_DIMENSIONS:
+            raise FakeAWSError('ValidationException', f"Group Definition {kind}:{key} is not supported")
+        if key == 'LINKED_ACCOUNT':
+            return {'labels': [account.account_id], 'codes': np.zeros(int(rows.sum()), dtype=np.int64)}
+        column = account.row_dimensions.get(key)
+        if column is None:
+            return {'labels': [f"No{key.title().replace('_', '')}"],
+                    'codes': np.zeros(int(rows.sum()), dtype=np.int64)}
+        labels, codes = np.unique(column[rows].astype(str), return_inverse=True)
+        return {'labels': labels.tolist(), 'codes': codes}
+    
+    def _ce_get_cost_and_usage(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        account = self.account
+        start, end = self._time_period(params)
+        months = (account.today.year * 12 + account.today.month) - (start.year * 12 + start.month)
+        if months > 14:
+            raise FakeAWSError('ValidationException', 'start date is too old (more than 14 months)')
+        metrics = params.get('Metrics') or []
+        if not metrics:
+            raise FakeAWSError('ValidationException', 'Metrics is required')
+        group_by = params.get('GroupBy') or []
+        if len(group_by) > 2:
+            raise FakeAWSError('ValidationException', 'Maximum of 2 group by is allowed')
+        
+        periods = self._periods(start, end, params.get('Granularity', 'MONTHLY'))
+        rows, factor = self._cost_filter(params.get('Filter'))
+        period_costs = account.period_costs(rows, periods) * factor  # linhas × períodos
+        
+        # Matriz grupos × períodos: dimensões somam linhas, tags repartem o valor
+        labels: List[List[str]] = [[]]
+        amounts = period_costs.sum(axis=0, keepdims=True)
+        if group_by:
+            dimension_axes = [self._group_axis(g, rows) for g in group_by if g.get('Type') != 'TAG']
+            codes = np.zeros(period_costs.shape[0], dtype=np.int64)
+            labels = [[]]
+            for axis in dimension_axes:
+                codes = codes * len(axis['labels']) + axis['codes']
+                labels = [prefix + [label] for prefix in labels for label in axis['labels']]
+            groups = np.zeros((len(labels), len(periods)))
+            np.add.at(groups, codes, period_costs)
+            amounts = groups
+            for g in group_by:
+                if g.get('Type') == 'TAG':
+                    axis = self._group_axis(g, rows)
+                    amounts = (amounts[:, None, :] * axis['shares'][None, :, None]).reshape(-1, len(periods))
+                    labels = [prefix + [label] for prefix in labels for label in axis['labels']]
+            # A ordem das chaves segue a do GroupBy
+            order = [i for i, g in enumerate(group_by) if g.get('Type') != 'TAG'] + \
+                    [i for i, g in enumerate(group_by) if g.get('Type') == 'TAG']
+            labels = [[keys[order.index(i)] for i in range(len(group_by))] for keys in labels]
+        
+        def metric_values(value: float) -> Dict[str, Dict[str, str]]:
+            return {
+                metric: {'Amount': _amount(value), 'Unit': 'USD'} if metric in COST_METRICS
+                else {'Amount': _amount(value * 12.5), 'Unit': 'N/A'}
+                for metric in metrics
+            }
+        
+        estimated_after = account.today - timedelta(days=2)
+        results = [{
+            'TimePeriod': {'Start': p_start.isoformat(), 'End': p_end.isoformat()},
+            'Total': {} if group_by else metric_values(float(amounts[0, i])),
+            'Groups': [],
+            'Estimated': p_end > estimated_after
+        } for i, (p_start, p_end) in enumerate(periods)]
+        
+        response: Dict[str, Any] = {'ResultsByTime': results, 'DimensionValueAttributes': []}
+        if group_by:
+            response['GroupDefinitions'] = group_by
+            # Células com custo, em ordem de período; cada página traz uma fatia
+            period_index, group_index = np.nonzero(amounts.T > 0)
+            cells = list(range(len(period_index)))
+            page, extra = _page(cells, params.get('NextPageToken'), CE_PAGE_SIZE, 'NextPageToken')
+            for cell in page:
+                p, g = int(period_index[cell]), int(group_index[cell])
+                results[p]['Groups'].append({'Keys': labels[g], 'Metrics': metric_values(float(amounts[g, p]))})
+            response.update(extra)
+        return response
+    
+    def _ce_get_dimension_values(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        self._time_period(params)
+        dimension = params.get('Dimension')
+        if dimension not in CE_DIMENSIONS:
+            raise FakeAWSError('ValidationException', f"Dimension {dimension} is not allowed")
+        search = (params.get('SearchString') or '').lower()
+        values = [value for value in self.account.dimension_values(dimension) if search in value.lower()]
+        page, extra = _page(values, params.get('NextPageToken'), params.get('MaxResults') or CE_VALUES_PAGE_SIZE,
+                            'NextPageToken')
+        return dict({
+            'DimensionValues': [{'Value': value, 'Attributes': {}} for value in page],
+            'ReturnSize': len(page),
+            'TotalSize': len(values)
+        }, **extra)
+    
+    def _ce_get_tags(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        self._time_period(params)
+        tag_key = params.get('TagKey')
+        if tag_key:
+            tag = self.account.tags.get(tag_key)
+            values = ([''] + tag['values']) if tag else []
+        else:
+            values = sorted(self.account.tags) + ['Name']
+        search = (params.get('SearchString') or '').lower()
+        values = [value for value in values if search in value.lower()]
+        page, extra = _page(values, params.get('NextPageToken'), params.get('MaxResults') or CE_VALUES_PAGE_SIZE,
+                            'NextPageToken')
+        return dict({'Tags': page, 'ReturnSize': len(page), 'TotalSize': len(values)}, **extra)
+    
+    def _ce_get_cost_forecast(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        account = self.account
+        start, end = self._time_period(params)
+        if start < account.today:
+            raise FakeAWSError('ValidationException', 'Start date must be equal to or no later than the current date')
+        periods = self._periods(start, end, params.get('Granularity', 'MONTHLY'))
+        
+        # Média dos últimos 28 dias projetada com a tendência dos últimos 90
+        daily = account.costs.sum(axis=0)
+        recent = daily[-28:].mean() if daily.size else 0.0
+        window = daily[-90:]
+        slope = np.polyfit(np.arange(window.size), window, 1)[0] if window.size > 1 else 0.0
+        level = float(params.get('PredictionIntervalLevel', 80)) / 100
+        
+        forecast, total = [], 0.0
+        for p_start, p_end in periods:
+            offset = (p_start - account.today).days + 14
+            days = (p_end - p_start).days
+            mean = max(recent + slope * (offset + days / 2), 0.0) * days
+            spread = mean * 0.08 * level * math.sqrt(max(offset, 1) / 30)
+            total += mean
+            forecast.append({
+                'TimePeriod': {'Start': p_start.isoformat(), 'End': p_end.isoformat()},
+                'MeanValue': _amount(mean),
+                'PredictionIntervalLowerBound': _amount(max(mean - spread, 0.0)),
+                'PredictionIntervalUpperBound': _amount(mean + spread)
+            })
+        return {'Total': {'Amount': _amount(total), 'Unit': 'USD'}, 'ForecastResultsByTime': forecast}
+    
+    # ----- EC2 -----
+    
+    def _ec2_list(self, kind: str, items: List[Dict[str, Any]], params: Dict[str, Any],
+                  id_param: Optional[str] = None, id_field: Optional[str] = None,
+                  not_found: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        ids = params.get(id_param) if id_param else None
+        if ids:
+            wanted = set(ids)
+            items = [item for item in items if item[id_field] in wanted]
+            missing = wanted - {item[id_field] for item in items}
+            if missing:
+                raise FakeAWSError(not_found, f"The {id_field} '{sorted(missing)[0]}' does not exist")
+        items = _apply_filters(kind, items, params.get('Filters'))
+        page, extra = _page(items, params.get('NextToken'), params.get('MaxResults'))
+        # Cópias: quem chama pode alterar a resposta, como faria com a do boto3
+        return copy.deepcopy(page), extra
+    
+    def _own_region(self, region: str) -> bool:
+        return region == self.account.region
+    
+    def _ec2_describe_instances(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        account = self.account
+        instances = account.instances if self._own_region(region) else []
+        page, extra = self._ec2_list('instances', instances, params, 'InstanceIds', 'InstanceId',
+                                     'InvalidInstanceID.NotFound')
+        reservations: List[Dict[str, Any]] = []
+        for instance in page:
+            reservation_id = account.instance_reservations[account.instance_index[instance['InstanceId']]]
+            if not reservations or reservations[-1]['ReservationId'] != reservation_id:
+                reservations.append({'ReservationId': reservation_id, 'OwnerId': account.account_id,
+                                     'Groups': [], 'Instances': []})
+            reservations[-1]['Instances'].append(instance)
+        return dict({'Reservations': reservations}, **extra)
+    
+    def _ec2_describe_volumes(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        volumes = self.account.volumes if self._own_region(region) else []
+        page, extra = self._ec2_list('volumes', volumes, params, 'VolumeIds', 'VolumeId',
+                                     'InvalidVolume.NotFound')
+        return dict({'Volumes': page}, **extra)
+    
+    def _ec2_describe_snapshots(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        account = self.account
+        owners = params.get('OwnerIds')
+        own = not owners or 'self' in owners or account.account_id in owners
+        snapshots = account.snapshots if own and self._own_region(region) else []
+        page, extra = self._ec2_list('snapshots', snapshots, params, 'SnapshotIds', 'SnapshotId',
+                                     'InvalidSnapshot.NotFound')
+        return dict({'Snapshots': page}, **extra)
+    
+    def _ec2_describe_addresses(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        addresses = self.account.addresses if self._own_region(region) else []
+        page, _ = self._ec2_list('addresses', addresses, params, 'AllocationIds', 'AllocationId',
+                                 'InvalidAllocationID.NotFound')
+        return {'Addresses': page}
+    
+    def _ec2_describe_vpcs(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        vpcs = self.account.vpcs if self._own_region(region) else []
+        page, extra = self._ec2_list('vpcs', vpcs, params, 'VpcIds', 'VpcId', 'InvalidVpcID.NotFound')
+        return dict({'Vpcs': page}, **extra)
+    
+    def _ec2_describe_subnets(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        subnets = self.account.subnets if self._own_region(region) else []
+        page, extra = self._ec2_list('subnets', subnets, params, 'SubnetIds', 'SubnetId',
+                                     'InvalidSubnetID.NotFound')
+        return dict({'Subnets': page}, **extra)
+    
+    def _ec2_describe_security_groups(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        groups = self.account.security_groups if self._own_region(region) else []
+        page, extra = self._ec2_list('security_groups', groups, params, 'GroupIds', 'GroupId',
+                                     'InvalidGroup.NotFound')
+        return dict({'SecurityGroups': page}, **extra)
+    
+    def _ec2_describe_regions(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        return {'Regions': [
+            {'RegionName': name, 'Endpoint': f"ec2.{name}.amazonaws.com", 'OptInStatus': 'opt-in-not-required'}
+            for name in REGION_CODES
+        ]}
+    
+    def _ec2_describe_availability_zones(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        return {'AvailabilityZones': [
+            {'ZoneName': f"{region}{suffix}", 'State': 'available', 'RegionName': region,
+             'ZoneId': f"{region[:2]}{region.split('-')[1][:1]}{i + 1}-az{i + 1}", 'ZoneType': 'availability-zone'}
+            for i, suffix in enumerate('abc')
+        ]}
+    
+    # ----- ELBv2 -----
+    
+    def _elbv2_describe_load_balancers(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        balancers = self.account.load_balancers if self._own_region(region) else []
+        arns, names = params.get('LoadBalancerArns'), params.get('Names')
+        if arns:
+            balancers = [lb for lb in balancers if lb['LoadBalancerArn'] in arns]
+        if names:
+            balancers = [lb for lb in balancers if lb['LoadBalancerName'] in names]
+        if (arns or names) and not balancers:
+            raise FakeAWSError('LoadBalancerNotFound', 'One or more load balancers not found')
+        page, extra = _page(balancers, params.get('Marker'), params.get('PageSize'), 'NextMarker')
+        return dict({'LoadBalancers': copy.deepcopy(page)}, **extra)
+    
+    def _elbv2_describe_target_groups(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        groups = self.account.target_groups if self._own_region(region) else []
+        lb_arn = params.get('LoadBalancerArn')
+        if lb_arn:
+            groups = [tg for tg in groups if lb_arn in tg['LoadBalancerArns']]
+        arns = params.get('TargetGroupArns')
+        if arns:
+            groups = [tg for tg in groups if tg['TargetGroupArn'] in arns]
+        page, extra = _page(groups, params.get('Marker'), params.get('PageSize'), 'NextMarker')
+        return dict({'TargetGroups': copy.deepcopy(page)}, **extra)
+    
+    def _elbv2_describe_target_health(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        arn = params.get('TargetGroupArn')
+        if arn not in self.account.target_health:
+            raise FakeAWSError('TargetGroupNotFound', f"Target groups '{arn}' not found")
+        return {'TargetHealthDescriptions': copy.deepcopy(self.account.target_health[arn])}
+    
+    def _elbv2_describe_listeners(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        lb_arn = params.get('LoadBalancerArn')
+        groups = [tg for tg in self.account.target_groups if lb_arn in tg['LoadBalancerArns']]
+        return {'Listeners': [
+            {'ListenerArn': tg['TargetGroupArn'].replace('targetgroup', 'listener'), 'LoadBalancerArn': lb_arn,
+             'Port': tg['Port'], 'Protocol': tg['Protocol'],
+             'DefaultActions': [{'Type': 'forward', 'TargetGroupArn': tg['TargetGroupArn']}]}
+            for tg in groups
+        ]}
+    
+    # ----- CloudWatch -----
+    
+    def _metric_levels(self, metric: str, indexes: np.ndarray) -> Optional[np.ndarray]:
+        """Nível médio por segundo da métrica para as instâncias (None = métrica sem dados)."""
+        spec = EC2_METRICS.get(metric)
+        if spec is None:
+            return None
+        source, scale, _ = spec
+        base = self.account.cpu_base if source == 'cpu' else self.account.network_base
+        return base[indexes] * scale
+    
+    def _series(self, index: int, metric: str, stat: str, period: int,
+                timestamps: np.ndarray) -> np.ndarray:
+        """Valores de uma instância: nível × ciclo diário (determinístico)."""
+        account = self.account
+        level = self._metric_levels(metric, np.array([index]))
+        if level is None or not account.reporting[index] or timestamps.size == 0:
+            return np.empty(0)
+        values = level[0] * (1.0 + 0.35 * np.sin(DAILY * timestamps + account.metric_phase[index]))
+        values *= STAT_FACTORS.get(stat, 1.0)
+        if EC2_METRICS[metric][2]:
+            # Contadores: Sum acumula o período; as demais estatísticas valem por amostra de 5 min
+            values *= period if stat == 'Sum' else 300
+        elif metric == 'CPUUtilization':
+            values = np.minimum(values, 100.0)
+        return values
+    
+    def _timestamps(self, start: datetime, end: datetime, period: int) -> np.ndarray:
+        first = math.ceil(start.timestamp() / period) * period
+        return np.arange(first, end.timestamp(), period, dtype=np.float64)
+    
+    def _cloudwatch_get_metric_data(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        queries = params.get('MetricDataQueries') or []
+        if not queries or len(queries) > 500:
+            raise FakeAWSError('ValidationException', 'MetricDataQueries must contain between 1 and 500 queries')
+        start, end = _as_utc(params['StartTime']), _as_utc(params['EndTime'])
+        if start >= end:
+            raise FakeAWSError('ValidationException', 'The parameter StartTime must be less than EndTime')
+        ascending = params.get('ScanBy', 'TimestampDescending') == 'TimestampAscending'
+        
+        results: List[Dict[str, Any]] = []
+        for query in queries:
+            if 'Expression' in query:
+                results.extend(self._insights(query, start, end))
+            elif 'MetricStat' in query:
+                results.append(self._metric_stat(query, start, end))
+        
+        # Limite de pontos por resposta: o restante vem nas próximas páginas
+        offset = int(params.get('NextToken') or 0)
+        page, points = [], 0
+        for position in range(offset, len(results)):
+            size = len(results[position]['Values'])
+            if page and points + size > MAX_DATAPOINTS_PER_RESPONSE:
+                break
+            page.append(results[position])
+            points += size
+        response: Dict[str, Any] = {'MetricDataResults': [], 'Messages': []}
+        for result in page:
+            timestamps, values = result['Timestamps'], result['Values']
+            if not ascending:
+                timestamps, values = timestamps[::-1], values[::-1]
+            response['MetricDataResults'].append(dict(
+                result,
+                Timestamps=[datetime.fromtimestamp(ts, tz=timezone.utc) for ts in timestamps],
+                Values=[float(value) for value in values]
+            ))
+        if offset + len(page) < len(results):
+            response['NextToken'] = str(offset + len(page))
+        return response
+    
+    def _metric_stat(self, query: Dict[str, Any], start: datetime, end: datetime) -> Dict[str, Any]:
+        stat = query['MetricStat']
+        metric = stat.get('Metric', {})
+        period = int(stat.get('Period', 300))
+        dimensions = {d['Name']: d['Value'] for d in metric.get('Dimensions', [])}
+        index = self.account.instance_index.get(dimensions.get('InstanceId', ''))
+        timestamps = self._timestamps(start, end, period)
+        values = np.empty(0)
+        if metric.get('Namespace') == 'AWS/EC2' and index is not None:
+            values = self._series(index, metric.get('MetricName', ''), stat.get('Stat', 'Average'), period, timestamps)
+        return {
+            'Id': query['Id'],
+            'Label': query.get('Label') or metric.get('MetricName', ''),
+            'Timestamps': timestamps[:values.size],
+            'Values': values,
+            'StatusCode': 'Complete'
+        }
+    
+    def _insights(self, query: Dict[str, Any], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Consulta Metrics Insights "top N" agrupada por InstanceId."""
+        match = _INSIGHTS.search(query['Expression'])
+        if match is None:
+            raise FakeAWSError('ValidationException', f"Unsupported Metrics Insights query: {query['Expression']}")
+        aggregate, metric, namespace, _, group_by, order, limit = match.groups()
+        if namespace != 'AWS/EC2' or group_by != 'InstanceId':
+            return []
+        account = self.account
+        period = int(query.get('Period', 300))
+        timestamps = self._timestamps(start, end, period)
+        indexes = np.flatnonzero(account.reporting)
+        levels = self._metric_levels(metric, indexes)
+        if levels is None or timestamps.size == 0:
+            return []
+        
+        # Ordenação pelo agregado da série inteira, calculado sem montar as séries
+        phases = account.metric_phase[indexes]
+        cycle = np.exp(1j * DAILY * timestamps).sum()
+        sums = levels * (timestamps.size + 0.35 * np.imag(np.exp(1j * phases) * cycle))
+        ranking = {'SUM': sums, 'AVG': sums / timestamps.size, 'MAX': levels * 1.35,
+                   'MIN': levels * 0.65, 'COUNT': np.full(levels.size, float(timestamps.size))}.get(aggregate.upper(), sums)
+        order_index = np.argsort(-ranking if (order or 'DESC').upper() == 'DESC' else ranking, kind='stable')
+        top = indexes[order_index[:min(int(limit or 500), 500)]]
+        
+        stat = {'SUM': 'Sum', 'AVG': 'Average', 'MAX': 'Maximum', 'MIN': 'Minimum'}.get(aggregate.upper(), 'Average')
+        return [{
+            'Id': query['Id'],
+            'Label': account.instances[index]['InstanceId'],
+            'Timestamps': timestamps,
+            'Values': self._series(int(index), metric, stat, period, timestamps),
+            'StatusCode': 'Complete'
+        } for index in top]
+    
+    # ----- STS -----
+    
+    def _sts_get_caller_identity(self, params: Dict[str, Any], region: str) -> Dict[str, Any]:
+        account_id = self.account.account_id
+        return {'UserId': 'AIDASYNTHETIC000000000', 'Account': account_id,
+                'Arn': f"arn:aws:iam::{account_id}:user/synthetic"}
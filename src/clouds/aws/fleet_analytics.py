@@ -0,0 +1,181 @@
+"""
+Agregação em streaming da performance de frotas EC2.
+
+As instâncias são consumidas à medida que os lotes de métricas chegam; apenas
+resumos mescláveis por grupo (tipo de instância, AZ ou tag) e uma lista limitada
+de outliers são mantidos, então a memória não cresce com o tamanho da frota.
+"""
+import heapq
+from typing import Dict, List, Any, Optional, Callable
+
+from src.clouds.aws.sketches import MetricSummary
+
+
+class FleetPerformanceAggregator:
+    """
+    Mantém resumos por grupo e outliers de CPU de uma frota processada em streaming.
+    """
+    
+    GROUP_BY_OPTIONS = ('instance_type', 'availability_zone', 'tag:<chave>')
+    
+    def __init__(self, metrics: List[str], group_by: str = 'instance_type',
+                 outlier_limit: int = 20, high_cpu_threshold: float = 90.0,
+                 low_cpu_threshold: float = 5.0, sample_limit: int = 20,
+                 on_outlier: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Inicializa o agregador.
+        
+        Args:
+            metrics: Métricas coletadas por instância
+            group_by: 'instance_type', 'availability_zone' ou 'tag:<chave>'
+            outlier_limit: Máximo de outliers mantidos por tipo (os mais extremos)
+            high_cpu_threshold: CPU média acima da qual a instância é outlier (%)
+            low_cpu_threshold: CPU média abaixo da qual a instância é outlier (%)
+            sample_limit: Número de instâncias mantidas com detalhes completos (amostra)
+            on_outlier: Callback chamado assim que um outlier é encontrado
+        """
+        if group_by not in ('instance_type', 'availability_zone') and not group_by.startswith('tag:'):
+            raise ValueError(f"group_by inválido: {group_by}. Use um de {', '.join(self.GROUP_BY_OPTIONS)}")
+        
+        self.metrics = metrics
+        self.group_by = group_by
+        self.outlier_limit = outlier_limit
+        self.high_cpu_threshold = high_cpu_threshold
+        self.low_cpu_threshold = low_cpu_threshold
+        self.sample_limit = sample_limit
+        self.on_outlier = on_outlier
+        
+        self.fleet = {metric: MetricSummary() for metric in metrics}
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.instance_types = set()
+        self.availability_zones = set()
+        self.instances_seen = 0
+        self.errors = 0
+        self.sample: List[Dict[str, Any]] = []
+        self.outlier_counts = {'high_cpu': 0, 'low_cpu': 0}
+        # Heaps limitados: mantêm apenas os N outliers mais extremos de cada tipo
+        self._high_cpu: List[tuple] = []
+        self._low_cpu: List[tuple] = []
+    
+    def _group_key(self, instance: Dict[str, Any]) -> str:
+        if self.group_by.startswith('tag:'):
+            return instance.get('tags', {}).get(self.group_by[4:], '(sem tag)')
+        return instance.get(self.group_by) or 'desconhecido'
+    
+    def add_instance(self, instance: Dict[str, Any], metrics: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """
+        Consome as métricas de uma instância.
+        
+        Args:
+            instance: Dados da instância (instance_id, instance_type, availability_zone, tags)
+            metrics: Estatísticas por métrica ({'average': ..., 'maximum': ...}), None sem dados
+        """
+        self.instances_seen += 1
+        self.instance_types.add(instance.get('instance_type'))
+        self.availability_zones.add(instance.get('availability_zone'))
+        
+        key = self._group_key(instance)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = {
+                'instances': 0,
+                'metrics': {metric: MetricSummary() for metric in self.metrics}
+            }
+        group['instances'] += 1
+        
+        for metric, stats in metrics.items():
+            if not stats or stats.get('average') is None:
+                if stats and 'error' in stats:
+                    self.errors += 1
+                continue
+            average = stats['average']
+            self.fleet[metric].update(average)
+            group['metrics'][metric].update(average)
+        
+        cpu = (metrics.get('CPUUtilization') or {}).get('average')
+        if cpu is not None:
+            self._check_outlier(instance, cpu, key)
+        
+        if len(self.sample) < self.sample_limit:
+            self.sample.append({
+                "instance_id": instance['instance_id'],
+                "instance_type": instance.get('instance_type'),
+                "availability_zone": instance.get('availability_zone'),
+                "metrics": metrics
+            })
+    
+    def _check_outlier(self, instance: Dict[str, Any], cpu: float, group: str) -> None:
+        if cpu > self.high_cpu_threshold:
+            outlier_type, heap, priority = 'high_cpu', self._high_cpu, cpu
+        elif cpu < self.low_cpu_threshold:
+            outlier_type, heap, priority = 'low_cpu', self._low_cpu, -cpu
+        else:
+            return
+        
+        self.outlier_counts[outlier_type] += 1
+        outlier = {
+            "instance_id": instance['instance_id'],
+            "type": outlier_type,
+            "value": cpu,
+            "severity": "HIGH" if outlier_type == 'high_cpu' else "LOW",
+            "group": group
+        }
+        if self.on_outlier:
+            self.on_outlier(outlier)
+        
+        entry = (priority, instance['instance_id'], outlier)
+        if len(heap) < self.outlier_limit:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    
+    def merge(self, other: 'FleetPerformanceAggregator') -> 'FleetPerformanceAggregator':
+        """Incorpora outro agregador (ex: de outro lote ou região) a este."""
+        for metric, summary in other.fleet.items():
+            self.fleet.setdefault(metric, MetricSummary()).merge(summary)
+        for key, other_group in other.groups.items():
+            group = self.groups.setdefault(key, {'instances': 0, 'metrics': {m: MetricSummary() for m in self.metrics}})
+            group['instances'] += other_group['instances']
+            for metric, summary in other_group['metrics'].items():
+                group['metrics'].setdefault(metric, MetricSummary()).merge(summary)
+        self.instance_types |= other.instance_types
+        self.availability_zones |= other.availability_zones
+        self.instances_seen += other.instances_seen
+        self.errors += other.errors
+        self.sample = (self.sample + other.sample)[:self.sample_limit]
+        for outlier_type in self.outlier_counts:
+            self.outlier_counts[outlier_type] += other.outlier_counts[outlier_type]
+        for heap, other_heap in ((self._high_cpu, other._high_cpu), (self._low_cpu, other._low_cpu)):
+            for entry in other_heap:
+                if len(heap) < self.outlier_limit:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+        return self
+    
+    def outliers(self) -> List[Dict[str, Any]]:
+        """Retorna os outliers mantidos, dos mais extremos para os menos extremos."""
+        high = [entry[2] for entry in sorted(self._high_cpu, key=lambda e: e[:2], reverse=True)]
+        low = [entry[2] for entry in sorted(self._low_cpu, key=lambda e: e[:2], reverse=True)]
+        return high + low
+    
+    def group_statistics(self) -> Dict[str, Any]:
+        """Retorna os resumos de cada grupo, ordenados pelo número de instâncias."""
+        ordered = sorted(self.groups.items(), key=lambda item: -item[1]['instances'])
+        return {
+            key: {
+                'instances': group['instances'],
+                **{metric.lower(): summary.to_dict() for metric, summary in group['metrics'].items()}
+            }
+            for key, group in ordered
+        }
+    
+    def memory_footprint(self) -> Dict[str, int]:
+        """Indica o tamanho das estruturas mantidas (cresce com grupos, não com instâncias)."""
+        summaries = len(self.fleet) + sum(len(g['metrics']) for g in self.groups.values())
+        return {
+            'groups': len(self.groups),
+            'summaries': summaries,
+            'outliers_kept': len(self._high_cpu) + len(self._low_cpu),
+            'sampled_instances': len(self.sample)
+        }
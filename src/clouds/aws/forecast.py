@@ -0,0 +1,262 @@
+"""
+Previsão local de custos por serviço.
+
+Complementa CostExplorer.get_cost_forecast (uma chamada paga por previsão, apenas
+para o total da conta): o histórico diário de todos os serviços é obtido em uma
+única consulta e modelos sazonais simples são ajustados a todas as séries de uma
+vez com NumPy.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.clouds.aws.cost_explorer import CostExplorer
+from src.clouds.aws.cost_trends import CostTrendEngine
+
+# Quantis da normal padrão para os níveis de confiança suportados
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.96, 0.99: 2.5758}
+
+# Sazonalidade semanal dos ajustes; o Holt-Winters precisa de duas temporadas de histórico
+SEASON = 7
+
+
+def fit_linear_seasonal(values: np.ndarray, horizon: int,
+                        season: int = 7) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ajusta tendência linear com sazonalidade semanal a todas as séries por mínimos quadrados.
+    
+    Args:
+        values: Matriz (séries × dias) com o histórico
+        horizon: Número de dias a prever
+        season: Comprimento da sazonalidade (7 = semanal)
+    
+    Returns:
+        Tupla (previsão séries × horizon, valores ajustados séries × dias, desvio padrão dos resíduos)
+    """
+    n_series, n_days = values.shape
+    t = np.arange(n_days + horizon, dtype=np.float64)
+    phase = t.astype(int) % season
+    
+    # Matriz de projeto: intercepto, tendência e indicadores sazonais (sem a primeira fase)
+    columns = [np.ones_like(t), t]
+    if n_days >= 2 * season:
+        columns.extend((phase == p).astype(np.float64) for p in range(1, season))
+    design = np.column_stack(columns)
+    
+    # Um único lstsq resolve todas as séries (uma coluna do lado direito por série)
+    coefficients, _, _, _ = np.linalg.lstsq(design[:n_days], values.T, rcond=None)
+    fitted = (design[:n_days] @ coefficients).T
+    forecast = (design[n_days:] @ coefficients).T
+    
+    dof = max(n_days - design.shape[1], 1)
+    sigma = np.sqrt(((values - fitted) ** 2).sum(axis=1) / dof)
+    return forecast, fitted, sigma
+
+
+def fit_holt_winters(values: np.ndarray, horizon: int, season: int = 7,
+                     alpha: float = 0.3, beta: float = 0.05,
+                     gamma: float = 0.2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Ajusta Holt-Winters aditivo a todas as séries simultaneamente.
+    
+    O laço percorre apenas o eixo do tempo; cada passo atualiza nível, tendência e
+    sazonalidade de todas as séries de uma vez.
+    
+    Args:
+        values: Matriz (séries × dias) com o histórico
+        horizon: Número de dias a prever
+        season: Comprimento da sazonalidade
+        alpha: Suavização do nível
+        beta: Suavização da tendência
+        gamma: Suavização da sazonalidade
+    
+    Returns:
+        Tupla (previsão séries × horizon, previsões de um passo séries × dias, desvio padrão dos resíduos)
+    """
+    n_series, n_days = values.shape
+    if n_days < 2 * season:
+        # Histórico curto demais para estimar a sazonalidade
+        return fit_linear_seasonal(values, horizon, season)
+    
+    # Inicialização a partir das duas primeiras temporadas
+    first = values[:, :season].mean(axis=1)
+    second = values[:, season:2 * season].mean(axis=1)
+    level = first.copy()
+    trend = (second - first) / season
+    seasonal = values[:, :season] - first[:, None]
+    
+    fitted = np.empty_like(values)
+    fitted[:, :season] = values[:, :season]
+    for day in range(season, n_days):
+        s = seasonal[:, day % season]
+        fitted[:, day] = level + trend + s
+        observed = values[:, day]
+        previous_level = level
+        level = alpha * (observed - s) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        seasonal[:, day % season] = gamma * (observed - level) + (1 - gamma) * s
+    
+    steps = np.arange(1, horizon + 1, dtype=np.float64)
+    season_index = (n_days + steps.astype(int) - 1) % season
+    forecast = level[:, None] + trend[:, None] * steps + seasonal[:, season_index]
+    
+    residuals = values[:, season:] - fitted[:, season:]
+    sigma = np.sqrt((residuals ** 2).mean(axis=1))
+    return forecast, fitted, sigma
+
+
+class CostForecaster:
+    """
+    Gera previsões de custo por serviço a partir do histórico diário em cache.
+    """
+    
+    METHODS = ('auto', 'holt_winters', 'linear')
+    
+    def __init__(self, cost_explorer: Optional[CostExplorer] = None,
+                 trend_engine: Optional[CostTrendEngine] = None):
+        """
+        Inicializa o gerador de previsões.
+        
+        Args:
+            cost_explorer: Cliente Cost Explorer opcional. Se não fornecido, um novo será criado.
+            trend_engine: Motor de tendências opcional (compartilha o cache de matrizes)
+        """
+        self.cost_explorer = cost_explorer or CostExplorer()
+        self.trend_engine = trend_engine or CostTrendEngine(self.cost_explorer)
+    
+    def forecast_services(self, history_days: int = 90, horizon_days: int = 30,
+                          method: str = 'auto', top_n: int = 10,
+                          confidence: float = 0.8) -> Dict[str, Any]:
+        """
+        Prevê os custos de todos os serviços para os próximos dias.
+        
+        Args:
+            history_days: Dias de histórico usados no ajuste
+            horizon_days: Dias a prever a partir de hoje
+            method: 'holt_winters', 'linear' ou 'auto' (escolhe por série o menor erro no histórico)
+            top_n: Número de serviços detalhados no resultado (por custo previsto)
+            confidence: Nível de confiança dos intervalos (0.8, 0.9, 0.95 ou 0.99)
+        
+        Returns:
+            Dicionário com a previsão total e por serviço, com intervalos
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Método inválido: {method}. Use um de {', '.join(self.METHODS)}")
+        z = Z_SCORES.get(confidence)
+        if z is None:
+            raise ValueError(f"Nível de confiança inválido: {confidence}. Use um de {sorted(Z_SCORES)}")
+        
+        today = datetime.now()
+        start_date = (today - timedelta(days=history_days)).strftime('%Y-%m-%d')
+        end_date = today.strftime('%Y-%m-%d')
+        
+        matrix = self.trend_engine.get_matrix(start_date, end_date, 'DAILY', include_usage_types=False)
+        values = matrix.values
+        
+        forecast_start = today.strftime('%Y-%m-%d')
+        forecast_end = (today + timedelta(days=horizon_days)).strftime('%Y-%m-%d')
+        result = {
+            'method': method,
+            'history': {'start_date': start_date, 'end_date': end_date, 'days': len(matrix.periods)},
+            'forecast_period': {'start_date': forecast_start, 'end_date': forecast_end, 'days': horizon_days},
+            'confidence': confidence,
+            'currency': matrix.unit,
+            'services_total': len(matrix.keys),
+            'total': None,
+            'services': []
+        }
+        
+        if values.size == 0 or values.shape[1] < 2:
+            result['warning'] = 'Histórico diário insuficiente para previsão'
+            return result
+        
+        steps = np.arange(1, horizon_days + 1, dtype=np.float64)
+        
+        if method != 'linear' and values.shape[1] < 2 * SEASON:
+            # fit_holt_winters cairia na tendência linear: a série é rotulada pelo método usado
+            result['note'] = (f"Histórico de {values.shape[1]} dias é curto para Holt-Winters "
+                              f"(mínimo {2 * SEASON}); usada a tendência linear")
+            method = 'linear'
+        
+        if method in ('linear', 'auto'):
+            linear, _, linear_sigma = fit_linear_seasonal(values, horizon_days, SEASON)
+            # Incerteza da previsão cresce com a distância do histórico
+            linear_spread = linear_sigma[:, None] * np.sqrt(1.0 + steps / values.shape[1])
+        if method in ('holt_winters', 'auto'):
+            holt, _, holt_sigma = fit_holt_winters(values, horizon_days, SEASON)
+            holt_spread = holt_sigma[:, None] * np.sqrt(steps)
+        
+        if method == 'linear':
+            forecast, spread = linear, linear_spread
+            chosen = np.full(len(matrix.keys), 'linear', dtype=object)
+        elif method == 'holt_winters':
+            forecast, spread = holt, holt_spread
+            chosen = np.full(len(matrix.keys), 'holt_winters', dtype=object)
+        else:
+            use_holt = holt_sigma < linear_sigma
+            forecast = np.where(use_holt[:, None], holt, linear)
+            spread = np.where(use_holt[:, None], holt_spread, linear_spread)
+            chosen = np.where(use_holt, 'holt_winters', 'linear')
+        
+        # Custos não podem ser negativos
+        forecast = np.clip(forecast, 0.0, None)
+        lower = np.clip(forecast - z * spread, 0.0, None)
+        upper = forecast + z * spread
+        
+        totals = forecast.sum(axis=1)
+        # Intervalo do acumulado assumindo erros diários independentes
+        total_spread = z * np.sqrt((spread ** 2).sum(axis=1))
+        history_daily = values[:, -min(7, values.shape[1]):].mean(axis=1)
+        
+        order = np.argsort(-totals, kind='stable')
+        for row in order[:top_n]:
+            result['services'].append({
+                'service': matrix.keys[row][0],
+                'method': str(chosen[row]),
+                'forecast_total': round(float(totals[row]), 2),
+                'lower_bound': round(float(max(totals[row] - total_spread[row], 0.0)), 2),
+                'upper_bound': round(float(totals[row] + total_spread[row]), 2),
+                'recent_daily_average': round(float(history_daily[row]), 4),
+                'forecast_daily_average': round(float(totals[row] / horizon_days), 4) if horizon_days else 0.0,
+                'daily_lower': round(float(lower[row].mean()), 4),
+                'daily_upper': round(float(upper[row].mean()), 4)
+            })
+        
+        account_total = float(totals.sum())
+        # Serviços tratados como correlacionados no mesmo dia (conservador), dias independentes
+        account_spread = float(z * np.sqrt((spread.sum(axis=0) ** 2).sum()))
+        result['total'] = {
+            'forecast_total': round(account_total, 2),
+            'lower_bound': round(max(account_total - account_spread, 0.0), 2),
+            'upper_bound': round(account_total + account_spread, 2)
+        }
+        return result
+    
+    def compare_with_api(self, local_forecast: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Confronta a previsão local do total com a previsão do Cost Explorer (uma chamada paga).
+        
+        Args:
+            local_forecast: Resultado de forecast_services
+        
+        Returns:
+            Dicionário com as duas previsões e a diferença percentual
+        """
+        period = local_forecast['forecast_period']
+        response = self.cost_explorer.get_cost_forecast(
+            start_date=period['start_date'],
+            end_date=period['end_date'],
+            granularity='MONTHLY'
+        )
+        api_total = float(response.get('Total', {}).get('Amount', '0'))
+        local_total = (local_forecast.get('total') or {}).get('forecast_total', 0.0)
+        periods = response.get('ForecastResultsByTime', [])
+        
+        return {
+            'api_forecast_total': round(api_total, 2),
+            'api_lower_bound': round(sum(float(p.get('PredictionIntervalLowerBound', 0)) for p in periods), 2),
+            'api_upper_bound': round(sum(float(p.get('PredictionIntervalUpperBound', 0)) for p in periods), 2),
+            'local_forecast_total': local_total,
+            'difference_percent': round((local_total - api_total) / api_total * 100, 2) if api_total else None
+        }
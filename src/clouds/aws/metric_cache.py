@@ -0,0 +1,237 @@
+"""
+Cache incremental de métricas CloudWatch por buckets de tempo.
+
+Cada série é identificada por (escopo, namespace, métrica, dimensões, período,
+estatística). Buckets já fechados são guardados permanentemente; a cada consulta
+só são buscados no CloudWatch os buckets que faltam e o bucket ainda aberto, de
+modo que repetir ou deslizar a janela ("CPU das últimas 24h") custa quase nada.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from src.clouds.aws.metric_query import MetricQuery, MetricQueryEngine, MetricSeries
+
+
+class _CachedSeries:
+    """Pontos armazenados de uma série e o intervalo de buckets fechados já coberto."""
+    
+    __slots__ = ('timestamps', 'values', 'covered_from', 'covered_to')
+    
+    def __init__(self):
+        self.timestamps = np.empty(0, dtype=np.float64)
+        self.values = np.empty(0, dtype=np.float64)
+        # Intervalo [covered_from, covered_to) de buckets fechados já consultados
+        self.covered_from = 0.0
+        self.covered_to = 0.0
+    
+    def merge(self, timestamps: np.ndarray, values: np.ndarray, fetched_from: float,
+              fetched_to: float, closed_until: float) -> None:
+        """Incorpora pontos recém-buscados, substituindo os do intervalo consultado."""
+        keep = (self.timestamps < fetched_from) | (self.timestamps >= fetched_to)
+        # Pontos de buckets ainda abertos nunca ficam no cache
+        keep &= self.timestamps < self.covered_to
+        fresh = timestamps < closed_until
+        kept_ts, new_ts = self.timestamps[keep], timestamps[fresh]
+        merged_ts = np.concatenate([kept_ts, new_ts])
+        merged_values = np.concatenate([self.values[keep], values[fresh]])
+        # Caso comum (cauda nova após os pontos existentes) dispensa a ordenação
+        if kept_ts.size and new_ts.size and new_ts[0] < kept_ts[-1]:
+            order = np.argsort(merged_ts, kind='stable')
+            merged_ts, merged_values = merged_ts[order], merged_values[order]
+        self.timestamps = merged_ts
+        self.values = merged_values
+        
+        covered_to = min(fetched_to, closed_until)
+        if self.covered_to <= self.covered_from or fetched_from > self.covered_to or covered_to < self.covered_from:
+            # Sem cobertura anterior ou intervalo desconexo: a cobertura recomeça
+            self.covered_from, self.covered_to = fetched_from, max(covered_to, fetched_from)
+            outside = (self.timestamps >= self.covered_from) & (self.timestamps < self.covered_to)
+            self.timestamps, self.values = self.timestamps[outside], self.values[outside]
+        else:
+            self.covered_from = min(self.covered_from, fetched_from)
+            self.covered_to = max(self.covered_to, covered_to)
+    
+    @property
+    def size(self) -> int:
+        return int(self.timestamps.size)
+
+
+class MetricCache:
+    """
+    Cache LRU de séries CloudWatch, limitado pelo número total de pontos.
+    """
+    
+    # Dados do CloudWatch podem chegar com atraso: um bucket só é considerado
+    # fechado depois desse intervalo além do seu fim
+    SETTLE_SECONDS = 600
+    
+    def __init__(self, max_points: int = 2_000_000, max_series: int = 100_000):
+        """
+        Inicializa o cache.
+        
+        Args:
+            max_points: Máximo de pontos armazenados no total
+            max_series: Máximo de séries armazenadas
+        """
+        self.max_points = max_points
+        self.max_series = max_series
+        self._entries: 'OrderedDict[Tuple[Any, ...], _CachedSeries]' = OrderedDict()
+        self._points = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _epoch(value: datetime) -> float:
+        """Converte datetime (ingênuo = UTC, como no botocore) para epoch."""
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    
+    @staticmethod
+    def _scope(engine: MetricQueryEngine) -> str:
+        """Escopo do cache: a região do cliente CloudWatch."""
+        meta = getattr(engine.client, 'meta', None)
+        return getattr(meta, 'region_name', None) or ''
+    
+    def fetch(self, engine: MetricQueryEngine, queries: List[MetricQuery],
+              start_time: datetime, end_time: datetime) -> List[MetricSeries]:
+        """
+        Retorna as séries do período, buscando no CloudWatch apenas os buckets faltantes.
+        
+        Args:
+            engine: Motor usado para buscar os buckets faltantes
+            queries: Consultas desejadas
+            start_time: Início do período (alinhado para baixo ao período da consulta)
+            end_time: Fim do período
+        
+        Returns:
+            Lista de séries, uma por consulta, na mesma ordem
+        """
+        scope = self._scope(engine)
+        end = self._epoch(end_time)
+        closed_until_now = time.time() - self.SETTLE_SECONDS
+        
+        # Agrupar as consultas pelo intervalo faltante para buscá-las juntas
+        missing: Dict[Tuple[float, float], List[int]] = {}
+        windows = []
+        with self._lock:
+            for index, query in enumerate(queries):
+                period = query.period
+                start = self._epoch(start_time) // period * period
+                closed_until = (min(end, closed_until_now) // period) * period
+                windows.append((start, closed_until))
+                
+                entry = self._entries.get((scope,) + query.key)
+                ranges = self._missing_ranges(entry, start, end)
+                if not ranges:
+                    self.hits += 1
+                elif len(ranges) == 1 and ranges[0][0] > start:
+                    # Apenas a cauda (buckets novos ou ainda abertos) precisou ser buscada
+                    self.partial_hits += 1
+                else:
+                    self.misses += 1
+                for fetch_range in ranges:
+                    missing.setdefault(fetch_range, []).append(index)
+        
+        failed: Dict[int, MetricSeries] = {}
+        fresh: Dict[int, List[MetricSeries]] = {}
+        for (fetch_from, fetch_to), indexes in missing.items():
+            series_list = engine.fetch(
+                [queries[i] for i in indexes],
+                datetime.fromtimestamp(fetch_from, tz=timezone.utc),
+                datetime.fromtimestamp(fetch_to, tz=timezone.utc)
+            )
+            with self._lock:
+                for index, series in zip(indexes, series_list):
+                    if series.error:
+                        failed[index] = series
+                        continue
+                    fresh.setdefault(index, []).append(series)
+                    key = (scope,) + queries[index].key
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        entry = self._entries[key] = _CachedSeries()
+                    self._points -= entry.size
+                    entry.merge(series.timestamps, series.values, fetch_from, fetch_to, windows[index][1])
+                    self._points += entry.size
+                self._evict()
+        
+        results = []
+        with self._lock:
+            for index, query in enumerate(queries):
+                if index in failed:
+                    results.append(failed[index])
+                    continue
+                start, closed_until = windows[index]
+                key = (scope,) + query.key
+                entry = self._entries.get(key)
+                timestamps = np.empty(0, dtype=np.float64)
+                values = np.empty(0, dtype=np.float64)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    in_window = (entry.timestamps >= start) & (entry.timestamps < end)
+                    timestamps, values = entry.timestamps[in_window], entry.values[in_window]
+                
+                # Pontos dos buckets abertos vêm direto da última busca (ou todos os
+                # pontos buscados, se a série já foi despejada pelo limite de tamanho)
+                for series in fresh.get(index, []):
+                    boundary = closed_until if entry is not None else start
+                    open_points = (series.timestamps >= boundary) & (series.timestamps < end)
+                    if open_points.any():
+                        timestamps = np.concatenate([timestamps, series.timestamps[open_points]])
+                        values = np.concatenate([values, series.values[open_points]])
+                
+                results.append(MetricSeries(query, timestamps, values))
+        return results
+    
+    @staticmethod
+    def _missing_ranges(entry: Optional[_CachedSeries], start: float,
+                        end: float) -> List[Tuple[float, float]]:
+        """Calcula os intervalos que precisam ser buscados no CloudWatch."""
+        if entry is None or entry.covered_to <= entry.covered_from \
+                or start > entry.covered_to or end < entry.covered_from:
+            return [(start, end)]
+        
+        ranges = []
+        if start < entry.covered_from:
+            ranges.append((start, entry.covered_from))
+        if end > entry.covered_to:
+            # Cauda: buckets ainda não cobertos, incluindo o bucket aberto
+            ranges.append((entry.covered_to, end))
+        return ranges
+    
+    def _evict(self) -> None:
+        """Remove as séries menos usadas até respeitar os limites (com o lock adquirido)."""
+        while self._entries and (self._points > self.max_points or len(self._entries) > self.max_series):
+            _, entry = self._entries.popitem(last=False)
+            self._points -= entry.size
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache."""
+        with self._lock:
+            lookups = self.hits + self.partial_hits + self.misses
+            return {
+                'series': len(self._entries),
+                'points': self._points,
+                'hits': self.hits,
+                'partial_hits': self.partial_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.partial_hits) / lookups, 4) if lookups else 0.0
+            }
+    
+    def clear(self) -> None:
+        """Remove todas as séries do cache."""
+        with self._lock:
+            self._entries.clear()
+            self._points = 0
+
+
+# Instância compartilhada pelas ferramentas CloudWatch do processo
+metric_cache = MetricCache()
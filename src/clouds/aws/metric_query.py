@@ -0,0 +1,419 @@
+"""
+Motor de consultas CloudWatch baseado em GetMetricData.
+
+Agrupa até 500 consultas de métricas por requisição, pagina os resultados e executa
+os lotes em paralelo. Cada consulta é devolvida como uma série NumPy, permitindo
+analisar frotas com milhares de instâncias em poucas requisições.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+import numpy as np
+
+
+class MetricQuery:
+    """
+    Consulta de uma estatística de uma métrica CloudWatch.
+    """
+    
+    def __init__(self, metric_name: str, dimensions: Optional[Dict[str, str]] = None,
+                 stat: str = 'Average', period: int = 3600, namespace: str = 'AWS/EC2',
+                 label: Optional[str] = None):
+        """
+        Inicializa a consulta.
+        
+        Args:
+            metric_name: Nome da métrica (ex: 'CPUUtilization')
+            dimensions: Dimensões da métrica (ex: {'InstanceId': 'i-123'})
+            stat: Estatística ('Average'|'Maximum'|'Minimum'|'Sum'|'SampleCount'|'pNN')
+            period: Período de agregação em segundos
+            namespace: Namespace da métrica
+            label: Rótulo opcional para identificar a série no resultado
+        """
+        self.metric_name = metric_name
+        self.dimensions = dimensions or {}
+        self.stat = stat
+        self.period = period
+        self.namespace = namespace
+        self.label = label
+    
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """Chave que identifica unicamente a consulta."""
+        return (self.namespace, self.metric_name, tuple(sorted(self.dimensions.items())),
+                self.period, self.stat)
+    
+    def to_request(self, query_id: str) -> Dict[str, Any]:
+        """
+        Converte a consulta para o formato MetricDataQueries do GetMetricData.
+        
+        Args:
+            query_id: Identificador da consulta dentro da requisição
+        
+        Returns:
+            Dicionário da consulta
+        """
+        return {
+            'Id': query_id,
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': self.namespace,
+                    'MetricName': self.metric_name,
+                    'Dimensions': [{'Name': name, 'Value': value} for name, value in self.dimensions.items()]
+                },
+                'Period': self.period,
+                'Stat': self.stat
+            },
+            'ReturnData': True
+        }
+
+
+class MetricInsightsQuery:
+    """
+    Consulta CloudWatch Metrics Insights (SELECT ... GROUP BY ... ORDER BY ... LIMIT N).
+    
+    Uma única consulta retorna até 500 séries (uma por grupo), ordenadas no servidor.
+    """
+    
+    # Metrics Insights consulta no máximo as duas últimas semanas de dados
+    MAX_WINDOW_DAYS = 14
+    
+    def __init__(self, expression: str, period: int = 3600, label: Optional[str] = None):
+        """
+        Inicializa a consulta.
+        
+        Args:
+            expression: Consulta SQL do Metrics Insights
+            period: Período de agregação em segundos
+            label: Rótulo opcional da consulta
+        """
+        self.expression = expression
+        self.period = period
+        self.label = label
+    
+    @classmethod
+    def top_n(cls, metric_name: str, group_by: str = 'InstanceId', namespace: str = 'AWS/EC2',
+              aggregate: str = 'SUM', limit: int = 20, period: int = 3600,
+              descending: bool = True) -> 'MetricInsightsQuery':
+        """
+        Monta uma consulta "top N" de uma métrica agrupada por uma dimensão.
+        
+        Args:
+            metric_name: Métrica a agregar (ex: 'NetworkOut')
+            group_by: Dimensão de agrupamento (ex: 'InstanceId')
+            namespace: Namespace da métrica
+            aggregate: Função de agregação (SUM|AVG|MAX|MIN|COUNT)
+            limit: Número de grupos retornados (máximo 500)
+            period: Período de agregação em segundos
+            descending: Ordenação decrescente (maiores primeiro)
+        
+        Returns:
+            Consulta Metrics Insights
+        """
+        limit = max(1, min(limit, 500))
+        order = 'DESC' if descending else 'ASC'
+        expression = (
+            f'SELECT {aggregate}({metric_name}) FROM SCHEMA("{namespace}", {group_by}) '
+            f'GROUP BY {group_by} ORDER BY {aggregate}() {order} LIMIT {limit}'
+        )
+        return cls(expression, period=period, label=metric_name)
+    
+    def to_request(self, query_id: str) -> Dict[str, Any]:
+        """
+        Converte a consulta para o formato MetricDataQueries do GetMetricData.
+        
+        Args:
+            query_id: Identificador da consulta dentro da requisição
+        
+        Returns:
+            Dicionário da consulta
+        """
+        return {
+            'Id': query_id,
+            'Expression': self.expression,
+            'Period': self.period,
+            'ReturnData': True
+        }
+
+
+# Períodos aceitos pelo CloudWatch, do mais fino ao mais grosso
+STANDARD_PERIODS = (60, 300, 900, 3600, 21600, 86400)
+
+
+def choose_period(start_time: datetime, end_time: datetime, max_datapoints: int = 200,
+                  min_period: int = 300) -> int:
+    """
+    Escolhe o menor período padrão que mantém a série com no máximo max_datapoints pontos.
+    
+    Também respeita a retenção do CloudWatch: dados com mais de 15 dias só existem
+    com resolução de 5 minutos e, com mais de 63 dias, de 1 hora.
+    
+    Args:
+        start_time: Início da janela
+        end_time: Fim da janela
+        max_datapoints: Máximo de pontos desejado por série
+        min_period: Período mínimo (300 = monitoramento básico do EC2)
+    
+    Returns:
+        Período em segundos
+    """
+    window = max((end_time - start_time).total_seconds(), 1)
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    age_days = (datetime.now(timezone.utc) - start_time).total_seconds() / 86400
+    
+    if age_days > 63:
+        min_period = max(min_period, 3600)
+    elif age_days > 15:
+        min_period = max(min_period, 300)
+    
+    for period in STANDARD_PERIODS:
+        if period >= min_period and window / period <= max_datapoints:
+            return period
+    # Janelas muito longas: múltiplo de 1 dia
+    days = int(np.ceil(window / 86400 / max_datapoints))
+    return 86400 * max(days, 1)
+
+
+class MetricSeries:
+    """
+    Série temporal retornada pelo GetMetricData, armazenada em arrays NumPy.
+    """
+    
+    def __init__(self, query: MetricQuery, timestamps: np.ndarray, values: np.ndarray,
+                 status: str = 'Complete', error: Optional[str] = None,
+                 label: Optional[str] = None):
+        """
+        Inicializa a série.
+        
+        Args:
+            query: Consulta que originou a série
+            timestamps: Timestamps (epoch em segundos, float64) em ordem crescente
+            values: Valores correspondentes (float64)
+            status: StatusCode retornado pelo CloudWatch
+            error: Mensagem de erro, se a consulta falhou
+            label: Rótulo da série (em consultas Metrics Insights, o valor do GROUP BY)
+        """
+        self.query = query
+        self.timestamps = timestamps
+        self.values = values
+        self.status = status
+        self.error = error
+        self.label = label if label is not None else getattr(query, 'label', None)
+    
+    def __len__(self) -> int:
+        return int(self.values.size)
+    
+    @property
+    def empty(self) -> bool:
+        """Indica se a série não possui pontos."""
+        return self.values.size == 0
+    
+    def mean(self) -> Optional[float]:
+        return float(self.values.mean()) if self.values.size else None
+    
+    def max(self) -> Optional[float]:
+        return float(self.values.max()) if self.values.size else None
+    
+    def min(self) -> Optional[float]:
+        return float(self.values.min()) if self.values.size else None
+    
+    def sum(self) -> Optional[float]:
+        return float(self.values.sum()) if self.values.size else None
+    
+    def median(self) -> Optional[float]:
+        return float(np.median(self.values)) if self.values.size else None
+    
+    def datetimes(self) -> List[datetime]:
+        """Retorna os timestamps como datetimes UTC."""
+        return [datetime.fromtimestamp(ts, tz=timezone.utc) for ts in self.timestamps]
+
+
+class MetricQueryEngine:
+    """
+    Executa lotes de consultas CloudWatch via GetMetricData.
+    """
+    
+    # Limite da API por requisição
+    MAX_QUERIES_PER_REQUEST = 500
+    
+    def __init__(self, cloudwatch_client, max_workers: int = 4):
+        """
+        Inicializa o motor de consultas.
+        
+        Args:
+            cloudwatch_client: Cliente boto3 do CloudWatch (thread-safe)
+            max_workers: Número máximo de requisições simultâneas
+        """
+        self.client = cloudwatch_client
+        self.max_workers = max(1, max_workers)
+        self.requests_made = 0
+        self._counter_lock = threading.Lock()
+    
+    def fetch(self, queries: List[MetricQuery], start_time: datetime,
+              end_time: datetime) -> List[MetricSeries]:
+        """
+        Executa todas as consultas e retorna as séries na mesma ordem.
+        
+        Args:
+            queries: Consultas a executar
+            start_time: Início do período
+            end_time: Fim do período
+        
+        Returns:
+            Lista de séries, uma por consulta
+        """
+        results: List[Optional[MetricSeries]] = [None] * len(queries)
+        for offset, batch in self.iter_batches(queries, start_time, end_time):
+            results[offset:offset + len(batch)] = batch
+        return results
+    
+    def iter_batches(self, queries: List[MetricQuery], start_time: datetime,
+                     end_time: datetime) -> Iterator[Tuple[int, List[MetricSeries]]]:
+        """
+        Executa as consultas em lotes paralelos e entrega cada lote assim que fica pronto.
+        
+        Args:
+            queries: Consultas a executar
+            start_time: Início do período
+            end_time: Fim do período
+        
+        Yields:
+            Tuplas (posição do primeiro item do lote em queries, séries do lote)
+        """
+        batches = [
+            (offset, queries[offset:offset + self.MAX_QUERIES_PER_REQUEST])
+            for offset in range(0, len(queries), self.MAX_QUERIES_PER_REQUEST)
+        ]
+        if not batches:
+            return
+        
+        if len(batches) == 1 or self.max_workers == 1:
+            for offset, batch in batches:
+                yield offset, self._run_batch(batch, start_time, end_time)
+            return
+        
+        # Cada lote roda com uma cópia do contexto: as chamadas continuam atribuídas
+        # à ferramenta que as causou (aws_call_scope)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._run_batch, batch, start_time, end_time): offset
+                for offset, batch in batches
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def fetch_insights(self, query: MetricInsightsQuery, start_time: datetime,
+                       end_time: datetime) -> List[MetricSeries]:
+        """
+        Executa uma consulta Metrics Insights e retorna uma série por grupo.
+        
+        Args:
+            query: Consulta Metrics Insights
+            start_time: Início do período
+            end_time: Fim do período
+        
+        Returns:
+            Séries na ordem retornada pelo CloudWatch (a do ORDER BY), com o
+            valor do grupo em label
+        """
+        request = {
+            'MetricDataQueries': [query.to_request('insights')],
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampAscending'
+        }
+        
+        groups: Dict[str, Tuple[List[float], List[float]]] = {}
+        errors: List[str] = []
+        while True:
+            response = self.client.get_metric_data(**request)
+            with self._counter_lock:
+                self.requests_made += 1
+            
+            for result in response.get('MetricDataResults', []):
+                label = result.get('Label', '')
+                timestamps, values = groups.setdefault(label, ([], []))
+                timestamps.extend(ts.timestamp() for ts in result.get('Timestamps', []))
+                values.extend(result.get('Values', []))
+            for message in response.get('Messages') or []:
+                errors.append(message.get('Value', ''))
+            
+            next_token = response.get('NextToken')
+            if not next_token:
+                break
+            request['NextToken'] = next_token
+        
+        error = '; '.join(errors) if errors else None
+        return [
+            MetricSeries(query, np.asarray(timestamps, dtype=np.float64), np.asarray(values, dtype=np.float64),
+                         error=error, label=label)
+            for label, (timestamps, values) in groups.items()
+        ]
+    
+    def _run_batch(self, batch: List[MetricQuery], start_time: datetime,
+                   end_time: datetime) -> List[MetricSeries]:
+        """
+        Executa um lote (até 500 consultas), seguindo a paginação por NextToken.
+        
+        Args:
+            batch: Consultas do lote
+            start_time: Início do período
+            end_time: Fim do período
+        
+        Returns:
+            Séries do lote, na mesma ordem das consultas
+        """
+        request = {
+            'MetricDataQueries': [query.to_request(f"q{i}") for i, query in enumerate(batch)],
+            'StartTime': start_time,
+            'EndTime': end_time,
+            'ScanBy': 'TimestampAscending'
+        }
+        
+        timestamps: Dict[str, List[float]] = {f"q{i}": [] for i in range(len(batch))}
+        values: Dict[str, List[float]] = {f"q{i}": [] for i in range(len(batch))}
+        status: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        
+        while True:
+            try:
+                response = self.client.get_metric_data(**request)
+            except Exception as e:
+                # Falha do lote inteiro: cada série carrega o erro
+                return [
+                    MetricSeries(query, np.empty(0), np.empty(0), status='Error', error=str(e))
+                    for query in batch
+                ]
+            with self._counter_lock:
+                self.requests_made += 1
+            
+            for result in response.get('MetricDataResults', []):
+                query_id = result.get('Id')
+                if query_id not in values:
+                    continue
+                timestamps[query_id].extend(ts.timestamp() for ts in result.get('Timestamps', []))
+                values[query_id].extend(result.get('Values', []))
+                status[query_id] = result.get('StatusCode', 'Complete')
+                messages = result.get('Messages') or []
+                if messages:
+                    errors[query_id] = '; '.join(m.get('Value', '') for m in messages)
+            
+            next_token = response.get('NextToken')
+            if not next_token:
+                break
+            request['NextToken'] = next_token
+        
+        series = []
+        for i, query in enumerate(batch):
+            query_id = f"q{i}"
+            ts = np.asarray(timestamps[query_id], dtype=np.float64)
+            vals = np.asarray(values[query_id], dtype=np.float64)
+            if ts.size > 1 and np.any(np.diff(ts) < 0):
+                order = np.argsort(ts, kind='stable')
+                ts, vals = ts[order], vals[order]
+            series.append(MetricSeries(query, ts, vals, status.get(query_id, 'Complete'), errors.get(query_id)))
+        return series
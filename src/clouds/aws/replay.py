@@ -0,0 +1,377 @@
+"""
+Gravação e reprodução de chamadas à AWS (execução offline).
+
+Com CLOUD_INSIGHTS_AWS_MODE=record, cada chamada feita pelas sessões do
+AWSClient é gravada como fixture (parâmetros → resposta). Com
+CLOUD_INSIGHTS_AWS_MODE=replay, as mesmas chamadas são respondidas a partir das
+fixtures, sem rede e sem credenciais: ferramentas, agente e servidor MCP rodam
+offline, o que permite benchmarks e medições de regressão reproduzíveis. Com
+CLOUD_INSIGHTS_AWS_MODE=fake, as respostas vêm de um backend em processo com uma
+conta sintética (src/clouds/aws/fake_backend.py), de qualquer tamanho.
+
+Funciona com os eventos do botocore (o mesmo mecanismo do botocore.stub.Stubber):
+- before-parameter-build: calcula a chave da chamada (serviço, operação, região
+  e parâmetros canônicos);
+- before-call: no replay (ou no fake), devolve a resposta gravada (ou simulada)
+  e a requisição HTTP não é feita (nem assinada);
+- after-call: na gravação, guarda a resposta já interpretada pelo botocore.
+
+As fixtures ficam em <diretório>/<serviço>/<Operação>.jsonl. Parâmetros que
+mudam a cada dia (períodos e horários) entram na chave exata como gravados; se
+ela não existir, o replay procura a mesma janela relativa: as datas viram a
+distância até o momento da gravação (dias para datas, minutos para horários),
+então "últimos 30 dias" gravado ontem responde "últimos 30 dias" hoje, e janelas
+diferentes nunca se confundem. Sem essa correspondência, FixtureNotFoundError.
+"""
+
+import base64
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from botocore.awsrequest import AWSResponse
+
+MODES = ('live', 'record', 'replay', 'fake')
+
+# Parâmetros relativos à data atual: comparados pela distância até a gravação na busca aproximada
+VOLATILE_PARAMS = {'TimePeriod', 'StartTime', 'EndTime', 'StartDate', 'EndDate', 'Start', 'End'}
+
+
+class FixtureNotFoundError(LookupError):
+    """Chamada sem fixture gravada no modo replay."""
+
+
+def _encode(value: Any) -> Any:
+    """Converte a resposta em JSON preservando tipos que o json não representa."""
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {'$bytes': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    raise TypeError(f"tipo não gravável: {type(value).__name__}")
+
+
+def _decode(value: Any) -> Any:
+    """Inverso de _encode()."""
+    if isinstance(value, dict):
+        if len(value) == 1 and '$datetime' in value:
+            return datetime.fromisoformat(value['$datetime'])
+        if len(value) == 1 and '$bytes' in value:
+            return base64.b64decode(value['$bytes'])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _digest(data: Any) -> str:
+    canonical = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:20]
+
+
+def _relative_params(value: Any, reference: datetime, volatile: bool = False) -> Any:
+    """
+    Troca as datas de VOLATILE_PARAMS pela distância até `reference`: dias para
+    datas ('2026-10-01'), minutos para horários (datetime ou ISO, ingênuo = local).
+    """
+    if isinstance(value, dict):
+        return {key: _relative_params(item, reference, volatile or key in VOLATILE_PARAMS)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_relative_params(item, reference, volatile) for item in value]
+    if not volatile or not isinstance(value, (str, datetime)):
+        return value
+    if isinstance(value, str):
+        try:
+            if len(value) == 10:
+                days = (datetime.strptime(value, '%Y-%m-%d').date() - reference.date()).days
+                return {'$days': days}
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+    return {'$minutes': round((value.timestamp() - reference.timestamp()) / 60)}
+
+
+def _parse_latency(value: Optional[str]) -> Optional[float]:
+    """'recorded' (ou vazio) usa a duração gravada (zero no fake); um número é a latência fixa em ms."""
+    value = (value or '').strip().lower()
+    if value in ('', 'recorded'):
+        return None
+    return max(float(value), 0.0) / 1000
+
+
+class AWSFixtures:
+    """
+    Modo de acesso à AWS das sessões do projeto: ao vivo, gravando ou reproduzindo.
+    
+    Os hooks são registrados em todas as sessões do AWSClient e consultam o modo a
+    cada chamada, então configure() vale também para sessões já criadas.
+    """
+    
+    def __init__(self, mode: Optional[str] = None, directory: Optional[str] = None,
+                 latency: Optional[str] = None):
+        """
+        Inicializa o modo de acesso.
+        
+        Args:
+            mode: 'live', 'record', 'replay' ou 'fake' (padrão: CLOUD_INSIGHTS_AWS_MODE ou 'live')
+            directory: Diretório das fixtures (padrão: CLOUD_INSIGHTS_AWS_FIXTURES ou ./aws_fixtures)
+            latency: Latência simulada no replay/fake: 'recorded' ou milissegundos
+                (padrão: CLOUD_INSIGHTS_REPLAY_LATENCY ou 'recorded')
+        """
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Any]] = None
+        self.backend: Any = None
+        self.configure(mode or os.environ.get('CLOUD_INSIGHTS_AWS_MODE', 'live'),
+                       directory or os.environ.get('CLOUD_INSIGHTS_AWS_FIXTURES', 'aws_fixtures'),
+                       latency if latency is not None else os.environ.get('CLOUD_INSIGHTS_REPLAY_LATENCY'))
+    
+    def configure(self, mode: str, directory: Optional[str] = None, latency: Optional[str] = None,
+                  backend: Any = None) -> None:
+        """
+        Altera o modo de acesso (ex: benchmarks que alternam entre gravação e replay).
+        
+        Args:
+            mode: 'live', 'record', 'replay' ou 'fake'
+            directory: Diretório das fixtures (mantém o atual se omitido)
+            latency: Latência simulada no replay/fake ('recorded' ou milissegundos)
+            backend: Backend do modo fake (objeto com handle(service, operation, params, region));
+                sem ele, um FakeAWSBackend é criado no primeiro uso a partir de
+                CLOUD_INSIGHTS_FAKE_SCALE, CLOUD_INSIGHTS_FAKE_SEED, CLOUD_INSIGHTS_FAKE_PROFILE
+                e CLOUD_INSIGHTS_FAKE_RATE_LIMIT (ex: 'ce=5')
+        """
+        mode = (mode or 'live').strip().lower()
+        if mode not in MODES:
+            raise ValueError(f"Modo AWS inválido: {mode} (use {', '.join(MODES)})")
+        with self._lock:
+            self.mode = mode
+            if directory:
+                self.directory = os.path.expanduser(directory)
+            self.latency = _parse_latency(latency)
+            if backend is not None:
+                self.backend = backend
+            self._index = None
+            self.recorded = 0
+            self.replayed = 0
+            self.approximate = 0
+            self.misses = 0
+            self.simulated = 0
+    
+    def attach(self, session: Any) -> Any:
+        """
+        Registra os hooks de gravação/replay numa sessão boto3 (uma única vez por sessão).
+        
+        Args:
+            session: boto3.Session
+        
+        Returns:
+            A própria sessão
+        """
+        if getattr(session, '_cloud_insights_fixtures', False):
+            return session
+        events = session.events
+        events.register('before-parameter-build', self._before_parameter_build,
+                        unique_id='cloud-insights-fixtures-key')
+        # Registrado primeiro: responde antes de qualquer outro before-call
+        events.register_first('before-call', self._before_call, unique_id='cloud-insights-fixtures-replay')
+        events.register('after-call', self._after_call, unique_id='cloud-insights-fixtures-record')
+        session._cloud_insights_fixtures = True
+        return session
+    
+    # ----- hooks do botocore -----
+    
+    def _before_parameter_build(self, params: Optional[Dict[str, Any]] = None, model: Any = None,
+                                context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+        if self.mode == 'live' or context is None or model is None:
+            return
+        region = context.get('client_region')
+        params = params or {}
+        call = {
+            'service': model.service_model.service_name,
+            'operation': model.name,
+            'region': region,
+            'params': params,
+            'started': time.perf_counter()
+        }
+        if self.mode != 'fake':
+            # O fake responde pelos próprios parâmetros; chaves só servem às fixtures
+            call.update(key=_digest([region, params]),
+                        relative_key=_digest([region, _relative_params(params, datetime.now())]),
+                        params=copy.deepcopy(params))
+        context['_fixture'] = call
+    
+    def _before_call(self, model: Any = None, context: Optional[Dict[str, Any]] = None,
+                     **kwargs) -> Optional[Tuple[AWSResponse, Dict[str, Any]]]:
+        if self.mode not in ('replay', 'fake') or context is None or '_fixture' not in context:
+            return None
+        call = context['_fixture']
+        if self.mode == 'fake':
+            return self._simulate(call)
+        entry, exact = self._lookup(call)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            raise FixtureNotFoundError(
+                f"Sem fixture para {call['service']}.{call['operation']} ({call['region']}) "
+                f"com os parâmetros {json.dumps(call['params'], default=str)[:300]}; "
+                f"grave com CLOUD_INSIGHTS_AWS_MODE=record em {self.directory}"
+            )
+        with self._lock:
+            self.replayed += 1
+            self.approximate += int(not exact)
+        
+        delay = self.latency if self.latency is not None else entry.get('duration_ms', 0) / 1000
+        if delay:
+            time.sleep(delay)
+        
+        status_code = entry.get('status_code', 200)
+        return AWSResponse(None, status_code, {}, None), _decode(entry['response'])
+    
+    def _after_call(self, http_response: Any = None, parsed: Optional[Dict[str, Any]] = None,
+                    model: Any = None, context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+        if self.mode != 'record' or context is None or '_fixture' not in context:
+            return
+        call = context['_fixture']
+        try:
+            response = _encode({key: value for key, value in (parsed or {}).items() if key != 'ResponseMetadata'})
+        except TypeError as e:
+            # Respostas em streaming (ex: S3 GetObject) não são gravadas
+            print(f"⚠️  Fixture não gravada para {call['service']}.{call['operation']}: {e}")
+            return
+        entry = {
+            'key': call['key'],
+            'region': call['region'],
+            'params': json.loads(json.dumps(call['params'], default=str)),
+            'status_code': getattr(http_response, 'status_code', 200),
+            'duration_ms': round((time.perf_counter() - call['started']) * 1000, 1),
+            'recorded_at': datetime.now().isoformat(),
+            'response': response
+        }
+        path = self._path(call['service'], call['operation'])
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as fixture_file:
+                fixture_file.write(line)
+            self.recorded += 1
+            self._index = None
+    
+    def _simulate(self, call: Dict[str, Any]) -> Tuple[AWSResponse, Dict[str, Any]]:
+        """Modo fake: a resposta (ou o erro) vem do backend sintético."""
+        from src.clouds.aws.fake_backend import FakeAWSError
+        
+        backend = self._fake_backend()
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.simulated += 1
+        try:
+            parsed = backend.handle(call['service'], call['operation'], call['params'], call['region'])
+        except FakeAWSError as e:
+            return AWSResponse(None, e.status_code, {}, None), e.response()
+        return AWSResponse(None, 200, {}, None), parsed
+    
+    def _fake_backend(self) -> Any:
+        with self._lock:
+            if self.backend is None:
+                from src.clouds.aws.fake_backend import FakeAWSBackend, parse_rate_limits
+                from src.clouds.aws.synthetic import SyntheticAccount
+                
+                scale = os.environ.get('CLOUD_INSIGHTS_FAKE_SCALE', 'small')
+                seed = int(os.environ.get('CLOUD_INSIGHTS_FAKE_SEED', '42'))
+                profile = os.environ.get('CLOUD_INSIGHTS_FAKE_PROFILE', 'default')
+                rate_limits = parse_rate_limits(os.environ.get('CLOUD_INSIGHTS_FAKE_RATE_LIMIT'))
+                print(f"🧪 Modo fake: gerando conta sintética '{scale}' (perfil {profile}, semente {seed})")
+                if rate_limits:
+                    print(f"🚦 Limites de taxa da AWS simulada: {rate_limits}")
+                self.backend = FakeAWSBackend(SyntheticAccount.generate(scale, seed=seed, profile=profile),
+                                              rate_limits=rate_limits)
+            return self.backend
+    
+    # ----- fixtures -----
+    
+    def _path(self, service: str, operation: str) -> str:
+        return os.path.join(self.directory, service, f"{operation}.jsonl")
+    
+    def _load_index(self) -> Dict[str, Any]:
+        """Lê todas as fixtures do diretório (a última gravação de cada chave prevalece)."""
+        exact: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        relative: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        if os.path.isdir(self.directory):
+            for service in sorted(os.listdir(self.directory)):
+                service_dir = os.path.join(self.directory, service)
+                if not os.path.isdir(service_dir):
+                    continue
+                for filename in sorted(os.listdir(service_dir)):
+                    if not filename.endswith('.jsonl'):
+                        continue
+                    operation = filename[:-len('.jsonl')]
+                    with open(os.path.join(service_dir, filename), encoding='utf-8') as fixture_file:
+                        for line in fixture_file:
+                            if not line.strip():
+                                continue
+                            entry = json.loads(line)
+                            exact[(service, operation, entry['key'])] = entry
+                            recorded_at = datetime.fromisoformat(entry['recorded_at'])
+                            key = _digest([entry['region'], _relative_params(entry['params'], recorded_at)])
+                            relative[(service, operation, key)] = entry
+        return {'exact': exact, 'relative': relative}
+    
+    def _lookup(self, call: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            index = self._index
+        entry = index['exact'].get((call['service'], call['operation'], call['key']))
+        if entry is not None:
+            return entry, True
+        return index['relative'].get((call['service'], call['operation'], call['relative_key'])), False
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o modo atual e a contagem de chamadas gravadas/reproduzidas."""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'directory': self.directory,
+                'latency_ms': None if self.latency is None else self.latency * 1000,
+                'recorded': self.recorded,
+                'replayed': self.replayed,
+                'approximate': self.approximate,
+                'misses': self.misses,
+                'simulated': self.simulated
+            }
+    
+    def fixture_count(self) -> Dict[str, int]:
+        """Número de fixtures gravadas por serviço.operação."""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            counts: Dict[str, int] = {}
+            for service, operation, _ in self._index['exact']:
+                name = f"{service}.{operation}"
+                counts[name] = counts.get(name, 0) + 1
+            return counts
+
+
+# Modo compartilhado por todas as sessões do processo
+aws_fixtures = AWSFixtures()
+
+
+def replay_enabled() -> bool:
+    """Indica se as chamadas à AWS estão sendo respondidas por fixtures."""
+    return aws_fixtures.mode == 'replay'
+
+
+def offline_enabled() -> bool:
+    """Indica se as chamadas à AWS são respondidas sem rede (replay ou fake)."""
+    return aws_fixtures.mode in ('replay', 'fake')
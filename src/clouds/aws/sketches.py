@@ -0,0 +1,209 @@
+"""
+Resumos estatísticos mescláveis e de memória constante.
+
+Usados para agregar métricas de frotas grandes sem guardar todos os valores:
+cada resumo pode ser atualizado em streaming e combinado com outros (por grupo,
+por lote ou por processo).
+"""
+import math
+from typing import Dict, Any, Iterable, Optional
+
+import numpy as np
+
+
+class TDigest:
+    """
+    t-digest (variante "merging") para estimar percentis com memória constante.
+    """
+    
+    def __init__(self, compression: float = 100):
+        """
+        Inicializa o digest.
+        
+        Args:
+            compression: Controla a precisão; o número de centróides fica em torno de compression/2
+        """
+        self.compression = compression
+        self._means = np.empty(0, dtype=np.float64)
+        self._weights = np.empty(0, dtype=np.float64)
+        self._buffer_means = []
+        self._buffer_weights = []
+        self._buffer_limit = int(compression * 5)
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def update(self, value: float, weight: float = 1.0) -> None:
+        """Adiciona um valor ao digest."""
+        if math.isnan(value):
+            return
+        self._buffer_means.append(float(value))
+        self._buffer_weights.append(float(weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer_means) >= self._buffer_limit:
+            self._compress()
+    
+    def update_many(self, values: Iterable[float]) -> None:
+        """Adiciona vários valores de uma vez."""
+        array = np.asarray(values, dtype=np.float64).ravel()
+        array = array[~np.isnan(array)]
+        if array.size == 0:
+            return
+        self._buffer_means.extend(array.tolist())
+        self._buffer_weights.extend([1.0] * array.size)
+        self.count += array.size
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+        if len(self._buffer_means) >= self._buffer_limit:
+            self._compress()
+    
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Incorpora outro digest a este (in-place) e retorna este digest."""
+        other._compress()
+        if other._means.size:
+            self._buffer_means.extend(other._means.tolist())
+            self._buffer_weights.extend(other._weights.tolist())
+            self.count += other.count
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress()
+        return self
+    
+    def _compress(self) -> None:
+        """Funde o buffer aos centróides, respeitando a função de escala k1."""
+        if not self._buffer_means:
+            return
+        means = np.concatenate([self._means, np.asarray(self._buffer_means)])
+        weights = np.concatenate([self._weights, np.asarray(self._buffer_weights)])
+        self._buffer_means = []
+        self._buffer_weights = []
+        
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        
+        # Cada centróide ocupa no máximo uma unidade da escala k1(q) = δ/2π · asin(2q - 1),
+        # o que mantém centróides pequenos nas caudas e grandes no meio da distribuição
+        cumulative = np.cumsum(weights)
+        q_mid = (cumulative - weights / 2.0) / total
+        k = self.compression / (2.0 * math.pi) * np.arcsin(np.clip(2.0 * q_mid - 1.0, -1.0, 1.0))
+        bucket = np.floor(k - k.min()).astype(np.int64)
+        
+        starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        
+        self._means = merged_means
+        self._weights = merged_weights
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estima o quantil q (entre 0 e 1).
+        
+        Returns:
+            Valor estimado, ou None se o digest estiver vazio
+        """
+        self._compress()
+        if self._means.size == 0:
+            return None
+        if self._means.size == 1 or q <= 0:
+            return float(self.min) if q <= 0 else float(self._means[0])
+        if q >= 1:
+            return float(self.max)
+        
+        cumulative = np.cumsum(self._weights)
+        centers = cumulative - self._weights / 2.0
+        target = q * self.count
+        # Interpolação linear entre os centros dos centróides, limitada por min/max
+        xp = np.concatenate([[0.0], centers, [self.count]])
+        fp = np.concatenate([[self.min], self._means, [self.max]])
+        return float(np.interp(target, xp, fp))
+    
+    @property
+    def centroids(self) -> int:
+        """Número atual de centróides (após compressão)."""
+        self._compress()
+        return int(self._means.size)
+
+
+class MetricSummary:
+    """
+    Resumo mesclável de uma métrica: contagem, soma, mínimo, máximo e percentis (t-digest).
+    """
+    
+    DEFAULT_PERCENTILES = (50, 90, 95, 99)
+    
+    def __init__(self, compression: float = 100):
+        """
+        Inicializa o resumo.
+        
+        Args:
+            compression: Compressão do t-digest usado para os percentis
+        """
+        self.digest = TDigest(compression)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def update(self, value: float) -> None:
+        """Adiciona um valor ao resumo."""
+        if value is None or math.isnan(value):
+            return
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.digest.update(value)
+    
+    def update_many(self, values: Iterable[float]) -> None:
+        """Adiciona vários valores ao resumo."""
+        array = np.asarray(values, dtype=np.float64).ravel()
+        array = array[~np.isnan(array)]
+        if array.size == 0:
+            return
+        self.count += int(array.size)
+        self.total += float(array.sum())
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+        self.digest.update_many(array)
+    
+    def merge(self, other: 'MetricSummary') -> 'MetricSummary':
+        """Incorpora outro resumo a este (in-place) e retorna este resumo."""
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.digest.merge(other.digest)
+        return self
+    
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+    
+    def to_dict(self, percentiles: Iterable[int] = DEFAULT_PERCENTILES,
+                digits: int = 2) -> Dict[str, Any]:
+        """
+        Converte o resumo para dicionário serializável.
+        
+        Args:
+            percentiles: Percentis a incluir (0-100)
+            digits: Casas decimais
+        
+        Returns:
+            Dicionário com count, sum, mean, min, max e pNN
+        """
+        if not self.count:
+            return {'count': 0}
+        result = {
+            'count': self.count,
+            'sum': round(self.total, digits),
+            'mean': round(self.mean, digits),
+            'min': round(self.min, digits),
+            'max': round(self.max, digits)
+        }
+        for percentile in percentiles:
+            result[f'p{percentile}'] = round(self.digest.quantile(percentile / 100.0), digits)
+        return result
@@ -0,0 +1,659 @@
+"""
+Contas AWS sintéticas para benchmarks e execução offline.
+
+Uma SyntheticAccount é gerada de forma determinística a partir de uma semente:
+o mesmo tamanho e a mesma semente produzem sempre os mesmos serviços, custos
+diários, tags e recursos EC2/ELB. Os dados ficam em memória no formato que o
+FakeAWSBackend (src/clouds/aws/fake_backend.py) precisa para responder às
+APIs do Cost Explorer, EC2, ELBv2 e CloudWatch:
+
+- custos: matriz linhas de uso (serviço × usage type × região) × dias, com
+  crescimento, sazonalidade semanal e ruído por serviço;
+- tags: valores por chave com participação no custo (distribuição de Zipf);
+- recursos: instâncias, volumes, snapshots, Elastic IPs, load balancers e
+  redes já no formato das respostas do boto3.
+
+O perfil (PROFILES) define o formato da conta, independente do tamanho: mix de
+serviços, curva de crescimento, anomalias de custo, cardinalidade e cobertura
+das tags, frotas de instâncias (grupos de Auto Scaling) e instâncias ociosas.
+As anomalias, frotas e instâncias ociosas geradas ficam registradas na conta
+(gabarito para testar as ferramentas); o perfil 'default' mantém os dados
+originais de cada semente.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+# Tamanhos predefinidos (CLOUD_INSIGHTS_FAKE_SCALE); 'large' é o cenário dos benchmarks
+SCALES: Dict[str, Dict[str, int]] = {
+    'small': {'services': 40, 'months': 3, 'instances': 200, 'snapshots': 500, 'tag_values': 100},
+    'medium': {'services': 150, 'months': 6, 'instances': 2000, 'snapshots': 5000, 'tag_values': 800},
+    'large': {'services': 400, 'months': 13, 'instances': 20000, 'snapshots': 50000, 'tag_values': 5000}
+}
+
+# Parâmetros dos perfis (valores do perfil 'default')
+PROFILE_DEFAULTS: Dict[str, Any] = {
+    'service_mix': {},            # multiplicador do gasto por categoria de serviço
+    'growth': (0.015, 0.03),      # crescimento mensal: média e desvio entre serviços
+    'curve': 'exponential',       # 'exponential', 'linear' ou 'step' (degraus trimestrais)
+    'anomalies': 0,               # picos de custo de 1 a 5 dias
+    'anomaly_factor': (2.0, 6.0), # multiplicador do custo no pico
+    'tag_skew': 1.1,              # expoente de Zipf da participação dos valores de tag
+    'tag_coverage': 1.0,          # multiplicador da fração do custo com cada tag
+    'fleets': 0,                  # grupos de Auto Scaling (instâncias iguais)
+    'fleet_share': 0.3,           # fração das instâncias nas frotas
+    'idle_fraction': 0.0          # fração das instâncias em execução quase sem uso
+}
+
+# Perfis de conta: só os parâmetros que diferem de PROFILE_DEFAULTS
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'default': {},
+    'startup': {
+        'service_mix': {'compute': 2.0, 'database': 1.2, 'analytics': 0.3},
+        'growth': (0.08, 0.04), 'tag_coverage': 0.5, 'fleets': 3, 'idle_fraction': 0.05
+    },
+    'enterprise': {
+        'service_mix': {'database': 1.8, 'storage': 1.3},
+        'growth': (0.005, 0.01), 'curve': 'linear', 'anomalies': 2, 'tag_skew': 0.8,
+        'tag_coverage': 1.25, 'fleets': 20, 'fleet_share': 0.5, 'idle_fraction': 0.25
+    },
+    'data-platform': {
+        'service_mix': {'analytics': 4.0, 'storage': 2.5, 'compute': 0.7},
+        'growth': (0.03, 0.02), 'curve': 'step', 'anomalies': 1, 'fleets': 6
+    },
+    'incident': {'anomalies': 8, 'anomaly_factor': (4.0, 12.0), 'idle_fraction': 0.1}
+}
+
+EC2_COMPUTE = 'Amazon Elastic Compute Cloud - Compute'
+
+# Serviços reais usados primeiro; os demais recebem nomes sintéticos
+KNOWN_SERVICES = [
+    EC2_COMPUTE, 'Amazon Relational Database Service', 'Amazon Simple Storage Service',
+    'EC2 - Other', 'Amazon Elastic Load Balancing', 'Amazon CloudFront', 'AWS Lambda',
+    'Amazon DynamoDB', 'Amazon ElastiCache', 'Amazon Elastic Container Service',
+    'Amazon Elastic Kubernetes Service', 'Amazon Virtual Private Cloud', 'AmazonCloudWatch',
+    'Amazon Route 53', 'Amazon Simple Queue Service', 'Amazon Simple Notification Service',
+    'Amazon OpenSearch Service', 'Amazon Redshift', 'Amazon Kinesis', 'AWS Glue',
+    'Amazon Athena', 'Amazon Elastic File System', 'AWS Key Management Service',
+    'AWS Secrets Manager', 'Amazon API Gateway', 'AWS Step Functions', 'Amazon SageMaker',
+    'AWS Backup', 'Amazon EC2 Container Registry (ECR)', 'AWS WAF', 'Amazon GuardDuty',
+    'AWS Config', 'AWS CloudTrail', 'Amazon Cognito', 'Amazon Simple Email Service',
+    'AWS Systems Manager', 'Amazon MQ', 'Amazon Managed Streaming for Apache Kafka',
+    'AWS Transfer Family', 'Amazon Elastic MapReduce'
+]
+
+# Categoria de cada serviço conhecido (os demais são 'other')
+SERVICE_CATEGORIES = {
+    **dict.fromkeys([EC2_COMPUTE, 'AWS Lambda', 'Amazon Elastic Container Service',
+                     'Amazon Elastic Kubernetes Service'], 'compute'),
+    **dict.fromkeys(['Amazon Relational Database Service', 'Amazon DynamoDB', 'Amazon ElastiCache',
+                     'Amazon OpenSearch Service', 'Amazon MQ'], 'database'),
+    **dict.fromkeys(['Amazon Simple Storage Service', 'EC2 - Other', 'Amazon Elastic File System',
+                     'AWS Backup', 'Amazon EC2 Container Registry (ECR)'], 'storage'),
+    **dict.fromkeys(['Amazon Elastic Load Balancing', 'Amazon CloudFront', 'Amazon Virtual Private Cloud',
+                     'Amazon Route 53', 'Amazon API Gateway', 'AWS Transfer Family'], 'network'),
+    **dict.fromkeys(['Amazon Redshift', 'Amazon Kinesis', 'AWS Glue', 'Amazon Athena', 'Amazon SageMaker',
+                     'Amazon Managed Streaming for Apache Kafka', 'Amazon Elastic MapReduce'], 'analytics')
+}
+
+REGION_CODES = {
+    'us-east-1': 'USE1', 'us-east-2': 'USE2', 'us-west-2': 'USW2', 'sa-east-1': 'SAE1',
+    'eu-west-1': 'EU', 'eu-central-1': 'EUC1', 'ap-southeast-1': 'APS1', 'ap-northeast-1': 'APN1'
+}
+
+INSTANCE_TYPES = ['t3.micro', 't3.small', 't3.medium', 't3.large', 'm5.large', 'm5.xlarge',
+                  'c5.large', 'c5.2xlarge', 'r5.large', 'r5.2xlarge', 'm6g.large', 'c6g.xlarge']
+INSTANCE_TYPE_WEIGHTS = [0.14, 0.14, 0.16, 0.1, 0.12, 0.07, 0.08, 0.04, 0.05, 0.03, 0.04, 0.03]
+
+USAGE_KINDS = ['Requests', 'DataTransfer-Out-Bytes', 'TimedStorage-ByteHrs', 'Usage', 'API-Calls']
+
+# Chaves de tag: (participação no total de valores, cobertura do custo, formato do valor)
+TAG_KEYS = {
+    'Project': (0.55, 0.75, 'project-{:04d}'),
+    'Application': (0.25, 0.6, 'app-{:04d}'),
+    'Owner': (0.1, 0.5, 'owner-{:04d}'),
+    'Team': (0.06, 0.55, 'team-{:03d}'),
+    'CostCenter': (0.04, 0.4, 'cc-{:04d}')
+}
+ENVIRONMENTS = ['production', 'staging', 'development', 'sandbox']
+
+ACCOUNT_ID_BASE = 100000000000
+
+
+def _months_back(day: date, months: int) -> date:
+    """Primeiro dia do mês `months` meses antes do mês de `day`."""
+    index = day.year * 12 + (day.month - 1) - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _zipf_shares(count: int, coverage: float, exponent: float = 1.1) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum() * coverage
+
+
+def _tag_value(resource: Dict[str, Any], key: str) -> Optional[str]:
+    return next((tag['Value'] for tag in resource.get('Tags', []) if tag['Key'] == key), None)
+
+
+def _abbreviation(name: str) -> str:
+    return ''.join(word[0] for word in name.replace('-', ' ').split() if word[0].isalnum()).upper()[:6]
+
+
+class SyntheticAccount:
+    """
+    Conta AWS sintética e determinística (mesma semente, mesmos dados).
+    """
+    
+    def __init__(self, seed: int = 42, services: int = 40, months: int = 3, instances: int = 200,
+                 snapshots: int = 500, tag_values: int = 100, region: str = 'us-east-1',
+                 today: Optional[date] = None, profile: str = 'default',
+                 profile_options: Optional[Dict[str, Any]] = None):
+        """
+        Gera a conta.
+        
+        Args:
+            seed: Semente do gerador
+            services: Número de serviços com custo
+            months: Meses de histórico diário de custos (incluindo o mês atual)
+            instances: Número de instâncias EC2
+            snapshots: Número de snapshots EBS
+            tag_values: Total de valores de tag distintos (somando todas as chaves)
+            region: Região dos recursos EC2/ELB
+            today: Data de referência (padrão: hoje)
+            profile: Perfil da conta (ver PROFILES)
+            profile_options: Parâmetros do perfil a sobrescrever (ver PROFILE_DEFAULTS)
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Perfil inválido: {profile} (use {', '.join(PROFILES)})")
+        unknown = sorted(set(profile_options or {}) - set(PROFILE_DEFAULTS))
+        if unknown:
+            raise ValueError(f"Parâmetros de perfil inválidos: {', '.join(unknown)}")
+        self.profile = profile
+        self.options = {**PROFILE_DEFAULTS, **PROFILES[profile], **(profile_options or {})}
+        self.seed = seed
+        self.region = region
+        self.account_id = str(ACCOUNT_ID_BASE + seed % 900000000000)
+        self.today = today or date.today()
+        self.start = _months_back(self.today, months - 1)
+        self.days = (self.today - self.start).days
+        self.now = datetime.combine(self.today, datetime.min.time(), tzinfo=timezone.utc)
+        self.sizes = {'services': services, 'months': months, 'instances': instances,
+                      'snapshots': snapshots, 'tag_values': tag_values}
+        
+        rng = np.random.default_rng(seed)
+        # Anomalias, frotas e ociosidade usam outro gerador: sem elas, os dados de
+        # cada semente são os mesmos de antes dos perfis
+        extra = np.random.default_rng([seed, 1])
+        self._build_costs(rng, extra, services)
+        self._build_tags(tag_values)
+        self._build_network(rng, instances)
+        self._build_instances(rng, instances)
+        self._build_fleets(extra)
+        self._build_storage(rng, snapshots)
+        self._build_load_balancers(rng)
+    
+    @classmethod
+    def generate(cls, scale: str = 'small', seed: int = 42, profile: str = 'default',
+                 **overrides) -> 'SyntheticAccount':
+        """
+        Gera uma conta a partir de um tamanho e de um perfil predefinidos.
+        
+        Args:
+            scale: 'small', 'medium' ou 'large'
+            seed: Semente do gerador
+            profile: Perfil da conta (ver PROFILES)
+            **overrides: Tamanhos, region/today ou parâmetros do perfil a sobrescrever
+                (ex: instances=5000, anomalies=3)
+        
+        Returns:
+            Conta sintética
+        """
+        if scale not in SCALES:
+            raise ValueError(f"Tamanho inválido: {scale} (use {', '.join(SCALES)})")
+        options = {key: overrides.pop(key) for key in list(overrides) if key in PROFILE_DEFAULTS}
+        return cls(seed=seed, profile=profile, profile_options=options, **dict(SCALES[scale], **overrides))
+    
+    # ----- custos -----
+    
+    def _build_costs(self, rng: np.random.Generator, extra: np.random.Generator, services: int) -> None:
+        names = KNOWN_SERVICES[:services] + [
+            f"AWS Synthetic Service {i:03d}" for i in range(len(KNOWN_SERVICES), services)
+        ]
+        self.services = names
+        regions = list(REGION_CODES)
+        
+        row_service: List[int] = []
+        dimensions: Dict[str, List[str]] = {key: [] for key in (
+            'SERVICE', 'USAGE_TYPE', 'REGION', 'INSTANCE_TYPE', 'OPERATING_SYSTEM',
+            'PURCHASE_TYPE', 'DATABASE_ENGINE', 'RECORD_TYPE')}
+        seen_usage = set()
+        
+        for index, name in enumerate(names):
+            # A região principal concentra o uso; alguns serviços têm usage types em outras
+            service_regions = [self.region] + list(rng.choice(regions, size=2, replace=False))
+            if name == EC2_COMPUTE:
+                kinds = [(f"BoxUsage:{instance_type}", instance_type) for instance_type in INSTANCE_TYPES]
+            else:
+                kinds = [(kind, 'NoInstanceType') for kind in rng.choice(USAGE_KINDS, size=3, replace=False)]
+            abbreviation = _abbreviation(name) or 'SVC'
+            for position, (kind, instance_type) in enumerate(kinds):
+                region = service_regions[0] if position < 2 else service_regions[position % 3]
+                usage_type = f"{REGION_CODES[region]}-{abbreviation}-{kind}"
+                if usage_type in seen_usage:
+                    usage_type = f"{REGION_CODES[region]}-{abbreviation}{index}-{kind}"
+                seen_usage.add(usage_type)
+                row_service.append(index)
+                dimensions['SERVICE'].append(name)
+                dimensions['USAGE_TYPE'].append(usage_type)
+                dimensions['REGION'].append(region)
+                dimensions['INSTANCE_TYPE'].append(instance_type)
+                dimensions['OPERATING_SYSTEM'].append(
+                    ('Windows' if position % 5 == 4 else 'Linux') if name == EC2_COMPUTE else 'NoOperatingSystem')
+                dimensions['PURCHASE_TYPE'].append(
+                    ('Savings Plans' if position % 4 == 3 else 'On Demand Instances')
+                    if name == EC2_COMPUTE else 'On Demand Instances')
+                dimensions['DATABASE_ENGINE'].append(
+                    ('PostgreSQL' if position % 2 else 'MySQL')
+                    if name == 'Amazon Relational Database Service' else 'NoDatabaseEngine')
+                dimensions['RECORD_TYPE'].append('Usage')
+        
+        self.row_service = np.asarray(row_service)
+        self.row_dimensions = {key: np.asarray(values, dtype=object) for key, values in dimensions.items()}
+        rows = len(row_service)
+        
+        # Gasto diário por serviço: cauda longa (poucos serviços concentram o custo)
+        base = (rng.pareto(1.2, services) + 0.05) * 2.0
+        if EC2_COMPUTE in names:
+            base[names.index(EC2_COMPUTE)] = base.max() * 1.5
+        mix = self.options['service_mix']
+        if mix:
+            base *= np.array([mix.get(SERVICE_CATEGORIES.get(name, 'other'), 1.0) for name in names])
+        growth = rng.normal(*self.options['growth'], services)
+        weekend_dip = rng.uniform(0.0, 0.3, services)
+        launch_day = np.where(rng.random(services) < 0.15, rng.integers(0, max(self.days, 1), services), 0)
+        
+        t = np.arange(self.days)
+        weekdays = np.array([(self.start + timedelta(days=int(d))).weekday() for d in t])
+        weekend = (weekdays >= 5).astype(np.float64)
+        curves = base[:, None] * self._growth_curve(growth, t)
+        curves *= 1.0 - weekend_dip[:, None] * weekend[None, :]
+        curves[t[None, :] < launch_day[:, None]] = 0.0
+        self._build_anomalies(extra, curves, launch_day)
+        
+        # Cada serviço divide o custo entre seus usage types
+        split = np.empty(rows)
+        for index in range(services):
+            members = np.flatnonzero(self.row_service == index)
+            split[members] = rng.dirichlet(np.ones(len(members)))
+        noise = rng.lognormal(0.0, 0.08, size=(rows, self.days))
+        self.costs = curves[self.row_service] * split[:, None] * noise
+        
+        # Somas acumuladas por dia: qualquer período é uma subtração
+        self.cumulative = np.zeros((rows, self.days + 1))
+        np.cumsum(self.costs, axis=1, out=self.cumulative[:, 1:])
+    
+    def _growth_curve(self, growth: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """Fator de crescimento de cada serviço em cada dia (serviços × dias)."""
+        curve = self.options['curve']
+        if curve == 'exponential':
+            return (1.0 + growth[:, None]) ** (t[None, :] / 30.0)
+        if curve == 'linear':
+            return np.maximum(1.0 + growth[:, None] * t[None, :] / 30.0, 0.05)
+        if curve == 'step':
+            # Crescimento acumulado a cada trimestre (ex: migrações em ondas)
+            return (1.0 + growth[:, None]) ** (np.floor(t[None, :] / 91.0) * 3.0)
+        raise ValueError(f"Curva de crescimento inválida: {curve} (use exponential, linear ou step)")
+    
+    def _build_anomalies(self, extra: np.random.Generator, curves: np.ndarray, launch_day: np.ndarray) -> None:
+        """Picos de custo em serviços relevantes, nos últimos 90 dias do histórico."""
+        self.anomalies: List[Dict[str, Any]] = []
+        count = self.options['anomalies']
+        # Um pico por serviço, entre os mais caros com custo desde o início (picos visíveis no total)
+        candidates = np.flatnonzero(launch_day == 0)
+        if not count or not len(candidates) or self.days < 2:
+            return
+        candidates = candidates[np.argsort(-curves[candidates].sum(axis=1))][:max(count * 3, 10)]
+        chosen = extra.choice(candidates, size=min(count, len(candidates)), replace=False)
+        low, high = self.options['anomaly_factor']
+        for service in chosen:
+            duration = int(extra.integers(1, 6))
+            first = int(extra.integers(max(self.days - 90, 0), max(self.days - duration, 1)))
+            last = min(first + duration, self.days)
+            factor = float(extra.uniform(low, high))
+            extra_cost = float(curves[service, first:last].sum()) * (factor - 1.0)
+            curves[service, first:last] *= factor
+            self.anomalies.append({
+                'service': self.services[service],
+                'start': (self.start + timedelta(days=first)).isoformat(),
+                'end': (self.start + timedelta(days=last)).isoformat(),
+                'factor': round(factor, 2),
+                'extra_cost': round(extra_cost, 2)
+            })
+        self.anomalies.sort(key=lambda anomaly: anomaly['start'])
+    
+    def day_index(self, day: date) -> int:
+        """Posição do dia no histórico, limitada ao intervalo [0, days]."""
+        return min(max((day - self.start).days, 0), self.days)
+    
+    def period_costs(self, rows: np.ndarray, periods: List[Any]) -> np.ndarray:
+        """
+        Custo de cada linha selecionada em cada período.
+        
+        Args:
+            rows: Máscara booleana das linhas de uso
+            periods: Lista de (início, fim exclusivo) como date
+        
+        Returns:
+            Matriz linhas selecionadas × períodos
+        """
+        starts = [self.day_index(start) for start, _ in periods]
+        ends = [self.day_index(end) for _, end in periods]
+        selected = self.cumulative[rows]
+        return selected[:, ends] - selected[:, starts]
+    
+    def dimension_values(self, dimension: str) -> List[str]:
+        """Valores existentes de uma dimensão do Cost Explorer."""
+        if dimension == 'LINKED_ACCOUNT':
+            return [self.account_id]
+        values = self.row_dimensions.get(dimension)
+        if values is None:
+            return []
+        return sorted(set(values.tolist()))
+    
+    # ----- tags -----
+    
+    def _build_tags(self, tag_values: int) -> None:
+        remaining = max(tag_values - len(ENVIRONMENTS), len(TAG_KEYS))
+        self.tags: Dict[str, Dict[str, Any]] = {
+            'Environment': {
+                'values': list(ENVIRONMENTS),
+                'shares': np.array([0.55, 0.15, 0.15, 0.05])
+            }
+        }
+        assigned = 0
+        for position, (key, (fraction, coverage, pattern)) in enumerate(TAG_KEYS.items()):
+            # A última chave recebe o restante: o total bate exatamente com tag_values
+            if position == len(TAG_KEYS) - 1:
+                count = max(2, remaining - assigned)
+            else:
+                count = max(2, int(round(remaining * fraction)))
+            assigned += count
+            self.tags[key] = {
+                'values': [pattern.format(i) for i in range(1, count + 1)],
+                'shares': _zipf_shares(count, min(coverage * self.options['tag_coverage'], 0.98),
+                                       self.options['tag_skew'])
+            }
+        for tag in self.tags.values():
+            tag['index'] = {value: position for position, value in enumerate(tag['values'])}
+            tag['untagged'] = max(1.0 - float(tag['shares'].sum()), 0.0)
+    
+    def tag_share(self, key: str, values: List[str]) -> float:
+        """Fração do custo com a tag `key` em um dos valores ('' = sem a tag)."""
+        tag = self.tags.get(key)
+        if tag is None:
+            return 1.0 if '' in values else 0.0
+        share = 0.0
+        for value in set(values):
+            if value == '':
+                share += tag['untagged']
+            elif value in tag['index']:
+                share += float(tag['shares'][tag['index'][value]])
+        return share
+    
+    def _sample_tag(self, rng: np.random.Generator, key: str, size: int) -> np.ndarray:
+        """Sorteia valores de tag para recursos, respeitando cobertura e participação."""
+        tag = self.tags[key]
+        probabilities = np.append(tag['shares'], tag['untagged'])
+        probabilities = probabilities / probabilities.sum()
+        choices = rng.choice(len(probabilities), size=size, p=probabilities)
+        values = np.asarray(tag['values'] + [''], dtype=object)
+        return values[choices]
+    
+    # ----- EC2 -----
+    
+    def _id(self, prefix: str, number: int) -> str:
+        return f"{prefix}-0{self.seed % 0xffff:04x}{number:012x}"
+    
+    def _build_network(self, rng: np.random.Generator, instances: int) -> None:
+        zones = [f"{self.region}{suffix}" for suffix in 'abc']
+        self.vpcs = []
+        self.subnets = []
+        self.security_groups = []
+        for v in range(3 + instances // 5000):
+            vpc_id = self._id('vpc', v)
+            self.vpcs.append({
+                'VpcId': vpc_id, 'CidrBlock': f"10.{v}.0.0/16", 'State': 'available',
+                'IsDefault': v == 0, 'OwnerId': self.account_id,
+                'Tags': [{'Key': 'Name', 'Value': f"vpc-{v}"}]
+            })
+            for s in range(4):
+                self.subnets.append({
+                    'SubnetId': self._id('subnet', v * 16 + s), 'VpcId': vpc_id,
+                    'CidrBlock': f"10.{v}.{s * 16}.0/20", 'AvailabilityZone': zones[s % 3],
+                    'AvailableIpAddressCount': int(rng.integers(100, 4000)), 'State': 'available',
+                    'MapPublicIpOnLaunch': s == 0, 'OwnerId': self.account_id
+                })
+            for g in range(8):
+                self.security_groups.append({
+                    'GroupId': self._id('sg', v * 16 + g), 'GroupName': f"sg-{v}-{g}",
+                    'Description': 'synthetic security group', 'VpcId': vpc_id,
+                    'OwnerId': self.account_id,
+                    'IpPermissions': [{'IpProtocol': 'tcp', 'FromPort': 443, 'ToPort': 443,
+                                       'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}],
+                    'IpPermissionsEgress': [{'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]
+                })
+    
+    def _build_instances(self, rng: np.random.Generator, count: int) -> None:
+        types = rng.choice(INSTANCE_TYPES, size=count, p=INSTANCE_TYPE_WEIGHTS)
+        states = rng.choice(['running', 'stopped', 'terminated'], size=count, p=[0.85, 0.12, 0.03])
+        subnets = rng.integers(0, len(self.subnets), size=count)
+        launch_age = rng.integers(1, 1200, size=count)
+        untagged = rng.random(count) < 0.05
+        sampled = {key: self._sample_tag(rng, key, count) for key in self.tags}
+        # Instâncias lançadas juntas compartilham a reserva
+        reservation_sizes = rng.integers(1, 5, size=count)
+        
+        state_codes = {'running': 16, 'stopped': 80, 'terminated': 48}
+        self.instances: List[Dict[str, Any]] = []
+        self.instance_reservations: List[str] = []
+        reservation, remaining = 0, 0
+        for i in range(count):
+            if remaining == 0:
+                reservation += 1
+                remaining = int(reservation_sizes[reservation % count])
+            remaining -= 1
+            subnet = self.subnets[subnets[i]]
+            application = sampled['Application'][i] or 'srv'
+            tags = [{'Key': 'Name', 'Value': f"{application}-{i:05d}"}]
+            if not untagged[i]:
+                tags += [{'Key': key, 'Value': values[i]} for key, values in sampled.items() if values[i]]
+            instance = {
+                'InstanceId': self._id('i', i),
+                'ImageId': self._id('ami', i % 50),
+                'InstanceType': str(types[i]),
+                'State': {'Code': state_codes[states[i]], 'Name': str(states[i])},
+                'Placement': {'AvailabilityZone': subnet['AvailabilityZone'], 'Tenancy': 'default'},
+                'LaunchTime': self.now - timedelta(days=int(launch_age[i]), minutes=i % 1440),
+                'PrivateIpAddress': f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                'VpcId': subnet['VpcId'],
+                'SubnetId': subnet['SubnetId'],
+                'Monitoring': {'State': 'disabled'},
+                'Architecture': 'arm64' if str(types[i]).startswith(('m6g', 'c6g')) else 'x86_64',
+                'Tags': tags
+            }
+            self.instances.append(instance)
+            self.instance_reservations.append(self._id('r', reservation))
+        self.instance_index = {instance['InstanceId']: i for i, instance in enumerate(self.instances)}
+        
+        # Nível médio de cada métrica por instância (CloudWatch)
+        self.cpu_base = rng.beta(2.0, 5.0, size=count) * 100.0
+        self.network_base = rng.lognormal(11.0, 1.5, size=count)  # bytes/s
+        self.metric_phase = rng.uniform(0.0, 2 * np.pi, size=count)
+        self.reporting = np.array([state == 'running' for state in states])
+    
+    def _build_fleets(self, extra: np.random.Generator) -> None:
+        """
+        Agrupa instâncias em frotas (grupos de Auto Scaling: mesmo tipo e tags, CPU
+        parecida) e deixa uma fração das instâncias em execução quase sem uso.
+        """
+        self.fleets: List[Dict[str, Any]] = []
+        self.idle_instances: List[str] = []
+        count = len(self.instances)
+        fleets = min(self.options['fleets'], count)
+        if fleets:
+            members = extra.choice(count, size=max(int(count * self.options['fleet_share']), fleets), replace=False)
+            for number, group in enumerate(np.array_split(np.sort(members), fleets)):
+                leader = self.instances[int(group[0])]
+                tags = [tag for tag in leader['Tags'] if tag['Key'] != 'Name']
+                # Nome da frota a partir da aplicação da primeira instância ('srv' sem a tag)
+                application = (_tag_value(leader, 'Name') or 'srv').rsplit('-', 1)[0]
+                name = f"asg-{application}-{number:03d}"
+                instance_type = str(extra.choice(INSTANCE_TYPES, p=INSTANCE_TYPE_WEIGHTS))
+                level = self.cpu_base[int(group[0])]
+                for position, index in enumerate(group):
+                    instance = self.instances[int(index)]
+                    instance['InstanceType'] = instance_type
+                    instance['Architecture'] = 'arm64' if instance_type.startswith(('m6g', 'c6g')) else 'x86_64'
+                    instance['Tags'] = [{'Key': 'Name', 'Value': f"{name}-{position:04d}"}, *tags,
+                                        {'Key': 'aws:autoscaling:groupName', 'Value': name}]
+                    self.cpu_base[int(index)] = min(level * extra.normal(1.0, 0.1), 100.0)
+                self.fleets.append({'name': name, 'instance_type': instance_type,
+                                    'instances': [self.instances[int(index)]['InstanceId'] for index in group]})
+        
+        running = np.flatnonzero(self.reporting)
+        idle = int(len(running) * self.options['idle_fraction'])
+        if idle:
+            chosen = np.sort(extra.choice(running, size=idle, replace=False))
+            self.cpu_base[chosen] = extra.uniform(0.3, 3.0, size=idle)
+            self.network_base[chosen] *= 0.01
+            self.idle_instances = [self.instances[int(index)]['InstanceId'] for index in chosen]
+    
+    def _build_storage(self, rng: np.random.Generator, snapshots: int) -> None:
+        sizes = [8, 20, 30, 50, 100, 200, 500]
+        self.volumes: List[Dict[str, Any]] = []
+        for i, instance in enumerate(self.instances):
+            if instance['State']['Name'] == 'terminated':
+                continue
+            self.volumes.append({
+                'VolumeId': self._id('vol', len(self.volumes)),
+                'Size': int(rng.choice(sizes, p=[0.3, 0.25, 0.2, 0.12, 0.08, 0.04, 0.01])),
+                'VolumeType': 'gp3' if i % 3 else 'gp2',
+                'State': 'in-use',
+                'AvailabilityZone': instance['Placement']['AvailabilityZone'],
+                'CreateTime': instance['LaunchTime'],
+                'Encrypted': bool(i % 2),
+                'Attachments': [{'InstanceId': instance['InstanceId'], 'Device': '/dev/xvda',
+                                 'State': 'attached', 'AttachTime': instance['LaunchTime'],
+                                 'DeleteOnTermination': True}],
+                'Tags': [tag for tag in instance['Tags'] if tag['Key'] != 'Name']
+            })
+        # Volumes esquecidos (não anexados)
+        for _ in range(max(1, len(self.instances) // 25)):
+            self.volumes.append({
+                'VolumeId': self._id('vol', len(self.volumes)),
+                'Size': int(rng.choice(sizes)),
+                'VolumeType': str(rng.choice(['gp2', 'gp3', 'io1', 'st1'])),
+                'State': 'available',
+                'AvailabilityZone': f"{self.region}a",
+                'CreateTime': self.now - timedelta(days=int(rng.integers(1, 900))),
+                'Encrypted': False,
+                'Attachments': [],
+                'Tags': []
+            })
+        
+        volume_choices = rng.integers(0, len(self.volumes), size=snapshots)
+        ages = rng.integers(0, 1100, size=snapshots)
+        self.snapshots: List[Dict[str, Any]] = []
+        for i in range(snapshots):
+            volume = self.volumes[volume_choices[i]]
+            self.snapshots.append({
+                'SnapshotId': self._id('snap', i),
+                'VolumeId': volume['VolumeId'],
+                'VolumeSize': volume['Size'],
+                'StartTime': self.now - timedelta(days=int(ages[i]), seconds=i % 86400),
+                'State': 'completed',
+                'Progress': '100%',
+                'OwnerId': self.account_id,
+                'Description': f"Backup of {volume['VolumeId']}",
+                'Encrypted': volume['Encrypted'],
+                'StorageTier': 'standard',
+                'Tags': volume['Tags'][:2]
+            })
+        
+        running = [instance for instance in self.instances if instance['State']['Name'] == 'running']
+        self.addresses: List[Dict[str, Any]] = []
+        for i in range(max(2, len(self.instances) // 40)):
+            address = {
+                'PublicIp': f"54.{200 + i // 65536 % 50}.{i // 256 % 256}.{i % 256}",
+                'AllocationId': self._id('eipalloc', i),
+                'Domain': 'vpc',
+                'Tags': []
+            }
+            if running and i % 5:
+                instance = running[i % len(running)]
+                address.update(AssociationId=self._id('eipassoc', i), InstanceId=instance['InstanceId'],
+                               PrivateIpAddress=instance['PrivateIpAddress'])
+            self.addresses.append(address)
+    
+    # ----- ELBv2 -----
+    
+    def _build_load_balancers(self, rng: np.random.Generator) -> None:
+        running = [instance['InstanceId'] for instance in self.instances if instance['State']['Name'] == 'running']
+        self.load_balancers: List[Dict[str, Any]] = []
+        self.target_groups: List[Dict[str, Any]] = []
+        self.target_health: Dict[str, List[Dict[str, Any]]] = {}
+        for i in range(max(1, len(self.instances) // 100)):
+            kind = 'network' if i % 4 == 3 else 'application'
+            name = f"lb-{i:04d}"
+            arn = (f"arn:aws:elasticloadbalancing:{self.region}:{self.account_id}:loadbalancer/"
+                   f"{'net' if kind == 'network' else 'app'}/{name}/{i:016x}")
+            self.load_balancers.append({
+                'LoadBalancerArn': arn, 'LoadBalancerName': name, 'Type': kind,
+                'Scheme': 'internet-facing', 'State': {'Code': 'active'},
+                'DNSName': f"{name}-{i}.{self.region}.elb.amazonaws.com",
+                'VpcId': self.vpcs[i % len(self.vpcs)]['VpcId'],
+                'CreatedTime': self.now - timedelta(days=30 + i % 700),
+                'AvailabilityZones': [{'ZoneName': f"{self.region}a"}, {'ZoneName': f"{self.region}b"}]
+            })
+            # Cerca de 10% dos load balancers não têm targets saudáveis
+            orphan = i % 10 == 9
+            for g in range(2):
+                tg_arn = (f"arn:aws:elasticloadbalancing:{self.region}:{self.account_id}:"
+                          f"targetgroup/tg-{i:04d}-{g}/{i * 2 + g:016x}")
+                self.target_groups.append({
+                    'TargetGroupArn': tg_arn, 'TargetGroupName': f"tg-{i:04d}-{g}",
+                    'Protocol': 'TCP' if kind == 'network' else 'HTTP', 'Port': 80 + g,
+                    'VpcId': self.load_balancers[-1]['VpcId'], 'TargetType': 'instance',
+                    'LoadBalancerArns': [arn]
+                })
+                targets = [] if orphan or not running else [
+                    running[int(index)] for index in rng.integers(0, len(running), size=int(rng.integers(1, 9)))
+                ]
+                self.target_health[tg_arn] = [
+                    {'Target': {'Id': instance_id, 'Port': 80 + g},
+                     'TargetHealth': {'State': 'healthy' if (k + i) % 7 else 'unhealthy'}}
+                    for k, instance_id in enumerate(targets)
+                ]
+    
+    def summary(self) -> Dict[str, Any]:
+        """Tamanho da conta gerada (para relatórios)."""
+        return {
+            'seed': self.seed,
+            'profile': self.profile,
+            'account_id': self.account_id,
+            'history': {'start': self.start.isoformat(), 'end': self.today.isoformat(), 'days': self.days},
+            'services': len(self.services),
+            'usage_types': len(self.row_service),
+            'tag_values': sum(len(tag['values']) for tag in self.tags.values()),
+            'instances': len(self.instances),
+            'volumes': len(self.volumes),
+            'snapshots': len(self.snapshots),
+            'addresses': len(self.addresses),
+            'load_balancers': len(self.load_balancers),
+            'target_groups': len(self.target_groups),
+            'anomalies': len(self.anomalies),
+            'fleets': len(self.fleets),
+            'idle_instances': len(self.idle_instances)
+        }
@@ -2,7 +2,7 @@
 Utilitários para processamento de dados da AWS.
 """
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import json
 from decimal import Decimal
 
@@ -139,11 +139,36 @@ class AWSUtils:
         return amount >= threshold
 
 
-class DecimalEncoder(json.JSONEncoder):
+def json_default(obj: Any) -> Any:
     """
-    Codificador JSON para tratar objetos Decimal.
+    Converte tipos não suportados pelo json (Decimal, datetime/date, conjuntos e
+    escalares/arrays do numpy) para equivalentes serializáveis.
+    
+    Args:
+        obj: Objeto que o encoder padrão não sabe serializar
+    
+    Returns:
+        Valor serializável
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    # numpy (escalares e arrays) sem importar o pacote aqui
+    if hasattr(obj, 'tolist') and type(obj).__module__ == 'numpy':
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonEncoder(json.JSONEncoder):
+    """
+    Codificador JSON único do projeto: Decimal, datetime/date, conjuntos e tipos numpy.
     """
     def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj) 
\ No newline at end of file
+        return json_default(obj)
+
+
+# Nome antigo mantido para compatibilidade
+DecimalEncoder = JsonEncoder 
\ No newline at end of file
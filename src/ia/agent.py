@@ -1,10 +1,16 @@
 """
 Agente de IA para análise de custos AWS.
+
+Haystack, OpenAI e as ferramentas (boto3, numpy...) são importados apenas quando
+o agente é criado ou uma consulta é executada: --version, --examples e --help
+iniciam sem carregar essas dependências.
 """
 
 import sys
 import os
 import argparse
+import threading
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
 
 # Adicionar o diretório raiz ao path
@@ -13,48 +19,93 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
-from haystack.components.agents import Agent
-from haystack.components.generators.chat import OpenAIChatGenerator
-from haystack.dataclasses import ChatMessage
+if TYPE_CHECKING:
+    from haystack.components.agents import Agent
+    from src.ia.session import AgentSession
+
+# Chamadas de ferramentas do mesmo passo do agente executadas em paralelo (cada uma
+# cria sua própria sessão boto3); o passo leva o tempo da ferramenta mais lenta
+AGENT_TOOL_CONCURRENCY = max(int(os.getenv("CLOUD_INSIGHTS_AGENT_TOOL_CONCURRENCY", "6")), 1)
+
+_cost_analyzer: Optional["Agent"] = None
+_cost_analyzer_lock = threading.Lock()
+
+
+def get_agent() -> "Agent":
+    """
+    Retorna o agente compartilhado, criando-o (e o cliente OpenAI) na primeira chamada.
+    
+    Returns:
+        Agente Haystack configurado com as ferramentas de análise
+    """
+    global _cost_analyzer
+    if _cost_analyzer is None:
+        with _cost_analyzer_lock:
+            if _cost_analyzer is None:
+                from haystack.components.agents import Agent
+                from haystack.components.generators.chat import OpenAIChatGenerator
+                
+                from src.adapters.haystack_tools import HAYSTACK_TOOLS
+                from src.adapters.tool_budget import budget_tools
+                from src.ia.streaming import observe_tools
+                from src.ia.system_prompt import SYSTEM_PROMPT
+                
+                _cost_analyzer = Agent(
+                    chat_generator=OpenAIChatGenerator(model=os.getenv("OPENAI_MODEL"), generation_kwargs={"max_tokens": 10000}),
+                    # Resultados grandes são reduzidos antes de chegar ao modelo; com uma
+                    # ConsoleStream ativa, cada chamada informa início e duração
+                    tools=observe_tools(budget_tools(HAYSTACK_TOOLS)),
+                    system_prompt=SYSTEM_PROMPT,
+                    exit_conditions=["text"],
+                    max_agent_steps=10,
+                    raise_on_tool_invocation_failure=False,
+                    tool_concurrency_limit=AGENT_TOOL_CONCURRENCY
+                )
+    return _cost_analyzer
 
-from src.adapters.haystack_tools import HAYSTACK_TOOLS
-from src.ia.system_prompt import SYSTEM_PROMPT
 
-cost_analyzer = Agent(
-    chat_generator=OpenAIChatGenerator(model=os.getenv("OPENAI_MODEL"), generation_kwargs={"max_tokens": 10000}),
-    tools=HAYSTACK_TOOLS,
-    system_prompt=SYSTEM_PROMPT,
-    exit_conditions=["text"],
-    max_agent_steps=10,
-    raise_on_tool_invocation_failure=False
-)
+def __getattr__(name: str):
+    # Compatibilidade: `cost_analyzer` continua acessível como atributo do módulo
+    if name == "cost_analyzer":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def run_agent_query(query: str):
+def run_agent_query(query: str, session: Optional["AgentSession"] = None, stream: bool = True):
     """
     Executa uma consulta no agente.
     
     Args:
         query: Pergunta do usuário
+        session: Sessão com o contexto das consultas anteriores (padrão: sessão nova,
+            sem histórico)
+        stream: Mostrar as ferramentas chamadas e a resposta conforme são geradas
+            (False: imprime só a resposta completa no final)
         
     Returns:
         Resposta do agente
     """
+    from src.ia.session import AgentSession
+    from src.ia.streaming import ConsoleStream, tool_progress_scope
+    
     try:
-        # Aquecer o agente (inicialização)
-        cost_analyzer.warm_up()
-        
-        # Executar a consulta
-        response = cost_analyzer.run(messages=[ChatMessage.from_user(query)])
-        
-        # Exibir a resposta
-        print("\n" + "=" * 80)
-        print("RESPOSTA DO AGENTE:")
-        print("=" * 80)
+        # A sessão aquece o agente uma única vez e reaproveita o contexto anterior
+        session = session or AgentSession(agent_factory=get_agent)
         
-        print(response["messages"][-1].text)
+        if stream:
+            console = ConsoleStream()
+            console.start()
+            with tool_progress_scope(console):
+                response = session.ask(query, streaming_callback=console.on_chunk)
+            if not console.answer_streamed:
+                # O modelo não transmitiu texto (ex: resposta vinda inteira no fim)
+                _print_answer(response)
+            console.finish()
+            return response
         
-        print("=" * 80)
+        response = session.ask(query)
+        _print_answer(response)
+        return response
         
     except Exception as e:
         print(f"\nErro ao executar o agente: {str(e)}")
@@ -62,8 +113,24 @@ def run_agent_query(query: str):
         traceback.print_exc()
 
 
-def interactive_mode():
-    """Modo interativo para múltiplas consultas."""
+def _print_answer(response) -> None:
+    """Exibe a resposta final completa do agente."""
+    print("\n" + "=" * 80)
+    print("RESPOSTA DO AGENTE:")
+    print("=" * 80)
+    
+    print(response["messages"][-1].text)
+    
+    print("=" * 80)
+
+
+def interactive_mode(stream: bool = True):
+    """
+    Modo interativo para múltiplas consultas.
+    
+    Args:
+        stream: Mostrar ferramentas e resposta conforme são geradas
+    """
     print("🤖 " + "=" * 70)
     print("   Jera Cloud Analyzer - AGENTE DE IA INTERATIVO")
     print("=" * 74)
@@ -73,8 +140,16 @@ def interactive_mode():
     print("   • 'help' - Mostra exemplos de consultas")
     print("   • 'exit' ou 'quit' - Sair do modo interativo")
     print("   • 'clear' - Limpar a tela")
+    print("   • 'reset' - Esquecer o contexto das perguntas anteriores")
     print()
     
+    from src.ia.session import AgentSession
+    
+    # Uma sessão para todas as perguntas: aquecida uma vez (enquanto o usuário digita)
+    # e com o contexto e os resultados de ferramentas das perguntas anteriores
+    session = AgentSession(agent_factory=get_agent)
+    session.start_background_warm_up()
+    
     while True:
         try:
             query = input("🔍 Sua pergunta: ").strip()
@@ -94,8 +169,16 @@ def interactive_mode():
                 show_help_examples()
                 continue
                 
+            elif query.lower() == 'reset':
+                session.reset()
+                print("🧹 Contexto da sessão descartado.\n")
+                continue
+            
             # Executar a consulta
-            run_agent_query(query)
+            run_agent_query(query, session, stream=stream)
+            stats = session.stats()
+            print(f"🧠 Sessão: {stats['turns']} pergunta(s), "
+                  f"{stats['reusable_tool_results']} resultado(s) de ferramentas reaproveitáveis")
             print()
             
         except KeyboardInterrupt:
@@ -192,6 +275,18 @@ Exemplos de uso:
         help="Mostrar exemplos de consultas"
     )
     
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Não transmitir a resposta: mostrar só o resultado completo no final"
+    )
+    
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Executar o comando medindo o tempo de import de cada módulo"
+    )
+    
     parser.add_argument(
         "--version", "-v",
         action="store_true",
@@ -200,11 +295,15 @@ Exemplos de uso:
     
     args = parser.parse_args()
     
+    # Perfil de inicialização: o comando roda de novo num processo filho, medido
+    if args.startup_profile:
+        from src.telemetry.startup import profile_startup
+        sys.exit(profile_startup())
+    
     # Mostrar versão
     if args.version:
         print("🌩️ Jera Cloud Analyzer v2.0.0")
         print("   Agente de IA para análise de custos e performance AWS")
-        print("   Ferramentas disponíveis: 28")
         print("   Suporte: Custos + Performance + Tráfego EC2 + CloudWatch + Serviços")
         return
     
@@ -215,13 +314,13 @@ Exemplos de uso:
     
     # Modo interativo
     if args.interactive:
-        interactive_mode()
+        interactive_mode(stream=not args.no_stream)
         return
     
     # Executar consulta direta
     if args.query:
         print(f"🤖 Processando: \"{args.query}\"")
-        run_agent_query(args.query)
+        run_agent_query(args.query, stream=not args.no_stream)
         return
     
     # Se nenhum argumento foi fornecido, mostrar ajuda
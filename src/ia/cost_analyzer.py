@@ -1,28 +1,18 @@
-import boto3
-import pandas as pd
-from datetime import datetime, timedelta
-from tabulate import tabulate
-import matplotlib.pyplot as plt
-from dotenv import load_dotenv
-import botocore.config
+"""
+Relatórios de custos AWS em texto (script legado, executado diretamente).
 
-import os
-import sys
-import requests
-from rich.console import Console
+pandas, tabulate e requests são importados apenas nos métodos que os usam, para
+que importar este módulo não carregue essas dependências.
+"""
 
 import boto3
-import pandas as pd
 from datetime import datetime, timedelta, timezone
-from tabulate import tabulate
-import matplotlib.pyplot as plt
+import botocore.config
 import os
 import sys
-import requests
-import botocore.config
 import subprocess
 import json
-from io import StringIO
+from rich.console import Console
 
 console = Console()
 class AWSCostAnalyzer:
@@ -209,6 +199,8 @@ class AWSCostAnalyzer:
 
     def _get_exchange_rate(self):
         """Obtém a taxa de câmbio atual USD/BRL"""
+        import requests
+        
         try:
             response = requests.get('https://api.exchangerate-api.com/v4/latest/USD')
             data = response.json()
@@ -223,6 +215,8 @@ class AWSCostAnalyzer:
         return usd_value * self.exchange_rate
 
     def get_cost_by_service(self, start_date, end_date):
+        import pandas as pd
+        
         response = self.client.get_cost_and_usage(
             TimePeriod={
                 'Start': start_date,
@@ -263,6 +257,8 @@ class AWSCostAnalyzer:
 
     def get_cost_by_tag(self, start_date, end_date, tag_key):
         """Obtém custos por tag"""
+        import pandas as pd
+        
         try:
             # Primeiro tenta sem prefixo
             response = self.client.get_cost_and_usage(
@@ -345,6 +341,9 @@ class AWSCostAnalyzer:
         Gera relatório de custos por serviço para um período específico
         start_date e end_date devem estar no formato 'YYYY-MM-DD'
         """
+        import pandas as pd
+        from tabulate import tabulate
+        
         df_services = self.get_cost_by_service(start_date, end_date)
         
         if df_services.empty:
@@ -466,6 +465,8 @@ class AWSCostAnalyzer:
 
     def generate_tag_reports(self, days=30):
         """Gera relatórios de custos por tags"""
+        from tabulate import tabulate
+        
         end_date = datetime.now().strftime('%Y-%m-%d')
         start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
         
@@ -524,6 +525,8 @@ class AWSCostAnalyzer:
             end_date (str): Data final no formato 'YYYY-MM-DD'
             detail_limit (int): Número máximo de itens a serem mostrados no detalhamento
         """
+        import pandas as pd
+        
         try:
             if service_name == 'Amazon Elastic Compute Cloud - Compute':
                 # Detalhes por tipo de instância e região
@@ -647,6 +650,9 @@ class AWSCostAnalyzer:
 
     def generate_top_services_detail_by_date(self, start_date, end_date, top_n=5, detail_limit=5):
         """Gera relatório detalhado dos top serviços para um período específico"""
+        import pandas as pd
+        from tabulate import tabulate
+        
         df_services = self.get_cost_by_service(start_date, end_date)
         
         if df_services.empty:
@@ -742,6 +748,8 @@ class AWSCostAnalyzer:
         Gera relatório de custos por tag para um período específico
         start_date e end_date devem estar no formato 'YYYY-MM-DD'
         """
+        from tabulate import tabulate
+        
         tags = self.get_available_tags()
         
         if not tags:
@@ -831,6 +839,9 @@ class AWSCostAnalyzer:
         :param end_date: Data de fim no formato 'YYYY-MM-DD' (opcional)
         :param days: Número de dias para o relatório se start_date e end_date não forem fornecidos
         """
+        import pandas as pd
+        from tabulate import tabulate
+        
         # Se start_date e end_date não forem fornecidos, usa os últimos 'days' dias
         if not start_date or not end_date:
             end_date = datetime.now().strftime('%Y-%m-%d')
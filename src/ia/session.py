@@ -0,0 +1,254 @@
+"""
+Sessão persistente do agente para consultas encadeadas.
+
+O modo interativo usa uma única AgentSession: o agente é aquecido uma vez e cada
+pergunta recebe o contexto das anteriores, limitado em tamanho:
+- as últimas consultas entram como mensagens (pergunta e resposta final);
+- as mais antigas viram um resumo curto;
+- os resultados de ferramentas ainda válidos (TTL) entram no contexto, para que
+  perguntas de acompanhamento não repitam as mesmas chamadas à AWS;
+- chamadas idênticas que o modelo repita mesmo assim são respondidas pela
+  memoização da sessão (ToolCallMemo), sem nova consulta.
+
+Mensagens de chamada e resultado de ferramentas não são reenviadas como histórico:
+só o resultado, uma vez, no bloco de contexto da sessão.
+"""
+
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from haystack.dataclasses import ChatMessage
+
+from src.adapters.haystack_tools import ToolCallMemo, is_error_result, tool_memo_scope
+
+
+@dataclass
+class _Turn:
+    """Pergunta e resposta final de uma consulta."""
+    
+    query: str
+    answer: str
+    tools: List[str] = field(default_factory=list)
+    at: float = field(default_factory=time.time)
+
+
+@dataclass
+class _ToolResult:
+    """Resultado de uma chamada de ferramenta feita em alguma consulta da sessão."""
+    
+    tool: str
+    arguments: Dict[str, Any]
+    result: str
+    at: float = field(default_factory=time.time)
+
+
+def _age(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    return f"há {minutes} min" if minutes else "há menos de 1 min"
+
+
+class AgentSession:
+    """
+    Conversa com o agente que mantém contexto resumido entre consultas.
+    """
+    
+    def __init__(self, agent_factory: Callable[[], Any], max_recent_turns: int = 3,
+                 max_summary_chars: int = 3000, tool_result_ttl: int = 900,
+                 max_tool_results: int = 12, max_tool_result_chars: int = 4000,
+                 max_tool_context_chars: int = 24000, tool_memo_ttl: int = 300):
+        """
+        Inicializa a sessão.
+        
+        Args:
+            agent_factory: Função que retorna o agente Haystack (ex: src.ia.agent.get_agent)
+            max_recent_turns: Consultas anteriores reenviadas como mensagens completas
+            max_summary_chars: Tamanho máximo do resumo das consultas mais antigas
+            tool_result_ttl: Validade (segundos) dos resultados de ferramentas reaproveitados
+            max_tool_results: Número máximo de resultados de ferramentas no contexto
+            max_tool_result_chars: Tamanho máximo de cada resultado no contexto
+            max_tool_context_chars: Tamanho máximo de todos os resultados no contexto
+            tool_memo_ttl: Validade (segundos) da memoização de chamadas idênticas de ferramentas
+        """
+        self.session_id = uuid.uuid4().hex[:12]
+        self._agent_factory = agent_factory
+        self.max_recent_turns = max_recent_turns
+        self.max_summary_chars = max_summary_chars
+        self.tool_result_ttl = tool_result_ttl
+        self.max_tool_results = max_tool_results
+        self.max_tool_result_chars = max_tool_result_chars
+        self.max_tool_context_chars = max_tool_context_chars
+        
+        self._turns: List[_Turn] = []
+        self._tool_results: Dict[Tuple[str, str], _ToolResult] = {}
+        self.tool_memo = ToolCallMemo(ttl_seconds=tool_memo_ttl)
+        self._warm_lock = threading.Lock()
+        self._warmed_up = False
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+    
+    def warm_up(self) -> None:
+        """Aquece resolver de serviços e agente uma única vez por sessão."""
+        if self._warmed_up:
+            return
+        with self._warm_lock:
+            if self._warmed_up:
+                return
+            from src.ia.warmup import warm_up
+            
+            report = warm_up(include_agent=True, agent_factory=self._agent_factory)
+            # Com erro, a próxima consulta tenta de novo
+            self._warmed_up = not any(isinstance(step, dict) for step in report.values())
+    
+    def start_background_warm_up(self) -> threading.Thread:
+        """Executa warm_up() numa thread daemon; ask() aguarda se ainda estiver em andamento."""
+        thread = threading.Thread(target=self.warm_up, name=f"session-warm-up-{self.session_id}", daemon=True)
+        thread.start()
+        return thread
+    
+    def ask(self, query: str, **run_kwargs: Any) -> Dict[str, Any]:
+        """
+        Executa uma consulta com o contexto da sessão e registra o resultado.
+        
+        Args:
+            query: Pergunta do usuário
+            **run_kwargs: Argumentos repassados ao Agent.run (ex: streaming_callback)
+        
+        Returns:
+            Resposta do Agent.run
+        """
+        self.warm_up()
+        agent = self._agent_factory()
+        with tool_memo_scope(self.tool_memo):
+            response = agent.run(messages=self.build_messages(query), **run_kwargs)
+        self._record(query, response)
+        return response
+    
+    def build_messages(self, query: str) -> List[ChatMessage]:
+        """
+        Monta as mensagens da consulta: contexto da sessão, consultas recentes e a pergunta.
+        
+        Args:
+            query: Pergunta do usuário
+        
+        Returns:
+            Mensagens para o Agent.run (o system prompt do agente é adicionado por ele)
+        """
+        messages: List[ChatMessage] = []
+        context = self._context_block()
+        if context:
+            messages.append(ChatMessage.from_system(context))
+        
+        for turn in self._turns[-self.max_recent_turns:] if self.max_recent_turns else []:
+            messages.append(ChatMessage.from_user(turn.query))
+            messages.append(ChatMessage.from_assistant(turn.answer))
+        
+        messages.append(ChatMessage.from_user(query))
+        return messages
+    
+    def _context_block(self) -> str:
+        """Texto com o resumo das consultas antigas e os resultados de ferramentas válidos."""
+        now = time.time()
+        sections = []
+        
+        older = self._turns[:-self.max_recent_turns] if self.max_recent_turns else list(self._turns)
+        if older:
+            lines = []
+            used = 0
+            # Mais recentes primeiro, até o limite; exibidas em ordem cronológica
+            for turn in reversed(older):
+                line = f"- [{_age(now - turn.at)}] P: {turn.query} → R: {self._shorten(' '.join(turn.answer.split()), 300)}"
+                if used + len(line) > self.max_summary_chars:
+                    break
+                lines.append(line)
+                used += len(line)
+            if lines:
+                sections.append("Resumo das consultas anteriores desta sessão:\n" + "\n".join(reversed(lines)))
+        
+        valid = self.valid_tool_results(now)
+        if valid:
+            blocks = []
+            used = 0
+            for item in valid[:self.max_tool_results]:
+                arguments = json.dumps(item.arguments, ensure_ascii=False, sort_keys=True)
+                block = (f"### {item.tool} {arguments} ({_age(now - item.at)})\n"
+                         f"{self._shorten(item.result, self.max_tool_result_chars)}")
+                if used + len(block) > self.max_tool_context_chars:
+                    break
+                blocks.append(block)
+                used += len(block)
+            sections.append(
+                "Resultados de ferramentas já obtidos nesta sessão. Reutilize-os em vez de chamar a "
+                "mesma ferramenta com os mesmos argumentos; chame de novo apenas para outros "
+                "argumentos, dados mais recentes ou resultados marcados como truncados.\n\n" + "\n\n".join(blocks)
+            )
+        
+        if not sections:
+            return ""
+        return "CONTEXTO DA SESSÃO\n\n" + "\n\n".join(sections)
+    
+    @staticmethod
+    def _shorten(text: str, limit: int) -> str:
+        if len(text) <= limit:
+            return text
+        return text[:limit] + " … [truncado]"
+    
+    def valid_tool_results(self, now: Optional[float] = None) -> List[_ToolResult]:
+        """Resultados de ferramentas dentro do TTL, do mais recente para o mais antigo."""
+        now = now if now is not None else time.time()
+        for key in [key for key, item in self._tool_results.items() if now - item.at > self.tool_result_ttl]:
+            del self._tool_results[key]
+        return sorted(self._tool_results.values(), key=lambda item: item.at, reverse=True)
+    
+    def _record(self, query: str, response: Dict[str, Any]) -> None:
+        """Guarda a resposta final e os resultados de ferramentas da consulta."""
+        tools = []
+        for message in response.get("messages", []):
+            for result in message.tool_call_results:
+                self.tool_calls += 1
+                tools.append(result.origin.tool_name)
+                text = result.result if isinstance(result.result, str) else str(result.result)
+                if result.error or is_error_result(text):
+                    continue
+                arguments = result.origin.arguments or {}
+                key = (result.origin.tool_name, json.dumps(arguments, sort_keys=True, default=str))
+                if key in self._tool_results and text.startswith(('{"_cache":', '[cache:')):
+                    # Veio da memoização: o registro original (e sua idade) já está guardado
+                    continue
+                self._tool_results[key] = _ToolResult(result.origin.tool_name, arguments, text)
+        
+        # Limite de memória: mantém só o que ainda pode entrar no contexto
+        for key, _ in sorted(self._tool_results.items(), key=lambda item: item[1].at)[:-self.max_tool_results or None]:
+            del self._tool_results[key]
+        
+        usage = response.get("token_usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+        self.completion_tokens += usage.get("completion_tokens", 0) or 0
+        
+        last = response.get("last_message") or (response.get("messages") or [None])[-1]
+        answer = last.text if last is not None and last.text else ""
+        self._turns.append(_Turn(query, answer, tools))
+        # Consultas que já não cabem no resumo não precisam ficar em memória
+        del self._turns[:-(self.max_recent_turns + 50)]
+    
+    def reset(self) -> None:
+        """Esquece as consultas e os resultados de ferramentas (o agente continua aquecido)."""
+        self._turns.clear()
+        self._tool_results.clear()
+        self.tool_memo.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas da sessão."""
+        return {
+            'session_id': self.session_id,
+            'turns': len(self._turns),
+            'tool_calls': self.tool_calls,
+            'reusable_tool_results': len(self.valid_tool_results()),
+            'memoized_tool_hits': self.tool_memo.stats()['hits'],
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens
+        }
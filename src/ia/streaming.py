@@ -0,0 +1,177 @@
+"""
+Saída em tempo real do agente no terminal.
+
+Em vez de esperar a execução inteira para imprimir a última mensagem, o
+ConsoleStream mostra:
+- cada ferramenta chamada, quando começa e quanto tempo levou;
+- a resposta final token a token, pelo streaming_callback do gerador de chat.
+
+As durações são medidas nas próprias ferramentas (observe_tools), porque o
+Agent só entrega os resultados de um passo na ordem das chamadas, depois que
+as anteriores terminam. Como na memoização, o observador vale dentro de
+tool_progress_scope() e também nas threads em que o Agent executa as ferramentas.
+"""
+
+import dataclasses
+import functools
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Iterator, Optional, TextIO
+
+from haystack.dataclasses import StreamingChunk
+from haystack.tools import Tool
+
+from src.adapters.haystack_tools import is_error_result
+
+
+def _short_arguments(arguments: Dict[str, Any], limit: int = 80) -> str:
+    text = ", ".join(f"{name}={value!r}" for name, value in arguments.items() if value is not None)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class ConsoleStream:
+    """
+    Imprime o progresso de uma consulta do agente conforme ele acontece.
+    """
+    
+    def __init__(self, out: Optional[TextIO] = None):
+        """
+        Inicializa a saída.
+        
+        Args:
+            out: Destino da saída (padrão: sys.stdout)
+        """
+        self.out = out or sys.stdout
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._answer_line_open = False
+        self.answer_streamed = False
+        self.first_output_seconds: Optional[float] = None
+        self.tools: List[Dict[str, Any]] = []
+    
+    def _write(self, text: str) -> None:
+        if self.first_output_seconds is None:
+            self.first_output_seconds = time.monotonic() - self._started_at
+        self.out.write(text)
+        self.out.flush()
+    
+    def _line(self, text: str) -> None:
+        """Escreve uma linha de status, fechando antes a linha de resposta em andamento."""
+        with self._lock:
+            if self._answer_line_open:
+                self._write("\n")
+                self._answer_line_open = False
+            self._write(text + "\n")
+    
+    def start(self) -> None:
+        """Marca o início da consulta e avisa que o modelo já está trabalhando."""
+        self._started_at = time.monotonic()
+        self._line("⏳ Consultando o modelo...")
+    
+    def tool_started(self, name: str, arguments: Dict[str, Any]) -> None:
+        """Uma ferramenta começou a executar."""
+        self._line(f"🔧 {name}({_short_arguments(arguments)})")
+    
+    def tool_finished(self, name: str, seconds: float, result: Any) -> None:
+        """Uma ferramenta terminou; informa a duração e se veio do cache ou falhou."""
+        text = result if isinstance(result, str) else ""
+        if is_error_result(text):
+            status = "❌"
+        elif text.startswith(('{"_cache":', '[cache:')):
+            status = "⚡ cache,"
+        else:
+            status = "✅"
+        self.tools.append({'tool': name, 'seconds': round(seconds, 2)})
+        self._line(f"   {status} {name} em {seconds:.2f}s")
+    
+    def on_chunk(self, chunk: StreamingChunk) -> None:
+        """
+        streaming_callback do Agent: imprime os tokens de texto do modelo.
+        
+        Chunks de chamadas e resultados de ferramentas são ignorados aqui; o
+        progresso das ferramentas vem de tool_started()/tool_finished(). O
+        cabeçalho da resposta sai uma única vez, no primeiro texto: texto de um
+        passo que ainda chama ferramentas continua no mesmo bloco, intercalado
+        com as linhas das ferramentas.
+        
+        Args:
+            chunk: Pedaço da resposta do gerador de chat
+        """
+        if chunk.tool_calls or chunk.tool_call_result or not chunk.content:
+            return
+        with self._lock:
+            if not self.answer_streamed:
+                self.answer_streamed = True
+                if self._answer_line_open:
+                    self._write("\n")
+                self._write("\n" + "=" * 80 + "\nRESPOSTA DO AGENTE:\n" + "=" * 80 + "\n")
+            self._write(chunk.content)
+            self._answer_line_open = not chunk.content.endswith("\n")
+    
+    def finish(self) -> None:
+        """Fecha a resposta transmitida e mostra o tempo total."""
+        total = time.monotonic() - self._started_at
+        with self._lock:
+            if self.answer_streamed:
+                self._write(("\n" if self._answer_line_open else "") + "=" * 80 + "\n")
+                self._answer_line_open = False
+            tools = f", {len(self.tools)} ferramenta(s)" if self.tools else ""
+            self._write(f"⏱️  {total:.1f}s{tools}\n")
+
+
+_active_stream: ContextVar[Optional[ConsoleStream]] = ContextVar("agent_console_stream", default=None)
+
+
+@contextmanager
+def tool_progress_scope(stream: ConsoleStream) -> Iterator[ConsoleStream]:
+    """
+    Envia o progresso das ferramentas chamadas dentro do bloco para a saída.
+    
+    Args:
+        stream: Saída da consulta
+    """
+    token = _active_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _active_stream.reset(token)
+
+
+def observe_tool(haystack_tool: Tool) -> Tool:
+    """
+    Retorna uma cópia da ferramenta que informa início e duração à saída ativa.
+    
+    Sem tool_progress_scope() ativo, a ferramenta é executada normalmente.
+    
+    Args:
+        haystack_tool: Ferramenta Haystack
+    
+    Returns:
+        Ferramenta observada
+    """
+    function = haystack_tool.function
+    
+    @functools.wraps(function)
+    def observed(**kwargs):
+        stream = _active_stream.get()
+        if stream is None:
+            return function(**kwargs)
+        stream.tool_started(haystack_tool.name, kwargs)
+        started = time.monotonic()
+        result = None
+        try:
+            result = function(**kwargs)
+            return result
+        finally:
+            stream.tool_finished(haystack_tool.name, time.monotonic() - started,
+                                 result if result is not None else "Erro")
+    
+    return dataclasses.replace(haystack_tool, function=observed)
+
+
+def observe_tools(tools: List[Tool]) -> List[Tool]:
+    """Aplica observe_tool() a todas as ferramentas."""
+    return [observe_tool(haystack_tool) for haystack_tool in tools]
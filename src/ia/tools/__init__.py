@@ -12,6 +12,7 @@ from src.ia.tools.aws_data_tools import (
     validate_and_analyze_service,
     analyze_account_coverage,
     get_account_context_data,
+    forecast_service_costs,
     check_account_data_availability,
     aws_ec2_call,
     get_instance_cost_by_name,
@@ -53,6 +54,7 @@ ALL_TOOLS = [
     validate_and_analyze_service,
     analyze_account_coverage,
     get_account_context_data,
+    forecast_service_costs,
     check_account_data_availability,
     aws_ec2_call,
     get_instance_cost_by_name,
@@ -85,6 +87,7 @@ __all__ = [
     'validate_and_analyze_service',
     'analyze_account_coverage',
     'get_account_context_data',
+    'forecast_service_costs',
     'check_account_data_availability',
     'aws_ec2_call',
     'get_instance_cost_by_name',
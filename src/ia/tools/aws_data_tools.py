@@ -2,7 +2,6 @@
 Ferramentas para coleta e análise de dados AWS.
 """
 
-import json
 import sys
 import os
 from datetime import datetime, timedelta
@@ -13,24 +12,15 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from src.clouds.aws.cost_explorer import CostExplorer
 from src.clouds.aws.cost_analyzer import CostAnalyzer
+from src.clouds.aws.forecast import CostForecaster
 from src.ia.tools.utility_tools import validate_and_adjust_date_range
-from src.ia.tools.service_resolver import service_resolver
+from src.ia.tools.service_resolver import get_service_resolver
+from src.ia.tools.response import to_json
+from src.ia.tools.pagination import CursorError, paginate, result_snapshots
 
 
-class JsonEncoder(json.JSONEncoder):
-    """Encoder JSON personalizado para lidar com tipos especiais como Decimal e datetime."""
-    def default(self, obj):
-        from decimal import Decimal
-        from datetime import datetime, date
-        
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return super().default(obj)
-
-
-def get_top_services(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 5) -> str:
+def get_top_services(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 5,
+                     fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém os top serviços mais caros da AWS.
     
@@ -38,6 +28,8 @@ def get_top_services(start_date: Optional[str] = None, end_date: Optional[str] =
         start_date: Data de início (YYYY-MM-DD) - opcional, padrão últimos 30 dias
         end_date: Data de fim (YYYY-MM-DD) - opcional, padrão hoje
         limit: Número de serviços a retornar (padrão 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
         
     Returns:
         JSON com lista dos serviços mais caros
@@ -77,7 +69,7 @@ def get_top_services(start_date: Optional[str] = None, end_date: Optional[str] =
                 limit=limit
             )
         
-        result = json.dumps(top_services, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        result = to_json(top_services, fields=fields, max_bytes=max_bytes)
         return result
         
     except Exception as e:
@@ -85,18 +77,19 @@ def get_top_services(start_date: Optional[str] = None, end_date: Optional[str] =
         
         # Se for erro de limitação histórica, fornecer orientação específica
         if "historical data beyond 14 months" in str(e):
-            return json.dumps({
+            return to_json({
                 "error": "Limitação de dados históricos do AWS Cost Explorer",
                 "message": "A AWS Cost Explorer só permite acesso a dados dos últimos 14 meses",
                 "solution": "Ajustando automaticamente para período válido",
                 "current_date": datetime.now().strftime('%Y-%m-%d'),
                 "using_period": "últimos 30 dias"
-            }, ensure_ascii=False, indent=2)
+            })
         
         return f"Erro ao obter top serviços: {str(e)}"
 
 
-def get_service_details(service_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+def get_service_details(service_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém detalhes de custos de um serviço específico com resolução automática do nome.
     
@@ -104,6 +97,8 @@ def get_service_details(service_name: str, start_date: Optional[str] = None, end
         service_name: Nome do serviço AWS (aceita apelidos como 'rds', 'ec2', etc.)
         start_date: Data de início (YYYY-MM-DD) - opcional
         end_date: Data de fim (YYYY-MM-DD) - opcional
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
         
     Returns:
         Detalhes de custo do serviço especificado
@@ -112,7 +107,7 @@ def get_service_details(service_name: str, start_date: Optional[str] = None, end
     
     try:
         # 🔧 NOVA FUNCIONALIDADE: Resolução automática do nome do serviço
-        resolved_name, confidence, suggestions = service_resolver.resolve_service_name(service_name)
+        resolved_name, confidence, suggestions = get_service_resolver().resolve_service_name(service_name)
         
         if confidence >= 0.8:
             actual_service_name = resolved_name
@@ -145,21 +140,21 @@ def get_service_details(service_name: str, start_date: Optional[str] = None, end
             'alternative_suggestions': suggestions[:3] if suggestions else []
         }
         
-        result = json.dumps(service_details, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        result = to_json(service_details, fields=fields, max_bytes=max_bytes)
         return result
         
     except Exception as e:
         print(f"GET SERVICE DETAILS ERROR: {e}")
         # Se for erro de limitação histórica, fornecer orientação específica
         if "historical data beyond 14 months" in str(e):
-            return json.dumps({
+            return to_json({
                 "error": "Limitação de dados históricos do AWS Cost Explorer",
                 "message": "A AWS Cost Explorer só permite acesso a dados dos últimos 14 meses",
                 "solution": "Use datas mais recentes (últimos 13 meses) para análise",
                 "current_date": datetime.now().strftime('%Y-%m-%d'),
                 "suggested_start_date": (datetime.now() - timedelta(days=390)).strftime('%Y-%m-%d'),
                 "service_attempted": service_name
-            }, ensure_ascii=False, indent=2)
+            })
         
         return f"Erro ao obter detalhes do serviço: {str(e)}"
 
@@ -172,7 +167,7 @@ def get_aws_tags() -> str:
     tags = cost_explorer.get_tags()
     print("GET AWS TAGS")
     try:
-        return tags
+        return to_json(tags)
     except Exception as e:
         return f"Erro ao obter tags: {str(e)}"
 
@@ -188,17 +183,20 @@ def get_dimension_values(dimension_name: str) -> str:
     print("GET DIMENSION VALUES", dimension_name)
     try:
         dimension_values = cost_explorer.get_dimension_values(dimension_name)
-        return dimension_values
+        return to_json(dimension_values)
     except Exception as e:
         return f"Erro ao obter valores da dimensão: {str(e)}"
 
 
-def discover_account_resources(limit: int = 5) -> str:
+def discover_account_resources(limit: int = 5,
+                               fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Descobre todos os recursos ativos na conta AWS com limitação configurável.
     
     Args:
         limit: Número máximo de recursos a retornar por categoria (padrão: 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
     
     Returns:
         JSON com dados sobre serviços, regiões, tipos de instância e contas descobertos (limitados)
@@ -276,10 +274,10 @@ def discover_account_resources(limit: int = 5) -> str:
             }
         }
         
-        return json.dumps(discovery_data, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(discovery_data, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
-        return json.dumps({"error": f"Erro na descoberta de recursos: {str(e)}"}, ensure_ascii=False)
+        return to_json({"error": f"Erro na descoberta de recursos: {str(e)}"})
 
 
 def validate_and_analyze_service(service_name: str) -> str:
@@ -307,12 +305,12 @@ def validate_and_analyze_service(service_name: str) -> str:
             # Busca serviços similares
             similar_services = [s for s in available_services if service_name.lower() in s.lower()]
             
-            return json.dumps({
+            return to_json({
                 "service_name": service_name,
                 "exists": False,
                 "similar_services": similar_services,
                 "all_available_services": available_services
-            }, ensure_ascii=False, indent=2)
+            })
         
         # Se existe, coleta dados detalhados
         service_details = cost_explorer.get_service_details(service_name)
@@ -403,10 +401,10 @@ def validate_and_analyze_service(service_name: str) -> str:
             "analysis_timestamp": datetime.now().isoformat()
         }
         
-        return json.dumps(analysis_result, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(analysis_result)
         
     except Exception as e:
-        return json.dumps({"error": f"Erro na validação do serviço: {str(e)}"}, ensure_ascii=False)
+        return to_json({"error": f"Erro na validação do serviço: {str(e)}"})
 
 
 def analyze_account_coverage() -> str:
@@ -527,16 +525,20 @@ def analyze_account_coverage() -> str:
         except Exception as e:
             coverage_data["dimensions_analysis"]["database_engines"] = {"error": str(e)}
         
-        return json.dumps(coverage_data, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(coverage_data)
         
     except Exception as e:
-        return json.dumps({"error": f"Erro na análise de cobertura: {str(e)}"}, ensure_ascii=False)
+        return to_json({"error": f"Erro na análise de cobertura: {str(e)}"})
 
 
-def get_account_context_data() -> str:
+def get_account_context_data(fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Coleta dados contextuais abrangentes da conta AWS para análise.
     
+    Args:
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
+    
     Returns:
         JSON com contexto completo da conta para geração de insights
     """
@@ -581,52 +583,88 @@ def get_account_context_data() -> str:
             except Exception as e:
                 context_data["dimension_summary"][dimension.lower()] = {"error": str(e)}
         
-        # Padrões de uso (últimos 30 dias)
+        # Padrões de uso (últimos 30 dias) - tendências diárias de todos os serviços
+        # calculadas a partir de uma única matriz diária
         try:
-            usage_response = cost_explorer.get_cost_by_service(
+            daily = analyzer.trend_engine.get_trends(
                 start_date=(datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'),
                 end_date=datetime.now().strftime('%Y-%m-%d'),
-                granularity='DAILY'
+                granularity='DAILY',
+                top_n=5,
+                include_usage_types=False
             )
             
-            # Processa dados de uso
-            daily_costs = []
-            service_usage = {}
-            
-            for period in usage_response.get('ResultsByTime', []):
-                period_total = 0
-                period_date = period.get('TimePeriod', {}).get('Start', '')
-                
-                for group in period.get('Groups', []):
-                    service = group.get('Keys', ['Unknown'])[0]
-                    cost = float(group.get('Metrics', {}).get('UnblendedCost', {}).get('Amount', '0'))
-                    
-                    period_total += cost
-                    
-                    if service not in service_usage:
-                        service_usage[service] = []
-                    service_usage[service].append({
-                        'date': period_date,
-                        'cost': cost
-                    })
-                
-                daily_costs.append({
-                    'date': period_date,
-                    'total_cost': period_total
-                })
+            daily_costs = [
+                {'date': date, 'total_cost': cost}
+                for date, cost in zip(daily['periods'], daily['period_totals'])
+            ]
             
             context_data["usage_patterns"] = {
                 "daily_costs": daily_costs[-7:],  # Últimos 7 dias
-                "service_trends": {k: v[-7:] for k, v in list(service_usage.items())[:5]}  # Top 5 services, últimos 7 dias
+                "service_trends": {
+                    item['service']: {
+                        'last_7_days': [
+                            {'date': date, 'cost': cost}
+                            for date, cost in zip(daily['periods'][-7:], item['series'][-7:])
+                        ],
+                        'rolling_average_7d': item['rolling_average'],
+                        'slope_per_day': item['slope_per_period'],
+                        'share_percent': item['share_percent']
+                    }
+                    for item in daily['services']['items']
+                },  # Top 5 services
+                "fastest_growing": daily['services']['fastest_growing'],
+                "fastest_declining": daily['services']['fastest_declining']
             }
             
         except Exception as e:
             context_data["usage_patterns"] = {"error": str(e)}
         
-        return json.dumps(context_data, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(context_data, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
-        return json.dumps({"error": f"Erro na coleta de dados contextuais: {str(e)}"}, ensure_ascii=False)
+        return to_json({"error": f"Erro na coleta de dados contextuais: {str(e)}"})
+
+
+def forecast_service_costs(history_days: int = 90, horizon_days: int = 30, top_n: int = 10,
+                           method: str = "auto", compare_with_api: bool = False) -> str:
+    """
+    Prevê os custos de cada serviço AWS para os próximos dias com modelos locais.
+    
+    O histórico diário de todos os serviços é obtido em uma única consulta e os modelos
+    (Holt-Winters ou linear com sazonalidade semanal) são ajustados localmente, sem
+    uma chamada paga de previsão por serviço.
+    
+    Args:
+        history_days: Dias de histórico usados no ajuste (padrão 90)
+        horizon_days: Dias a prever a partir de hoje (padrão 30)
+        top_n: Número de serviços detalhados (padrão 10)
+        method: 'auto', 'holt_winters' ou 'linear' (padrão 'auto')
+        compare_with_api: Se True, confronta o total com a previsão do Cost Explorer (1 chamada paga)
+    
+    Returns:
+        JSON com previsão total e por serviço, com intervalos de confiança
+    """
+    print(f"CHAMANDO FORECAST_SERVICE_COSTS - history_days: {history_days}, horizon_days: {horizon_days}, method: {method}")
+    try:
+        forecaster = CostForecaster(CostExplorer())
+        result = forecaster.forecast_services(
+            history_days=history_days,
+            horizon_days=horizon_days,
+            method=method,
+            top_n=top_n
+        )
+        
+        if compare_with_api and result.get('total'):
+            try:
+                result['api_cross_check'] = forecaster.compare_with_api(result)
+            except Exception as e:
+                result['api_cross_check'] = {"error": str(e)}
+        
+        return to_json(result)
+    
+    except Exception as e:
+        return to_json({"error": f"Erro na previsão de custos: {str(e)}"})
 
 
 def check_account_data_availability() -> str:
@@ -705,15 +743,16 @@ def check_account_data_availability() -> str:
                 "Implemente políticas de cost optimization"
             ]
         
-        return json.dumps(data_availability, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(data_availability)
         
     except Exception as e:
-        return json.dumps({"error": f"Erro na verificação de dados: {str(e)}"}, ensure_ascii=False)
+        return to_json({"error": f"Erro na verificação de dados: {str(e)}"})
 
 
 def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Optional[str] = None, 
                  vpc_ids: Optional[str] = None, subnet_ids: Optional[str] = None, 
-                 group_ids: Optional[str] = None, region_name: Optional[str] = None, limit: int = 5) -> str:
+                 group_ids: Optional[str] = None, region_name: Optional[str] = None, limit: int = 5,
+                 fields: Optional[str] = None, max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
     """
     Executa chamadas dinâmicas para EC2 e outros serviços AWS baseado no método solicitado.
     
@@ -726,6 +765,10 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
         group_ids: IDs de security groups (separados por vírgula, opcional)
         region_name: Região AWS específica (opcional)
         limit: Número máximo de recursos a retornar (padrão: 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
+        cursor: Cursor 'next_cursor' de uma chamada anterior; retorna a próxima página
+                sem consultar a AWS (os demais parâmetros são ignorados)
         
     Returns:
         JSON com a resposta da API AWS correspondente ao método solicitado (limitado)
@@ -737,6 +780,25 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
     """
     print(f"AWS EC2 CALL - Método: {method}, Limite: {limit}")
     
+    if cursor:
+        try:
+            pages, pagination, context = result_snapshots.page('aws_ec2_call', cursor)
+        except CursorError as e:
+            return to_json({"error": str(e), "cursor": cursor})
+        list_key = context['list_key']
+        items = pages[list_key]
+        return to_json({
+            list_key: _merge_reservations(items) if list_key == 'Reservations' else items,
+            '_meta': {
+                'total_resources_found': pagination['totals'][list_key],
+                'resources_returned': len(items),
+                'truncated': pagination['next_cursor'] is not None,
+                'method': context['method'],
+                'client_type': context['client_type']
+            },
+            '_pagination': pagination
+        }, fields=fields, max_bytes=max_bytes)
+    
     # Preparar parâmetros dinâmicos baseados no método
     parameters = {}
     
@@ -802,6 +864,40 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
         'describe_target_health'
     }
     
+    # Lista limitada (e paginada por cursor) da resposta de cada método permitido
+    PAGINATED_KEYS = {
+        'describe_instances': 'Reservations',
+        'describe_instance_status': 'InstanceStatuses',
+        'describe_instance_types': 'InstanceTypes',
+        'describe_volumes': 'Volumes',
+        'describe_snapshots': 'Snapshots',
+        'describe_images': 'Images',
+        'describe_vpcs': 'Vpcs',
+        'describe_subnets': 'Subnets',
+        'describe_security_groups': 'SecurityGroups',
+        'describe_network_interfaces': 'NetworkInterfaces',
+        'describe_route_tables': 'RouteTables',
+        'describe_internet_gateways': 'InternetGateways',
+        'describe_nat_gateways': 'NatGateways',
+        'describe_vpc_peering_connections': 'VpcPeeringConnections',
+        'describe_addresses': 'Addresses',
+        'describe_network_acls': 'NetworkAcls',
+        'describe_vpc_endpoints': 'VpcEndpoints',
+        'describe_customer_gateways': 'CustomerGateways',
+        'describe_vpn_gateways': 'VpnGateways',
+        'describe_vpn_connections': 'VpnConnections',
+        'describe_key_pairs': 'KeyPairs',
+        'describe_regions': 'Regions',
+        'describe_availability_zones': 'AvailabilityZones',
+        'describe_tags': 'Tags',
+        'describe_account_attributes': 'AccountAttributes',
+        'describe_instance_credit_specifications': 'InstanceCreditSpecifications',
+        'describe_load_balancers': 'LoadBalancers',
+        'describe_target_groups': 'TargetGroups',
+        'describe_listeners': 'Listeners',
+        'describe_target_health': 'TargetHealthDescriptions'
+    }
+    
     # Determinar qual cliente usar
     if method in EC2_METHODS:
         client_type = 'ec2'
@@ -810,11 +906,11 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
         client_type = 'elbv2'
         allowed_methods = ELB_METHODS
     else:
-        return json.dumps({
+        return to_json({
             "error": f"Método '{method}' não reconhecido",
             "ec2_methods": sorted(list(EC2_METHODS)),
             "elb_methods": sorted(list(ELB_METHODS))
-        }, ensure_ascii=False, indent=2)
+        })
 
     try:
         cost_explorer = CostExplorer()
@@ -855,83 +951,34 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
         if 'ResponseMetadata' in response:
             del response['ResponseMetadata']
         
-        # Aplicar limitação aos recursos retornados
-        original_response = response.copy()
-        total_resources = 0
-        truncated = False
-        
-        if client_type == 'ec2':
-            if method == 'describe_instances' and 'Reservations' in response:
-                # Para instâncias, limitar o número total de instâncias
-                limited_reservations = []
-                instances_count = 0
-                
-                for reservation in response['Reservations']:
-                    if instances_count >= limit:
-                        truncated = True
-                        break
-                    
-                    limited_instances = []
-                    for instance in reservation.get('Instances', []):
-                        if instances_count >= limit:
-                            truncated = True
-                            break
-                        limited_instances.append(instance)
-                        instances_count += 1
-                    
-                    if limited_instances:
-                        limited_reservation = reservation.copy()
-                        limited_reservation['Instances'] = limited_instances
-                        limited_reservations.append(limited_reservation)
-                
-                total_resources = sum(len(res.get('Instances', [])) for res in original_response['Reservations'])
-                response['Reservations'] = limited_reservations
-                
-            elif method == 'describe_volumes' and 'Volumes' in response:
-                total_resources = len(response['Volumes'])
-                response['Volumes'] = response['Volumes'][:limit]
-                truncated = total_resources > limit
-                
-            elif method == 'describe_addresses' and 'Addresses' in response:
-                total_resources = len(response['Addresses'])
-                response['Addresses'] = response['Addresses'][:limit]
-                truncated = total_resources > limit
-                
-            elif method == 'describe_vpcs' and 'Vpcs' in response:
-                total_resources = len(response['Vpcs'])
-                response['Vpcs'] = response['Vpcs'][:limit]
-                truncated = total_resources > limit
-                
-            elif method == 'describe_subnets' and 'Subnets' in response:
-                total_resources = len(response['Subnets'])
-                response['Subnets'] = response['Subnets'][:limit]
-                truncated = total_resources > limit
-                
-            elif method == 'describe_security_groups' and 'SecurityGroups' in response:
-                total_resources = len(response['SecurityGroups'])
-                response['SecurityGroups'] = response['SecurityGroups'][:limit]
-                truncated = total_resources > limit
-                
-        elif client_type == 'elbv2':
-            if method == 'describe_load_balancers' and 'LoadBalancers' in response:
-                total_resources = len(response['LoadBalancers'])
-                response['LoadBalancers'] = response['LoadBalancers'][:limit]
-                truncated = total_resources > limit
-                
-            elif method == 'describe_target_groups' and 'TargetGroups' in response:
-                total_resources = len(response['TargetGroups'])
-                response['TargetGroups'] = response['TargetGroups'][:limit]
-                truncated = total_resources > limit
-        
-        # Adicionar metadados sobre limitação
+        # Aplicar limitação aos recursos retornados; o restante fica num snapshot, acessível pelo cursor
         response['_meta'] = {
-            'limit_applied': limit,
-            'total_resources_found': total_resources,
-            'resources_returned': min(total_resources, limit),
-            'truncated': truncated,
             'method': method,
             'client_type': client_type
         }
+        list_key = PAGINATED_KEYS.get(method)
+        
+        if list_key and list_key in response:
+            items = response[list_key]
+            if list_key == 'Reservations':
+                # Uma entrada por instância: o limite conta instâncias, não reservas
+                items = [dict(reservation, Instances=[instance])
+                         for reservation in items for instance in reservation.get('Instances', [])]
+            total_resources = len(items)
+            pages, pagination = paginate('aws_ec2_call', {list_key: items}, limit, context={
+                'method': method,
+                'client_type': client_type,
+                'list_key': list_key
+            })
+            response[list_key] = _merge_reservations(pages[list_key]) if list_key == 'Reservations' else pages[list_key]
+            response['_meta'].update({
+                'limit_applied': limit,
+                'total_resources_found': total_resources,
+                'resources_returned': min(total_resources, limit),
+                'truncated': total_resources > limit
+            })
+            if pagination:
+                response['_pagination'] = pagination
         
         # Verificar se há dados úteis na resposta
         has_data = False
@@ -975,20 +1022,20 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
             
         print(f"{client_type.upper()} Call - Success: {method} (has_data: {has_data})")
         print(f"Response: {response}")
-        return json.dumps(response, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(response, fields=fields, max_bytes=max_bytes)
         
     except AttributeError as e:
         import traceback
         tb = traceback.format_exc()
         print(f"{client_type.upper()} Call - AttributeError: {e}")
         print(f"{client_type.upper()} Call - Traceback:\n{tb}")
-        return json.dumps({
+        return to_json({
             "error": f"Método '{method}' não existe no cliente {client_type}",
             "details": str(e),
             "client_type": client_type,
             "traceback": tb,
             "suggestion": f"Verifique se o método {method} está disponível no serviço {client_type}"
-        }, ensure_ascii=False, indent=2)
+        })
         
     except Exception as e:
         import traceback
@@ -999,38 +1046,49 @@ def aws_ec2_call(method: str, instance_ids: Optional[str] = None, volume_ids: Op
         
         # Tratamento de erros específicos com informações detalhadas
         if "InvalidParameterValue" in error_msg:
-            return json.dumps({
+            return to_json({
                 "error": "Parâmetros inválidos fornecidos",
                 "details": error_msg,
                 "suggestion": "Verifique os parâmetros e tente novamente",
                 "client_type": client_type,
                 "traceback": tb
-            }, ensure_ascii=False, indent=2)
+            })
         elif "UnauthorizedOperation" in error_msg:
-            return json.dumps({
+            return to_json({
                 "error": "Operação não autorizada",
                 "details": error_msg,
                 "suggestion": f"Verifique as permissões IAM para {client_type}",
                 "client_type": client_type,
                 "traceback": tb
-            }, ensure_ascii=False, indent=2)
+            })
         elif "InvalidInstanceID" in error_msg:
-            return json.dumps({
+            return to_json({
                 "error": "ID de instância inválido",
                 "details": error_msg,
                 "suggestion": "Verifique se o ID da instância existe e está correto",
                 "client_type": client_type,
                 "traceback": tb
-            }, ensure_ascii=False, indent=2)
+            })
         else:
-            return json.dumps({
+            return to_json({
                 "error": f"Erro ao executar {method}",
                 "details": error_msg,
                 "client_type": client_type,
                 "traceback": tb,
                 "method": method,
                 "parameters": parameters
-            }, ensure_ascii=False, indent=2)
+            })
+
+
+def _merge_reservations(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reagrupa entradas de uma instância por reserva (consecutivas com o mesmo ReservationId)."""
+    reservations = []
+    for item in items:
+        if reservations and reservations[-1].get('ReservationId') == item.get('ReservationId'):
+            reservations[-1]['Instances'].extend(item['Instances'])
+        else:
+            reservations.append(dict(item, Instances=list(item['Instances'])))
+    return reservations
 
 
 def get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
@@ -1079,11 +1137,11 @@ def get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = No
                 found_instances.append(instance)
         
         if not found_instances:
-            return json.dumps({
+            return to_json({
                 "error": f"Instância com nome '{instance_name}' não encontrada",
                 "suggestion": "Verifique se o nome está correto e se a instância existe",
                 "searched_name": instance_name
-            }, ensure_ascii=False, indent=2)
+            })
         
         # Se encontrou múltiplas instâncias com o mesmo nome
         if len(found_instances) > 1:
@@ -1096,11 +1154,11 @@ def get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = No
                     "availability_zone": instance.get('Placement', {}).get('AvailabilityZone')
                 })
             
-            return json.dumps({
+            return to_json({
                 "warning": f"Encontradas {len(found_instances)} instâncias com nome '{instance_name}'",
                 "instances": instances_info,
                 "suggestion": "Use o Instance ID específico para análise mais precisa"
-            }, ensure_ascii=False, indent=2)
+            })
         
         # Processar a instância encontrada
         instance = found_instances[0]
@@ -1238,7 +1296,7 @@ def get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = No
         
         print(f"Análise concluída para {instance_name}: ${cost_analysis['total_estimated_cost_usd']:.2f}")
         
-        return json.dumps(result, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(result)
         
     except Exception as e:
         import traceback
@@ -1246,15 +1304,15 @@ def get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = No
         print(f"Erro na análise de custo da instância: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro ao analisar custo da instância '{instance_name}'",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique se a instância existe e se você tem permissões adequadas"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
-def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -> str:
+def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5, cursor: Optional[str] = None) -> str:
     """
     Busca instâncias EC2 por uma tag específica ou lista todas as instâncias com uma determinada tag.
     
@@ -1262,6 +1320,8 @@ def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -
         tag_key: Chave da tag (ex: 'Name', 'Environment', 'Project')
         tag_value: Valor da tag (opcional). Se não fornecido, lista todos os valores para essa tag
         limit: Número máximo de instâncias a retornar (padrão: 5)
+        cursor: Cursor 'next_cursor' de uma chamada anterior; retorna a próxima página
+                sem consultar a AWS (os demais parâmetros são ignorados)
         
     Returns:
         JSON com instâncias encontradas e suas informações básicas (limitado)
@@ -1273,6 +1333,18 @@ def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -
     """
     print(f"BUSCANDO INSTÂNCIAS POR TAG: {tag_key}={tag_value or '*'} - Limite: {limit}")
     
+    if cursor:
+        try:
+            pages, pagination, context = result_snapshots.page('find_instances_by_tag', cursor)
+        except CursorError as e:
+            return to_json({"error": str(e), "cursor": cursor})
+        result = dict(context)
+        result["results_summary"] = dict(context["results_summary"], instances_returned=len(pages["instances"]),
+                                         truncated=pagination["next_cursor"] is not None)
+        result["instances"] = pages["instances"]
+        result["_pagination"] = pagination
+        return to_json(result)
+    
     try:
         cost_explorer = CostExplorer()
         session = cost_explorer.aws_client.session
@@ -1311,10 +1383,6 @@ def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -
             for instance in reservation.get('Instances', []):
                 total_instances_found += 1
                 
-                # Aplicar limite
-                if len(instances_info) >= limit:
-                    continue
-                
                 # Extrair informações básicas
                 instance_id = instance.get('InstanceId')
                 instance_type = instance.get('InstanceType')
@@ -1348,21 +1416,30 @@ def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -
                 
                 instances_info.append(instance_info)
         
+        # Aplicar limite: o restante fica no snapshot, acessível pelo cursor
+        search_criteria = {
+            "tag_key": tag_key,
+            "tag_value": tag_value,
+            "search_type": "specific_value" if tag_value else "all_values",
+            "limit_applied": limit
+        }
+        results_summary = {
+            "total_instances_found": total_instances_found,
+            "unique_tag_values": sorted(tag_values_found) if not tag_value else None
+        }
+        pages, pagination = paginate('find_instances_by_tag', {"instances": instances_info}, limit, context={
+            "search_criteria": search_criteria,
+            "results_summary": results_summary
+        })
+        instances_info = pages["instances"]
+        
         # Montar resposta
         result = {
-            "search_criteria": {
-                "tag_key": tag_key,
-                "tag_value": tag_value,
-                "search_type": "specific_value" if tag_value else "all_values",
-                "limit_applied": limit
-            },
-            "results_summary": {
-                "total_instances_found": total_instances_found,
-                "instances_returned": len(instances_info),
-                "truncated": total_instances_found > limit,
-                "unique_tag_values": list(tag_values_found) if not tag_value else None
-            },
-            "instances": instances_info
+            "search_criteria": search_criteria,
+            "results_summary": dict(results_summary, instances_returned=len(instances_info),
+                                    truncated=total_instances_found > limit),
+            "instances": instances_info,
+            "_pagination": pagination
         }
         
         # Adicionar insights
@@ -1380,7 +1457,7 @@ def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -
         
         print(f"Busca concluída: {len(instances_info)} instâncias encontradas")
         
-        return json.dumps(result, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(result)
         
     except Exception as e:
         import traceback
@@ -1388,19 +1465,23 @@ def find_instances_by_tag(tag_key: str, tag_value: str = None, limit: int = 5) -
         print(f"Erro na busca de instâncias por tag: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro ao buscar instâncias pela tag '{tag_key}'",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique se você tem permissões para listar instâncias EC2"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
-def audit_governance_tags() -> str:
+def audit_governance_tags(fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Auditoria otimizada de recursos sem tags de governança adequadas.
     Retorna resumo eficiente focando apenas em recursos sem tags críticas.
     
+    Args:
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
+    
     Returns:
         JSON compacto com auditoria de governança por tipo de recurso
         
@@ -1594,7 +1675,7 @@ def audit_governance_tags() -> str:
         
         print(f"Auditoria concluída: {audit_result['summary']['compliance_percentage']} compliance")
         
-        return json.dumps(audit_result, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(audit_result, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
         import traceback
@@ -1602,21 +1683,27 @@ def audit_governance_tags() -> str:
         print(f"Erro na auditoria de governança: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro na auditoria de governança",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique permissões e conectividade AWS"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
-def identify_orphaned_resources(limit: int = 5) -> str:
+def identify_orphaned_resources(limit: int = 5,
+                                fields: Optional[str] = None, max_bytes: Optional[int] = None,
+                                cursor: Optional[str] = None) -> str:
     """
     Identifica recursos órfãos (não utilizados) na conta AWS com limitação configurável.
     Prioriza recursos por impacto financeiro potencial.
     
     Args:
         limit: Número máximo de recursos órfãos a retornar por categoria (padrão: 5)
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
+        cursor: Cursor 'next_cursor' de uma chamada anterior; retorna a próxima página de
+                cada categoria sem consultar a AWS (limit é ignorado)
     
     Returns:
         JSON com recursos órfãos identificados, priorizados por economia potencial
@@ -1630,6 +1717,22 @@ def identify_orphaned_resources(limit: int = 5) -> str:
     """
     print(f"IDENTIFICANDO RECURSOS ÓRFÃOS - Limite: {limit}")
     
+    if cursor:
+        try:
+            pages, pagination, context = result_snapshots.page('identify_orphaned_resources', cursor)
+        except CursorError as e:
+            return to_json({"error": str(e), "cursor": cursor})
+        result = dict(context, orphaned_resources={})
+        for category, resources in pages.items():
+            result["orphaned_resources"][category] = dict(
+                context["orphaned_resources"][category],
+                resources_returned=len(resources),
+                truncated=pagination["totals"][category] > pagination["offset"] + len(resources),
+                resources=resources
+            )
+        result["_pagination"] = pagination
+        return to_json(result, fields=fields, max_bytes=max_bytes)
+    
     try:
         cost_explorer = CostExplorer()
         session = cost_explorer.aws_client.session
@@ -1646,6 +1749,8 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             },
             "orphaned_resources": {}
         }
+        # Listas completas por categoria, para as páginas seguintes via cursor
+        all_resources = {}
         
         # 1. Volumes EBS não anexados
         print("Identificando volumes EBS órfãos...")
@@ -1687,6 +1792,7 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             total_volumes = len(orphaned_volumes)
             limited_volumes = orphaned_volumes[:limit]
             
+            all_resources["ebs_volumes"] = orphaned_volumes
             orphaned_resources["orphaned_resources"]["ebs_volumes"] = {
                 "total_found": total_volumes,
                 "resources_returned": len(limited_volumes),
@@ -1728,6 +1834,7 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             total_ips = len(orphaned_ips)
             limited_ips = orphaned_ips[:limit]
             
+            all_resources["elastic_ips"] = orphaned_ips
             orphaned_resources["orphaned_resources"]["elastic_ips"] = {
                 "total_found": total_ips,
                 "resources_returned": len(limited_ips),
@@ -1753,7 +1860,8 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             
             for snapshot in snapshots_response.get('Snapshots', []):
                 start_time = snapshot.get('StartTime')
-                if start_time and start_time < cutoff_date:
+                # O boto3 devolve StartTime com fuso (UTC); a comparação é feita sem ele
+                if start_time and start_time.replace(tzinfo=None) < cutoff_date:
                     snapshot_id = snapshot.get('SnapshotId')
                     volume_size = snapshot.get('VolumeSize', 0)
                     
@@ -1774,6 +1882,7 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             total_snapshots = len(orphaned_snapshots)
             limited_snapshots = orphaned_snapshots[:limit]
             
+            all_resources["old_snapshots"] = orphaned_snapshots
             orphaned_resources["orphaned_resources"]["old_snapshots"] = {
                 "total_found": total_snapshots,
                 "resources_returned": len(limited_snapshots),
@@ -1837,6 +1946,7 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             total_lbs = len(orphaned_lbs)
             limited_lbs = orphaned_lbs[:limit]
             
+            all_resources["load_balancers"] = orphaned_lbs
             orphaned_resources["orphaned_resources"]["load_balancers"] = {
                 "total_found": total_lbs,
                 "resources_returned": len(limited_lbs),
@@ -1852,11 +1962,23 @@ def identify_orphaned_resources(limit: int = 5) -> str:
             print(f"Erro ao identificar Load Balancers órfãos: {e}")
             orphaned_resources["orphaned_resources"]["load_balancers"] = {"error": str(e)}
         
+        # Recursos além do limite ficam num snapshot, acessíveis pelo cursor
+        _, orphaned_resources["_pagination"] = paginate('identify_orphaned_resources', all_resources, limit, context={
+            "analysis_timestamp": orphaned_resources["analysis_timestamp"],
+            "limit_applied": limit,
+            "summary": orphaned_resources["summary"],
+            "orphaned_resources": {
+                category: {key: value for key, value in info.items()
+                           if key not in ("resources", "resources_returned", "truncated")}
+                for category, info in orphaned_resources["orphaned_resources"].items() if category in all_resources
+            }
+        })
+        
         # Gerar recomendações priorizadas
         orphaned_resources["recommendations"] = _generate_orphaned_resources_recommendations(orphaned_resources)
         
         print(f"Análise de recursos órfãos concluída: {orphaned_resources['summary']['total_orphaned_resources']} recursos encontrados")
-        return json.dumps(orphaned_resources, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(orphaned_resources, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
         import traceback
@@ -1864,12 +1986,12 @@ def identify_orphaned_resources(limit: int = 5) -> str:
         print(f"Erro na identificação de recursos órfãos: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro na identificação de recursos órfãos",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique permissões EC2 e ELB"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 def _generate_orphaned_resources_recommendations(orphaned_data: Dict[str, Any]) -> List[str]:
@@ -1933,11 +2055,11 @@ def analyze_multiple_tags_costs(tag_keys: str, start_date: Optional[str] = None,
         tag_list = [tag.strip() for tag in tag_keys.split(',') if tag.strip()]
         
         if not tag_list:
-            return json.dumps({
+            return to_json({
                 "error": "Nenhuma tag válida fornecida",
                 "suggestion": "Forneça uma lista de tags separadas por vírgula",
                 "example": "Environment,Project,Owner"
-            }, ensure_ascii=False, indent=2)
+            })
         
         cost_explorer = CostExplorer()
         
@@ -2076,7 +2198,7 @@ def analyze_multiple_tags_costs(tag_keys: str, start_date: Optional[str] = None,
         
         print(f"Análise concluída: {analysis_result['summary']['tags_with_costs']}/{len(tag_list)} tags com custos")
         
-        return json.dumps(analysis_result, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(analysis_result)
         
     except Exception as e:
         import traceback
@@ -2084,15 +2206,16 @@ def analyze_multiple_tags_costs(tag_keys: str, start_date: Optional[str] = None,
         print(f"Erro na análise de múltiplas tags: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro na análise de múltiplas tags",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique se as tags estão no formato correto e se você tem permissões adequadas"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
-def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                cursor: Optional[str] = None) -> str:
     """
     Analisa custos de valores específicos de uma tag para um período determinado.
     
@@ -2101,6 +2224,8 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
         tag_values: Lista de valores específicos separados por vírgula (ex: "valhalla-support,valhalla-main,jormungand")
         start_date: Data inicial no formato YYYY-MM-DD (opcional, padrão: 30 dias atrás)
         end_date: Data final no formato YYYY-MM-DD (opcional, padrão: hoje)
+        cursor: Cursor 'next_cursor' de uma chamada anterior; retorna a próxima página de
+                'other_values_found' sem consultar a AWS
         
     Returns:
         JSON com análise de custos para os valores específicos da tag
@@ -2112,16 +2237,23 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
     """
     print(f"ANALISANDO TAG '{tag_key}' COM VALORES ESPECÍFICOS: {tag_values}")
     
+    if cursor:
+        try:
+            pages, pagination, context = result_snapshots.page('analyze_tag_specific_values', cursor)
+        except CursorError as e:
+            return to_json({"error": str(e), "cursor": cursor})
+        return to_json(dict(context, other_values_found=pages["other_values_found"], _pagination=pagination))
+    
     try:
         # Processar lista de valores
         values_list = [value.strip() for value in tag_values.split(',') if value.strip()]
         
         if not values_list:
-            return json.dumps({
+            return to_json({
                 "error": "Nenhum valor válido fornecido",
                 "suggestion": "Forneça uma lista de valores separados por vírgula",
                 "example": "valhalla-support,valhalla-main,jormungand"
-            }, ensure_ascii=False, indent=2)
+            })
         
         cost_explorer = CostExplorer()
         
@@ -2161,7 +2293,7 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
             tag_cost_response = cost_explorer.get_cost_by_tag(tag_key, validated_start, validated_end)
             
             if not tag_cost_response.get('ResultsByTime'):
-                return json.dumps({
+                return to_json({
                     "error": f"Nenhum dado encontrado para a tag '{tag_key}' no período especificado",
                     "tag_key": tag_key,
                     "period": f"{validated_start} a {validated_end}",
@@ -2170,7 +2302,7 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
                         "Considere usar um período de análise maior",
                         "Verifique se os recursos estão sendo tagueados corretamente"
                     ]
-                }, ensure_ascii=False, indent=2)
+                })
             
             # Coletar todos os valores encontrados para esta tag
             all_tag_values = {}
@@ -2260,9 +2392,13 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
                         "cost_brl": round(cost * 5.5, 2)
                     })
             
-            # Ordenar outros valores por custo e limitar a 10
+            # Ordenar outros valores por custo e limitar a 10 (os demais ficam acessíveis pelo cursor)
             other_values.sort(key=lambda x: x["cost_usd"], reverse=True)
-            analysis_result["other_values_found"] = other_values[:10]
+            pages, analysis_result["_pagination"] = paginate('analyze_tag_specific_values', {"other_values_found": other_values}, 10, context={
+                "tag_key": tag_key,
+                "analysis_period": analysis_result["analysis_period"]
+            })
+            analysis_result["other_values_found"] = pages["other_values_found"]
             
             # Gerar insights e recomendações
             analysis_result["insights"] = []
@@ -2302,16 +2438,16 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
             
             print(f"Análise concluída: {analysis_result['summary']['values_with_costs']}/{len(values_list)} valores encontrados")
             
-            return json.dumps(analysis_result, cls=JsonEncoder, ensure_ascii=False, indent=2)
+            return to_json(analysis_result)
             
         except Exception as e:
             print(f"Erro ao buscar custos para tag '{tag_key}': {e}")
-            return json.dumps({
+            return to_json({
                 "error": f"Erro ao buscar custos para a tag '{tag_key}'",
                 "details": str(e),
                 "tag_key": tag_key,
                 "requested_values": values_list
-            }, ensure_ascii=False, indent=2)
+            })
         
     except Exception as e:
         import traceback
@@ -2319,12 +2455,12 @@ def analyze_tag_specific_values(tag_key: str, tag_values: str, start_date: Optio
         print(f"Erro na análise de valores específicos da tag: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro na análise de valores específicos da tag",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique se a tag e valores estão no formato correto"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
  
\ No newline at end of file
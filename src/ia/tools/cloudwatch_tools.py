@@ -2,32 +2,55 @@
 Ferramentas para monitoramento CloudWatch de instâncias EC2.
 """
 
-import json
 import sys
 import os
+import contextvars
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-from statistics import mean, median
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from typing import Optional, List, Dict, Any, Iterator
+
+import numpy as np
 
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 from src.clouds.aws.cost_explorer import CostExplorer
+from src.clouds.aws.metric_query import MetricQuery, MetricQueryEngine, MetricInsightsQuery, choose_period
+from src.clouds.aws.metric_cache import metric_cache
+from src.clouds.aws.fleet_analytics import FleetPerformanceAggregator
+from src.ia.tools.response import to_json
 
-class JsonEncoder(json.JSONEncoder):
-    """Encoder JSON personalizado para lidar com tipos especiais como Decimal e datetime."""
-    def default(self, obj):
-        from decimal import Decimal
-        from datetime import datetime, date
-        
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return super().default(obj)
+# Unidades das métricas EC2 (o GetMetricData não retorna a unidade dos pontos)
+EC2_METRIC_UNITS = {
+    'CPUUtilization': 'Percent',
+    'NetworkIn': 'Bytes',
+    'NetworkOut': 'Bytes',
+    'NetworkPacketsIn': 'Count',
+    'NetworkPacketsOut': 'Count',
+    'DiskReadOps': 'Count',
+    'DiskWriteOps': 'Count',
+    'DiskReadBytes': 'Bytes',
+    'DiskWriteBytes': 'Bytes',
+    'StatusCheckFailed': 'Count'
+}
+
+# Limite de instâncias por análise de frota (cada 500 séries = 1 requisição GetMetricData)
+MAX_FLEET_INSTANCES = 50000
+
+# Blocos de instâncias buscados em paralelo na análise de frota
+FLEET_PIPELINE_WORKERS = 4
+
+# Métricas aceitas no ranking de tráfego da frota
+FLEET_NETWORK_METRICS = {
+    'NetworkOut': 'Tráfego de saída',
+    'NetworkIn': 'Tráfego de entrada',
+    'NetworkPacketsOut': 'Pacotes de saída',
+    'NetworkPacketsIn': 'Pacotes de entrada'
+}
 
 
-def get_instance_performance_metrics(instance_id: str, hours: int = 24, metrics: Optional[str] = None) -> str:
+def get_instance_performance_metrics(instance_id: str, hours: int = 24, metrics: Optional[str] = None,
+                                     fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Obtém métricas de performance de uma instância EC2 específica via CloudWatch.
     
@@ -36,6 +59,8 @@ def get_instance_performance_metrics(instance_id: str, hours: int = 24, metrics:
         hours: Número de horas para análise (padrão: 24)
         metrics: Métricas específicas separadas por vírgula (ex: 'CPUUtilization,NetworkIn,NetworkOut')
                 Se não especificado, busca todas as métricas principais
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
         
     Returns:
         JSON com métricas de performance da instância
@@ -92,99 +117,84 @@ def get_instance_performance_metrics(instance_id: str, hours: int = 24, metrics:
             "alerts": []
         }
         
-        # Buscar cada métrica
-        for metric_name in metrics_list:
-            try:
-                print(f"Buscando métrica: {metric_name}")
+        # Buscar todas as métricas e estatísticas em uma única requisição GetMetricData
+        # (apenas os buckets que ainda não estão no cache)
+        dimensions = {'InstanceId': instance_id}
+        stats = ['Average', 'Maximum', 'Minimum']
+        queries = [
+            MetricQuery(metric_name, dimensions, stat=stat, period=3600)  # 1 hora
+            for metric_name in metrics_list
+            for stat in stats
+        ]
+        series = metric_cache.fetch(MetricQueryEngine(cloudwatch), queries, start_time, end_time)
+        
+        for index, metric_name in enumerate(metrics_list):
+            average_series, maximum_series, minimum_series = series[index * 3:index * 3 + 3]
+            
+            if average_series.error:
+                print(f"Erro ao buscar métrica {metric_name}: {average_series.error}")
+                performance_data["metrics"][metric_name] = {
+                    "error": average_series.error
+                }
+                continue
+            
+            if not average_series.empty:
+                averages = average_series.values
                 
-                response = cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName=metric_name,
-                    Dimensions=[
+                metric_data = {
+                    "unit": EC2_METRIC_UNITS.get(metric_name, ''),
+                    "data_points": len(average_series),
+                    "time_series": [
                         {
-                            'Name': 'InstanceId',
-                            'Value': instance_id
-                        }
+                            "timestamp": timestamp.isoformat(),
+                            "average": float(value)
+                        } for timestamp, value in zip(average_series.datetimes(), averages)
                     ],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=3600,  # 1 hora
-                    Statistics=['Average', 'Maximum', 'Minimum']
-                )
-                datapoints = response.get('Datapoints', [])
-                if datapoints:
-                    # Ordenar por timestamp
-                    datapoints.sort(key=lambda x: x['Timestamp'])
-                    
-                    # Calcular estatísticas
-                    averages = [dp['Average'] for dp in datapoints]
-                    maximums = [dp['Maximum'] for dp in datapoints]
-                    minimums = [dp['Minimum'] for dp in datapoints]
-                    
-                    metric_data = {
-                        "unit": datapoints[0].get('Unit', ''),
-                        "data_points": len(datapoints),
-                        "time_series": [
-                            {
-                                "timestamp": dp['Timestamp'].isoformat(),
-                                "average": dp['Average'],
-                                "maximum": dp['Maximum'], 
-                                "minimum": dp['Minimum']
-                            } for dp in datapoints
-                        ],
-                        "statistics": {
-                            "overall_average": mean(averages),
-                            "overall_maximum": max(maximums),
-                            "overall_minimum": min(minimums),
-                            "median": median(averages)
-                        }
+                    "statistics": {
+                        "overall_average": average_series.mean(),
+                        "overall_maximum": maximum_series.max() if not maximum_series.empty else average_series.max(),
+                        "overall_minimum": minimum_series.min() if not minimum_series.empty else average_series.min(),
+                        "median": average_series.median()
                     }
+                }
+                
+                performance_data["metrics"][metric_name] = metric_data
+                
+                # Gerar alertas baseados em thresholds
+                if metric_name == 'CPUUtilization':
+                    avg_cpu = metric_data["statistics"]["overall_average"]
                     
-                    performance_data["metrics"][metric_name] = metric_data
-                    
-                    # Gerar alertas baseados em thresholds
-                    if metric_name == 'CPUUtilization':
-                        avg_cpu = mean(averages)
-                        max_cpu = max(maximums)
-                        
-                        if avg_cpu > 80:
-                            performance_data["alerts"].append({
-                                "severity": "HIGH",
-                                "metric": metric_name,
-                                "message": f"CPU média alta: {avg_cpu:.1f}%",
-                                "recommendation": "Considere upgrade do tipo de instância ou otimização de código"
-                            })
-                        elif avg_cpu < 10:
-                            performance_data["alerts"].append({
-                                "severity": "LOW",
-                                "metric": metric_name,
-                                "message": f"CPU subutilizada: {avg_cpu:.1f}%",
-                                "recommendation": "Considere reduzir o tipo de instância para economizar custos"
-                            })
-                    
-                    elif metric_name in ['NetworkIn', 'NetworkOut']:
-                        # Converter bytes para GB para análise
-                        total_traffic_gb = sum(averages) / (1024**3)
-                        avg_traffic_mbps = mean(averages) * 8 / (1024**2)  # Convert to Mbps
-                        
-                        if avg_traffic_mbps > 100:  # > 100 Mbps
-                            performance_data["alerts"].append({
-                                "severity": "MEDIUM",
-                                "metric": metric_name,
-                                "message": f"Tráfego de rede alto: {avg_traffic_mbps:.1f} Mbps",
-                                "recommendation": "Monitore custos de transferência de dados"
-                            })
-                    
-                else:
-                    performance_data["metrics"][metric_name] = {
-                        "status": "no_data",
-                        "message": f"Nenhum dado encontrado para {metric_name} no período especificado"
-                    }
+                    if avg_cpu > 80:
+                        performance_data["alerts"].append({
+                            "severity": "HIGH",
+                            "metric": metric_name,
+                            "message": f"CPU média alta: {avg_cpu:.1f}%",
+                            "recommendation": "Considere upgrade do tipo de instância ou otimização de código"
+                        })
+                    elif avg_cpu < 10:
+                        performance_data["alerts"].append({
+                            "severity": "LOW",
+                            "metric": metric_name,
+                            "message": f"CPU subutilizada: {avg_cpu:.1f}%",
+                            "recommendation": "Considere reduzir o tipo de instância para economizar custos"
+                        })
+                
+                elif metric_name in ['NetworkIn', 'NetworkOut']:
+                    # Converter bytes para Mbps para análise
+                    avg_traffic_mbps = average_series.mean() * 8 / (1024**2)
                     
-            except Exception as e:
-                print(f"Erro ao buscar métrica {metric_name}: {e}")
+                    if avg_traffic_mbps > 100:  # > 100 Mbps
+                        performance_data["alerts"].append({
+                            "severity": "MEDIUM",
+                            "metric": metric_name,
+                            "message": f"Tráfego de rede alto: {avg_traffic_mbps:.1f} Mbps",
+                            "recommendation": "Monitore custos de transferência de dados"
+                        })
+            
+            else:
                 performance_data["metrics"][metric_name] = {
-                    "error": str(e)
+                    "status": "no_data",
+                    "message": f"Nenhum dado encontrado para {metric_name} no período especificado"
                 }
         
         # Gerar resumo geral
@@ -220,7 +230,7 @@ def get_instance_performance_metrics(instance_id: str, hours: int = 24, metrics:
         
         print("performance_data", performance_data)
         print(f"Métricas coletadas com sucesso para {instance_id}")
-        return json.dumps(performance_data, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(performance_data, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
         import traceback
@@ -228,24 +238,33 @@ def get_instance_performance_metrics(instance_id: str, hours: int = 24, metrics:
         print(f"Erro ao obter métricas de performance: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro ao obter métricas para instância {instance_id}",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique se a instância existe e se você tem permissões CloudWatch"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 def analyze_ec2_fleet_performance(tag_key: Optional[str] = None, tag_value: Optional[str] = None, 
-                                hours: int = 24, max_instances: int = 10) -> str:
+                                hours: int = 24, max_instances: int = 100,
+                                group_by: str = "instance_type",
+                                fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
     Analisa performance de múltiplas instâncias EC2 (fleet analysis).
     
+    As instâncias são processadas em streaming: cada lote de até 500 séries
+    (GetMetricData) é consumido assim que chega e resumido em percentis
+    mescláveis por grupo, com memória constante independente do tamanho da frota.
+    
     Args:
         tag_key: Chave da tag para filtrar instâncias (opcional)
         tag_value: Valor da tag para filtrar instâncias (opcional)
         hours: Número de horas para análise (padrão: 24)
-        max_instances: Máximo de instâncias a analisar (padrão: 10)
+        max_instances: Máximo de instâncias a analisar (padrão: 100, limite: 50000)
+        group_by: Agrupamento dos resumos: 'instance_type', 'availability_zone' ou 'tag:<chave>'
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
         
     Returns:
         JSON com análise comparativa de performance da frota
@@ -277,34 +296,73 @@ def analyze_ec2_fleet_performance(tag_key: Optional[str] = None, tag_value: Opti
                 'Values': [tag_key]
             })
         
-        instances_response = ec2_client.describe_instances(Filters=filters)
+        max_instances = max(1, min(max_instances, MAX_FLEET_INSTANCES))
         
-        # Extrair informações das instâncias
-        instances = []
-        for reservation in instances_response.get('Reservations', []):
-            for instance in reservation.get('Instances', []):
-                if len(instances) >= max_instances:
-                    break
-                instances.append({
-                    'instance_id': instance.get('InstanceId'),
-                    'instance_type': instance.get('InstanceType'),
-                    'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
-                    'tags': {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
-                })
+        # Definir período de análise
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=hours)
+        
+        # Métricas principais para análise de frota
+        key_metrics = ['CPUUtilization', 'NetworkIn', 'NetworkOut']
+        
+        def report_outlier(outlier: Dict[str, Any]) -> None:
+            print(f"Outlier detectado: {outlier['instance_id']} ({outlier['type']}: {outlier['value']:.1f}%)")
+        
+        aggregator = FleetPerformanceAggregator(key_metrics, group_by=group_by, on_outlier=report_outlier)
+        engine = MetricQueryEngine(cloudwatch)
         
-        if not instances:
-            return json.dumps({
+        # Cada bloco de instâncias cabe em uma requisição GetMetricData
+        chunk_size = MetricQueryEngine.MAX_QUERIES_PER_REQUEST // len(key_metrics)
+        
+        def fetch_chunk(chunk: List[Dict[str, Any]]):
+            queries = [
+                MetricQuery(metric_name, {'InstanceId': instance['instance_id']}, stat='Average', period=3600)  # 1 hora
+                for instance in chunk
+                for metric_name in key_metrics
+            ]
+            return chunk, metric_cache.fetch(engine, queries, start_time, end_time)
+        
+        def consume(chunk: List[Dict[str, Any]], series: List[Any]) -> None:
+            for index, instance in enumerate(chunk):
+                instance_metrics = {}
+                for offset, metric_name in enumerate(key_metrics):
+                    metric_series = series[index * len(key_metrics) + offset]
+                    if metric_series.error:
+                        print(f"Erro ao buscar {metric_name} para {instance['instance_id']}: {metric_series.error}")
+                        instance_metrics[metric_name] = {"error": metric_series.error}
+                    elif not metric_series.empty:
+                        instance_metrics[metric_name] = {
+                            "average": metric_series.mean(),
+                            "maximum": metric_series.max(),
+                            "minimum": metric_series.min(),
+                            "data_points": len(metric_series)
+                        }
+                    else:
+                        instance_metrics[metric_name] = None
+                aggregator.add_instance(instance, instance_metrics)
+        
+        # Pipeline: páginas do describe_instances -> blocos -> GetMetricData em paralelo
+        # -> agregação. No máximo FLEET_PIPELINE_WORKERS blocos ficam em memória ao mesmo tempo.
+        with ThreadPoolExecutor(max_workers=FLEET_PIPELINE_WORKERS) as executor:
+            pending = set()
+            for chunk in _iter_instance_chunks(ec2_client, filters, max_instances, chunk_size):
+                pending.add(executor.submit(contextvars.copy_context().run, fetch_chunk, chunk))
+                if len(pending) >= FLEET_PIPELINE_WORKERS:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        consume(*future.result())
+            for future in as_completed(pending):
+                consume(*future.result())
+        
+        if not aggregator.instances_seen:
+            return to_json({
                 "message": "Nenhuma instância encontrada com os filtros especificados",
                 "filters_applied": {
                     "tag_key": tag_key,
                     "tag_value": tag_value,
                     "state": "running"
                 }
-            }, ensure_ascii=False, indent=2)
-        
-        # Definir período de análise
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(hours=hours)
+            })
         
         fleet_analysis = {
             "analysis_timestamp": datetime.utcnow().isoformat(),
@@ -314,74 +372,27 @@ def analyze_ec2_fleet_performance(tag_key: Optional[str] = None, tag_value: Opti
                 "hours": hours
             },
             "fleet_summary": {
-                "total_instances_analyzed": len(instances),
-                "instance_types": list(set(i['instance_type'] for i in instances)),
-                "availability_zones": list(set(i['availability_zone'] for i in instances))
+                "total_instances_analyzed": aggregator.instances_seen,
+                "instance_types": sorted(t for t in aggregator.instance_types if t),
+                "availability_zones": sorted(z for z in aggregator.availability_zones if z),
+                "cloudwatch_requests": engine.requests_made,
+                "metric_errors": aggregator.errors
             },
-            "instances_performance": [],
+            # Amostra limitada: a frota completa está resumida em fleet_insights
+            "instances_performance": aggregator.sample,
             "fleet_insights": {},
             "recommendations": []
         }
         
-        # Métricas principais para análise de frota
-        key_metrics = ['CPUUtilization', 'NetworkIn', 'NetworkOut']
-        
-        # Coletar dados de cada instância
-        for instance in instances:
-            instance_id = instance['instance_id']
-            print(f"Analisando instância: {instance_id}")
-            
-            instance_metrics = {
-                "instance_id": instance_id,
-                "instance_type": instance['instance_type'],
-                "availability_zone": instance['availability_zone'],
-                "metrics": {}
-            }
-            
-            for metric_name in key_metrics:
-                try:
-                    response = cloudwatch.get_metric_statistics(
-                        Namespace='AWS/EC2',
-                        MetricName=metric_name,
-                        Dimensions=[
-                            {
-                                'Name': 'InstanceId',
-                                'Value': instance_id
-                            }
-                        ],
-                        StartTime=start_time,
-                        EndTime=end_time,
-                        Period=3600,  # 1 hora
-                        Statistics=['Average']
-                    )
-                    
-                    datapoints = response.get('Datapoints', [])
-                    if datapoints:
-                        averages = [dp['Average'] for dp in datapoints]
-                        instance_metrics["metrics"][metric_name] = {
-                            "average": mean(averages),
-                            "maximum": max(averages),
-                            "minimum": min(averages),
-                            "data_points": len(datapoints)
-                        }
-                    else:
-                        instance_metrics["metrics"][metric_name] = None
-                        
-                except Exception as e:
-                    print(f"Erro ao buscar {metric_name} para {instance_id}: {e}")
-                    instance_metrics["metrics"][metric_name] = {"error": str(e)}
-            
-            fleet_analysis["instances_performance"].append(instance_metrics)
-        
         # Gerar insights da frota
-        fleet_insights = _generate_fleet_insights(fleet_analysis["instances_performance"])
+        fleet_insights = _generate_fleet_insights(aggregator)
         fleet_analysis["fleet_insights"] = fleet_insights
         
         # Gerar recomendações
         fleet_analysis["recommendations"] = _generate_fleet_recommendations(fleet_insights)
         
-        print(f"Análise da frota concluída: {len(instances)} instâncias")
-        return json.dumps(fleet_analysis, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        print(f"Análise da frota concluída: {aggregator.instances_seen} instâncias")
+        return to_json(fleet_analysis, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
         import traceback
@@ -389,25 +400,67 @@ def analyze_ec2_fleet_performance(tag_key: Optional[str] = None, tag_value: Opti
         print(f"Erro na análise da frota: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro na análise de performance da frota",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique permissões EC2 e CloudWatch"
-        }, ensure_ascii=False, indent=2)
+        })
+
+
+def _iter_instance_chunks(ec2_client, filters: List[Dict[str, Any]], max_instances: int,
+                          chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Percorre o describe_instances paginado e entrega as instâncias em blocos."""
+    chunk = []
+    seen = 0
+    paginator = ec2_client.get_paginator('describe_instances')
+    for page in paginator.paginate(Filters=filters):
+        for reservation in page.get('Reservations', []):
+            for instance in reservation.get('Instances', []):
+                if seen >= max_instances:
+                    break
+                seen += 1
+                chunk.append({
+                    'instance_id': instance.get('InstanceId'),
+                    'instance_type': instance.get('InstanceType'),
+                    'availability_zone': instance.get('Placement', {}).get('AvailabilityZone'),
+                    'tags': {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+                })
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if seen >= max_instances:
+            break
+    if chunk:
+        yield chunk
 
 
-def get_network_traffic_analysis(instance_id: str, days: int = 7) -> str:
+def get_network_traffic_analysis(instance_id: Optional[str] = None, days: int = 7,
+                                 top_n: int = 20, order_by: str = "NetworkOut",
+                                 fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """
-    Análise específica de tráfego de rede de uma instância EC2.
+    Análise específica de tráfego de rede de uma instância EC2 ou da frota inteira.
+    
+    Sem instance_id, executa o modo frota: uma única consulta CloudWatch Metrics
+    Insights retorna as top_n instâncias com maior tráfego (top talkers), sem uma
+    chamada por instância. O período de agregação é escolhido automaticamente
+    pela janela para manter poucas amostras por série.
     
     Args:
-        instance_id: ID da instância EC2
-        days: Número de dias para análise (padrão: 7)
+        instance_id: ID da instância EC2 (opcional; sem ele, analisa a frota)
+        days: Número de dias para análise (padrão: 7; no modo frota, máximo 14)
+        top_n: Número de instâncias no ranking do modo frota (padrão: 20, máximo 500)
+        order_by: Métrica do ranking no modo frota ('NetworkOut', 'NetworkIn',
+                  'NetworkPacketsOut' ou 'NetworkPacketsIn')
+        fields: Campos a retornar, separados por vírgula, com '.' para campos aninhados (opcional)
+        max_bytes: Tamanho máximo da resposta em bytes; o excedente é truncado (opcional)
         
     Returns:
         JSON com análise detalhada de tráfego de rede
     """
+    if not instance_id:
+        return _analyze_fleet_network_traffic(days, top_n, order_by, fields, max_bytes)
+    
     print(f"ANALISANDO TRÁFEGO DE REDE - Instância: {instance_id}, Período: {days} dias")
     
     try:
@@ -418,13 +471,15 @@ def get_network_traffic_analysis(instance_id: str, days: int = 7) -> str:
         # Definir período de análise
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(days=days)
+        period = choose_period(start_time, end_time)
         
         network_analysis = {
             "instance_id": instance_id,
             "analysis_period": {
                 "start_time": start_time.isoformat(),
                 "end_time": end_time.isoformat(),
-                "days": days
+                "days": days,
+                "period_seconds": period
             },
             "traffic_metrics": {},
             "bandwidth_analysis": {},
@@ -440,65 +495,60 @@ def get_network_traffic_analysis(instance_id: str, days: int = 7) -> str:
             'NetworkPacketsOut': 'Pacotes de saída'
         }
         
-        for metric_name, description in network_metrics.items():
-            try:
-                response = cloudwatch.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName=metric_name,
-                    Dimensions=[
-                        {
-                            'Name': 'InstanceId',
-                            'Value': instance_id
-                        }
-                    ],
-                    StartTime=start_time,
-                    EndTime=end_time,
-                    Period=3600,  # 1 hora
-                    Statistics=['Sum', 'Average', 'Maximum']
-                )
+        # Buscar todas as métricas e estatísticas em uma única requisição GetMetricData
+        # (apenas os buckets que ainda não estão no cache)
+        dimensions = {'InstanceId': instance_id}
+        stats = ['Sum', 'Average', 'Maximum']
+        queries = [
+            MetricQuery(metric_name, dimensions, stat=stat, period=period)
+            for metric_name in network_metrics
+            for stat in stats
+        ]
+        series = metric_cache.fetch(MetricQueryEngine(cloudwatch), queries, start_time, end_time)
+        
+        for index, (metric_name, description) in enumerate(network_metrics.items()):
+            sum_series, average_series, maximum_series = series[index * 3:index * 3 + 3]
+            
+            if sum_series.error:
+                print(f"Erro ao buscar {metric_name}: {sum_series.error}")
+                network_analysis["traffic_metrics"][metric_name] = {"error": sum_series.error}
+                continue
+            
+            if not sum_series.empty:
+                # Calcular estatísticas de tráfego
+                total_transfer = sum_series.sum()
+                # Normalizar para valores por hora, qualquer que seja o período escolhido
+                average_hourly = sum_series.mean() * 3600 / period
+                peak_hourly = sum_series.max() * 3600 / period
+                average_rate = average_series.mean() if not average_series.empty else 0.0
+                peak_rate = maximum_series.max() if not maximum_series.empty else 0.0
                 
-                datapoints = response.get('Datapoints', [])
-                if datapoints:
-                    # Ordenar por timestamp
-                    datapoints.sort(key=lambda x: x['Timestamp'])
-                    
-                    sums = [dp['Sum'] for dp in datapoints]
-                    averages = [dp['Average'] for dp in datapoints]
-                    maximums = [dp['Maximum'] for dp in datapoints]
-                    
-                    # Calcular estatísticas de tráfego
-                    total_transfer = sum(sums)
-                    
-                    metric_data = {
-                        "description": description,
-                        "unit": datapoints[0].get('Unit', ''),
-                        "total_transfer": total_transfer,
-                        "average_hourly": mean(sums),
-                        "peak_hourly": max(sums),
-                        "average_rate": mean(averages),
-                        "peak_rate": max(maximums),
-                        "data_points": len(datapoints)
-                    }
-                    
-                    # Converter para unidades mais legíveis se for bytes
-                    if 'Bytes' in metric_data["unit"]:
-                        metric_data["total_transfer_gb"] = total_transfer / (1024**3)
-                        metric_data["average_hourly_gb"] = mean(sums) / (1024**3)
-                        metric_data["peak_hourly_gb"] = max(sums) / (1024**3)
-                        metric_data["average_rate_mbps"] = mean(averages) * 8 / (1024**2)
-                        metric_data["peak_rate_mbps"] = max(maximums) * 8 / (1024**2)
-                    
-                    network_analysis["traffic_metrics"][metric_name] = metric_data
-                    
-                else:
-                    network_analysis["traffic_metrics"][metric_name] = {
-                        "status": "no_data",
-                        "message": f"Nenhum dado encontrado para {metric_name}"
-                    }
-                    
-            except Exception as e:
-                print(f"Erro ao buscar {metric_name}: {e}")
-                network_analysis["traffic_metrics"][metric_name] = {"error": str(e)}
+                metric_data = {
+                    "description": description,
+                    "unit": EC2_METRIC_UNITS.get(metric_name, ''),
+                    "total_transfer": total_transfer,
+                    "average_hourly": average_hourly,
+                    "peak_hourly": peak_hourly,
+                    "average_rate": average_rate,
+                    "peak_rate": peak_rate,
+                    "data_points": len(sum_series)
+                }
+                
+                # Converter para unidades mais legíveis se for bytes
+                if 'Bytes' in metric_data["unit"]:
+                    metric_data["total_transfer_gb"] = total_transfer / (1024**3)
+                    metric_data["average_hourly_gb"] = average_hourly / (1024**3)
+                    metric_data["peak_hourly_gb"] = peak_hourly / (1024**3)
+                    metric_data["average_rate_mbps"] = average_rate * 8 / (1024**2)
+                    metric_data["peak_rate_mbps"] = peak_rate * 8 / (1024**2)
+                
+                network_analysis["traffic_metrics"][metric_name] = metric_data
+            
+            else:
+                network_analysis["traffic_metrics"][metric_name] = {
+                    "status": "no_data",
+                    "message": f"Nenhum dado encontrado para {metric_name}"
+                }
         
         # Análise de bandwidth
         network_in = network_analysis["traffic_metrics"].get("NetworkIn", {})
@@ -524,7 +574,7 @@ def get_network_traffic_analysis(instance_id: str, days: int = 7) -> str:
         network_analysis["recommendations"] = _generate_network_recommendations(network_analysis)
         
         print(f"Análise de tráfego concluída para {instance_id}")
-        return json.dumps(network_analysis, cls=JsonEncoder, ensure_ascii=False, indent=2)
+        return to_json(network_analysis, fields=fields, max_bytes=max_bytes)
         
     except Exception as e:
         import traceback
@@ -532,12 +582,137 @@ def get_network_traffic_analysis(instance_id: str, days: int = 7) -> str:
         print(f"Erro na análise de tráfego: {e}")
         print(f"Traceback:\n{tb}")
         
-        return json.dumps({
+        return to_json({
             "error": f"Erro na análise de tráfego para instância {instance_id}",
             "details": str(e),
             "traceback": tb,
             "suggestion": "Verifique se a instância existe e permissões CloudWatch"
-        }, ensure_ascii=False, indent=2)
+        })
+
+
+def _analyze_fleet_network_traffic(days: int, top_n: int, order_by: str,
+                                   fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
+    """
+    Ranking das instâncias com maior tráfego de rede via CloudWatch Metrics Insights.
+    
+    Args:
+        days: Número de dias para análise (máximo 14, limite do Metrics Insights)
+        top_n: Número de instâncias no ranking
+        order_by: Métrica usada no ranking
+    
+    Returns:
+        JSON com as instâncias de maior tráfego e o resumo do ranking
+    """
+    print(f"ANALISANDO TRÁFEGO DE REDE DA FROTA - Top {top_n} por {order_by}, Período: {days} dias")
+    
+    if order_by not in FLEET_NETWORK_METRICS:
+        return to_json({
+            "error": f"Métrica de ordenação inválida: {order_by}",
+            "valid_metrics": list(FLEET_NETWORK_METRICS)
+        })
+    
+    try:
+        cost_explorer = CostExplorer()
+        session = cost_explorer.aws_client.session
+        cloudwatch = session.client('cloudwatch')
+        
+        # Definir período de análise
+        requested_days = days
+        days = max(1, min(days, MetricInsightsQuery.MAX_WINDOW_DAYS))
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=days)
+        period = choose_period(start_time, end_time)
+        
+        query = MetricInsightsQuery.top_n(order_by, group_by='InstanceId', aggregate='SUM',
+                                          limit=top_n, period=period)
+        engine = MetricQueryEngine(cloudwatch)
+        series = engine.fetch_insights(query, start_time, end_time)
+        
+        unit = EC2_METRIC_UNITS.get(order_by, '')
+        is_bytes = unit == 'Bytes'
+        totals = np.array([s.sum() or 0.0 for s in series], dtype=np.float64)
+        ranking_total = float(totals.sum())
+        hours = days * 24
+        
+        top_talkers = []
+        for rank, (metric_series, total) in enumerate(zip(series, totals), start=1):
+            talker = {
+                "rank": rank,
+                "instance_id": metric_series.label,
+                "total": float(total),
+                "share_of_ranking_percent": round(float(total) / ranking_total * 100, 2) if ranking_total else 0.0,
+                "peak_per_period": metric_series.max(),
+                "data_points": len(metric_series)
+            }
+            if is_bytes:
+                talker["total_gb"] = round(float(total) / (1024**3), 3)
+                talker["average_rate_mbps"] = round(float(total) * 8 / (1024**2) / (hours * 3600), 3)
+                talker["peak_rate_mbps"] = round((metric_series.max() or 0.0) * 8 / (1024**2) / period, 3)
+            top_talkers.append(talker)
+        
+        fleet_network = {
+            "mode": "fleet",
+            "analysis_period": {
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat(),
+                "days": days,
+                "period_seconds": period
+            },
+            "ranking": {
+                "metric": order_by,
+                "description": FLEET_NETWORK_METRICS[order_by],
+                "unit": unit,
+                "top_n": top_n,
+                "instances_returned": len(top_talkers),
+                "query": query.expression,
+                "cloudwatch_requests": engine.requests_made
+            },
+            "top_talkers": top_talkers,
+            "summary": {
+                "ranking_total": ranking_total
+            },
+            "cost_implications": {},
+            "recommendations": []
+        }
+        
+        if requested_days != days:
+            fleet_network["analysis_period"]["note"] = (
+                f"Janela reduzida de {requested_days} para {days} dias (limite do CloudWatch Metrics Insights)"
+            )
+        
+        if is_bytes:
+            ranking_gb = ranking_total / (1024**3)
+            fleet_network["summary"]["ranking_total_gb"] = round(ranking_gb, 3)
+            fleet_network["summary"]["daily_average_gb"] = round(ranking_gb / days, 3)
+            if top_talkers:
+                top_share = top_talkers[0]["share_of_ranking_percent"]
+                fleet_network["summary"]["top_talker_share_percent"] = top_share
+        
+        if order_by == 'NetworkOut' and is_bytes:
+            # Mesma premissa do modo instância: tráfego de saída semanal extrapolado para o mês
+            weekly_outbound_gb = ranking_total / (1024**3) * 7 / days
+            fleet_network["cost_implications"] = _calculate_network_costs({"total_outbound_gb": weekly_outbound_gb})
+            fleet_network["cost_implications"]["note"] = (
+                "Estimativa para as instâncias do ranking, baseada em tráfego de saída para internet"
+            )
+        
+        fleet_network["recommendations"] = _generate_fleet_network_recommendations(fleet_network)
+        
+        print(f"Análise de tráfego da frota concluída: {len(top_talkers)} instâncias no ranking")
+        return to_json(fleet_network, fields=fields, max_bytes=max_bytes)
+    
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        print(f"Erro na análise de tráfego da frota: {e}")
+        print(f"Traceback:\n{tb}")
+        
+        return to_json({
+            "error": "Erro na análise de tráfego da frota",
+            "details": str(e),
+            "traceback": tb,
+            "suggestion": "Verifique permissões CloudWatch (cloudwatch:GetMetricData) e se o Metrics Insights está disponível na região"
+        })
 
 
 def _assess_cpu_usage(avg_cpu: float) -> str:
@@ -580,68 +755,41 @@ def _generate_performance_recommendations(performance_data: Dict[str, Any]) -> L
     return recommendations
 
 
-def _generate_fleet_insights(instances_performance: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Gera insights da análise de frota."""
+def _generate_fleet_insights(aggregator: FleetPerformanceAggregator) -> Dict[str, Any]:
+    """Gera insights da análise de frota a partir dos resumos em streaming."""
     insights = {
         "cpu_statistics": {},
         "network_statistics": {},
-        "performance_outliers": []
+        "performance_outliers": aggregator.outliers(),
+        "outlier_counts": dict(aggregator.outlier_counts),
+        "groups": {
+            "group_by": aggregator.group_by,
+            "statistics": aggregator.group_statistics()
+        }
     }
     
-    # Coletar dados de CPU de todas as instâncias
-    cpu_values = []
-    network_in_values = []
-    network_out_values = []
-    
-    for instance in instances_performance:
-        cpu_metric = instance.get("metrics", {}).get("CPUUtilization")
-        network_in_metric = instance.get("metrics", {}).get("NetworkIn") 
-        network_out_metric = instance.get("metrics", {}).get("NetworkOut")
-        
-        if cpu_metric and cpu_metric.get("average") is not None:
-            cpu_values.append(cpu_metric["average"])
-            
-            # Identificar outliers de CPU
-            if cpu_metric["average"] > 90:
-                insights["performance_outliers"].append({
-                    "instance_id": instance["instance_id"],
-                    "type": "high_cpu",
-                    "value": cpu_metric["average"],
-                    "severity": "HIGH"
-                })
-            elif cpu_metric["average"] < 5:
-                insights["performance_outliers"].append({
-                    "instance_id": instance["instance_id"],
-                    "type": "low_cpu", 
-                    "value": cpu_metric["average"],
-                    "severity": "LOW"
-                })
-        
-        if network_in_metric and network_in_metric.get("average") is not None:
-            network_in_values.append(network_in_metric["average"])
-        
-        if network_out_metric and network_out_metric.get("average") is not None:
-            network_out_values.append(network_out_metric["average"])
-    
     # Calcular estatísticas da frota
-    if cpu_values:
+    cpu = aggregator.fleet['CPUUtilization']
+    if cpu.count:
         insights["cpu_statistics"] = {
-            "fleet_average_cpu": round(mean(cpu_values), 2),
-            "fleet_median_cpu": round(median(cpu_values), 2),
-            "fleet_max_cpu": round(max(cpu_values), 2),
-            "fleet_min_cpu": round(min(cpu_values), 2),
-            "instances_analyzed": len(cpu_values)
+            "fleet_average_cpu": round(cpu.mean, 2),
+            "fleet_median_cpu": round(cpu.digest.quantile(0.5), 2),
+            "fleet_p90_cpu": round(cpu.digest.quantile(0.9), 2),
+            "fleet_p99_cpu": round(cpu.digest.quantile(0.99), 2),
+            "fleet_max_cpu": round(cpu.max, 2),
+            "fleet_min_cpu": round(cpu.min, 2),
+            "instances_analyzed": cpu.count
         }
     
-    if network_in_values and network_out_values:
-        total_network_in = sum(network_in_values)
-        total_network_out = sum(network_out_values)
-        
+    network_in = aggregator.fleet['NetworkIn']
+    network_out = aggregator.fleet['NetworkOut']
+    if network_in.count and network_out.count:
         insights["network_statistics"] = {
-            "fleet_total_inbound": total_network_in,
-            "fleet_total_outbound": total_network_out,
-            "fleet_total_traffic": total_network_in + total_network_out,
-            "average_instance_traffic": (total_network_in + total_network_out) / len(network_in_values)
+            "fleet_total_inbound": network_in.total,
+            "fleet_total_outbound": network_out.total,
+            "fleet_total_traffic": network_in.total + network_out.total,
+            "average_instance_traffic": (network_in.total + network_out.total) / network_in.count,
+            "p95_instance_outbound": network_out.digest.quantile(0.95)
         }
     
     return insights
@@ -659,9 +807,10 @@ def _generate_fleet_recommendations(fleet_insights: Dict[str, Any]) -> List[str]
     elif fleet_avg_cpu > 75:
         recommendations.append("Frota com CPU alta - monitore performance e considere upgrades")
     
-    outliers = fleet_insights.get("performance_outliers", [])
-    high_cpu_count = len([o for o in outliers if o["type"] == "high_cpu"])
-    low_cpu_count = len([o for o in outliers if o["type"] == "low_cpu"])
+    # Contagens exatas (a lista de outliers é limitada aos mais extremos)
+    outlier_counts = fleet_insights.get("outlier_counts", {})
+    high_cpu_count = outlier_counts.get("high_cpu", 0)
+    low_cpu_count = outlier_counts.get("low_cpu", 0)
     
     if high_cpu_count > 0:
         recommendations.append(f"{high_cpu_count} instância(s) com CPU crítica - priorize otimização")
@@ -712,4 +861,23 @@ def _generate_network_recommendations(network_data: Dict[str, Any]) -> List[str]
     if outbound_traffic > 50:
         recommendations.append("Considere usar CloudFront para reduzir custos de bandwidth")
     
-    return recommendations 
\ No newline at end of file
+    return recommendations 
+
+def _generate_fleet_network_recommendations(fleet_network: Dict[str, Any]) -> List[str]:
+    """Gera recomendações baseadas no ranking de tráfego da frota."""
+    recommendations = []
+    
+    summary = fleet_network.get("summary", {})
+    cost_implications = fleet_network.get("cost_implications", {})
+    top_share = summary.get("top_talker_share_percent", 0)
+    
+    if top_share > 50:
+        recommendations.append("Uma única instância concentra mais da metade do tráfego do ranking - investigue a origem desse tráfego")
+    
+    if summary.get("daily_average_gb", 0) > 100:
+        recommendations.append("Alto volume diário de tráfego nas instâncias do ranking - avalie CloudFront, VPC endpoints ou compressão")
+    
+    if cost_implications.get("cost_category") == "alto":
+        recommendations.append("Custos altos de transferência de dados - analise as top talkers individualmente com instance_id")
+    
+    return recommendations
@@ -0,0 +1,231 @@
+"""
+Paginação por cursor para ferramentas com resultados grandes.
+
+Na primeira chamada a ferramenta varre a AWS, devolve a primeira página e guarda
+o resultado completo num snapshot em memória. O cursor retornado ('next_cursor')
+é opaco e aponta para o snapshot e a posição da próxima página; as páginas
+seguintes são servidas do snapshot, sem nenhuma chamada à AWS.
+
+Os snapshots expiram após o TTL e o total guardado é limitado em quantidade e
+em bytes: ao exceder, os snapshots usados há mais tempo são descartados.
+"""
+
+import base64
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+from src.ia.tools.response import encode
+
+
+class CursorError(ValueError):
+    """Cursor inválido, de outra ferramenta ou cujo snapshot já expirou."""
+
+
+class _Snapshot:
+    """Resultado completo de uma consulta, dividido em seções paginadas."""
+    
+    __slots__ = ('tool', 'sections', 'page_size', 'context', 'size', 'expires_at')
+    
+    def __init__(self, tool: str, sections: Dict[str, List[Any]], page_size: int,
+                 context: Dict[str, Any], size: int, expires_at: float):
+        self.tool = tool
+        self.sections = sections
+        self.page_size = page_size
+        self.context = context
+        self.size = size
+        self.expires_at = expires_at
+
+
+def _env_number(name: str, default: int) -> int:
+    value = os.environ.get(name, '').strip()
+    return int(value) if value.isdigit() and int(value) > 0 else default
+
+
+class ResultSnapshots:
+    """
+    Armazena snapshots de resultados com TTL e limites de memória.
+    
+    Cada snapshot tem uma ou mais seções (listas) paginadas juntas: a página N
+    traz os itens [N * page_size, (N + 1) * page_size) de cada seção. Assim,
+    ferramentas com várias categorias (ex: recursos órfãos) avançam todas as
+    categorias com um único cursor.
+    """
+    
+    def __init__(self, ttl_seconds: Optional[int] = None, max_snapshots: int = 64,
+                 max_bytes: Optional[int] = None):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            ttl_seconds: Validade dos snapshots (padrão: CLOUD_INSIGHTS_CURSOR_TTL ou 900s)
+            max_snapshots: Número máximo de snapshots guardados
+            max_bytes: Tamanho total máximo em bytes JSON (padrão: CLOUD_INSIGHTS_CURSOR_MAX_BYTES ou 32 MB)
+        """
+        self.ttl_seconds = ttl_seconds or _env_number('CLOUD_INSIGHTS_CURSOR_TTL', 900)
+        self.max_snapshots = max_snapshots
+        self.max_bytes = max_bytes or _env_number('CLOUD_INSIGHTS_CURSOR_MAX_BYTES', 32 * 1024 * 1024)
+        self._snapshots: 'OrderedDict[str, _Snapshot]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.pages_served = 0
+        self.cursor_misses = 0
+        self.expired = 0
+        self.evicted = 0
+    
+    @staticmethod
+    def _encode_cursor(snapshot_id: str, offset: int) -> str:
+        raw = f"{snapshot_id}:{offset}".encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+            snapshot_id, offset = raw.rsplit(':', 1)
+            return snapshot_id, int(offset)
+        except (ValueError, UnicodeDecodeError):
+            raise CursorError("Cursor inválido") from None
+    
+    def _purge_expired(self, now: float) -> None:
+        for snapshot_id in [sid for sid, snap in self._snapshots.items() if snap.expires_at <= now]:
+            self._bytes -= self._snapshots.pop(snapshot_id).size
+            self.expired += 1
+    
+    def create(self, tool: str, sections: Dict[str, List[Any]], page_size: int,
+               context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Guarda o resultado completo se ele tiver mais de uma página.
+        
+        Args:
+            tool: Nome da ferramenta (o cursor só vale para ela)
+            sections: Listas completas, por nome de seção
+            page_size: Itens por página em cada seção (a primeira página já foi entregue)
+            context: Dados fixos usados para montar as páginas seguintes
+        
+        Returns:
+            Cursor da segunda página, ou None se tudo coube na primeira ou o resultado
+            é grande demais para o limite de memória
+        """
+        page_size = max(int(page_size), 1)
+        if not any(len(items) > page_size for items in sections.values()):
+            return None
+        
+        size = len(encode({'sections': sections, 'context': context or {}}).encode('utf-8'))
+        if size > self.max_bytes:
+            print(f"⚠️  Resultado de {tool} ({size} bytes) excede o limite de snapshots; sem cursor")
+            return None
+        
+        snapshot_id = secrets.token_urlsafe(12)
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            self._snapshots[snapshot_id] = _Snapshot(tool, sections, page_size, context or {},
+                                                     size, now + self.ttl_seconds)
+            self._bytes += size
+            self.created += 1
+            while len(self._snapshots) > self.max_snapshots or self._bytes > self.max_bytes:
+                _, evicted = self._snapshots.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evicted += 1
+        return self._encode_cursor(snapshot_id, page_size)
+    
+    def page(self, tool: str, cursor: str) -> Tuple[Dict[str, List[Any]], Dict[str, Any], Dict[str, Any]]:
+        """
+        Retorna a página apontada pelo cursor.
+        
+        Args:
+            tool: Nome da ferramenta que está consumindo o cursor
+            cursor: Cursor retornado pela chamada anterior
+        
+        Returns:
+            Tupla (itens da página por seção, metadados de paginação, contexto do snapshot)
+        
+        Raises:
+            CursorError: Cursor inválido, de outra ferramenta ou expirado
+        """
+        snapshot_id, offset = self._decode_cursor(cursor)
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            snapshot = self._snapshots.get(snapshot_id)
+            if snapshot is None:
+                self.cursor_misses += 1
+                raise CursorError("Cursor expirado ou desconhecido; execute a consulta novamente sem cursor")
+            if snapshot.tool != tool:
+                raise CursorError(f"Cursor pertence à ferramenta {snapshot.tool}, não a {tool}")
+            self._snapshots.move_to_end(snapshot_id)
+            self.pages_served += 1
+        
+        end = offset + snapshot.page_size
+        pages = {name: items[offset:end] for name, items in snapshot.sections.items()}
+        has_more = any(len(items) > end for items in snapshot.sections.values())
+        meta = {
+            'offset': offset,
+            'page_size': snapshot.page_size,
+            'totals': {name: len(items) for name, items in snapshot.sections.items()},
+            'next_cursor': self._encode_cursor(snapshot_id, end) if has_more else None,
+            'expires_in_seconds': int(snapshot.expires_at - now),
+            'from_snapshot': True
+        }
+        return pages, meta, snapshot.context
+    
+    def first_page_meta(self, sections: Dict[str, List[Any]], page_size: int,
+                        next_cursor: Optional[str]) -> Dict[str, Any]:
+        """Metadados de paginação da primeira página (a que foi buscada na AWS)."""
+        return {
+            'offset': 0,
+            'page_size': page_size,
+            'totals': {name: len(items) for name, items in sections.items()},
+            'next_cursor': next_cursor,
+            'expires_in_seconds': self.ttl_seconds if next_cursor else None,
+            'from_snapshot': False
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso dos snapshots."""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                'snapshots': len(self._snapshots),
+                'bytes': self._bytes,
+                'created': self.created,
+                'pages_served': self.pages_served,
+                'cursor_misses': self.cursor_misses,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
+    
+    def clear(self) -> None:
+        """Remove todos os snapshots."""
+        with self._lock:
+            self._snapshots.clear()
+            self._bytes = 0
+
+
+# Snapshots compartilhados pelas ferramentas do processo
+result_snapshots = ResultSnapshots()
+
+
+def paginate(tool: str, sections: Dict[str, List[Any]], page_size: int,
+             context: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, List[Any]], Dict[str, Any]]:
+    """
+    Corta a primeira página de cada seção e guarda o restante para o cursor.
+    
+    Args:
+        tool: Nome da ferramenta
+        sections: Listas completas, por nome de seção
+        page_size: Itens por página (o 'limit' da ferramenta)
+        context: Dados fixos usados para montar as páginas seguintes
+    
+    Returns:
+        Tupla (primeira página por seção, metadados de paginação para '_pagination')
+    """
+    page_size = max(int(page_size), 1)
+    cursor = result_snapshots.create(tool, sections, page_size, context)
+    pages = {name: items[:page_size] for name, items in sections.items()}
+    return pages, result_snapshots.first_page_meta(sections, page_size, cursor)
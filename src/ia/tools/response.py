@@ -0,0 +1,272 @@
+"""
+Camada de resposta das ferramentas: serialização compacta, projeção de campos
+e limite de tamanho.
+
+Todas as ferramentas retornam JSON via to_json(). Por padrão a saída é compacta
+(sem indentação, que além de gastar bytes e tokens obriga o json a usar o
+encoder em Python puro); CLOUD_INSIGHTS_PRETTY_JSON=1 volta ao formato indentado
+e CLOUD_INSIGHTS_MAX_RESPONSE_BYTES define um limite padrão de tamanho.
+
+Dentro de uma execução de ferramenta contabilizada (aws_call_scope), o resumo das
+chamadas à AWS feitas até ali entra em '_meta.aws_calls' (respostas em lista passam
+a {'items': [...], '_meta': {...}}, como no truncamento).
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from src.clouds.aws.utils import json_default
+from src.telemetry.aws_calls import current_tool_ledger, meta_enabled
+
+# Metadados HTTP das respostas boto3: nunca interessam a quem consome as ferramentas
+DROPPED_KEYS = ('ResponseMetadata',)
+
+# Chaves da raiz mantidas em qualquer projeção (o cursor da próxima página, por exemplo)
+KEPT_KEYS = ('_pagination',)
+
+# Espaço reservado para as anotações de truncamento ao calcular o orçamento
+_TRUNCATION_OVERHEAD = 256
+
+# Orçamentos menores que isso não comportariam nem as anotações de truncamento
+MIN_MAX_BYTES = 512
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name, '').strip()
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+_options: ContextVar[Dict[str, Any]] = ContextVar('response_options', default={})
+
+
+@contextmanager
+def response_options(fields: Optional[str] = None, max_bytes: Optional[int] = None,
+                     pretty: Optional[bool] = None) -> Iterator[None]:
+    """
+    Define opções de resposta para as ferramentas chamadas dentro do bloco.
+    
+    Args:
+        fields: Campos a manter (ver project())
+        max_bytes: Tamanho máximo da resposta em bytes
+        pretty: Saída indentada
+    """
+    current = dict(_options.get())
+    current.update({key: value for key, value in
+                    (('fields', fields), ('max_bytes', max_bytes), ('pretty', pretty)) if value is not None})
+    token = _options.set(current)
+    try:
+        yield
+    finally:
+        _options.reset(token)
+
+
+def encode(data: Any, pretty: bool = False) -> str:
+    """Serializa em JSON (Decimal/datetime/numpy aceitos), compacto ou indentado."""
+    if pretty:
+        return json.dumps(data, default=json_default, ensure_ascii=False, indent=2)
+    return json.dumps(data, default=json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def _strip(data: Any) -> Any:
+    """Remove chaves de metadados (DROPPED_KEYS) em qualquer nível."""
+    if isinstance(data, dict):
+        return {key: _strip(value) for key, value in data.items() if key not in DROPPED_KEYS}
+    if isinstance(data, list):
+        return [_strip(item) for item in data]
+    return data
+
+
+def project(data: Any, fields: str) -> Any:
+    """
+    Mantém apenas os campos pedidos.
+    
+    Args:
+        data: Dados da resposta
+        fields: Caminhos separados por vírgula, com '.' para campos aninhados; listas
+            são atravessadas automaticamente (ex: "services.service,services.cost,total_cost")
+    
+    Returns:
+        Dados projetados (com as chaves de KEPT_KEYS); caminhos inexistentes são listados em '_missing_fields'
+    """
+    tree: Dict[str, Any] = {}
+    for path in (part.strip() for part in fields.split(',')):
+        if not path:
+            continue
+        node = tree
+        for segment in path.split('.'):
+            node = node.setdefault(segment, {})
+    
+    missing: List[str] = []
+    
+    def apply(value: Any, node: Dict[str, Any], prefix: str) -> Any:
+        if not node:
+            return value
+        if isinstance(value, list):
+            return [apply(item, node, prefix) for item in value]
+        if not isinstance(value, dict):
+            return value
+        result = {}
+        for key, child in node.items():
+            if key in value:
+                result[key] = apply(value[key], child, f"{prefix}{key}.")
+            elif f"{prefix}{key}" not in missing:
+                missing.append(f"{prefix}{key}")
+        return result
+    
+    projected = apply(data, tree, '')
+    if isinstance(data, dict) and isinstance(projected, dict):
+        projected.update({key: data[key] for key in KEPT_KEYS if key in data and key not in projected})
+    if isinstance(data, list) and missing:
+        # Em listas, o campo só é "inexistente" se faltar em todos os itens
+        present = {key for item in data if isinstance(item, dict) for key in item}
+        missing = [path for path in missing if path.split('.')[0] not in present]
+    if missing and isinstance(projected, dict):
+        projected['_missing_fields'] = missing
+    return projected
+
+
+def _largest_container(data: Any) -> Tuple[Optional[str], Any]:
+    """
+    Escolhe o container a encurtar: a maior lista com mais de um item ou, sem
+    listas, o maior dicionário aninhado (as chaves da raiz nunca são removidas).
+    """
+    best = {list: [None, None, 0], dict: [None, None, 0]}
+    
+    def measure(value: Any, path: str) -> int:
+        # Tamanhos calculados de baixo para cima: só as folhas são serializadas
+        if isinstance(value, dict):
+            size = 2 + sum(len(str(key)) + 4 + measure(child, f"{path}.{key}" if path else str(key))
+                           for key, child in value.items())
+        elif isinstance(value, list):
+            size = 2 + sum(1 + measure(child, f"{path}[{index}]") for index, child in enumerate(value))
+        elif isinstance(value, str):
+            return len(value.encode('utf-8')) + 2
+        else:
+            return len(encode(value))
+        kind = dict if isinstance(value, dict) else list
+        if len(value) > 1 and size > best[kind][2] and (kind is list or path):
+            best[kind] = [path, value, size]
+        return size
+    
+    measure(data, '')
+    chosen = best[list] if best[list][1] is not None else best[dict]
+    return chosen[0], chosen[1]
+
+
+def fit_to_budget(data: Any, max_bytes: int) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Encurta a resposta até caber em max_bytes, de forma determinística.
+    
+    A cada passo, o maior container (lista ou dicionário com mais de um item) perde
+    os últimos itens necessários para cobrir o excesso, mantendo a ordem original
+    (as ferramentas já retornam os itens mais relevantes primeiro).
+    
+    Args:
+        data: Dados da resposta
+        max_bytes: Tamanho máximo em bytes (UTF-8)
+    
+    Returns:
+        Tupla (dados encurtados, lista de truncamentos {'path', 'kept', 'total'})
+    """
+    truncations: List[Dict[str, Any]] = []
+    # O original não é alterado: cada container encurtado é copiado antes
+    data = json.loads(encode(data))
+    
+    for _ in range(100):
+        size = len(encode(data).encode('utf-8'))
+        excess = size - (max_bytes - _TRUNCATION_OVERHEAD)
+        if excess <= 0:
+            break
+        path, container = _largest_container(data)
+        if container is None:
+            break
+        
+        values = list(container.values()) if isinstance(container, dict) else container
+        keep = len(values)
+        removed = 0
+        while keep > 1 and removed < excess:
+            keep -= 1
+            removed += len(encode(values[keep]).encode('utf-8')) + 1
+        
+        total = len(values)
+        if isinstance(container, dict):
+            for key in list(container.keys())[keep:]:
+                del container[key]
+        else:
+            del container[keep:]
+        
+        previous = next((t for t in truncations if t['path'] == (path or '$')), None)
+        if previous:
+            previous['kept'] = keep
+        else:
+            truncations.append({'path': path or '$', 'kept': keep, 'total': total})
+    
+    return data, truncations
+
+
+def _with_aws_calls(data: Any) -> Any:
+    """Acrescenta o resumo das chamadas à AWS da execução ativa em '_meta.aws_calls'."""
+    ledger = current_tool_ledger()
+    if ledger is None or not ledger.calls or not isinstance(data, (dict, list)) or not meta_enabled():
+        return data
+    if isinstance(data, list):
+        data = {'items': data}
+    meta = data.get('_meta')
+    meta = dict(meta) if isinstance(meta, dict) else {}
+    meta['aws_calls'] = ledger.meta()
+    return {**data, '_meta': meta}
+
+
+def to_json(data: Any, fields: Optional[str] = None, max_bytes: Optional[int] = None,
+            pretty: Optional[bool] = None) -> str:
+    """
+    Serializa a resposta de uma ferramenta aplicando projeção e limite de tamanho.
+    
+    Parâmetros não informados vêm de response_options() ou das variáveis de ambiente.
+    
+    Args:
+        data: Dados da resposta
+        fields: Campos a manter (ver project())
+        max_bytes: Tamanho máximo da resposta em bytes
+        pretty: Saída indentada em vez de compacta
+    
+    Returns:
+        String JSON
+    """
+    options = _options.get()
+    fields = fields if fields is not None else options.get('fields')
+    max_bytes = max_bytes if max_bytes is not None else options.get('max_bytes', _env_int('CLOUD_INSIGHTS_MAX_RESPONSE_BYTES'))
+    if pretty is None:
+        pretty = options.get('pretty', os.environ.get('CLOUD_INSIGHTS_PRETTY_JSON', '').lower() in ('1', 'true', 'yes'))
+    
+    data = _strip(data)
+    if fields and not (isinstance(data, dict) and 'error' in data):
+        data = project(data, fields)
+    data = _with_aws_calls(data)
+    
+    text = encode(data, pretty)
+    if not max_bytes or len(text.encode('utf-8')) <= max_bytes:
+        return text
+    max_bytes = max(max_bytes, MIN_MAX_BYTES)
+    
+    shortened, truncations = fit_to_budget(data, max_bytes)
+    if not isinstance(shortened, dict):
+        shortened = {'items': shortened}
+    shortened['_truncated'] = {
+        'max_bytes': max_bytes,
+        'original_bytes': len(text.encode('utf-8')),
+        'containers': truncations,
+        'hint': "Use 'fields' para selecionar campos ou aumente 'max_bytes'"
+    }
+    text = encode(shortened, pretty)
+    if len(text.encode('utf-8')) <= max_bytes:
+        return text
+    
+    # Não há mais o que encurtar (ex: um único texto enorme): prévia truncada
+    # (metade do espaço livre: aspas e barras do texto são escapadas ao serializar)
+    room = max_bytes - len(encode({'_truncated': shortened['_truncated'], 'preview': ''}).encode('utf-8'))
+    preview = encode(data)[:max(room, 0) // 2]
+    return encode({'_truncated': shortened['_truncated'], 'preview': preview}, pretty)
@@ -0,0 +1,186 @@
+"""
+Índice de n-gramas para busca de nomes de serviços AWS.
+
+Usado pelo ServiceResolver para podar candidatos antes do cálculo de similaridade
+(SequenceMatcher) e para buscas por substring em suggest_services, evitando
+varrer todos os nomes e palavras a cada chamada.
+
+A poda da busca fuzzy usa o perfil de caracteres de cada termo: o número de
+caracteres em comum limita o ratio() do SequenceMatcher (é o quick_ratio), então
+nenhum termo que atingiria o limite é descartado e os resultados são os mesmos
+da comparação com todos os termos.
+"""
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple, Iterable
+
+import numpy as np
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Retorna os trigramas do texto (usados na busca por substring)."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ServiceNameIndex:
+    """
+    Índice de termos (apelidos, nomes oficiais e suas palavras) para nomes de serviços.
+    """
+    
+    def __init__(self):
+        self._terms: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        # Para cada termo: (serviço alvo, peso, ordem) — o peso penaliza matches por palavra
+        # e a ordem reproduz o desempate da busca linear original
+        self._targets: List[List[Tuple[str, float, int]]] = []
+        self._order = 0
+        # Perfis de caracteres (termos × alfabeto), montados em _finalize()
+        self._alphabet: Dict[str, int] = {}
+        self._profiles = np.zeros((0, 0), dtype=np.int32)
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._exact: Dict[str, str] = {}
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._name_postings: Dict[str, List[int]] = defaultdict(list)
+    
+    @classmethod
+    def build(cls, mapping: Dict[str, str], account_services: Iterable[str]) -> 'ServiceNameIndex':
+        """
+        Constrói o índice com os mesmos termos e pesos usados pela busca fuzzy do resolver.
+        
+        Args:
+            mapping: Apelidos -> nomes oficiais
+            account_services: Serviços descobertos na conta
+        
+        Returns:
+            Índice pronto para consulta
+        """
+        index = cls()
+        
+        for key, official_name in mapping.items():
+            index._add_term(key, official_name, 1.0)
+            for word in official_name.lower().split():
+                if len(word) > 2:  # Ignorar palavras muito pequenas
+                    index._add_term(word, official_name, 0.9)
+            index._add_name(official_name)
+        
+        for service in account_services:
+            index._exact.setdefault(service.lower(), service)
+            index._add_term(service.lower(), service, 1.0)
+            for word in service.lower().split():
+                if len(word) > 2:
+                    index._add_term(word, service, 0.8)
+            index._add_name(service)
+        
+        index._finalize()
+        return index
+    
+    def _add_term(self, term: str, target: str, weight: float) -> None:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self._terms)
+            self._terms.append(term)
+            self._targets.append([])
+        targets = self._targets[term_id]
+        if not any(t == target and w == weight for t, w, _ in targets):
+            targets.append((target, weight, self._order))
+        self._order += 1
+    
+    def _finalize(self) -> None:
+        """Monta a matriz de contagem de caracteres de todos os termos."""
+        self._alphabet = {char: i for i, char in enumerate(sorted({c for term in self._terms for c in term}))}
+        self._profiles = np.zeros((len(self._terms), len(self._alphabet)), dtype=np.int32)
+        for term_id, term in enumerate(self._terms):
+            for char in term:
+                self._profiles[term_id, self._alphabet[char]] += 1
+        self._lengths = np.array([len(term) for term in self._terms], dtype=np.int32)
+    
+    def _profile(self, text: str) -> np.ndarray:
+        profile = np.zeros(len(self._alphabet), dtype=np.int32)
+        for char in text:
+            position = self._alphabet.get(char)
+            if position is not None:
+                profile[position] += 1
+        return profile
+    
+    def _add_name(self, name: str) -> None:
+        if name in self._name_ids:
+            return
+        name_id = self._name_ids[name] = len(self._names)
+        self._names.append(name)
+        for gram in _trigrams(name.lower()):
+            self._name_postings[gram].append(name_id)
+    
+    def exact(self, user_input: str) -> Optional[str]:
+        """Retorna o serviço da conta cujo nome é igual à entrada (case insensitive)."""
+        return self._exact.get(user_input)
+    
+    def fuzzy(self, user_input: str, threshold: float) -> List[Tuple[str, float]]:
+        """
+        Busca fuzzy: retorna os serviços com o melhor score entre os termos candidatos.
+        
+        Só são comparados os termos cujo limite superior de similaridade
+        (2 × caracteres em comum / tamanho total) atinge o limite informado.
+        
+        Args:
+            user_input: Entrada normalizada (minúsculas, sem espaços nas pontas)
+            threshold: Similaridade mínima
+        
+        Returns:
+            Lista de (serviço, score) ordenada por score; score = similaridade × peso do termo
+        """
+        matches: Dict[str, Tuple[float, int]] = {}
+        if not self._terms:
+            return []
+        
+        common = np.minimum(self._profiles, self._profile(user_input)).sum(axis=1)
+        bounds = 2.0 * common / (len(user_input) + self._lengths)
+        candidates = np.flatnonzero(bounds >= threshold)
+        
+        # Mesma orientação (entrada, termo) da busca linear: ratio() não é simétrico
+        matcher = SequenceMatcher(None, user_input)
+        for term_id in candidates.tolist():
+            matcher.set_seq2(self._terms[term_id])
+            similarity = matcher.ratio()
+            if similarity < threshold:
+                continue
+            for target, weight, order in self._targets[term_id]:
+                score = similarity if weight == 1.0 else similarity * weight
+                best = matches.get(target)
+                if best is None or score > best[0] or (score == best[0] and order < best[1]):
+                    matches[target] = (score, order)
+        
+        ranked = sorted(matches.items(), key=lambda item: (-item[1][0], item[1][1]))
+        return [(target, score) for target, (score, _) in ranked]
+    
+    def substring(self, partial_name: str) -> List[str]:
+        """
+        Retorna os nomes de serviços que contêm o texto informado (case insensitive).
+        
+        Args:
+            partial_name: Texto a procurar
+        
+        Returns:
+            Nomes que contêm o texto
+        """
+        partial = partial_name.lower()
+        if len(partial) < 3:
+            # Sem trigramas para filtrar: poucos nomes, verificação direta
+            return [name for name in self._names if partial in name.lower()]
+        
+        candidate_ids: Optional[Set[int]] = None
+        for gram in sorted(_trigrams(partial), key=lambda g: len(self._name_postings.get(g, ()))):
+            postings = self._name_postings.get(gram)
+            if not postings:
+                return []
+            candidate_ids = set(postings) if candidate_ids is None else candidate_ids.intersection(postings)
+            if not candidate_ids:
+                return []
+        
+        return [self._names[i] for i in sorted(candidate_ids) if partial in self._names[i].lower()]
+    
+    @property
+    def names(self) -> List[str]:
+        """Todos os nomes de serviços indexados."""
+        return list(self._names)
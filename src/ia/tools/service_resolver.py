@@ -1,20 +1,29 @@
 """
 Módulo para resolução inteligente de nomes de serviços AWS.
 Combina mapeamento hardcoded, discovery automático e busca fuzzy.
+
+A lista de serviços descobertos fica num cache compartilhado entre processos
+(diskcache em CLOUD_INSIGHTS_CACHE_DIR, padrão ~/.cache/cloud-insights). Quando
+expira, a lista antiga continua sendo servida enquanto um único processo a
+renova em segundo plano (stale-while-revalidate).
 """
 
 import json
 import os
+import threading
 import time
-from typing import List, Dict, Optional, Tuple
-from difflib import SequenceMatcher
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import sys
 
+import diskcache
+
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 from src.clouds.aws.cost_explorer import CostExplorer
+from src.ia.tools.service_index import ServiceNameIndex
 
 
 class ServiceResolver:
@@ -22,18 +31,45 @@ class ServiceResolver:
     Resolver inteligente para nomes de serviços AWS.
     """
     
-    def __init__(self, cache_file: str = "aws_services_cache.json", cache_ttl_hours: int = 24):
+    # Máximo de resoluções recentes memorizadas
+    MEMO_SIZE = 512
+    
+    CACHE_DIR_ENV = "CLOUD_INSIGHTS_CACHE_DIR"
+    CACHE_KEY = "aws_services"
+    # Lease de renovação: só um processo por vez consulta o Cost Explorer
+    LEASE_KEY = "aws_services:refresh"
+    LEASE_SECONDS = 300
+    # Intervalo para reler o cache compartilhado (renovações feitas por outros processos)
+    RECHECK_SECONDS = 60
+    
+    def __init__(self, cache_file: str = "aws_services_cache.json", cache_ttl_hours: int = 24,
+                 cache_dir: Optional[str] = None):
         """
         Inicializa o resolver de serviços.
         
         Args:
-            cache_file: Arquivo para cache dos serviços descobertos
+            cache_file: Arquivo distribuído com o pacote, usado como semente do cache
             cache_ttl_hours: TTL do cache em horas (padrão: 24h)
+            cache_dir: Diretório do cache compartilhado (padrão: $CLOUD_INSIGHTS_CACHE_DIR
+                ou ~/.cache/cloud-insights)
         """
         self.cache_file = os.path.join(os.path.dirname(__file__), cache_file)
+        self.cache_dir = cache_dir or os.environ.get(self.CACHE_DIR_ENV) \
+            or os.path.join(os.path.expanduser("~"), ".cache", "cloud-insights")
         self.cache_ttl_hours = cache_ttl_hours
         self._service_mapping = self._get_service_mapping()
         self._cached_services = None
+        self._checked_at = 0.0
+        self._store: Optional[diskcache.Cache] = None
+        self._services_lock = threading.RLock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.memo_hits = 0
+        self.memo_misses = 0
+        # Índice de trigramas e memo LRU, reconstruídos quando a lista de serviços muda
+        self._index: Optional[ServiceNameIndex] = None
+        self._index_source = None
+        self._memo: 'OrderedDict[Tuple[str, float], Tuple[str, float, List[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
         
     def _get_service_mapping(self) -> Dict[str, str]:
         """
@@ -145,121 +181,217 @@ class ServiceResolver:
         if user_input_clean in self._service_mapping:
             return self._service_mapping[user_input_clean], 1.0, []
         
-        # 2. Tentativa: Busca exata (case insensitive) nos serviços da conta
-        all_services = self._get_cached_services()
-        
-        for service in all_services:
-            if service.lower() == user_input_clean:
-                return service, 1.0, []
-        
-        # 3. Tentativa: Busca fuzzy nos serviços mapeados
-        mapped_matches = self._fuzzy_search_mapped(user_input_clean, confidence_threshold)
-        
-        # 4. Tentativa: Busca fuzzy nos serviços da conta
-        account_matches = self._fuzzy_search_account(user_input_clean, all_services, confidence_threshold)
+        index = self._get_index()
+        memo_key = (user_input_clean, confidence_threshold)
+        with self._lock:
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                self._memo.move_to_end(memo_key)
+                self.memo_hits += 1
+            else:
+                self.memo_misses += 1
+        if cached is not None:
+            best_match, best_score, suggestions = cached
+            # Score baixo: a resposta devolve a entrada original do usuário
+            return (best_match if best_score else user_input), best_score, list(suggestions)
         
-        # Combinar e ordenar matches por confiança
-        all_matches = mapped_matches + account_matches
-        all_matches.sort(key=lambda x: x[1], reverse=True)
+        result = self._resolve_indexed(index, user_input_clean, confidence_threshold)
+        with self._lock:
+            self._memo[memo_key] = result
+            if len(self._memo) > self.MEMO_SIZE:
+                self._memo.popitem(last=False)
         
-        # Remover duplicatas mantendo o melhor score
-        unique_matches = {}
-        for service, score in all_matches:
-            if service not in unique_matches or unique_matches[service] < score:
-                unique_matches[service] = score
+        best_match, best_score, suggestions = result
+        return (best_match if best_score else user_input), best_score, list(suggestions)
+    
+    @staticmethod
+    def _resolve_indexed(index: ServiceNameIndex, user_input: str,
+                         threshold: float) -> Tuple[Optional[str], float, List[str]]:
+        """Resolve a entrada normalizada usando o índice (sem o mapeamento direto)."""
+        # 2. Tentativa: Busca exata (case insensitive) nos serviços da conta
+        exact = index.exact(user_input)
+        if exact is not None:
+            return exact, 1.0, []
         
-        # Converter de volta para lista ordenada
-        final_matches = [(service, score) for service, score in unique_matches.items()]
-        final_matches.sort(key=lambda x: x[1], reverse=True)
+        # 3. e 4. Tentativas: Busca fuzzy nos serviços mapeados e nos serviços da conta,
+        # comparando apenas os termos que compartilham n-gramas com a entrada
+        final_matches = index.fuzzy(user_input, threshold)
         
         if final_matches:
             best_match, best_score = final_matches[0]
             suggestions = [service for service, _ in final_matches[1:6]]  # Top 5 alternativas
             
-            if best_score >= confidence_threshold:
+            if best_score >= threshold:
                 return best_match, best_score, suggestions
             else:
                 # Score baixo, retornar original com sugestões
-                return user_input, 0.0, suggestions
+                return None, 0.0, suggestions
         
         # Nenhum match encontrado
-        return user_input, 0.0, []
+        return None, 0.0, []
     
-    def _fuzzy_search_mapped(self, user_input: str, threshold: float) -> List[Tuple[str, float]]:
-        """Busca fuzzy nos serviços mapeados."""
-        matches = []
-        
-        for key, official_name in self._service_mapping.items():
-            # Comparar com a chave do mapeamento
-            key_similarity = SequenceMatcher(None, user_input, key).ratio()
-            if key_similarity >= threshold:
-                matches.append((official_name, key_similarity))
-            
-            # Comparar com palavras do nome oficial
-            official_words = official_name.lower().split()
-            for word in official_words:
-                if len(word) > 2:  # Ignorar palavras muito pequenas
-                    word_similarity = SequenceMatcher(None, user_input, word).ratio()
-                    if word_similarity >= threshold:
-                        matches.append((official_name, word_similarity * 0.9))  # Penalizar um pouco
+    def warm_up(self) -> int:
+        """
+        Carrega a lista de serviços e constrói o índice de busca antecipadamente.
         
-        return matches
+        Returns:
+            Número de serviços carregados
+        """
+        self._get_index()
+        return len(self._cached_services or [])
     
-    def _fuzzy_search_account(self, user_input: str, services: List[str], threshold: float) -> List[Tuple[str, float]]:
-        """Busca fuzzy nos serviços da conta."""
-        matches = []
-        
-        for service in services:
-            # Comparar nome completo
-            full_similarity = SequenceMatcher(None, user_input, service.lower()).ratio()
-            if full_similarity >= threshold:
-                matches.append((service, full_similarity))
-            
-            # Comparar palavras individuais
-            words = service.lower().split()
-            for word in words:
-                if len(word) > 2:
-                    word_similarity = SequenceMatcher(None, user_input, word).ratio()
-                    if word_similarity >= threshold:
-                        matches.append((service, word_similarity * 0.8))  # Penalizar mais
-        
-        return matches
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do memo de resoluções e da lista de serviços."""
+        with self._lock:
+            lookups = self.memo_hits + self.memo_misses
+            return {
+                'services': len(self._cached_services or []),
+                'memo_entries': len(self._memo),
+                'memo_hits': self.memo_hits,
+                'memo_misses': self.memo_misses,
+                'memo_hit_ratio': round(self.memo_hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def _get_index(self) -> ServiceNameIndex:
+        """Retorna o índice de nomes, reconstruindo-o se a lista de serviços mudou."""
+        services = self._get_cached_services()
+        with self._lock:
+            if self._index is None or self._index_source is not services:
+                self._index = ServiceNameIndex.build(self._service_mapping, services)
+                self._index_source = services
+                self._memo.clear()
+            return self._index
+    
+    def _get_store(self) -> diskcache.Cache:
+        """Abre (uma vez) o cache compartilhado em disco."""
+        if self._store is None:
+            self._store = diskcache.Cache(self.cache_dir)
+        return self._store
     
     def _get_cached_services(self) -> List[str]:
         """
-        Obtém lista de serviços, usando cache se disponível e válido.
+        Obtém lista de serviços, usando cache se disponível.
+        
+        Um cache expirado continua sendo usado enquanto a renovação roda em segundo plano.
         """
-        if self._cached_services is not None:
+        with self._services_lock:
+            if self._cached_services is not None and time.time() - self._checked_at < self.RECHECK_SECONDS:
+                return self._cached_services
+            
+            entry = self._read_shared()
+            if entry is None:
+                entry = self._read_seed()
+            
+            if entry is None:
+                # Nenhuma lista disponível: descoberta síncrona (uma única vez entre processos)
+                self._set_services(self.refresh_services(only_if_missing=True))
+                return self._cached_services
+            
+            self._set_services(entry['services'])
+            cache_age_hours = (time.time() - entry.get('timestamp', 0)) / 3600
+            if cache_age_hours >= self.cache_ttl_hours:
+                self._refresh_in_background(cache_age_hours)
+            
             return self._cached_services
+    
+    def _set_services(self, services: List[str]) -> None:
+        """Atualiza a lista em memória (mantendo o objeto se nada mudou, para não reconstruir o índice)."""
+        with self._services_lock:
+            if self._cached_services is None or self._cached_services != services:
+                self._cached_services = list(services)
+            self._checked_at = time.time()
+    
+    def _read_shared(self) -> Optional[Dict[str, Any]]:
+        """Lê a lista do cache compartilhado."""
+        try:
+            entry = self._get_store().get(self.CACHE_KEY)
+        except Exception as e:
+            print(f"⚠️  Erro ao ler cache: {e}")
+            return None
+        if not entry or not isinstance(entry.get('services'), list):
+            return None
+        return entry
+    
+    def _read_seed(self) -> Optional[Dict[str, Any]]:
+        """Lê a lista distribuída com o pacote e a usa como semente do cache compartilhado."""
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Erro ao ler cache: {e}")
+            return None
+        
+        entry = {
+            'timestamp': cache_data.get('timestamp', 0),
+            'services': cache_data.get('services', [])
+        }
+        try:
+            # add() só grava se nenhum outro processo gravou antes
+            self._get_store().add(self.CACHE_KEY, entry)
+        except Exception as e:
+            print(f"⚠️  Erro ao salvar cache: {e}")
+        return entry
+    
+    def _refresh_in_background(self, cache_age_hours: float) -> None:
+        """Renova a lista numa thread, se nenhum processo já estiver renovando."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        try:
+            acquired = self._get_store().add(self.LEASE_KEY, os.getpid(), expire=self.LEASE_SECONDS)
+        except Exception as e:
+            print(f"⚠️  Erro ao obter lease de renovação: {e}")
+            return
+        if not acquired:
+            return
         
-        # Verificar se cache existe e é válido
-        if os.path.exists(self.cache_file):
+        print(f"⏰ Cache expirado (idade: {cache_age_hours:.1f}h), renovando em segundo plano...")
+        
+        def refresh():
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                cache_timestamp = cache_data.get('timestamp', 0)
-                cache_age_hours = (time.time() - cache_timestamp) / 3600
-                
-                if cache_age_hours < self.cache_ttl_hours:
-                    print(f"🔄 Usando cache de serviços (idade: {cache_age_hours:.1f}h)")
-                    self._cached_services = cache_data.get('services', [])
-                    return self._cached_services
-                else:
-                    print(f"⏰ Cache expirado (idade: {cache_age_hours:.1f}h), renovando...")
-            
-            except Exception as e:
-                print(f"⚠️  Erro ao ler cache: {e}")
+                services = self._discover_services()
+                if services is not None:
+                    self._save_cache(services)
+                    self._set_services(services)
+            finally:
+                self._get_store().delete(self.LEASE_KEY)
         
-        # Cache inválido ou inexistente, buscar da AWS
-        self._cached_services = self._discover_services()
-        self._save_cache()
+        self._refresh_thread = threading.Thread(target=refresh, name="service-cache-refresh", daemon=True)
+        self._refresh_thread.start()
+    
+    def refresh_services(self, only_if_missing: bool = False) -> List[str]:
+        """
+        Redescobre os serviços da conta de forma síncrona e atualiza o cache compartilhado.
+        
+        Args:
+            only_if_missing: Não consultar a AWS se outro processo preencheu o cache
+                enquanto este aguardava o lease
         
-        return self._cached_services
+        Returns:
+            Lista de serviços (o mapeamento hardcoded se a descoberta falhar)
+        """
+        with diskcache.Lock(self._get_store(), self.LEASE_KEY, expire=self.LEASE_SECONDS):
+            if only_if_missing:
+                entry = self._read_shared()
+                if entry is not None:
+                    return entry['services']
+            
+            services = self._discover_services()
+            if services is None:
+                # Fallback: usar apenas mapeamento hardcoded (sem gravar no cache)
+                return list(self._service_mapping.values())
+            self._save_cache(services)
+        
+        self._set_services(services)
+        return services
     
-    def _discover_services(self) -> List[str]:
+    def _discover_services(self) -> Optional[List[str]]:
         """
         Descobre todos os serviços disponíveis na conta AWS.
+        
+        Returns:
+            Lista de serviços, ou None se a descoberta falhar
         """
         print("🔍 Descobrindo serviços AWS na conta...")
         
@@ -274,26 +406,20 @@ class ServiceResolver:
             
         except Exception as e:
             print(f"❌ Erro ao descobrir serviços: {e}")
-            # Fallback: usar apenas mapeamento hardcoded
-            return list(self._service_mapping.values())
+            return None
     
-    def _save_cache(self):
-        """Salva cache dos serviços descobertos."""
-        if self._cached_services is None:
-            return
-        
+    def _save_cache(self, services: List[str]):
+        """Salva os serviços descobertos no cache compartilhado (gravação atômica)."""
         try:
             cache_data = {
                 'timestamp': time.time(),
-                'services': self._cached_services,
-                'total_services': len(self._cached_services),
+                'services': services,
+                'total_services': len(services),
                 'last_updated': datetime.now().isoformat()
             }
+            self._get_store().set(self.CACHE_KEY, cache_data)
             
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2, ensure_ascii=False)
-            
-            print(f"💾 Cache salvo: {len(self._cached_services)} serviços")
+            print(f"💾 Cache salvo: {len(services)} serviços")
             
         except Exception as e:
             print(f"⚠️  Erro ao salvar cache: {e}")
@@ -315,26 +441,50 @@ class ServiceResolver:
         Returns:
             Lista de tuplas (nome_serviço, score_confiança)
         """
+        # Candidatos vêm da interseção das listas de trigramas do índice
         matches = []
-        all_services = self.get_all_services()
-        
-        for service in all_services:
-            if partial_name.lower() in service.lower():
-                score = len(partial_name) / len(service)  # Score baseado em proporção
-                matches.append((service, score))
+        for service in self._get_index().substring(partial_name):
+            score = len(partial_name) / len(service)  # Score baseado em proporção
+            matches.append((service, score))
         
         # Ordenar por score e retornar top N
-        matches.sort(key=lambda x: x[1], reverse=True)
+        matches.sort(key=lambda x: (-x[1], x[0]))
         return matches[:limit]
     
     def clear_cache(self):
-        """Remove o cache de serviços."""
-        if os.path.exists(self.cache_file):
-            os.remove(self.cache_file)
-            print("🗑️  Cache removido")
+        """Remove o cache de serviços compartilhado (a semente do pacote é preservada)."""
+        try:
+            if self._get_store().delete(self.CACHE_KEY):
+                print("🗑️  Cache removido")
+        except Exception as e:
+            print(f"⚠️  Erro ao remover cache: {e}")
         
-        self._cached_services = None
+        with self._services_lock:
+            self._cached_services = None
+            self._checked_at = 0.0
+        with self._lock:
+            self._index = None
+            self._index_source = None
+            self._memo.clear()
+
+
+# Instância global para uso nas ferramentas, criada no primeiro uso
+_service_resolver: Optional[ServiceResolver] = None
+_service_resolver_lock = threading.Lock()
+
+
+def get_service_resolver() -> ServiceResolver:
+    """Retorna o resolver compartilhado, criando-o na primeira chamada."""
+    global _service_resolver
+    if _service_resolver is None:
+        with _service_resolver_lock:
+            if _service_resolver is None:
+                _service_resolver = ServiceResolver()
+    return _service_resolver
 
 
-# Instância global para uso nas ferramentas
-service_resolver = ServiceResolver() 
\ No newline at end of file
+def __getattr__(name: str):
+    # Compatibilidade: `service_resolver` continua acessível como atributo do módulo
+    if name == "service_resolver":
+        return get_service_resolver()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
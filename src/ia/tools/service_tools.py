@@ -2,7 +2,6 @@
 Ferramentas para resolução e sugestão de serviços AWS.
 """
 
-import json
 import sys
 import os
 from typing import Optional, List, Dict, Any
@@ -11,7 +10,8 @@ from datetime import datetime
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
-from src.ia.tools.service_resolver import service_resolver
+from src.ia.tools.service_resolver import get_service_resolver
+from src.ia.tools.response import to_json
 
 
 def resolve_service_name(service_name: str, auto_apply: bool = True) -> str:
@@ -33,7 +33,7 @@ def resolve_service_name(service_name: str, auto_apply: bool = True) -> str:
     print(f"RESOLVENDO NOME DO SERVIÇO: '{service_name}'")
     
     try:
-        resolved_name, confidence, suggestions = service_resolver.resolve_service_name(service_name)
+        resolved_name, confidence, suggestions = get_service_resolver().resolve_service_name(service_name)
         
         result = {
             "original_input": service_name,
@@ -71,13 +71,13 @@ def resolve_service_name(service_name: str, auto_apply: bool = True) -> str:
         else:
             result["has_alternatives"] = False
         
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return to_json(result)
         
     except Exception as e:
-        return json.dumps({
+        return to_json({
             "error": f"Erro ao resolver nome do serviço: {str(e)}",
             "original_input": service_name
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 def suggest_services(partial_name: str, limit: int = 10) -> str:
@@ -99,7 +99,7 @@ def suggest_services(partial_name: str, limit: int = 10) -> str:
     print(f"SUGERINDO SERVIÇOS PARA: '{partial_name}'")
     
     try:
-        suggestions = service_resolver.suggest_services(partial_name, limit)
+        suggestions = get_service_resolver().suggest_services(partial_name, limit)
         
         result = {
             "search_term": partial_name,
@@ -119,13 +119,13 @@ def suggest_services(partial_name: str, limit: int = 10) -> str:
         else:
             print(f"❌ Nenhuma sugestão encontrada para '{partial_name}'")
         
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return to_json(result)
         
     except Exception as e:
-        return json.dumps({
+        return to_json({
             "error": f"Erro ao sugerir serviços: {str(e)}",
             "search_term": partial_name
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 def list_all_services(category_filter: Optional[str] = None) -> str:
@@ -146,7 +146,7 @@ def list_all_services(category_filter: Optional[str] = None) -> str:
     print(f"LISTANDO SERVIÇOS - Filtro: {category_filter or 'nenhum'}")
     
     try:
-        all_services = service_resolver.get_all_services()
+        all_services = get_service_resolver().get_all_services()
         
         # Categorizar serviços
         categorized_services = {}
@@ -185,12 +185,12 @@ def list_all_services(category_filter: Optional[str] = None) -> str:
         
         print(f"✅ Listados {len(all_services)} serviços em {len(categorized_services)} categorias")
         
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return to_json(result)
         
     except Exception as e:
-        return json.dumps({
+        return to_json({
             "error": f"Erro ao listar serviços: {str(e)}"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 def refresh_services_cache() -> str:
@@ -203,11 +203,8 @@ def refresh_services_cache() -> str:
     print("🔄 FORÇANDO ATUALIZAÇÃO DO CACHE DE SERVIÇOS")
     
     try:
-        # Limpar cache atual
-        service_resolver.clear_cache()
-        
-        # Forçar nova descoberta
-        services = service_resolver._get_cached_services()
+        # Forçar nova descoberta (atualiza o cache compartilhado entre processos)
+        services = get_service_resolver().refresh_services()
         
         result = {
             "status": "success",
@@ -218,13 +215,13 @@ def refresh_services_cache() -> str:
         
         print(f"✅ Cache atualizado: {len(services)} serviços descobertos")
         
-        return json.dumps(result, ensure_ascii=False, indent=2)
+        return to_json(result)
         
     except Exception as e:
-        return json.dumps({
+        return to_json({
             "status": "error",
             "message": f"Erro ao atualizar cache: {str(e)}"
-        }, ensure_ascii=False, indent=2)
+        })
 
 
 def _categorize_service(service_name: str) -> str:
@@ -2,7 +2,6 @@
 Ferramentas utilitárias para o agente de IA.
 """
 
-import json
 import sys
 import os
 from datetime import datetime, timedelta
@@ -13,16 +12,6 @@ from decimal import Decimal
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 
-class JsonEncoder(json.JSONEncoder):
-    """Encoder JSON personalizado para lidar com tipos especiais como Decimal e datetime."""
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
-
-
 def validate_and_adjust_date_range(start_date: str, end_date: str) -> tuple[str, str]:
     """
     Valida e ajusta o intervalo de datas para estar dentro do limite de 14 meses do Cost Explorer.
@@ -0,0 +1,78 @@
+"""
+Aquecimento dos recursos caros do agente e das ferramentas.
+
+Os singletons (resolver de serviços, agente Haystack) são criados no primeiro
+uso; o servidor MCP e o modo interativo chamam start_background_warm_up() na
+inicialização para que a primeira consulta real não pague essa latência.
+"""
+
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+
+def warm_up(include_agent: bool = False,
+            agent_factory: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """
+    Cria e aquece os singletons compartilhados.
+    
+    Args:
+        include_agent: Também criar e aquecer o agente Haystack (cliente OpenAI)
+        agent_factory: Função que retorna o agente (padrão: src.ia.agent.get_agent);
+            necessária quando agent.py roda como script (__main__)
+    
+    Returns:
+        Dicionário com o tempo de cada etapa (segundos) e eventuais erros
+    """
+    report: Dict[str, Any] = {}
+    
+    steps = [("service_resolver", _warm_up_service_resolver)]
+    if include_agent:
+        steps.append(("agent", lambda: _warm_up_agent(agent_factory)))
+    
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            report[name] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            # Falhas no aquecimento não impedem a inicialização; o uso real tenta de novo
+            report[name] = {"error": str(e)}
+            print(f"⚠️  Erro ao aquecer {name}: {e}")
+    
+    return report
+
+
+def start_background_warm_up(include_agent: bool = False,
+                             agent_factory: Optional[Callable[[], Any]] = None) -> threading.Thread:
+    """
+    Executa warm_up() numa thread daemon.
+    
+    Args:
+        include_agent: Também criar e aquecer o agente Haystack
+        agent_factory: Função que retorna o agente (ver warm_up)
+    
+    Returns:
+        Thread iniciada
+    """
+    thread = threading.Thread(
+        target=warm_up,
+        kwargs={"include_agent": include_agent, "agent_factory": agent_factory},
+        name="warm-up",
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _warm_up_service_resolver() -> None:
+    from src.ia.tools.service_resolver import get_service_resolver
+    
+    get_service_resolver().warm_up()
+
+
+def _warm_up_agent(agent_factory: Optional[Callable[[], Any]] = None) -> None:
+    if agent_factory is None:
+        from src.ia.agent import get_agent as agent_factory
+    
+    agent_factory().warm_up()
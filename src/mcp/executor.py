@@ -0,0 +1,230 @@
+"""
+Camada de execução das ferramentas do servidor MCP.
+
+Cada ferramenta pertence a um perfil:
+- "heavy": varreduras da conta (órfãos, auditorias, frotas) em um pool pequeno e separado
+- "standard": consultas pontuais à AWS em um pool próprio
+- "inline": utilidades locais e baratas, executadas direto no event loop
+
+Dentro do perfil, cada ferramenta tem limite de execuções simultâneas e de fila,
+e o perfil admite no máximo uma execução por thread do pool (a soma dos limites
+das ferramentas passa do tamanho do pool, e a fila interna do ThreadPoolExecutor
+não tem prazo). Quando a fila está cheia, ou o prazo de espera por uma vaga (da
+ferramenta e do pool, somados) expira, a chamada falha rapidamente com um erro
+de "ocupado" em vez de acumular trabalho.
+
+As vagas só são devolvidas quando a execução termina na thread: se o cliente
+desiste (desconexão ou timeout), a ferramenta continua ocupando a vaga até o fim.
+
+Cada execução contabiliza as próprias chamadas à AWS ('_meta.aws_calls' da
+resposta); o escopo é aberto na thread do pool, que não herda o contexto do
+event loop.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Optional
+
+from fastmcp.exceptions import ToolError
+
+from src.telemetry.aws_calls import accounted
+from src.telemetry.metrics import track_tool
+
+
+@dataclass(frozen=True)
+class ToolLimit:
+    """Limites de concorrência de uma ferramenta."""
+    
+    max_concurrent: int
+    max_queued: int
+    queue_timeout: float  # segundos aguardando uma vaga antes de responder "ocupado"
+
+
+class _ToolState:
+    """Contadores e semáforo de uma ferramenta."""
+    
+    def __init__(self, limit: ToolLimit):
+        self.limit = limit
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+
+class ToolExecutor:
+    """
+    Executa ferramentas síncronas com pools limitados e backpressure por ferramenta.
+    """
+    
+    PROFILES = ('heavy', 'standard', 'inline')
+    
+    DEFAULT_LIMITS = {
+        'heavy': ToolLimit(max_concurrent=2, max_queued=2, queue_timeout=30.0),
+        'standard': ToolLimit(max_concurrent=4, max_queued=16, queue_timeout=30.0),
+        'inline': None
+    }
+    
+    def __init__(self, heavy_workers: int = 3, standard_workers: int = 8):
+        """
+        Inicializa o executor.
+        
+        Args:
+            heavy_workers: Threads do pool de ferramentas pesadas
+            standard_workers: Threads do pool de consultas pontuais
+        """
+        self._pools = {
+            'heavy': ThreadPoolExecutor(max_workers=heavy_workers, thread_name_prefix="mcp-heavy"),
+            'standard': ThreadPoolExecutor(max_workers=standard_workers, thread_name_prefix="mcp-tool")
+        }
+        self._workers = {'heavy': heavy_workers, 'standard': standard_workers}
+        # Admissão por perfil: uma vaga por thread (criados no event loop, no primeiro uso)
+        self._admission: Dict[str, asyncio.Semaphore] = {}
+        self._states: Dict[str, _ToolState] = {}
+        self._profiles: Dict[str, str] = {}
+    
+    def tool(self, profile: str = 'standard', limit: Optional[ToolLimit] = None) -> Callable:
+        """
+        Decorador que envolve uma ferramenta síncrona numa corrotina limitada.
+        
+        Deve ficar abaixo de @mcp.tool(); nome, docstring e assinatura são preservados.
+        
+        Args:
+            profile: 'heavy', 'standard' ou 'inline'
+            limit: Limites próprios da ferramenta (padrão: os do perfil)
+        
+        Returns:
+            Decorador
+        """
+        if profile not in self.PROFILES:
+            raise ValueError(f"Perfil inválido: {profile}. Use um de {', '.join(self.PROFILES)}")
+        
+        def decorator(fn: Callable) -> Callable:
+            name = fn.__name__
+            self._profiles[name] = profile
+            run = accounted(name, fn)
+            
+            if profile == 'inline':
+                @functools.wraps(fn)
+                async def run_inline(*args, **kwargs):
+                    with track_tool(name):
+                        return run(*args, **kwargs)
+                return run_inline
+            
+            state = self._states[name] = _ToolState(limit or self.DEFAULT_LIMITS[profile])
+            pool = self._pools[profile]
+            
+            @functools.wraps(fn)
+            async def run_limited(*args, **kwargs):
+                with track_tool(name) as outcome:
+                    try:
+                        admission = await self._acquire(name, profile, state)
+                    except ToolError:
+                        outcome['status'] = 'rejected'
+                        raise
+                    loop = asyncio.get_running_loop()
+                    try:
+                        future = pool.submit(run, *args, **kwargs)
+                    except BaseException:
+                        self._release(state, admission, None)
+                        raise
+                    # As vagas voltam quando a thread termina, mesmo se esta corrotina for cancelada
+                    future.add_done_callback(
+                        lambda done: self._release_threadsafe(loop, state, admission, done))
+                    return await asyncio.wrap_future(future)
+            
+            return run_limited
+        
+        return decorator
+    
+    async def _acquire(self, name: str, profile: str, state: _ToolState) -> asyncio.Semaphore:
+        """
+        Reserva uma vaga da ferramenta e uma thread do pool do perfil, ou falha com
+        erro de ocupado; o prazo de espera vale para as duas reservas juntas.
+        
+        Returns:
+            Semáforo de admissão do perfil (a devolver junto com o da ferramenta)
+        """
+        if state.semaphore is None:
+            state.semaphore = asyncio.Semaphore(state.limit.max_concurrent)
+        admission = self._admission.get(profile)
+        if admission is None:
+            admission = self._admission[profile] = asyncio.Semaphore(self._workers[profile])
+        
+        if state.semaphore.locked() and state.waiting >= state.limit.max_queued:
+            state.rejected += 1
+            raise ToolError(
+                f"Ferramenta {name} ocupada: {state.active} execuções em andamento e "
+                f"{state.waiting} na fila. Tente novamente em instantes."
+            )
+        
+        deadline = time.monotonic() + state.limit.queue_timeout
+        state.waiting += 1
+        try:
+            await asyncio.wait_for(state.semaphore.acquire(), timeout=state.limit.queue_timeout)
+            try:
+                await asyncio.wait_for(admission.acquire(), timeout=max(deadline - time.monotonic(), 0))
+            except BaseException:
+                state.semaphore.release()
+                raise
+        except asyncio.TimeoutError:
+            state.timed_out += 1
+            raise ToolError(
+                f"Ferramenta {name} ocupada: nenhuma vaga liberada em "
+                f"{state.limit.queue_timeout:.0f}s. Tente novamente em instantes."
+            ) from None
+        finally:
+            state.waiting -= 1
+        state.active += 1
+        return admission
+    
+    def _release(self, state: _ToolState, admission: asyncio.Semaphore, done: Optional[Future]) -> None:
+        """Devolve as vagas da ferramenta e do pool e contabiliza o desfecho (no event loop)."""
+        if done is not None and not done.cancelled():
+            if done.exception() is None:
+                state.completed += 1
+            else:
+                state.failed += 1
+        state.active -= 1
+        state.semaphore.release()
+        admission.release()
+    
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop, state: _ToolState,
+                            admission: asyncio.Semaphore, done: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release, state, admission, done)
+        except RuntimeError:
+            # Event loop já encerrado (desligamento do servidor): não há a quem devolver
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna, por ferramenta limitada, o perfil, os limites e os contadores ('active'
+        conta execuções ainda na thread, inclusive as de chamadas já canceladas)."""
+        return {
+            name: {
+                'profile': self._profiles[name],
+                'max_concurrent': state.limit.max_concurrent,
+                'max_queued': state.limit.max_queued,
+                'active': state.active,
+                'waiting': state.waiting,
+                'completed': state.completed,
+                'failed': state.failed,
+                'rejected': state.rejected,
+                'timed_out': state.timed_out
+            }
+            for name, state in self._states.items()
+        }
+    
+    def shutdown(self, wait: bool = False) -> None:
+        """Encerra os pools de threads."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+# Executor compartilhado pelas ferramentas do servidor MCP
+executor = ToolExecutor()
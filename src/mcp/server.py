@@ -4,6 +4,7 @@ Servidor MCP para análise de custos AWS - Cloud Insights.
 Este servidor expõe todas as ferramentas de análise como tools MCP.
 """
 
+import asyncio
 import sys
 import os
 from typing import Optional
@@ -28,6 +29,7 @@ from src.ia.tools import (
     validate_and_analyze_service,
     analyze_account_coverage,
     get_account_context_data,
+    forecast_service_costs,
     check_account_data_availability,
     aws_ec2_call,
     get_instance_cost_by_name,
@@ -50,6 +52,11 @@ from src.ia.tools import (
     refresh_services_cache
 )
 
+from src.ia.warmup import start_background_warm_up
+from src.ia.tools.response import to_json
+from src.mcp.executor import executor
+from src.telemetry.metrics import registry, cache_samples
+
 # Inicializar servidor MCP
 mcp = FastMCP("cloud-analyzer")
 
@@ -58,51 +65,68 @@ mcp = FastMCP("cloud-analyzer")
 # ===============================
 
 @mcp.tool()
-def mcp_get_top_services(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 5) -> str:
+@executor.tool("standard")
+def mcp_get_top_services(start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 5, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """Obtém os top serviços mais caros da AWS."""
-    return get_top_services(start_date, end_date, limit)
+    return get_top_services(start_date, end_date, limit, fields=fields, max_bytes=max_bytes)
 
 @mcp.tool()
-def mcp_get_service_details(service_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+@executor.tool("standard")
+def mcp_get_service_details(service_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """Obtém detalhes de custos de um serviço específico com resolução automática do nome."""
-    return get_service_details(service_name, start_date, end_date)
+    return get_service_details(service_name, start_date, end_date, fields=fields, max_bytes=max_bytes)
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_get_aws_tags() -> str:
     """Obtém as tags da AWS disponíveis na conta."""
     return get_aws_tags()
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_get_dimension_values(dimension_name: str) -> str:
     """Obtém os valores de uma dimensão específica."""
     return get_dimension_values(dimension_name)
 
 @mcp.tool()
-def mcp_discover_account_resources(limit: int = 5) -> str:
+@executor.tool("heavy")
+def mcp_discover_account_resources(limit: int = 5, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """Descobre recursos disponíveis na conta AWS."""
-    return discover_account_resources(limit)
+    return discover_account_resources(limit, fields=fields, max_bytes=max_bytes)
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_validate_service(service_name: str) -> str:
     """Valida e analisa um serviço específico com sugestões e correções."""
     return validate_and_analyze_service(service_name)
 
 @mcp.tool()
+@executor.tool("heavy")
 def mcp_analyze_account_coverage() -> str:
     """Analisa a cobertura de dados disponíveis na conta AWS."""
     return analyze_account_coverage()
 
 @mcp.tool()
-def mcp_get_account_context_data() -> str:
+@executor.tool("heavy")
+def mcp_get_account_context_data(fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """Obtém dados de contexto completos da conta AWS."""
-    return get_account_context_data()
+    return get_account_context_data(fields=fields, max_bytes=max_bytes)
+
+@mcp.tool()
+@executor.tool("heavy")
+def mcp_forecast_service_costs(history_days: int = 90, horizon_days: int = 30, top_n: int = 10,
+                               method: str = "auto", compare_with_api: bool = False) -> str:
+    """Prevê os custos de cada serviço AWS com modelos locais e intervalos de confiança."""
+    return forecast_service_costs(history_days, horizon_days, top_n, method, compare_with_api)
 
 @mcp.tool()
+@executor.tool("heavy")
 def mcp_check_data_availability() -> str:
     """Verifica a disponibilidade de dados na conta AWS."""
     return check_account_data_availability()
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_aws_ec2_call(
     method: str, 
     instance_ids: Optional[str] = None, 
@@ -111,115 +135,133 @@ def mcp_aws_ec2_call(
     subnet_ids: Optional[str] = None, 
     group_ids: Optional[str] = None, 
     region_name: Optional[str] = None, 
-    limit: int = 5
+    limit: int = 5,
+    fields: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    cursor: Optional[str] = None
 ) -> str:
-    """Executa chamadas específicas da API EC2."""
-    return aws_ec2_call(method, instance_ids, volume_ids, vpc_ids, subnet_ids, group_ids, region_name, limit)
+    """Executa chamadas específicas da API EC2. Para a próxima página, passe o next_cursor de '_pagination' em cursor."""
+    return aws_ec2_call(method, instance_ids, volume_ids, vpc_ids, subnet_ids, group_ids, region_name, limit, fields=fields, max_bytes=max_bytes, cursor=cursor)
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_get_instance_cost_by_name(instance_name: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
     """Obtém custos de uma instância EC2 específica pelo nome."""
     return get_instance_cost_by_name(instance_name, start_date, end_date)
 
 @mcp.tool()
-def mcp_find_instances_by_tag(tag_key: str, tag_value: Optional[str] = None, limit: int = 5) -> str:
-    """Encontra instâncias EC2 por tag específica."""
-    return find_instances_by_tag(tag_key, tag_value, limit)
+@executor.tool("standard")
+def mcp_find_instances_by_tag(tag_key: str, tag_value: Optional[str] = None, limit: int = 5, cursor: Optional[str] = None) -> str:
+    """Encontra instâncias EC2 por tag específica. Para a próxima página, passe o next_cursor de '_pagination' em cursor."""
+    return find_instances_by_tag(tag_key, tag_value, limit, cursor=cursor)
 
 @mcp.tool()
-def mcp_audit_governance_tags() -> str:
+@executor.tool("heavy")
+def mcp_audit_governance_tags(fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """Audita tags de governança nas instâncias EC2."""
-    return audit_governance_tags()
+    return audit_governance_tags(fields=fields, max_bytes=max_bytes)
 
 @mcp.tool()
-def mcp_identify_orphaned_resources(limit: int = 5) -> str:
-    """Identifica recursos órfãos (não utilizados) na conta AWS."""
-    return identify_orphaned_resources(limit)
+@executor.tool("heavy")
+def mcp_identify_orphaned_resources(limit: int = 5, fields: Optional[str] = None, max_bytes: Optional[int] = None, cursor: Optional[str] = None) -> str:
+    """Identifica recursos órfãos (não utilizados) na conta AWS. Para a próxima página, passe o next_cursor de '_pagination' em cursor."""
+    return identify_orphaned_resources(limit, fields=fields, max_bytes=max_bytes, cursor=cursor)
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_analyze_tags_costs(tag_keys: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
     """Analisa custos de múltiplas tags específicas."""
     return analyze_multiple_tags_costs(tag_keys, start_date, end_date)
 
 @mcp.tool()
-def mcp_analyze_tag_values(tag_key: str, tag_values: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
-    """Analisa custos de valores específicos de uma tag."""
-    return analyze_tag_specific_values(tag_key, tag_values, start_date, end_date)
+@executor.tool("standard")
+def mcp_analyze_tag_values(tag_key: str, tag_values: str, start_date: Optional[str] = None, end_date: Optional[str] = None, cursor: Optional[str] = None) -> str:
+    """Analisa custos de valores específicos de uma tag. Para a próxima página, passe o next_cursor de '_pagination' em cursor."""
+    return analyze_tag_specific_values(tag_key, tag_values, start_date, end_date, cursor=cursor)
 
 # ===============================
 # MCP TOOLS - UTILITIES
 # ===============================
 
 @mcp.tool()
+@executor.tool("inline")
 def mcp_format_currency(amount: float, currency: str = "USD", to_brl: bool = True) -> str:
     """Formata valores monetários com conversão automática USD->BRL."""
     return format_currency(amount, currency, to_brl)
 
 @mcp.tool()
+@executor.tool("inline")
 def mcp_get_current_date() -> str:
     """Retorna a data atual no formato YYYY-MM-DD."""
     return get_current_date()
 
 @mcp.tool()
+@executor.tool("inline")
 def mcp_get_date_from_period(period_description: str) -> str:
     """Converte descrições de período em datas específicas com validação de limite."""
     result = get_date_from_period(period_description)
-    import json
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    return to_json(result)
 
 @mcp.tool()
+@executor.tool("inline")
 def mcp_all_dimensions() -> str:
     """Lista todas as dimensões disponíveis para análise de custos AWS."""
     dimensions = all_dimensions()
-    import json
-    return json.dumps(dimensions, ensure_ascii=False, indent=2)
+    return to_json(dimensions)
 
 @mcp.tool()
+@executor.tool("inline")
 def mcp_get_safe_date_range(months_back: int = 1) -> str:
     """Obtém um intervalo de datas seguro respeitando limitações do Cost Explorer."""
     result = get_safe_date_range(months_back)
-    import json
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    return to_json(result)
 
 # ===============================
 # MCP TOOLS - CLOUDWATCH
 # ===============================
 
 @mcp.tool()
-def mcp_get_instance_metrics(instance_id: str, hours: int = 24, metrics: Optional[str] = None) -> str:
+@executor.tool("standard")
+def mcp_get_instance_metrics(instance_id: str, hours: int = 24, metrics: Optional[str] = None, fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
     """Obtém métricas de performance de uma instância EC2 específica via CloudWatch."""
-    return get_instance_performance_metrics(instance_id, hours, metrics)
+    return get_instance_performance_metrics(instance_id, hours, metrics, fields=fields, max_bytes=max_bytes)
 
 @mcp.tool()
-def mcp_analyze_fleet_perf(tag_key: Optional[str] = None, tag_value: Optional[str] = None, hours: int = 24, max_instances: int = 10) -> str:
-    """Analisa performance de uma frota de instâncias EC2."""
-    return analyze_ec2_fleet_performance(tag_key, tag_value, hours, max_instances)
+@executor.tool("heavy")
+def mcp_analyze_fleet_perf(tag_key: Optional[str] = None, tag_value: Optional[str] = None, hours: int = 24, max_instances: int = 100, group_by: str = "instance_type", fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
+    """Analisa performance de uma frota de instâncias EC2, com percentis por grupo (tipo, AZ ou tag)."""
+    return analyze_ec2_fleet_performance(tag_key, tag_value, hours, max_instances, group_by, fields=fields, max_bytes=max_bytes)
 
 @mcp.tool()
-def mcp_get_network_analysis(instance_id: str, days: int = 7) -> str:
-    """Analisa tráfego de rede de uma instância EC2."""
-    return get_network_traffic_analysis(instance_id, days)
+@executor.tool("heavy")
+def mcp_get_network_analysis(instance_id: Optional[str] = None, days: int = 7, top_n: int = 20, order_by: str = "NetworkOut", fields: Optional[str] = None, max_bytes: Optional[int] = None) -> str:
+    """Analisa tráfego de rede de uma instância EC2 ou, sem instance_id, as top talkers da frota."""
+    return get_network_traffic_analysis(instance_id, days, top_n, order_by, fields=fields, max_bytes=max_bytes)
 
 # ===============================
 # MCP TOOLS - SERVICES
 # ===============================
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_resolve_service_name(service_name: str, auto_apply: bool = True) -> str:
     """Resolve o nome oficial de um serviço AWS a partir de um nome informal."""
     return resolve_service_name(service_name, auto_apply)
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_suggest_services(partial_name: str, limit: int = 10) -> str:
     """Sugere serviços AWS baseado em um nome parcial ou palavras-chave."""
     return suggest_services(partial_name, limit)
 
 @mcp.tool()
+@executor.tool("standard")
 def mcp_list_all_services(category_filter: Optional[str] = None) -> str:
     """Lista todos os serviços AWS conhecidos, opcionalmente filtrados por categoria."""
     return list_all_services(category_filter)
 
 @mcp.tool()
+@executor.tool("heavy")
 def mcp_refresh_services_cache() -> str:
     """Atualiza o cache de serviços AWS."""
     return refresh_services_cache()
@@ -228,10 +270,54 @@ def mcp_refresh_services_cache() -> str:
 async def health_check(request: Request) -> PlainTextResponse:
     return PlainTextResponse("OK")
 
+def _collect_runtime_metrics():
+    """Coletor do /metrics: caches e filas do executor, lidos no momento do scrape."""
+    from src.clouds.aws.cost_trends import CostTrendEngine
+    from src.clouds.aws.metric_cache import metric_cache
+    from src.ia.tools.pagination import result_snapshots
+    from src.ia.tools.service_resolver import get_service_resolver
+    
+    caches = [
+        cache_samples('cloudwatch_metrics', metric_cache.stats(), hits=('hits', 'partial_hits'), entries='series'),
+        cache_samples('cost_matrix', CostTrendEngine.cache_stats(), entries='entries'),
+        cache_samples('service_resolution', get_service_resolver().stats(), hits=('memo_hits',),
+                      misses=('memo_misses',), entries='memo_entries'),
+        cache_samples('result_snapshots', result_snapshots.stats(), hits=('pages_served',),
+                      misses=('cursor_misses',), entries='snapshots')
+    ]
+    yield ('cloud_insights_cache_lookups_total', 'counter', 'Consultas aos caches por resultado',
+           [sample for cache in caches for sample in cache['lookups']])
+    yield ('cloud_insights_cache_hit_ratio', 'gauge', 'Razão de acerto dos caches (acertos parciais contam como acerto)',
+           [sample for cache in caches for sample in cache['hit_ratio']])
+    yield ('cloud_insights_cache_entries', 'gauge', 'Entradas armazenadas nos caches',
+           [sample for cache in caches for sample in cache['entries']])
+    
+    stats = executor.stats()
+    yield ('cloud_insights_tool_queue_waiting', 'gauge', 'Chamadas aguardando vaga no executor',
+           [({'tool': tool, 'profile': s['profile']}, s['waiting']) for tool, s in stats.items()])
+    yield ('cloud_insights_tool_queue_timeouts_total', 'counter', 'Chamadas que desistiram após o prazo de espera na fila',
+           [({'tool': tool, 'profile': s['profile']}, s['timed_out']) for tool, s in stats.items()])
+
+registry.add_collector(_collect_runtime_metrics)
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Métricas no formato de texto do Prometheus."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     """Função principal para execução do servidor."""
     print("🚀 Iniciando Cloud Insights MCP Server...")
-    print("📊 28 ferramentas especializadas carregadas")
+    # Contagem das ferramentas registradas: get_tools() no fastmcp 2.x, list_tools() a partir do 3.x
+    # (sem middleware: o servidor ainda não está rodando)
+    if hasattr(mcp, 'get_tools'):
+        tools = asyncio.run(mcp.get_tools())
+    else:
+        tools = asyncio.run(mcp.list_tools(run_middleware=False))
+    print(f"📊 {len(tools)} ferramentas especializadas carregadas")
+    
+    # Carregar serviços e índice de busca sem atrasar a abertura da porta
+    start_background_warm_up()
     
     mcp.run(
         transport="streamable-http",
@@ -0,0 +1,5 @@
+"""
+Telemetria do Cloud Insights: métricas no formato Prometheus, contabilidade das
+chamadas à AWS por execução de ferramenta, traces das consultas (OTLP em JSON lines)
+e perfil de inicialização dos comandos.
+"""
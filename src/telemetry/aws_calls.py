@@ -0,0 +1,354 @@
+"""
+Contabilidade das chamadas à AWS por execução de ferramenta.
+
+Hooks do botocore atribuem cada chamada feita pelas sessões do AWSClient à
+execução de ferramenta que a causou (aws_call_scope(), ativo no contexto da
+thread que faz a chamada): operação, latência, bytes, retentativas, throttles e
+o custo estimado das APIs cobradas por requisição (Cost Explorer: US$ 0,01 por
+requisição, cada página conta). O total da execução aparece no '_meta' da
+resposta da ferramenta (ver to_json()) e escopos externos (ex: uma consulta do
+CLI) acumulam o detalhamento por ferramenta. Com um trace ativo
+(src/telemetry/tracing.py), cada chamada vira também um span filho do span atual.
+
+No replay e no modo fake não há requisição HTTP: as chamadas são contadas como
+'offline' e sem bytes (estimá-los serializando cada resposta custaria mais que a
+própria chamada simulada).
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+
+from src.telemetry.metrics import THROTTLE_CODES
+from src.telemetry.tracing import current_span, record_span
+
+# Preço por requisição das APIs cobradas por chamada (US$)
+REQUEST_PRICES_USD = {'ce': 0.01}
+
+
+def _body_size(body: Any) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if isinstance(body, dict):
+        return len(json.dumps(body, default=str).encode('utf-8'))
+    return 0
+
+
+class AWSCallLedger:
+    """
+    Chamadas à AWS de um escopo (uma execução de ferramenta ou uma consulta inteira).
+    
+    Thread-safe: ferramentas que paralelizam chamadas registram de várias threads.
+    """
+    
+    def __init__(self, name: str, kind: str = 'tool'):
+        """
+        Inicializa o registro.
+        
+        Args:
+            name: Nome do escopo (ex: nome da ferramenta)
+            kind: 'tool' (uma execução de ferramenta) ou 'run' (agrupa várias)
+        """
+        self.name = name
+        self.kind = kind
+        self.calls: List[Dict[str, Any]] = []
+        self.invocations: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+    
+    def record(self, call: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls.append(call)
+    
+    def add_invocation(self, name: str, summary: Dict[str, Any]) -> None:
+        """Registra o resumo de uma execução de ferramenta encerrada dentro deste escopo."""
+        with self._lock:
+            self.invocations.append({'tool': name, **summary})
+    
+    def tool_summaries(self) -> List[Dict[str, Any]]:
+        """Resumos das execuções de ferramentas encerradas dentro deste escopo, em ordem."""
+        with self._lock:
+            return list(self.invocations)
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totais do escopo.
+        
+        Returns:
+            Dicionário com chamadas, latência somada, bytes, retentativas, throttles,
+            erros, custo estimado e os mesmos totais por 'serviço.Operação'
+        """
+        with self._lock:
+            calls = list(self.calls)
+        totals = _totals(calls)
+        operations: Dict[str, List[Dict[str, Any]]] = {}
+        for call in calls:
+            operations.setdefault(f"{call['service']}.{call['operation']}", []).append(call)
+        totals['operations'] = {
+            name: _totals(items) for name, items in
+            sorted(operations.items(), key=lambda item: (-len(item[1]), item[0]))
+        }
+        offline = sum(1 for call in calls if call['offline'])
+        if offline:
+            totals['offline_calls'] = offline
+        return totals
+    
+    def meta(self) -> Dict[str, Any]:
+        """Resumo compacto para o '_meta' das ferramentas (operações só com chamadas e latência)."""
+        summary = self.summary()
+        summary['operations'] = {name: {'calls': item['calls'], 'duration_ms': item['duration_ms']}
+                                 for name, item in summary['operations'].items()}
+        return {key: value for key, value in summary.items() if value or key == 'calls'}
+
+
+def _totals(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'calls': len(calls),
+        'duration_ms': round(sum(call['duration_ms'] for call in calls), 1),
+        'bytes_sent': sum(call['bytes_sent'] for call in calls),
+        'bytes_received': sum(call['bytes_received'] for call in calls),
+        'retries': sum(call['retries'] for call in calls),
+        'throttles': sum(call['throttles'] for call in calls),
+        'errors': sum(1 for call in calls if call['error']),
+        'estimated_cost_usd': round(sum(call['cost_usd'] for call in calls), 4)
+    }
+
+
+_active_ledgers: ContextVar[Tuple[AWSCallLedger, ...]] = ContextVar('aws_call_ledgers', default=())
+
+
+@contextmanager
+def aws_call_scope(name: str, kind: str = 'tool') -> Iterator[AWSCallLedger]:
+    """
+    Atribui as chamadas à AWS feitas dentro do bloco a um novo registro.
+    
+    Escopos podem ser aninhados: a chamada entra em todos os ativos e, ao sair, o
+    resumo de um escopo 'tool' é adicionado aos escopos externos. Threads criadas
+    dentro do bloco só enxergam o escopo se executarem com uma cópia do contexto
+    (contextvars.copy_context()).
+    
+    Args:
+        name: Nome do escopo
+        kind: 'tool' ou 'run'
+    
+    Returns:
+        O registro do escopo
+    """
+    ledger = AWSCallLedger(name, kind)
+    parents = _active_ledgers.get()
+    token = _active_ledgers.set(parents + (ledger,))
+    try:
+        yield ledger
+    finally:
+        _active_ledgers.reset(token)
+        if kind == 'tool':
+            summary = ledger.summary()
+            for parent in parents:
+                parent.add_invocation(name, summary)
+
+
+def current_tool_ledger() -> Optional[AWSCallLedger]:
+    """Registro da execução de ferramenta mais interna ativa (ou None)."""
+    for ledger in reversed(_active_ledgers.get()):
+        if ledger.kind == 'tool':
+            return ledger
+    return None
+
+
+def meta_enabled() -> bool:
+    """Se o resumo das chamadas entra no '_meta' das ferramentas (CLOUD_INSIGHTS_AWS_CALLS_META)."""
+    return os.environ.get('CLOUD_INSIGHTS_AWS_CALLS_META', '1').lower() not in ('0', 'false', 'no')
+
+
+def accounted(name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Envolve uma ferramenta para que cada execução tenha o próprio aws_call_scope().
+    
+    Args:
+        name: Nome da ferramenta
+        function: Função da ferramenta
+    
+    Returns:
+        Função envolvida (nome, docstring e assinatura preservados)
+    """
+    @functools.wraps(function)
+    def run(*args, **kwargs):
+        with aws_call_scope(name):
+            return function(*args, **kwargs)
+    
+    return run
+
+
+# ----- hooks do botocore -----
+
+def _before_parameter_build(params: Optional[Dict[str, Any]] = None, model: Any = None,
+                            context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    ledgers = _active_ledgers.get()
+    parent_span = current_span()
+    if context is None or model is None or (not ledgers and parent_span is None):
+        return
+    context['_aws_call'] = {
+        'service': model.service_model.service_name,
+        'operation': model.name,
+        'region': context.get('client_region'),
+        'ledgers': ledgers,
+        'parent_span': parent_span,
+        'bytes_sent': 0,
+        'throttles': 0,
+        'started_ns': time.time_ns(),
+        'started': time.perf_counter()
+    }
+
+
+def _request_created(request: Any = None, **kwargs) -> None:
+    call = (getattr(request, 'context', None) or {}).get('_aws_call')
+    if call is not None:
+        call['bytes_sent'] = _body_size(getattr(request, 'body', None))
+
+
+def _needs_retry(response: Any = None, request_dict: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    call = ((request_dict or {}).get('context') or {}).get('_aws_call')
+    if call is None or not response:
+        return
+    parsed = response[1] if isinstance(response, tuple) and len(response) > 1 else {}
+    if (parsed or {}).get('Error', {}).get('Code') in THROTTLE_CODES:
+        call['throttles'] += 1
+
+
+def _after_call(http_response: Any = None, parsed: Optional[Dict[str, Any]] = None,
+                context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    call = (context or {}).pop('_aws_call', None)
+    if call is None:
+        return
+    parsed = parsed or {}
+    error = parsed.get('Error', {}).get('Code') if getattr(http_response, 'status_code', 200) >= 300 else None
+    # Resposta sem corpo HTTP: veio do replay ou do modo fake
+    offline = getattr(http_response, 'raw', None) is None
+    received = 0 if offline else len(http_response.content or b'')
+    _finish(call, error, received, offline, parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0), billed=True)
+
+
+def _after_call_error(exception: Exception = None, context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    call = (context or {}).pop('_aws_call', None)
+    if call is not None:
+        # Sem resposta (ex: falha de conexão), a requisição não chegou a ser cobrada
+        _finish(call, type(exception).__name__ if exception else 'Error', 0, False, 0, billed=False)
+
+
+def _finish(call: Dict[str, Any], error: Optional[str], received: int, offline: bool, retries: int,
+            billed: bool) -> None:
+    if error in THROTTLE_CODES and not call['throttles']:
+        call['throttles'] = 1
+    record = {
+        'service': call['service'],
+        'operation': call['operation'],
+        'duration_ms': round((time.perf_counter() - call['started']) * 1000, 2),
+        'bytes_sent': call['bytes_sent'],
+        'bytes_received': received,
+        'offline': offline,
+        'retries': retries or 0,
+        'throttles': call['throttles'],
+        'error': error,
+        'cost_usd': REQUEST_PRICES_USD.get(call['service'], 0.0) if billed else 0.0
+    }
+    for ledger in call['ledgers']:
+        ledger.record(record)
+    if call['parent_span'] is not None:
+        record_span(f"aws {call['service']}.{call['operation']}", call['parent_span'], call['started_ns'],
+                    time.time_ns(), error=error, attributes={
+                        'cloud_insights.category': 'aws',
+                        'rpc.system': 'aws-api',
+                        'rpc.service': call['service'],
+                        'rpc.method': call['operation'],
+                        'cloud.region': call['region'],
+                        'cloud_insights.bytes_sent': record['bytes_sent'],
+                        'cloud_insights.bytes_received': received,
+                        'cloud_insights.offline': offline,
+                        'cloud_insights.retries': record['retries'],
+                        'cloud_insights.throttles': record['throttles'],
+                        'cloud_insights.estimated_cost_usd': record['cost_usd']
+                    })
+
+
+def instrument_call_accounting(session: Any) -> Any:
+    """
+    Registra os hooks de contabilidade numa sessão boto3 (uma única vez por sessão).
+    
+    Fora de um aws_call_scope() e de um trace os hooks não fazem nada.
+    
+    Args:
+        session: boto3.Session
+    
+    Returns:
+        A própria sessão
+    """
+    if getattr(session, '_cloud_insights_accounting', False):
+        return session
+    events = session.events
+    events.register('before-parameter-build', _before_parameter_build, unique_id='cloud-insights-accounting-start')
+    events.register('request-created', _request_created, unique_id='cloud-insights-accounting-request')
+    events.register('needs-retry', _needs_retry, unique_id='cloud-insights-accounting-retry')
+    events.register('after-call', _after_call, unique_id='cloud-insights-accounting-after')
+    events.register('after-call-error', _after_call_error, unique_id='cloud-insights-accounting-error')
+    session._cloud_insights_accounting = True
+    return session
+
+
+def _format_bytes(value: int) -> str:
+    if value >= 1024 * 1024:
+        return f"{value / (1024 * 1024):.1f} MB"
+    if value >= 1024:
+        return f"{value / 1024:.1f} KB"
+    return f"{value} B"
+
+
+def format_call_summary(ledger: AWSCallLedger) -> str:
+    """
+    Resumo legível de um escopo: totais, por ferramenta e por operação.
+    
+    Args:
+        ledger: Registro de um aws_call_scope() (normalmente do tipo 'run')
+    
+    Returns:
+        Texto do resumo
+    """
+    totals = ledger.summary()
+    if not totals['calls']:
+        return "☁️  Nenhuma chamada à AWS nesta execução\n"
+    
+    offline = f" ({totals['offline_calls']} offline, sem bytes)" if totals.get('offline_calls') else ""
+    lines = [
+        f"☁️  Chamadas à AWS: {totals['calls']} em {totals['duration_ms'] / 1000:.2f}s · "
+        f"{_format_bytes(totals['bytes_sent'])} enviados, {_format_bytes(totals['bytes_received'])} "
+        f"recebidos{offline} · {totals['retries']} retentativa(s), {totals['throttles']} throttle(s), "
+        f"{totals['errors']} erro(s) · custo estimado US$ {totals['estimated_cost_usd']:.2f}"
+    ]
+    
+    invocations = ledger.tool_summaries()
+    if invocations:
+        width = max(len(item['tool']) for item in invocations)
+        lines.append("   Por ferramenta:")
+        for item in invocations:
+            lines.append(f"   • {item['tool']:<{width}}  {item['calls']:>4} chamada(s)  "
+                         f"{item['duration_ms'] / 1000:>6.2f}s  US$ {item['estimated_cost_usd']:.2f}")
+        unattributed = totals['calls'] - sum(item['calls'] for item in invocations)
+        if unattributed:
+            lines.append(f"   • fora de ferramentas: {unattributed} chamada(s)")
+    
+    width = max(len(name) for name in totals['operations'])
+    lines.append("   Por operação:")
+    for name, item in totals['operations'].items():
+        extras = ", ".join(f"{item[key]} {label}" for key, label in
+                           (('retries', 'retentativa(s)'), ('throttles', 'throttle(s)'), ('errors', 'erro(s)'))
+                           if item[key])
+        lines.append(f"   • {name:<{width}}  {item['calls']:>4}x  {item['duration_ms'] / 1000:>6.2f}s  "
+                     f"{_format_bytes(item['bytes_received']):>9}" + (f"  ({extras})" if extras else ""))
+    return "\n".join(lines) + "\n"
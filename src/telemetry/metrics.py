@@ -0,0 +1,350 @@
+"""
+Métricas em memória no formato de texto do Prometheus.
+
+Contadores, gauges e histogramas simples (sem dependências externas), mais hooks
+do botocore que medem todas as chamadas à AWS feitas pelas sessões do projeto.
+Valores obtidos sob demanda (caches, filas) entram por coletores chamados no
+momento do scrape.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# Buckets de latência (segundos): de chamadas locais a varreduras de minutos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Códigos de erro da AWS que indicam limitação de taxa
+THROTTLE_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'TooManyRequestsException', 'RequestLimitExceeded',
+    'LimitExceededException', 'SlowDown', 'ProvisionedThroughputExceededException'
+}
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base das métricas: nome, ajuda, rótulos e lock."""
+    
+    type_name = 'untyped'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: rótulos esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotônico por combinação de rótulos."""
+    
+    type_name = 'counter'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}'
+                for key, value in items]
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce (ex: requisições em andamento)."""
+    
+    type_name = 'gauge'
+    
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Histograma de buckets cumulativos, com soma e contagem."""
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por rótulos: [contagens por bucket (não cumulativas)..., soma, contagem]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+    
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        position = len(self.buckets)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                position = index
+                break
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 3)
+            state[position] += 1
+            state[-2] += value
+            state[-1] += 1
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:len(self.buckets) + 1]):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+                lines.append(f'{self.name}_bucket{bucket_labels} {_format_value(cumulative)}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(state[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {_format_value(state[-1])}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registro das métricas do processo e dos coletores avaliados a cada scrape.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+    
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+    
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+    
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        """
+        Registra um coletor chamado a cada scrape.
+        
+        Args:
+            collector: Função que retorna tuplas (nome, tipo, ajuda, [(rótulos, valor), ...])
+        """
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """Gera o texto de exposição do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        
+        lines = []
+        for metric in metrics:
+            samples = metric.render()
+            if not samples:
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(samples)
+        
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # Um coletor com problema não deve derrubar o endpoint inteiro
+                print(f"⚠️  Erro no coletor de métricas: {e}")
+                continue
+            for name, type_name, help_text, samples in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {type_name}')
+                lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}' for labels, value in samples)
+        
+        return '\n'.join(lines) + '\n'
+
+
+# Registro compartilhado pelo processo
+registry = MetricsRegistry()
+
+TOOL_CALLS = registry.counter(
+    'cloud_insights_tool_calls_total', 'Chamadas de ferramentas por resultado', ('tool', 'status'))
+TOOL_DURATION = registry.histogram(
+    'cloud_insights_tool_duration_seconds', 'Latência das ferramentas (inclui espera na fila)', ('tool',))
+TOOL_IN_FLIGHT = registry.gauge(
+    'cloud_insights_tool_in_flight', 'Chamadas de ferramentas em andamento', ('tool',))
+AWS_CALLS = registry.counter(
+    'cloud_insights_aws_api_calls_total', 'Chamadas à API da AWS por serviço, operação e resultado',
+    ('service', 'operation', 'status'))
+AWS_DURATION = registry.histogram(
+    'cloud_insights_aws_api_duration_seconds', 'Latência das chamadas à API da AWS (inclui retentativas)',
+    ('service', 'operation'))
+AWS_THROTTLES = registry.counter(
+    'cloud_insights_aws_api_throttles_total', 'Respostas de limitação de taxa da AWS (por tentativa)',
+    ('service', 'operation'))
+
+
+@contextmanager
+def track_tool(tool: str) -> Iterator[Dict[str, str]]:
+    """
+    Mede uma chamada de ferramenta: em andamento, latência e resultado.
+    
+    O chamador pode mudar o resultado registrado (ex: 'rejected') pelo dicionário retornado.
+    
+    Args:
+        tool: Nome da ferramenta
+    """
+    outcome = {'status': 'ok'}
+    started = time.perf_counter()
+    TOOL_IN_FLIGHT.inc(tool=tool)
+    try:
+        yield outcome
+    except Exception:
+        if outcome['status'] == 'ok':
+            outcome['status'] = 'error'
+        raise
+    finally:
+        TOOL_IN_FLIGHT.dec(tool=tool)
+        TOOL_DURATION.observe(time.perf_counter() - started, tool=tool)
+        TOOL_CALLS.inc(tool=tool, status=outcome['status'])
+
+
+def _operation_labels(model: Any) -> Dict[str, str]:
+    return {
+        'service': model.service_model.service_name if model is not None else 'unknown',
+        'operation': model.name if model is not None else 'unknown'
+    }
+
+
+def _before_call(model: Any = None, context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    if context is not None:
+        context['_telemetry_started'] = time.perf_counter()
+        # O after-call-error não recebe o model: os rótulos vão no contexto
+        context['_telemetry_labels'] = _operation_labels(model)
+
+
+def _after_call(http_response: Any = None, model: Any = None,
+                context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    status_code = getattr(http_response, 'status_code', 200)
+    _record_call(model, context, 'ok' if status_code < 400 else 'error')
+
+
+def _after_call_error(model: Any = None, context: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    _record_call(model, context, 'error')
+
+
+def _record_call(model: Any, context: Optional[Dict[str, Any]], status: str) -> None:
+    labels = (context or {}).get('_telemetry_labels') or _operation_labels(model)
+    AWS_CALLS.inc(status=status, **labels)
+    started = (context or {}).pop('_telemetry_started', None)
+    if started is not None:
+        AWS_DURATION.observe(time.perf_counter() - started, **labels)
+
+
+def _needs_retry(response: Any = None, operation: Any = None, **kwargs) -> None:
+    # Chamado a cada tentativa; retornar None não interfere na política de retry
+    if not response:
+        return
+    parsed = response[1] if isinstance(response, tuple) and len(response) > 1 else {}
+    code = (parsed or {}).get('Error', {}).get('Code')
+    if code in THROTTLE_CODES:
+        AWS_THROTTLES.inc(**_operation_labels(operation))
+
+
+def instrument_session(session: Any) -> Any:
+    """
+    Registra os hooks de métricas numa sessão boto3 (uma única vez por sessão).
+    
+    Args:
+        session: boto3.Session
+    
+    Returns:
+        A própria sessão
+    """
+    if getattr(session, '_cloud_insights_instrumented', False):
+        return session
+    events = session.events
+    # before-parameter-build é emitido para todos os handlers (before-call para no primeiro que responde)
+    events.register('before-parameter-build', _before_call, unique_id='cloud-insights-metrics-before')
+    events.register('after-call', _after_call, unique_id='cloud-insights-metrics-after')
+    events.register('after-call-error', _after_call_error, unique_id='cloud-insights-metrics-error')
+    events.register('needs-retry', _needs_retry, unique_id='cloud-insights-metrics-retry')
+    session._cloud_insights_instrumented = True
+    return session
+
+
+def cache_samples(name: str, stats: Dict[str, Any], hits: Iterable[str] = ('hits',),
+                  misses: Iterable[str] = ('misses',), entries: Optional[str] = None) -> Dict[str, List[Sample]]:
+    """
+    Converte o stats() de um cache em amostras dos contadores de lookup, razão de acerto e tamanho.
+    
+    Args:
+        name: Nome do cache (rótulo 'cache')
+        stats: Dicionário retornado pelo stats() do cache
+        hits: Chaves do stats que contam como acerto (cada uma vira um 'result')
+        misses: Chaves do stats que contam como falta
+        entries: Chave do stats com o número de entradas
+    
+    Returns:
+        Amostras por família ('lookups', 'hit_ratio', 'entries')
+    """
+    hit_total = sum(stats.get(key, 0) for key in hits)
+    miss_total = sum(stats.get(key, 0) for key in misses)
+    lookups = hit_total + miss_total
+    samples = {
+        'lookups': [({'cache': name, 'result': key}, stats.get(key, 0)) for key in tuple(hits) + tuple(misses)],
+        'hit_ratio': [({'cache': name}, round(hit_total / lookups, 4) if lookups else 0.0)],
+        'entries': []
+    }
+    if entries:
+        samples['entries'].append(({'cache': name}, stats.get(entries, 0)))
+    return samples
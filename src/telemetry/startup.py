@@ -0,0 +1,107 @@
+"""
+Perfil de inicialização dos comandos de linha de comando.
+
+--startup-profile executa o mesmo comando num processo filho com
+PYTHONPROFILEIMPORTTIME (equivalente a `python -X importtime`) e, ao final,
+mostra quanto tempo cada módulo levou para ser importado. Assim dá para ver
+quais dependências pesadas (boto3, haystack, numpy...) cada caminho carrega.
+
+Só usa a biblioteca padrão: importar este módulo não pode pesar na inicialização.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+STARTUP_PROFILE_FLAG = "--startup-profile"
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+
+
+def parse_import_times(stderr: str) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Interpreta a saída de -X importtime.
+    
+    Args:
+        stderr: stderr do processo perfilado
+    
+    Returns:
+        Tupla (imports na ordem em que terminaram: {'module', 'self_ms', 'cumulative_ms',
+        'depth'}, demais linhas do stderr)
+    """
+    entries: List[Dict[str, Any]] = []
+    other: List[str] = []
+    for line in stderr.splitlines(keepends=True):
+        match = _IMPORT_LINE.match(line.rstrip('\n'))
+        if match is None:
+            if not line.startswith('import time: self [us]'):
+                other.append(line)
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            'module': module,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': (len(indent) - 1) // 2
+        })
+    return entries, ''.join(other)
+
+
+def format_report(entries: List[Dict[str, Any]], wall_seconds: float, top: int = 15) -> str:
+    """
+    Monta o relatório: imports de primeiro nível e módulos com maior tempo próprio.
+    
+    Args:
+        entries: Resultado de parse_import_times()
+        wall_seconds: Duração total do processo
+        top: Linhas em cada tabela
+    
+    Returns:
+        Texto do relatório
+    """
+    roots = sorted((e for e in entries if e['depth'] == 0), key=lambda e: -e['cumulative_ms'])
+    heaviest = sorted(entries, key=lambda e: -e['self_ms'])
+    imports_ms = sum(e['cumulative_ms'] for e in roots)
+    
+    lines = [
+        "",
+        "⏱️  " + "=" * 60,
+        "   PERFIL DE INICIALIZAÇÃO",
+        "=" * 64,
+        f"Tempo total do processo: {wall_seconds * 1000:.0f} ms",
+        f"Tempo em imports: {imports_ms:.0f} ms ({len(entries)} módulos)",
+        "",
+        f"Imports de primeiro nível (tempo acumulado, top {top}):"
+    ]
+    lines += [f"  {e['cumulative_ms']:9.1f} ms  {e['module']}" for e in roots[:top]]
+    lines += ["", f"Módulos com maior tempo próprio (top {top}):"]
+    lines += [f"  {e['self_ms']:9.1f} ms  {e['module']}" for e in heaviest[:top]]
+    return "\n".join(lines) + "\n"
+
+
+def profile_startup(argv: Optional[List[str]] = None, top: int = 15) -> int:
+    """
+    Executa o comando atual sem --startup-profile, medindo os imports, e imprime o relatório.
+    
+    Args:
+        argv: Argumentos do comando (padrão: sys.argv)
+        top: Linhas em cada tabela do relatório
+    
+    Returns:
+        Código de saída do comando perfilado
+    """
+    argv = list(argv if argv is not None else sys.argv)
+    command = [sys.executable, argv[0]] + [arg for arg in argv[1:] if arg != STARTUP_PROFILE_FLAG]
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    
+    started = time.perf_counter()
+    completed = subprocess.run(command, env=env, stderr=subprocess.PIPE, text=True)
+    wall_seconds = time.perf_counter() - started
+    
+    entries, other = parse_import_times(completed.stderr)
+    sys.stderr.write(other)
+    sys.stdout.write(format_report(entries, wall_seconds, top))
+    return completed.returncode
@@ -0,0 +1,407 @@
+"""
+Rastreamento (tracing) hierárquico das consultas: execução do agente → passo do
+modelo → chamada de ferramenta → requisição à AWS.
+
+Os spans ficam em memória enquanto um trace_scope() está ativo e, ao final, podem
+ser gravados em JSON lines no formato OTLP/JSON (uma linha por trace, como o
+exportador de arquivo do OpenTelemetry Collector; dá para reenviá-las a qualquer
+backend OTLP) e resumidos em árvore, estilo flame graph, no terminal.
+
+O span atual segue o contexto (contextvars): threads criadas com uma cópia do
+contexto (ferramentas do agente, lotes do CloudWatch) continuam na mesma árvore.
+Só usa a biblioteca padrão; a ligação com o Haystack fica em
+src/adapters/haystack_tracing.py.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+SERVICE_NAME = 'cloud-insights'
+SCOPE_NAME = 'cloud_insights.tracing'
+
+# Tipos de span do OTLP
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+
+# Status do OTLP
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+class Span:
+    """
+    Um intervalo de trabalho com atributos, dentro de um trace.
+    """
+    
+    def __init__(self, trace: 'Trace', name: str, parent: Optional['Span'] = None, kind: int = KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        """
+        Inicia o span.
+        
+        Args:
+            trace: Trace ao qual o span pertence
+            name: Nome do span
+            parent: Span pai (None para a raiz)
+            kind: KIND_INTERNAL ou KIND_CLIENT (chamadas a serviços externos)
+            attributes: Atributos iniciais
+            start_ns: Início em nanossegundos desde a época (padrão: agora)
+        """
+        self.trace = trace
+        self.trace_id = trace.trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ''
+    
+    @property
+    def duration_seconds(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+    
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = message[:300]
+    
+    def end(self, end_ns: Optional[int] = None) -> None:
+        """Encerra o span (uma única vez) e o registra no trace."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        self.trace.add(self)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span no formato OTLP/JSON (ids em hexadecimal, inteiros de 64 bits como texto)."""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns if self.end_ns is not None else self.start_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)}
+                           for key, value in self.attributes.items() if value is not None],
+            'status': {'code': self.status}
+        }
+        if self.parent is not None:
+            span['parentSpanId'] = self.parent.span_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if isinstance(value, (list, tuple)):
+        return {'arrayValue': {'values': [_otlp_value(item) for item in value]}}
+    return {'stringValue': str(value)}
+
+
+class Trace:
+    """
+    Spans encerrados de uma execução (thread-safe).
+    """
+    
+    def __init__(self, name: str):
+        """
+        Inicializa o trace.
+        
+        Args:
+            name: Nome do span raiz
+        """
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+    
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+    
+    def finished_spans(self) -> List[Span]:
+        """Spans encerrados, em ordem de início."""
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span.start_ns)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """Trace no formato de uma ExportTraceServiceRequest do OTLP/JSON."""
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+                'scopeSpans': [{
+                    'scope': {'name': SCOPE_NAME},
+                    'spans': [span.to_otlp() for span in self.finished_spans()]
+                }]
+            }]
+        }
+    
+    def write_jsonl(self, path: str) -> None:
+        """
+        Acrescenta o trace como uma linha OTLP/JSON ao arquivo.
+        
+        Args:
+            path: Caminho do arquivo .jsonl
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as trace_file:
+            trace_file.write(json.dumps(self.to_otlp(), ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('trace_current_span', default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Span ativo no contexto atual (None fora de um trace_scope())."""
+    return _current_span.get()
+
+
+@contextmanager
+def trace_scope(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Trace]:
+    """
+    Inicia um trace: o bloco é o span raiz e spans abertos dentro dele entram na árvore.
+    
+    Args:
+        name: Nome do span raiz
+        attributes: Atributos do span raiz
+    
+    Returns:
+        O trace (com os spans encerrados ao sair do bloco)
+    """
+    trace = Trace(name)
+    with span(name, attributes=attributes, trace=trace) as root:
+        trace.root = root
+        yield trace
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+         parent: Optional[Span] = None, trace: Optional[Trace] = None) -> Iterator[Optional[Span]]:
+    """
+    Abre um span filho do span ativo (ou de parent) e o torna ativo dentro do bloco.
+    
+    Fora de um trace_scope() (e sem trace), não faz nada e retorna None.
+    
+    Args:
+        name: Nome do span
+        kind: KIND_INTERNAL ou KIND_CLIENT
+        attributes: Atributos iniciais
+        parent: Pai explícito (ex: quando o span ativo não é o pai lógico)
+        trace: Trace novo (só para o span raiz)
+    
+    Returns:
+        O span aberto ou None
+    """
+    parent = parent or (current_span() if trace is None else None)
+    owner = trace or (parent.trace if parent is not None else None)
+    if owner is None:
+        yield None
+        return
+    opened = Span(owner, name, parent, kind, attributes)
+    token = _current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        opened.end()
+
+
+def record_span(name: str, parent: Span, start_ns: int, end_ns: int, kind: int = KIND_CLIENT,
+                attributes: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> Span:
+    """
+    Registra um span já concluído (ex: medido por hooks de início e fim separados).
+    
+    Args:
+        name: Nome do span
+        parent: Span pai
+        start_ns: Início (ns desde a época)
+        end_ns: Fim (ns desde a época)
+        kind: Tipo do span
+        attributes: Atributos
+        error: Mensagem de erro, se houve
+    
+    Returns:
+        O span registrado
+    """
+    recorded = Span(parent.trace, name, parent, kind, attributes, start_ns=start_ns)
+    if error:
+        recorded.set_error(error)
+    recorded.end(end_ns)
+    return recorded
+
+
+# ----- resumo estilo flame graph -----
+
+def _union_seconds(intervals: List[Tuple[int, int]]) -> float:
+    """Duração coberta por intervalos que podem se sobrepor (chamadas em paralelo)."""
+    total, current_start, current_end = 0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total / 1e9
+
+
+def _subtract(intervals: List[Tuple[int, int]], removed: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Partes dos intervalos não cobertas por 'removed'."""
+    result = []
+    removed = sorted(removed)
+    for start, end in intervals:
+        cursor = start
+        for r_start, r_end in removed:
+            if r_end <= cursor or r_start >= end:
+                continue
+            if r_start > cursor:
+                result.append((cursor, r_start))
+            cursor = max(cursor, r_end)
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def time_breakdown(trace: Trace) -> Dict[str, float]:
+    """
+    Para onde foi o tempo da execução: modelo, código das ferramentas, AWS e o restante.
+    
+    Usa a categoria dos spans (atributo 'cloud_insights.category': 'llm', 'tool' ou
+    'aws') e conta trechos em paralelo uma única vez.
+    
+    Returns:
+        Segundos por categoria e o total ('total', 'llm', 'tool_code', 'aws', 'other')
+    """
+    spans = trace.finished_spans()
+    by_category: Dict[str, List[Tuple[int, int]]] = {'llm': [], 'tool': [], 'aws': []}
+    for item in spans:
+        category = item.attributes.get('cloud_insights.category')
+        if category in by_category:
+            by_category[category].append((item.start_ns, item.end_ns))
+    total = trace.root.duration_seconds if trace.root else 0.0
+    llm = _union_seconds(by_category['llm'])
+    aws = _union_seconds(by_category['aws'])
+    tool_code = _union_seconds(_subtract(by_category['tool'], by_category['aws'] + by_category['llm']))
+    covered = _union_seconds(by_category['llm'] + by_category['tool'] + by_category['aws'])
+    return {
+        'total': round(total, 3),
+        'llm': round(llm, 3),
+        'tool_code': round(tool_code, 3),
+        'aws': round(aws, 3),
+        'other': round(max(total - covered, 0.0), 3)
+    }
+
+
+def _label(item: Span) -> str:
+    attributes = item.attributes
+    details = []
+    if 'gen_ai.usage.input_tokens' in attributes:
+        estimated = '~' if attributes.get('cloud_insights.tokens_estimated') else ''
+        details.append(f"{estimated}{attributes['gen_ai.usage.input_tokens']}→"
+                       f"{estimated}{attributes.get('gen_ai.usage.output_tokens', 0)} tokens")
+    if 'cloud_insights.output_bytes' in attributes:
+        details.append(f"{attributes['cloud_insights.output_bytes'] / 1024:.1f} KB")
+    if item.status == STATUS_ERROR:
+        details.append("erro")
+    return item.name + (f" ({', '.join(details)})" if details else "")
+
+
+def format_flame(trace: Trace, width: int = 30, max_children: int = 12) -> str:
+    """
+    Árvore dos spans com duração e barra proporcional ao span raiz.
+    
+    Spans irmãos de requisições à AWS com o mesmo nome são agrupados (×N, duração somada).
+    
+    Args:
+        trace: Trace encerrado
+        width: Largura máxima da barra
+        max_children: Filhos mostrados por span (os mais longos; o resto é resumido)
+    
+    Returns:
+        Texto do resumo
+    """
+    spans = trace.finished_spans()
+    if trace.root is None or not spans:
+        return "🔥 Trace vazio\n"
+    children: Dict[str, List[Span]] = {}
+    for item in spans:
+        if item.parent is not None:
+            children.setdefault(item.parent.span_id, []).append(item)
+    total = max(trace.root.duration_seconds, 1e-9)
+    rows: List[Tuple[str, float, float]] = []
+    
+    def visit(item: Span, depth: int) -> None:
+        rows.append(("  " * depth + _label(item), item.duration_seconds, item.duration_seconds))
+        groups: Dict[str, List[Span]] = {}
+        nodes: List[Any] = []
+        for child in children.get(item.span_id, []):
+            if child.kind == KIND_CLIENT:
+                if child.name not in groups:
+                    groups[child.name] = []
+                    nodes.append(groups[child.name])
+                groups[child.name].append(child)
+            else:
+                nodes.append(child)
+        
+        def seconds(node: Any) -> float:
+            if isinstance(node, list):
+                return _union_seconds([(child.start_ns, child.end_ns) for child in node])
+            return node.duration_seconds
+        
+        # Filhos na ordem em que começaram; se forem muitos, só os mais longos
+        shown = nodes
+        if len(nodes) > max_children:
+            shown = sorted(nodes, key=seconds, reverse=True)[:max_children]
+            shown = [node for node in nodes if any(node is kept for kept in shown)]
+        for node in shown:
+            if isinstance(node, list):
+                summed = sum(child.duration_seconds for child in node)
+                errors = sum(1 for child in node if child.status == STATUS_ERROR)
+                label = f"{node[0].name} ×{len(node)}" if len(node) > 1 else _label(node[0])
+                if errors and len(node) > 1:
+                    label += f" ({errors} erro(s))"
+                rows.append(("  " * (depth + 1) + label, seconds(node), summed))
+            else:
+                visit(node, depth + 1)
+        hidden = len(nodes) - len(shown)
+        if hidden:
+            rows.append(("  " * (depth + 1) + f"… {hidden} span(s) menores", 0.0, 0.0))
+    
+    visit(trace.root, 0)
+    label_width = min(max(len(label) for label, _, _ in rows), 70)
+    lines = [f"🔥 Trace {trace.trace_id} ({total:.2f}s, {len(spans)} spans)"]
+    for label, wall, summed in rows:
+        bar = "█" * max(int(round(wall / total * width)), 1 if wall > 0 else 0)
+        parallel = f" (soma {summed:.2f}s)" if summed > wall * 1.05 and summed - wall > 0.01 else ""
+        text = label if len(label) <= label_width else label[:label_width - 1] + "…"
+        lines.append(f"{text:<{label_width}}  {wall:>7.2f}s {wall / total * 100:>5.1f}%  {bar}{parallel}")
+    
+    breakdown = time_breakdown(trace)
+    lines.append(
+        f"⏱️  Tempo: modelo {breakdown['llm']:.2f}s · ferramentas (código) {breakdown['tool_code']:.2f}s · "
+        f"AWS {breakdown['aws']:.2f}s · outros {breakdown['other']:.2f}s (total {breakdown['total']:.2f}s)"
+    )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,95 @@
+"""
+Testes da paginação por cursor (src/ia/tools/pagination.py).
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.ia.tools import pagination
+from src.ia.tools.pagination import CursorError, ResultSnapshots
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste no lugar de time.monotonic()."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(pagination, 'time', SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def _sections(count: int = 25) -> dict:
+    return {'Volumes': [{'VolumeId': f"vol-{index:04d}"} for index in range(count)]}
+
+
+def test_pages_follow_the_cursor(clock):
+    snapshots = ResultSnapshots(ttl_seconds=60)
+    cursor = snapshots.create('aws_ec2_call', _sections(), 10)
+    
+    pages, meta, _ = snapshots.page('aws_ec2_call', cursor)
+    assert [item['VolumeId'] for item in pages['Volumes']] == [f"vol-{index:04d}" for index in range(10, 20)]
+    assert meta['offset'] == 10 and meta['totals'] == {'Volumes': 25}
+    
+    pages, meta, _ = snapshots.page('aws_ec2_call', meta['next_cursor'])
+    assert len(pages['Volumes']) == 5
+    assert meta['next_cursor'] is None
+
+
+def test_single_page_has_no_cursor(clock):
+    snapshots = ResultSnapshots(ttl_seconds=60)
+    
+    assert snapshots.create('aws_ec2_call', _sections(5), 10) is None
+    assert snapshots.stats()['snapshots'] == 0
+
+
+def test_cursor_expires_after_ttl(clock):
+    snapshots = ResultSnapshots(ttl_seconds=60)
+    cursor = snapshots.create('aws_ec2_call', _sections(), 10)
+    
+    clock.value += 59
+    snapshots.page('aws_ec2_call', cursor)
+    clock.value += 2
+    
+    with pytest.raises(CursorError, match='expirado'):
+        snapshots.page('aws_ec2_call', cursor)
+    assert snapshots.stats()['expired'] == 1
+
+
+def test_oldest_snapshot_is_evicted(clock):
+    snapshots = ResultSnapshots(ttl_seconds=60, max_snapshots=2)
+    cursors = [snapshots.create('aws_ec2_call', _sections(), 10) for _ in range(3)]
+    
+    with pytest.raises(CursorError):
+        snapshots.page('aws_ec2_call', cursors[0])
+    for cursor in cursors[1:]:
+        snapshots.page('aws_ec2_call', cursor)
+    assert snapshots.stats()['evicted'] == 1
+
+
+def test_byte_limit_evicts_least_recently_used(clock):
+    size = len(pagination.encode({'sections': _sections(), 'context': {}}).encode('utf-8'))
+    snapshots = ResultSnapshots(ttl_seconds=60, max_bytes=2 * size)
+    first = snapshots.create('aws_ec2_call', _sections(), 10)
+    second = snapshots.create('aws_ec2_call', _sections(), 10)
+    # Usar o primeiro o torna o mais recente: o segundo é o descartado
+    snapshots.page('aws_ec2_call', first)
+    snapshots.create('aws_ec2_call', _sections(), 10)
+    
+    snapshots.page('aws_ec2_call', first)
+    with pytest.raises(CursorError):
+        snapshots.page('aws_ec2_call', second)
+
+
+def test_cursor_from_another_tool_is_rejected(clock):
+    snapshots = ResultSnapshots(ttl_seconds=60)
+    cursor = snapshots.create('aws_ec2_call', _sections(), 10)
+    
+    with pytest.raises(CursorError, match='aws_ec2_call'):
+        snapshots.page('find_orphaned_resources', cursor)
+
+
+def test_malformed_cursor_is_rejected(clock):
+    snapshots = ResultSnapshots(ttl_seconds=60)
+    
+    with pytest.raises(CursorError, match='inválido'):
+        snapshots.page('aws_ec2_call', 'não-é-um-cursor')
@@ -0,0 +1,69 @@
+"""
+Testes do orçamento de tokens dos resultados de ferramentas (src/adapters/tool_budget.py).
+"""
+
+import json
+
+from src.adapters.tool_budget import ToolOutputBudget, estimate_tokens
+
+
+def _services(count: int) -> dict:
+    """Resultado no formato das ferramentas de custo: muitas linhas com custo e texto."""
+    return {
+        'period': {'start': '2026-09-01', 'end': '2026-10-01'},
+        'services': [
+            {'service': f"Service {index:04d}", 'cost': round(1000.0 / (index + 1), 4),
+             'description': 'x' * 80}
+            for index in range(count)
+        ]
+    }
+
+
+def test_small_result_passes_untouched():
+    budget = ToolOutputBudget(max_tokens=6000)
+    text = json.dumps(_services(5))
+    
+    assert budget.apply('get_top_services', text) == text
+    assert budget.stats()['reduced'] == 0
+
+
+def test_reduced_result_fits_the_budget():
+    budget = ToolOutputBudget(max_tokens=1000)
+    text = json.dumps(_services(500))
+    
+    reduced = budget.apply('get_top_services', text)
+    
+    assert estimate_tokens(reduced) <= 1000
+    assert 'top_k' in json.loads(reduced)['_budget']['steps']
+
+
+def test_others_row_sums_the_omitted_rows():
+    budget = ToolOutputBudget(max_tokens=1000)
+    data = _services(500)
+    
+    reduced = json.loads(budget.apply('get_top_services', json.dumps(data)))
+    rows = reduced['services']
+    kept = [row for row in rows if '_others' not in row]
+    others = rows[-1]['_others']
+    
+    kept_names = {row['service'] for row in kept}
+    omitted = [row for row in data['services'] if row['service'] not in kept_names]
+    assert others['count'] == len(omitted)
+    assert abs(others['sums']['cost'] - sum(row['cost'] for row in omitted)) < 1e-4
+    # Os itens mantidos são os de maior custo e o total da lista completa é preservado
+    assert min(row['cost'] for row in kept) >= max(row['cost'] for row in omitted)
+    summary = reduced['_budget']['lists'][0]
+    assert summary['total'] == 500
+    assert abs(summary['sums']['cost'] - sum(row['cost'] for row in data['services'])) < 1e-4
+
+
+def test_zero_cost_rows_are_dropped_first():
+    budget = ToolOutputBudget(max_tokens=1000)
+    data = _services(20)
+    data['services'].extend({'service': f"Idle {index}", 'cost': 0.0, 'description': 'y' * 200}
+                            for index in range(40))
+    
+    reduced = json.loads(budget.apply('get_top_services', json.dumps(data)))
+    
+    assert reduced['_budget']['zero_rows_dropped'] == 40
+    assert all(row['cost'] > 0 for row in reduced['services'] if '_others' not in row)
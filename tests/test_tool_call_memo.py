@@ -0,0 +1,88 @@
+"""
+Testes da memoização de chamadas de ferramentas por sessão (ToolCallMemo).
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.adapters import haystack_tools
+from src.adapters.haystack_tools import ToolCallMemo
+
+KEY = ('get_top_services', '{"limit": 5}')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste no lugar de time.monotonic()."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(haystack_tools, 'time', SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_result_is_reused_within_ttl(clock):
+    memo = ToolCallMemo(ttl_seconds=60)
+    calls = []
+    compute = lambda: calls.append(1) or '{"total": 10}'
+    
+    assert memo.call(KEY, compute) == '{"total": 10}'
+    clock.value += 30
+    cached = memo.call(KEY, compute)
+    
+    assert len(calls) == 1
+    assert cached.startswith('{"_cache":') and cached.endswith('"total": 10}')
+    assert memo.stats() == {'entries': 1, 'hits': 1, 'misses': 1}
+
+
+def test_result_expires_after_ttl(clock):
+    memo = ToolCallMemo(ttl_seconds=60)
+    calls = []
+    compute = lambda: calls.append(1) or '{"total": 10}'
+    
+    memo.call(KEY, compute)
+    clock.value += 61
+    
+    assert memo.call(KEY, compute) == '{"total": 10}'
+    assert len(calls) == 2
+
+
+def test_errors_are_not_memoized(clock):
+    memo = ToolCallMemo()
+    calls = []
+    compute = lambda: calls.append(1) or '{"error": "AccessDenied"}'
+    
+    memo.call(KEY, compute)
+    memo.call(KEY, compute)
+    
+    assert len(calls) == 2
+
+
+def test_duplicate_in_flight_call_waits_for_the_first():
+    memo = ToolCallMemo()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return '{"total": 10}'
+    
+    results = []
+    first = threading.Thread(target=lambda: results.append(memo.call(KEY, compute)))
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=lambda: results.append(memo.call(KEY, compute)))
+    second.start()
+    time.sleep(0.05)
+    # A segunda chamada está esperando a primeira, sem executar de novo
+    assert second.is_alive()
+    release.set()
+    first.join(5)
+    second.join(5)
+    
+    assert len(calls) == 1
+    assert len(results) == 2
+    assert any(result.startswith('{"_cache":') for result in results)